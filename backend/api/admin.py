@@ -15,6 +15,8 @@ from backend.schemas.admin import (
     UpdateRolePayload,
 )
 from backend.services import admin as admin_service
+from backend.services.dashboard import invalidate_dashboard_cache
+from backend.services.supply import invalidate_supply_cache
 from backend.dependencies.tenant import Tenant, get_current_tenant
 from backend.dependencies.security import require_roles
 
@@ -70,6 +72,8 @@ def restore_backup(filename: str):
         admin_service.restore_backup_file(filename)
     except admin_service.BackupError as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+    invalidate_dashboard_cache()
+    invalidate_supply_cache()
     return {"status": "restored"}
 
 
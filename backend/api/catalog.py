@@ -21,19 +21,29 @@ def list_products(
     status: str | None = None,
     page: int = 1,
     per_page: int = 25,
+    cursor: str | None = None,
     tenant: Tenant = Depends(get_current_tenant),
 ):
-    items, total = catalog_service.list_products_page(
-        tenant_id=tenant.id,
-        search=search,
-        category=category,
-        status=status,
-        page=page,
-        per_page=per_page,
-    )
+    try:
+        items, total = catalog_service.list_products_page(
+            tenant_id=tenant.id,
+            search=search,
+            category=category,
+            status=status,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     return {
         "items": items,
-        "meta": {"page": page, "per_page": per_page, "total": total},
+        "meta": {
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "next_cursor": catalog_service.next_cursor(items, per_page),
+        },
     }
 
 
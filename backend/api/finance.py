@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi import UploadFile, File
 
+from backend.api.jobs import job_status, submit_ingestion_job
 from backend.dependencies.tenant import Tenant, get_current_tenant
+from backend.schemas.jobs import IngestionJobStatus
+from backend.services.ingestion_jobs import JOB_DONE, JOB_ERROR, JOB_RUNNING, JobContext
 from backend.services.finance import core as finance_service
 from backend.services.finance import accounts as finance_accounts
 from backend.services.finance import transactions as finance_transactions
@@ -44,6 +48,7 @@ from backend.schemas.finance import (
     FinanceBatchCategorizeRequest,
     FinanceAutreSuggestion,
     FinanceTransactionSearchResponse,
+    FinanceTransactionKeysetResponse,
     FinanceBankStatementSearchResponse,
     FinanceInvoiceSearchResponse,
     FinanceCategoryCreate,
@@ -175,6 +180,45 @@ def search_transactions(
     )
 
 
+@router.get("/transactions/search/keyset", response_model=FinanceTransactionKeysetResponse)
+def search_transactions_keyset(
+    entity_id: int | None = Query(default=None),
+    account_id: int | None = Query(default=None),
+    category_id: int | None = Query(default=None),
+    date_from: str | None = Query(default=None),
+    date_to: str | None = Query(default=None),
+    amount_min: float | None = Query(default=None),
+    amount_max: float | None = Query(default=None),
+    q: str | None = Query(default=None, description="Recherche texte sur libellé/note"),
+    cursor: str | None = Query(default=None, description="next_cursor de la page précédente"),
+    size: int = Query(default=50, ge=1, le=500),
+    sort: str = Query(
+        default="-date_operation",
+        pattern="^-?date_operation$",
+        description="date_operation ou -date_operation",
+    ),
+    count: str = Query(default="none", description="none|estimate|exact"),
+    tenant: Tenant = Depends(get_current_tenant),
+) -> FinanceTransactionKeysetResponse:
+    try:
+        return finance_transactions.search_transactions_keyset(
+            entity_id=entity_id,
+            account_id=account_id,
+            category_id=category_id,
+            date_from=date_from,
+            date_to=date_to,
+            amount_min=amount_min,
+            amount_max=amount_max,
+            q=q,
+            cursor=cursor,
+            size=size,
+            sort=sort,
+            count=count,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
 @router.patch("/transactions/{transaction_id}")
 def update_transaction(
     transaction_id: int,
@@ -426,8 +470,8 @@ def finance_dashboard_summary(
 def refresh_stats_cache(
     tenant: Tenant = Depends(get_current_tenant),
 ) -> dict:
-    """Rafraîchit les vues matérialisées des stats finance."""
-    return finance_stats.refresh_materialized_views()
+    """Reconstruit les agrégats finance (normalement tenus à jour par triggers)."""
+    return finance_stats.rebuild_rollups()
 
 
 @router.get("/stats/timeline")
@@ -523,16 +567,54 @@ def search_bank_statements(
     return FinanceBankStatementSearchResponse(**result)
 
 
-@router.post("/bank-statements/import")
-async def import_bank_statements(
-    account_id: int = Query(..., description="ID du compte finance_accounts"),
-    file: UploadFile = File(...),
-    tenant: Tenant = Depends(get_current_tenant),
-) -> dict:
-    try:
-        content = await file.read()
-        summary = bank_statement_csv.import_csv(content, account_id=account_id, source=file.filename or "CSV")
-        finance_rules.record_import(account_id=account_id, file_name=file.filename or "CSV", summary=summary, error=None)
+def _bank_statement_import_job(content: bytes, *, account_id: int, file_name: str, import_id: int | None = None):
+    """Job d'import CSV : parsing dans le pool CPU, insertion et suivi finance_imports ensuite.
+
+    Sans ``import_id`` (appel synchrone historique), la ligne finance_imports est créée
+    en fin d'import via ``record_import`` ; sinon elle est mise à jour au fil de l'eau.
+    """
+
+    def run(ctx: JobContext) -> dict:
+        def progress(inserted: int, total: int) -> None:
+            ctx.progress(inserted, total)
+            if import_id is not None:
+                finance_metrics.increment_import_progress(import_id, inserted, total)
+
+        try:
+            if import_id is not None:
+                finance_imports.update_import_progress(import_id, 0, status=JOB_RUNNING)
+            entries = ctx.run_cpu(bank_statement_csv.parse_csv, content)
+            summary = bank_statement_csv.import_csv(
+                content,
+                account_id=account_id,
+                source=file_name,
+                entries=entries,
+                progress=progress,
+            )
+        except Exception as exc:
+            if import_id is None:
+                finance_rules.record_import(account_id=account_id, file_name=file_name, summary=None, error=str(exc))
+            else:
+                finance_imports.update_import_progress(import_id, 0, status=JOB_ERROR, error=str(exc))
+            finance_metrics.record_import_metrics(
+                account_id=account_id,
+                inserted=None,
+                total=None,
+                status="ERROR",
+                error=str(exc),
+            )
+            raise
+
+        ctx.progress(int(summary.get("inserted") or 0), summary.get("total"))
+        if import_id is None:
+            finance_rules.record_import(account_id=account_id, file_name=file_name, summary=summary, error=None)
+        else:
+            finance_imports.update_import_progress(
+                import_id,
+                int(summary.get("inserted") or 0),
+                summary.get("total"),
+                status=JOB_DONE,
+            )
         finance_metrics.record_import_metrics(
             account_id=account_id,
             inserted=summary.get("inserted"),
@@ -541,18 +623,55 @@ async def import_bank_statements(
             error=None,
         )
         return summary
+
+    return run
+
+
+@router.post("/bank-statements/import")
+async def import_bank_statements(
+    account_id: int = Query(..., description="ID du compte finance_accounts"),
+    file: UploadFile = File(...),
+    tenant: Tenant = Depends(get_current_tenant),
+) -> dict:
+    content = await file.read()
+    job = submit_ingestion_job(
+        "bank_statement_import",
+        _bank_statement_import_job(content, account_id=account_id, file_name=file.filename or "CSV"),
+        tenant_id=tenant.id,
+    )
+    try:
+        # Parsing et insertion tournent hors de la boucle d'événements.
+        return await asyncio.wrap_future(job.future)
     except ValueError as exc:
-        finance_rules.record_import(account_id=account_id, file_name=file.filename or "CSV", summary=None, error=str(exc))
-        finance_metrics.record_import_metrics(
-            account_id=account_id,
-            inserted=None,
-            total=None,
-            status="ERROR",
-            error=str(exc),
-        )
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
 
+@router.post("/bank-statements/import/jobs", response_model=IngestionJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_bank_statement_import(
+    account_id: int = Query(..., description="ID du compte finance_accounts"),
+    file: UploadFile = File(...),
+    tenant: Tenant = Depends(get_current_tenant),
+) -> IngestionJobStatus:
+    """Planifie l'import et répond immédiatement ; avancement dans finance_imports et ``GET /jobs/{id}``."""
+
+    content = await file.read()
+    file_name = file.filename or "CSV"
+    import_id = await asyncio.to_thread(finance_imports.create_import, account_id, file_name)
+    try:
+        job = submit_ingestion_job(
+            "bank_statement_import",
+            _bank_statement_import_job(content, account_id=account_id, file_name=file_name, import_id=import_id),
+            tenant_id=tenant.id,
+            import_id=import_id,
+        )
+    except HTTPException:
+        await asyncio.to_thread(
+            finance_imports.update_import_progress, import_id, 0, status=JOB_ERROR, error="File d'ingestion pleine"
+        )
+        raise
+    return job_status(job)
+
+
 @router.post("/reconciliation/run", response_model=FinanceRunResponse)
 def run_reconciliation(
     payload: FinanceRunRequest,
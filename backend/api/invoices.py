@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-import io
+import asyncio
 import logging
 from typing import Any
 
@@ -22,8 +22,10 @@ from backend.schemas.invoices import (
     InvoiceImportSummary,
     InvoiceLine,
 )
+from backend.api.jobs import job_status, submit_ingestion_job
+from backend.schemas.jobs import IngestionJobStatus
 from backend.services import invoices as invoices_service
-from core.invoice_extractor import extract_text_from_file
+from backend.services.ingestion_jobs import JobContext
 from backend.dependencies.tenant import Tenant, get_current_tenant
 
 try:  # pragma: no cover
@@ -51,10 +53,23 @@ EXPORTED_COLUMNS = [
     "catalogue_id",
     "catalogue_nom",
     "catalogue_categorie",
+    "suggestion_id",
+    "suggestion_nom",
     "facture_date",
     "invoice_id",
 ]
-TEXT_COLUMNS = {"nom", "codes", "numero_article", "catalogue_nom", "catalogue_categorie", "facture_date", "invoice_id"}
+TEXT_COLUMNS = {
+    "nom",
+    "codes",
+    "numero_article",
+    "catalogue_nom",
+    "catalogue_categorie",
+    "suggestion_nom",
+    "facture_date",
+    "invoice_id",
+}
+# Sans suggestion, l'identifiant reste absent (None) plutôt que 0.
+OPTIONAL_ID_COLUMNS = {"suggestion_id"}
 
 
 def _ensure_valid_invoice_lines(lines: list[InvoiceLine], tenant_id: int | None = None) -> None:
@@ -92,6 +107,8 @@ def _serialize_minimal(df: pd.DataFrame) -> list[dict[str, Any]]:
         if column not in working.columns:
             if column in TEXT_COLUMNS:
                 working[column] = ""
+            elif column in OPTIONAL_ID_COLUMNS:
+                working[column] = None
             else:
                 working[column] = 0
 
@@ -99,9 +116,12 @@ def _serialize_minimal(df: pd.DataFrame) -> list[dict[str, Any]]:
     for column in TEXT_COLUMNS:
         working[column] = working[column].fillna("")
 
-    numeric_columns = [col for col in EXPORTED_COLUMNS if col not in TEXT_COLUMNS]
+    numeric_columns = [col for col in EXPORTED_COLUMNS if col not in TEXT_COLUMNS | OPTIONAL_ID_COLUMNS]
     for column in numeric_columns:
         working[column] = pd.to_numeric(working[column], errors="coerce").fillna(0)
+    for column in OPTIONAL_ID_COLUMNS:
+        ids = pd.to_numeric(working[column], errors="coerce")
+        working[column] = [int(value) if pd.notna(value) else None for value in ids]
 
     return working.to_dict(orient="records")
 
@@ -168,6 +188,45 @@ def extract_invoice(payload: InvoiceExtractRequest, tenant: Tenant = Depends(get
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+def _invoice_extraction_job(
+    content: bytes,
+    filename: str | None,
+    *,
+    margin_percent: float,
+    supplier_hint: str | None,
+    tenant: Tenant,
+):
+    """Job d'extraction : texte + lignes dans le pool CPU, stockage et catalogue ensuite."""
+
+    def run(ctx: JobContext) -> dict[str, Any]:
+        ctx.progress(0, 3)
+        lines_df = ctx.run_cpu(
+            invoices_service.extract_invoice_file,
+            content,
+            filename,
+            margin_percent=margin_percent,
+            supplier_hint=supplier_hint,
+        )
+        ctx.progress(1)
+        stored_docs = invoices_service.persist_invoice_documents(
+            content,
+            tenant_id=tenant.id,
+            supplier=supplier_hint or tenant.name,
+        )
+        ctx.progress(2)
+        enriched = invoices_service.enrich_lines_with_catalog(
+            lines_df,
+            margin_percent=margin_percent,
+            tenant_id=tenant.id,
+        )
+        items = _serialize_minimal(enriched)
+        documents = _group_items_by_invoice(items, attachments=stored_docs)
+        ctx.progress(3)
+        return InvoiceExtractResponse(items=items, documents=documents).model_dump(mode="json")
+
+    return run
+
+
 if MULTIPART_AVAILABLE:
 
     @router.post("/extract/file", response_model=InvoiceExtractResponse)
@@ -177,32 +236,40 @@ if MULTIPART_AVAILABLE:
         supplier_hint: str | None = Form(default=None),
         tenant: Tenant = Depends(get_current_tenant),
     ):
+        content = await file.read()
+        job = submit_ingestion_job(
+            "invoice_extraction",
+            _invoice_extraction_job(
+                content, file.filename, margin_percent=margin_percent, supplier_hint=supplier_hint, tenant=tenant
+            ),
+            tenant_id=tenant.id,
+        )
         try:
-            content = await file.read()
-            buffer = io.BytesIO(content)
-            buffer.name = file.filename  # type: ignore[attr-defined]
-            text = extract_text_from_file(buffer)
-            stored_docs = invoices_service.persist_invoice_documents(
-                content,
-                tenant_id=tenant.id,
-                supplier=supplier_hint or tenant.name,
-            )
-            lines_df = invoices_service.extract_invoice_lines(
-                text,
-                margin_percent=margin_percent,
-                supplier_hint=supplier_hint,
-            )
-            enriched = invoices_service.enrich_lines_with_catalog(
-                lines_df,
-                margin_percent=margin_percent,
-                tenant_id=tenant.id,
-            )
-            items = _serialize_minimal(enriched)
-            documents = _group_items_by_invoice(items, attachments=stored_docs)
-            return InvoiceExtractResponse(items=items, documents=documents)
+            # Le traitement tourne hors de la boucle d'événements ; on attend juste son résultat.
+            return await asyncio.wrap_future(job.future)
         except Exception as exc:
             LOGGER.exception("Invoice file extraction failed: %s", file.filename)
             raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    @router.post("/extract/file/jobs", response_model=IngestionJobStatus, status_code=202)
+    async def enqueue_invoice_extraction(
+        file: UploadFile = File(...),
+        margin_percent: float = Form(40.0),
+        supplier_hint: str | None = Form(default=None),
+        tenant: Tenant = Depends(get_current_tenant),
+    ) -> IngestionJobStatus:
+        """Planifie l'extraction et répond immédiatement ; suivi via ``GET /jobs/{id}``."""
+
+        content = await file.read()
+        job = submit_ingestion_job(
+            "invoice_extraction",
+            _invoice_extraction_job(
+                content, file.filename, margin_percent=margin_percent, supplier_hint=supplier_hint, tenant=tenant
+            ),
+            tenant_id=tenant.id,
+        )
+        return job_status(job)
+
 else:  # pragma: no cover - optional route
     LOGGER.warning("python-multipart non installé : /invoices/extract/file désactivé.")
 
@@ -0,0 +1,63 @@
+"""Suivi des jobs d'ingestion en arrière-plan (statut, avancement, résultat)."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from backend.dependencies.tenant import Tenant, get_current_tenant
+from backend.schemas.jobs import IngestionJobList, IngestionJobStatus
+from backend.services.ingestion_jobs import (
+    IngestionJob,
+    JobNotFoundError,
+    JobQueueFullError,
+    JobRunner,
+    get_job_manager,
+)
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+QUEUE_FULL_RETRY_AFTER_SECONDS = 5
+
+
+def _timestamp(value: float | None) -> datetime | None:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+
+def job_status(job: IngestionJob) -> IngestionJobStatus:
+    snapshot = job.snapshot()
+    for key in ("created_at", "started_at", "finished_at"):
+        snapshot[key] = _timestamp(snapshot[key])
+    return IngestionJobStatus(**snapshot)
+
+
+def submit_ingestion_job(kind: str, run: JobRunner, *, tenant_id: int, import_id: int | None = None) -> IngestionJob:
+    """Planifie un job ; file pleine -> 503 avec ``Retry-After`` (contre-pression)."""
+
+    try:
+        return get_job_manager().submit(kind, run, tenant_id=tenant_id, import_id=import_id)
+    except JobQueueFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER_SECONDS)},
+        ) from exc
+
+
+@router.get("", response_model=IngestionJobList)
+def list_jobs(
+    kind: str | None = Query(default=None),
+    tenant: Tenant = Depends(get_current_tenant),
+) -> IngestionJobList:
+    jobs = get_job_manager().list(tenant_id=tenant.id, kind=kind)
+    return IngestionJobList(items=[job_status(job) for job in jobs])
+
+
+@router.get("/{job_id}", response_model=IngestionJobStatus)
+def get_job(job_id: str, tenant: Tenant = Depends(get_current_tenant)) -> IngestionJobStatus:
+    try:
+        job = get_job_manager().get(job_id, tenant_id=tenant.id)
+    except JobNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job introuvable") from exc
+    return job_status(job)
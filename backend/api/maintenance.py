@@ -1,13 +1,15 @@
-"""Maintenance endpoints (backups)."""
+"""Maintenance endpoints (backups, stock ledger, forecasts)."""
 
 from __future__ import annotations
 
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
 
-from backend.schemas.maintenance import BackupListResponse
+from backend.dependencies.security import require_roles
+from backend.dependencies.tenant import Tenant, get_current_tenant
+from backend.schemas.maintenance import BackupListResponse, ForecastRefreshEntry, StockLedgerCompaction
 from backend.services import maintenance as maintenance_service
 
 router = APIRouter(prefix="/maintenance", tags=["maintenance"])
@@ -29,3 +31,24 @@ def download_backup(filename: str):
     if not path.exists():
         raise HTTPException(status_code=404, detail="Fichier absent du disque.")
     return FileResponse(path, filename=path.name)
+
+
+@router.post(
+    "/stock-ledger/compact",
+    response_model=StockLedgerCompaction,
+    dependencies=[Depends(require_roles("admin"))],
+)
+def compact_stock_ledger(max_movements: int | None = Query(default=None, ge=1)):
+    return StockLedgerCompaction(**maintenance_service.compact_stock_ledger(max_movements=max_movements))
+
+
+@router.post(
+    "/forecasts/refresh",
+    response_model=ForecastRefreshEntry,
+    dependencies=[Depends(require_roles("admin"))],
+)
+def refresh_forecasts(
+    full: bool = Query(default=False),
+    tenant: Tenant = Depends(get_current_tenant),
+):
+    return ForecastRefreshEntry(**maintenance_service.refresh_consumption_forecasts(tenant.id, full=full))
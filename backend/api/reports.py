@@ -24,17 +24,26 @@ def get_reports_overview(tenant: Tenant = Depends(get_current_tenant)):
 def export_report_dataset(
     report_type: str,
     limit: int = Query(default=5000, ge=10, le=50_000),
+    full: bool = Query(default=False, description="Exporter tout l'historique (ignore limit)"),
+    export_format: str = Query(default="csv", alias="format", pattern="^(csv|parquet|arrow)$"),
     tenant: Tenant = Depends(get_current_tenant),
 ):
-    """Stream a CSV export for the requested dataset."""
+    """Stream an export (CSV, Parquet or Arrow IPC) for the requested dataset."""
 
     try:
-        filename, payload = reports_service.export_dataset(report_type, limit, tenant_id=tenant.id)
+        export = reports_service.stream_dataset(
+            report_type,
+            tenant_id=tenant.id,
+            limit=None if full else limit,
+            fmt=export_format,
+        )
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except reports_service.ExportFormatUnavailableError as exc:
+        raise HTTPException(status_code=501, detail=str(exc)) from exc
 
     return StreamingResponse(
-        iter([payload]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        export.chunks,
+        media_type=export.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export.filename}"'},
     )
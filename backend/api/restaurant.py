@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Query, UploadFile, File, Form, Body
+from starlette.concurrency import run_in_threadpool
 
 from backend.dependencies.tenant import Tenant, get_current_tenant
 from backend.schemas.restaurant import (
@@ -320,9 +321,8 @@ async def import_bank_statements_pdf(
     Cet endpoint sera supprimé dans une version future.
     """
     content = await file.read()
-    summary = restaurant_service.import_bank_statements_from_pdf(tenant.id, account, content)
-    duplicates = summary["total"] - summary["inserted"]
-    return {"inserted": summary["inserted"], "total": summary["total"], "duplicates": duplicates}
+    summary = await run_in_threadpool(restaurant_service.import_bank_statements_from_pdf, tenant.id, account, content)
+    return {"inserted": summary["inserted"], "total": summary["total"], "duplicates": summary["duplicates"]}
 
 
 @router.get("/alerts", response_model=list[RestaurantAlert])
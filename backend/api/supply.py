@@ -33,6 +33,12 @@ def get_supply_plan(
         max_length=120,
         description="Terme de recherche appliqué côté serveur.",
     ),
+    priorities: Optional[List[str]] = Query(
+        default=None,
+        description="Niveaux de priorité à renvoyer (Critique, Tendue, Surveillance, Confort).",
+    ),
+    limit: Optional[int] = Query(default=None, ge=1, le=5000, description="Nombre maximal d'articles renvoyés."),
+    offset: int = Query(default=0, ge=0, description="Décalage de pagination des articles."),
     tenant: Tenant = Depends(get_current_tenant),
 ):
     """Expose the dynamic supply planning data structure."""
@@ -45,6 +51,9 @@ def get_supply_plan(
             categories=categories,
             search=search,
             tenant_id=tenant.id,
+            priorities=priorities,
+            limit=limit,
+            offset=offset,
         )
     except Exception as exc:  # pragma: no cover - FastAPI converts to 500
         raise HTTPException(status_code=500, detail=str(exc)) from exc
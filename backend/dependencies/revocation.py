@@ -0,0 +1,182 @@
+"""Liste de révocation des jti JWT, partagée entre les workers d'un même hôte."""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import heapq
+import logging
+import os
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Au-delà de ce nombre de lignes (et du double des entrées vivantes), le journal est compacté.
+_COMPACT_MIN_LINES = 1024
+
+_SHM_DIR = Path("/dev/shm")
+
+
+def default_journal_path() -> Path | None:
+    """Chemin du journal partagé (``JWT_REVOCATION_FILE``, ``off`` pour rester en mémoire).
+
+    Par défaut : ``epicerie-<uid>/jwt-revocations-<déploiement>.log`` sous ``/dev/shm``,
+    dans un répertoire 0700 de l'utilisateur courant. Le suffixe dérive de
+    ``DATABASE_URL`` : deux déploiements d'un même hôte ne partagent pas leur journal.
+    """
+
+    configured = (os.getenv("JWT_REVOCATION_FILE") or "").strip()
+    if configured.lower() in {"off", "none", "0"}:
+        return None
+    if configured:
+        return Path(configured)
+    base = _SHM_DIR if _SHM_DIR.is_dir() else Path(tempfile.gettempdir())
+    directory = base / f"epicerie-{os.geteuid()}"
+    try:
+        directory.mkdir(mode=0o700, exist_ok=True)
+        info = os.lstat(directory)
+    except OSError as exc:
+        logger.warning("Journal de révocation désactivé (%s): %s", directory, exc)
+        return None
+    if not stat.S_ISDIR(info.st_mode) or not _is_private(info):
+        logger.warning("Journal de révocation désactivé: %s n'est pas un répertoire privé", directory)
+        return None
+    deployment = hashlib.sha256((os.getenv("DATABASE_URL") or os.getcwd()).encode("utf-8")).hexdigest()[:12]
+    return directory / f"jwt-revocations-{deployment}.log"
+
+
+def _is_private(info: os.stat_result) -> bool:
+    return info.st_uid == os.geteuid() and not info.st_mode & 0o077
+
+
+def _open_private(path: Path, flags: int) -> int:
+    """Ouvre le journal sans suivre de lien ; refuse un fichier d'un autre utilisateur
+    ou lisible par d'autres (un tiers pourrait y lire des jti ou en injecter)."""
+
+    fd = os.open(path, flags | os.O_NOFOLLOW, 0o600)
+    if not _is_private(os.fstat(fd)):
+        os.close(fd)
+        raise PermissionError(f"journal de révocation non privé: {path}")
+    return fd
+
+
+class RevocationList:
+    """
+    jti révoqués jusqu'à l'expiration de leur token.
+
+    - ``dict`` jti -> expiration pour le test d'appartenance en O(1) ;
+    - tas (expiration, jti) : le nettoyage ne dépile que les entrées échues,
+      O(1) quand rien n'expire, O(log n) amorti par révocation sinon ;
+    - journal append-only privé (0600, ``/dev/shm`` par défaut) : chaque worker y ajoute ses
+      révocations et relit la fin du fichier quand sa taille change (un ``stat``
+      par vérification). Le journal est réécrit atomiquement quand les lignes
+      expirées dominent.
+    """
+
+    def __init__(self, journal: Path | None = None) -> None:
+        self.journal = journal
+        self._expiry: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._inode: int | None = None
+        self._offset = 0
+        self._journal_lines = 0
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def _add(self, jti: str, exp: float) -> None:
+        if self._expiry.get(jti, float("-inf")) >= exp:
+            return
+        self._expiry[jti] = exp
+        heapq.heappush(self._heap, (exp, jti))
+
+    def _gc(self, now: float) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            exp, jti = heapq.heappop(heap)
+            if self._expiry.get(jti) == exp:
+                del self._expiry[jti]
+
+    def _sync(self) -> None:
+        if self.journal is None:
+            return
+        try:
+            info = os.stat(self.journal)
+        except FileNotFoundError:
+            return
+        if info.st_ino != self._inode:
+            # Journal compacté (ou recréé) : relecture complète.
+            self._inode, self._offset, self._journal_lines = info.st_ino, 0, 0
+        if info.st_size <= self._offset:
+            return
+        try:
+            with os.fdopen(_open_private(self.journal, os.O_RDONLY), "rb") as handle:
+                handle.seek(self._offset)
+                chunk = handle.read(info.st_size - self._offset)
+        except OSError as exc:  # système de fichiers défaillant ou journal non privé
+            logger.warning("Lecture du journal de révocation impossible: %s", exc)
+            return
+        complete = chunk[: chunk.rfind(b"\n") + 1]  # ignore une ligne en cours d'écriture
+        self._offset += len(complete)
+        for line in complete.splitlines():
+            exp_text, _, jti = line.decode("utf-8", "replace").partition(" ")
+            try:
+                self._add(jti, float(exp_text))
+            except ValueError:
+                continue
+            self._journal_lines += 1
+
+    def _append(self, jti: str, exp: float, now: float) -> None:
+        line = f"{exp:.3f} {jti}\n".encode("utf-8")
+        while True:
+            fd = _open_private(self.journal, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                # Un autre worker a pu compacter (renommer) le journal entre open et flock.
+                try:
+                    current = os.stat(self.journal).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current != os.fstat(fd).st_ino:
+                    continue
+                os.write(fd, line)
+                self._sync()
+                if self._journal_lines > max(_COMPACT_MIN_LINES, 2 * len(self._expiry)):
+                    self._compact(now)
+                return
+            finally:
+                os.close(fd)
+
+    def _compact(self, now: float) -> None:
+        # Appelé sous le verrou du journal courant.
+        self._gc(now)
+        fd, tmp_name = tempfile.mkstemp(dir=self.journal.parent, prefix=".revocations-")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write("".join(f"{exp:.3f} {jti}\n" for jti, exp in self._expiry.items()).encode("utf-8"))
+        os.chmod(tmp_name, 0o600)
+        os.replace(tmp_name, self.journal)
+        info = os.stat(self.journal)
+        self._inode, self._offset, self._journal_lines = info.st_ino, info.st_size, len(self._expiry)
+
+    def revoke(self, jti: str, exp: float, *, now: float) -> None:
+        with self._lock:
+            self._add(jti, exp)
+            if self.journal is not None:
+                try:
+                    self._append(jti, exp, now)
+                except OSError as exc:
+                    logger.warning("Révocation non partagée (journal indisponible): %s", exc)
+            self._gc(now)
+
+    def is_revoked(self, jti: str, *, now: float) -> bool:
+        with self._lock:
+            self._sync()
+            self._gc(now)
+            return jti in self._expiry
+
+
+__all__ = ["RevocationList", "default_journal_path"]
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import hashlib
 import logging
 import os
 import time
@@ -15,12 +16,14 @@ from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
 from core.user_service import ALLOWED_ROLES
+from backend.dependencies.revocation import RevocationList, default_journal_path
 from backend.settings import Settings
 
 
 DEFAULT_SECRET = "change-me-in-prod"
 DEFAULT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
+TOKEN_CACHE_SIZE = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", "4096"))
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +42,13 @@ class AuthenticatedUser(BaseModel):
 
 ROLE_PRIORITY = {"standard": 0, "manager": 1, "admin": 2}
 
-# Mémoire de révocation simple (en RAM) pour invalider les jti encore valides.
-_REVOKED_JTIS: dict[str, float] = {}
+# jti révoqués jusqu'à leur expiration, partagés entre workers via un journal.
+_REVOCATIONS = RevocationList(default_journal_path())
+
+# Tokens déjà vérifiés : empreinte sha256 -> (exp, payload). Évite de refaire la
+# vérification de signature à chaque requête ; une entrée n'est jamais servie
+# au-delà de l'expiration du token.
+_VERIFIED_TOKENS: dict[bytes, tuple[float, dict[str, Any]]] = {}
 
 
 def _is_production_env() -> bool:
@@ -75,12 +83,30 @@ _APP_SETTINGS = Settings.load()
 _SECRET_KEYS = _APP_SETTINGS.jwt_secret_keys or _load_secrets(_APP_SETTINGS)
 
 
+def _key_id(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+_SECRETS_BY_KID = {_key_id(secret): secret for secret in _SECRET_KEYS}
+
+
 def _get_secret() -> str:
     return _SECRET_KEYS[0]
 
 
-def _get_verify_secrets() -> list[str]:
-    return _SECRET_KEYS
+def _get_verify_secrets(token: str | None = None) -> list[str]:
+    """Secrets à essayer : celui désigné par le ``kid`` du token d'abord."""
+
+    if token is None:
+        return _SECRET_KEYS
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.InvalidTokenError:
+        return _SECRET_KEYS
+    secret = _SECRETS_BY_KID.get(kid) if kid else None
+    if secret is None:
+        return _SECRET_KEYS
+    return [secret] + [other for other in _SECRET_KEYS if other != secret]
 
 
 def _get_algorithm() -> str:
@@ -95,15 +121,36 @@ def create_access_token(claims: dict[str, Any], expires_delta: timedelta | None
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     payload.update({"exp": expire, "jti": uuid.uuid4().hex})
-    return jwt.encode(payload, _get_secret(), algorithm=_get_algorithm())
+    secret = _get_secret()
+    return jwt.encode(payload, secret, algorithm=_get_algorithm(), headers={"kid": _key_id(secret)})
+
+
+def _remember_verified(digest: bytes, payload: dict[str, Any]) -> None:
+    exp = payload.get("exp")
+    if not exp:
+        return
+    if len(_VERIFIED_TOKENS) >= TOKEN_CACHE_SIZE:
+        # Éviction FIFO : l'entrée la plus ancienne est aussi la plus proche de l'expiration.
+        _VERIFIED_TOKENS.pop(next(iter(_VERIFIED_TOKENS)), None)
+    _VERIFIED_TOKENS[digest] = (float(exp), payload)
 
 
 def _decode_token(token: str) -> dict[str, Any]:
+    now = time.time()
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _VERIFIED_TOKENS.get(digest)
+    if cached is not None:
+        if cached[0] > now:
+            _enforce_not_revoked(cached[1], now)
+            return cached[1]
+        _VERIFIED_TOKENS.pop(digest, None)
+
     last_error: Exception | None = None
-    for secret in _get_verify_secrets():
+    for secret in _get_verify_secrets(token):
         try:
             payload = jwt.decode(token, secret, algorithms=[_get_algorithm()])
-            _enforce_not_revoked(payload)
+            _enforce_not_revoked(payload, now)
+            _remember_verified(digest, payload)
             return payload
         except jwt.ExpiredSignatureError as exc:
             raise HTTPException(
@@ -122,7 +169,7 @@ def _decode_token(token: str) -> dict[str, Any]:
     ) from last_error
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
     payload = _decode_token(token)
     try:
         user_id = int(payload["sub"])
@@ -142,19 +189,17 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
             detail="Rôle inconnu dans le token",
         )
 
-    _gc_revoked()
-
     return AuthenticatedUser(id=user_id, username=username, role=role_lower, tenant_id=tenant_id)
 
 
-def require_user(user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
+async def require_user(user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
     return user
 
 
 def require_roles(*roles: str) -> Callable[[AuthenticatedUser], AuthenticatedUser]:
     allowed = {role.lower() for role in roles} or set(ALLOWED_ROLES)
 
-    def _checker(user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
+    async def _checker(user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
         if user.role not in allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -165,7 +210,7 @@ def require_roles(*roles: str) -> Callable[[AuthenticatedUser], AuthenticatedUse
     return _checker
 
 
-def enforce_default_rbac(
+async def enforce_default_rbac(
     request: Request, user: AuthenticatedUser = Depends(get_current_user)
 ) -> AuthenticatedUser:
     """Allow anyone authenticated to read, managers/admins to mutate."""
@@ -191,29 +236,17 @@ def revoke_token(token: str) -> None:
 
     if not jti or not exp:
         return
-    _REVOKED_JTIS[str(jti)] = float(exp)
+    _REVOCATIONS.revoke(str(jti), float(exp), now=time.time())
 
 
-def _enforce_not_revoked(payload: dict[str, Any]) -> None:
+def _enforce_not_revoked(payload: dict[str, Any], now: float | None = None) -> None:
     jti = str(payload.get("jti") or "")
     if not jti:
         return
-    exp = payload.get("exp")
-    cutoff = _REVOKED_JTIS.get(jti)
-    if cutoff is None:
-        return
-    if exp and time.time() > float(cutoff):
-        _REVOKED_JTIS.pop(jti, None)
+    if not _REVOCATIONS.is_revoked(jti, now=time.time() if now is None else now):
         return
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token révoqué",
         headers={"WWW-Authenticate": "Bearer"},
     )
-
-
-def _gc_revoked() -> None:
-    now = time.time()
-    to_delete = [jti for jti, exp_ts in _REVOKED_JTIS.items() if exp_ts <= now]
-    for jti in to_delete:
-        _REVOKED_JTIS.pop(jti, None)
@@ -4,12 +4,13 @@ from __future__ import annotations
 
 import logging
 import os
+import time
 from dataclasses import dataclass
-from functools import lru_cache
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
 
 from core.data_repository import get_engine
 from core.tenant_service import ensure_tenants_table
@@ -28,6 +29,14 @@ DEFAULT_TENANT = Tenant(id=1, code="epicerie", name="Épicerie HQ")
 
 logger = logging.getLogger(__name__)
 
+TENANT_CACHE_TTL_SECONDS = float(os.getenv("TENANT_CACHE_TTL_SECONDS", "300"))
+_TENANT_CACHE_MAX = 256
+
+# identifiant -> (expiration monotone, tenant). Seuls les tenants trouvés sont mis en cache.
+# Les tenants ne sont modifiés que par les scripts de seed, hors processus API : le TTL
+# borne la durée pendant laquelle un renommage reste invisible.
+_TENANT_CACHE: dict[str, tuple[float, Tenant]] = {}
+
 
 def bootstrap_tenants_if_enabled() -> None:
     """Initialise la table des tenants seulement si l'environnement l'autorise."""
@@ -40,8 +49,17 @@ def bootstrap_tenants_if_enabled() -> None:
         logger.warning("Impossible d'initialiser la table tenants au démarrage: %s", exc)
 
 
-@lru_cache(maxsize=32)
-def _load_tenant(identifier: str) -> Tenant | None:
+def _cached_tenant(identifier: str) -> Tenant | None:
+    entry = _TENANT_CACHE.get(identifier)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        _TENANT_CACHE.pop(identifier, None)
+        return None
+    return entry[1]
+
+
+def _query_tenant(identifier: str) -> Tenant | None:
     engine = get_engine()
     query = text(
         """
@@ -58,6 +76,18 @@ def _load_tenant(identifier: str) -> Tenant | None:
         return Tenant(id=int(row.id), code=str(row.code), name=str(row.name))
 
 
+def _load_tenant(identifier: str) -> Tenant | None:
+    tenant = _cached_tenant(identifier)
+    if tenant is not None:
+        return tenant
+    tenant = _query_tenant(identifier)
+    if tenant is not None:
+        if len(_TENANT_CACHE) >= _TENANT_CACHE_MAX:
+            _TENANT_CACHE.clear()
+        _TENANT_CACHE[identifier] = (time.monotonic() + TENANT_CACHE_TTL_SECONDS, tenant)
+    return tenant
+
+
 def resolve_tenant(identifier: Optional[str | int]) -> Tenant | None:
     if identifier is None:
         return None
@@ -68,7 +98,11 @@ def resolve_tenant(identifier: Optional[str | int]) -> Tenant | None:
 
 
 async def get_current_tenant(user: AuthenticatedUser = Depends(get_current_user)) -> Tenant:
-    tenant = resolve_tenant(user.tenant_id)
+    # Chemin rapide sans I/O ; sinon la requête SQL part dans le threadpool pour
+    # ne jamais bloquer la boucle d'événements.
+    tenant = _cached_tenant(str(user.tenant_id))
+    if tenant is None:
+        tenant = await run_in_threadpool(resolve_tenant, user.tenant_id)
     if tenant is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
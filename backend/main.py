@@ -4,11 +4,13 @@ from __future__ import annotations
 
 import base64
 import os
+from contextlib import asynccontextmanager
 from functools import lru_cache
-from typing import Iterable, List
+from typing import AsyncIterator, Iterable, List
 
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field, field_validator
 
 from core.data_repository import query_df
@@ -20,6 +22,9 @@ from core.product_service import (
     update_catalog_entry,
 )
 from backend.dependencies.tenant import Tenant, bootstrap_tenants_if_enabled, get_current_tenant
+from backend.services.catalog_match import warm_catalog_match_indexes_if_enabled
+from backend.services.dashboard import invalidate_dashboard_cache
+from backend.services.receipts import ReceiptNotFoundError, ReceiptPendingError, get_receipt_store
 
 from backend.api import auth as auth_router
 from backend.api import catalog as catalog_router
@@ -36,6 +41,7 @@ from backend.api import admin as admin_router
 from backend.api import restaurant as restaurant_router
 from backend.api import capital as capital_router
 from backend.api import analytics as analytics_router
+from backend.api import jobs as jobs_router
 from backend.dependencies.auth import optional_api_key
 from backend.dependencies.security import enforce_default_rbac
 from backend.settings import Settings
@@ -73,11 +79,16 @@ class POSCartLine(BaseModel):
 class CheckoutRequest(BaseModel):
     cart: List[POSCartLine]
     username: str | None = Field(default=None, description="Utilisateur effectuant la vente")
+    inline_receipt: bool = Field(
+        default=False,
+        description="Renvoie le ticket encodé en base64 dans la réponse (ancien comportement)",
+    )
 
 
 class CheckoutResponse(BaseModel):
     success: bool
     message: str | None = None
+    receipt_id: str | None = None
     receipt_filename: str | None = None
     receipt_base64: str | None = None
 
@@ -131,6 +142,18 @@ def _compute_inventory_value(tenant_id: int) -> dict[str, float]:
     }
 
 
+def _batched_checkout_enabled() -> bool:
+    """Active le chemin de vente ensembliste (POS_BATCHED_CHECKOUT=1)."""
+
+    return os.getenv("POS_BATCHED_CHECKOUT", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _inline_receipt_forced() -> bool:
+    """Force le rendu du ticket dans la réponse de checkout (POS_INLINE_RECEIPT=1)."""
+
+    return os.getenv("POS_INLINE_RECEIPT", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
 def _load_allowed_origins() -> list[str]:
     raw_origins = os.getenv("CORS_ALLOWED_ORIGINS")
     if not raw_origins:
@@ -152,6 +175,13 @@ def _load_allowed_origins() -> list[str]:
     return parsed or ["http://localhost:5173"]
 
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Préchauffage au démarrage du serveur seulement (pas à l'import, ni dans les tests/scripts).
+    warm_catalog_match_indexes_if_enabled()
+    yield
+
+
 @lru_cache
 def create_app() -> FastAPI:
     """Construit l'application FastAPI ainsi que tous les routeurs de domaine."""
@@ -185,6 +215,7 @@ Chaque requete est filtree par tenant_id pour isoler les donnees.
         ],
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=_lifespan,
     )
 
     settings = Settings.load()
@@ -222,6 +253,7 @@ Chaque requete est filtree par tenant_id pour isoler les donnees.
     epicerie_router.include_router(admin_router.router)
     epicerie_router.include_router(finance_router.router)
     epicerie_router.include_router(analytics_router.router)
+    epicerie_router.include_router(jobs_router.router)
     app.include_router(epicerie_router)
 
     restaurant_domain_router = APIRouter(tags=['restaurant'], dependencies=_security_dependencies())
@@ -257,17 +289,35 @@ Chaque requete est filtree par tenant_id pour isoler les donnees.
 
     @app.post("/pos/checkout", response_model=CheckoutResponse, dependencies=_security_dependencies())
     def checkout(payload: CheckoutRequest, tenant: Tenant = Depends(get_current_tenant)) -> CheckoutResponse:
+        inline = payload.inline_receipt or _inline_receipt_forced()
         success, message, receipt = process_sale_transaction(
             [item.dict() for item in payload.cart],
             payload.username or "api_user",
             tenant_id=tenant.id,
+            batched=_batched_checkout_enabled(),
+            defer_receipt=not inline,
         )
 
         if not success:
             return CheckoutResponse(success=False, message=message)
+        invalidate_dashboard_cache(tenant.id)
 
         receipt_filename = None
         receipt_base64 = None
+        if receipt and not inline:
+            # Le PDF est rendu en arrière-plan : la SPA le récupère via /pos/receipts/{id}.
+            receipt_id = get_receipt_store().submit(
+                receipt["render"],
+                filename=receipt["filename"],
+                tenant_id=tenant.id,
+            )
+            return CheckoutResponse(
+                success=True,
+                message=message,
+                receipt_id=receipt_id,
+                receipt_filename=receipt["filename"],
+            )
+
         if receipt:
             receipt_filename = receipt.get("filename")
             raw_content = receipt.get("content")
@@ -282,6 +332,39 @@ Chaque requete est filtree par tenant_id pour isoler les donnees.
             receipt_base64=receipt_base64,
         )
 
+    @app.get("/pos/receipts/{receipt_id}", dependencies=_security_dependencies())
+    def download_receipt(
+        receipt_id: str,
+        request: Request,
+        tenant: Tenant = Depends(get_current_tenant),
+    ) -> Response:
+        store = get_receipt_store()
+        try:
+            filename, content = store.get(receipt_id, tenant_id=tenant.id)
+        except ReceiptNotFoundError as exc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticket introuvable ou expiré.") from exc
+        except ReceiptPendingError:
+            return Response(status_code=status.HTTP_202_ACCEPTED, headers={"Retry-After": "1"})
+
+        # Un ticket ne change jamais une fois généré : l'identifiant sert d'ETag.
+        etag = f'"{receipt_id}"'
+        cache_headers = {
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={int(store.ttl_seconds)}, immutable",
+        }
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+        return StreamingResponse(
+            iter([content]),
+            media_type="application/pdf",
+            headers={
+                **cache_headers,
+                "Content-Disposition": f'inline; filename="{filename}"',
+                "Content-Length": str(len(content)),
+            },
+        )
+
     @app.patch("/products/{product_id}", dependencies=_security_dependencies())
     def update_product(
         product_id: int,
@@ -306,6 +389,7 @@ Chaque requete est filtree par tenant_id pour isoler les donnees.
         except ValueError as exc:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
+        invalidate_dashboard_cache(tenant.id)
         return {"status": "updated", "result": result}
 
     return app
@@ -8,10 +8,20 @@ from .rate_limiter import (
     rate_limit,
     get_rate_limiter,
 )
+from .rate_limit_backends import (
+    MemoryBucketStore,
+    RedisBucketStore,
+    SharedMemoryBucketStore,
+    get_bucket_store,
+)
 
 __all__ = [
     "RateLimiter",
     "RateLimitConfig",
     "rate_limit",
     "get_rate_limiter",
+    "MemoryBucketStore",
+    "SharedMemoryBucketStore",
+    "RedisBucketStore",
+    "get_bucket_store",
 ]
@@ -0,0 +1,457 @@
+"""
+Rate limiter storage backends.
+
+Every backend applies the same token bucket atomically through ``take()``:
+
+- ``MemoryBucketStore``: per-process dict, expiry driven by a timing wheel
+  (amortised O(1) per request, no periodic full scan).
+- ``SharedMemoryBucketStore``: fixed-size bucket table in an mmap-ed file
+  (``/dev/shm`` by default) shared by every worker of a host, guarded by ``flock``.
+- ``RedisBucketStore``: Lua script evaluated over the Redis protocol (RESP), for
+  deployments spanning several hosts. No client library is required.
+
+Select one with ``RATE_LIMIT_BACKEND`` (``memory`` | ``shm`` | ``redis``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Protocol
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BucketPolicy:
+    """Token bucket parameters shared by every backend."""
+
+    capacity: float
+    refill_rate: float  # tokens per second
+
+    @property
+    def ttl(self) -> float:
+        """Idle time after which a bucket is full again and can be forgotten."""
+        return self.capacity / self.refill_rate if self.refill_rate > 0 else 0.0
+
+
+class BucketStore(Protocol):
+    async def take(self, key: str, now: float, policy: BucketPolicy) -> tuple[bool, float]:
+        """Consume one token if available. Returns ``(allowed, tokens_left)``."""
+
+
+def _refill(tokens: float, last_update: float, now: float, policy: BucketPolicy) -> float:
+    elapsed = max(0.0, now - last_update)
+    return min(policy.capacity, tokens + elapsed * policy.refill_rate)
+
+
+def _consume(tokens: float) -> tuple[bool, float]:
+    if tokens >= 1.0:
+        return True, tokens - 1.0
+    return False, tokens
+
+
+# =============================================================================
+# In-process store with timing wheel expiry
+# =============================================================================
+
+
+@dataclass
+class _MemoryEntry:
+    tokens: float
+    last_update: float
+    expires_at: float
+
+
+class MemoryBucketStore:
+    """
+    Per-process buckets. Expired entries are dropped by a timing wheel.
+
+    Each key is filed in the wheel slot of its expiry time. Touching a key only
+    updates ``expires_at``. When the cursor reaches a slot, its keys are either
+    deleted (still expired) or filed again for their new expiry. The work per
+    request is therefore amortised O(1), with no full scan of the buckets.
+    """
+
+    def __init__(self, *, tick: float = 1.0, slots: int = 512) -> None:
+        self._entries: dict[str, _MemoryEntry] = {}
+        self._tick = float(tick)
+        self._wheel: list[set[str]] = [set() for _ in range(int(slots))]
+        self._cursor: int | None = None  # absolute tick index already processed
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _schedule(self, key: str, expires_at: float) -> None:
+        # Never file into a slot the cursor has already passed.
+        tick_index = max(math.ceil(expires_at / self._tick), (self._cursor or 0) + 1)
+        self._wheel[tick_index % len(self._wheel)].add(key)
+
+    def _advance(self, now: float) -> None:
+        current = int(now // self._tick)
+        if self._cursor is None:
+            self._cursor = current
+            return
+        # After a long pause, one lap over the wheel covers every slot.
+        steps = min(current - self._cursor, len(self._wheel))
+        pending_reschedule: list[tuple[str, float]] = []
+        for offset in range(1, steps + 1):
+            slot = self._wheel[(self._cursor + offset) % len(self._wheel)]
+            if not slot:
+                continue
+            pending = list(slot)
+            slot.clear()
+            for key in pending:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry.expires_at <= now:
+                    del self._entries[key]
+                else:
+                    pending_reschedule.append((key, entry.expires_at))
+        self._cursor = max(self._cursor, current)
+        for key, expires_at in pending_reschedule:
+            self._schedule(key, expires_at)
+
+    def take_sync(self, key: str, now: float, policy: BucketPolicy) -> tuple[bool, float]:
+        with self._lock:
+            self._advance(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _MemoryEntry(tokens=policy.capacity, last_update=now, expires_at=now + policy.ttl)
+                self._entries[key] = entry
+                self._schedule(key, entry.expires_at)
+            else:
+                entry.tokens = _refill(entry.tokens, entry.last_update, now, policy)
+                entry.last_update = now
+                entry.expires_at = now + policy.ttl
+            allowed, entry.tokens = _consume(entry.tokens)
+            return allowed, entry.tokens
+
+    async def take(self, key: str, now: float, policy: BucketPolicy) -> tuple[bool, float]:
+        return self.take_sync(key, now, policy)
+
+
+# =============================================================================
+# Shared-memory store (single host, multiple workers)
+# =============================================================================
+
+_SLOT = struct.Struct("<Qdd")  # key hash, tokens, last_update
+_HEADER = struct.Struct("<8sQ")  # magic, slot count
+_MAGIC = b"EPRLv001"
+
+
+def _key_hash(key: str) -> int:
+    # hash() is randomised per process; workers need a stable fingerprint.
+    digest = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest or 1  # 0 marks an empty slot
+
+
+def _default_shm_path() -> Path:
+    base = Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+    return base / "epicerie-rate-limit.bin"
+
+
+class SharedMemoryBucketStore:
+    """
+    Bucket table in an mmap-ed file, shared by every process that opens it.
+
+    A key lives in a probe window of ``probe`` consecutive slots starting at its
+    hash. Within that window, an empty or expired slot is reused for a new key, so
+    expiry needs no cleanup pass. A live bucket is never evicted: when the window
+    holds only live buckets of other clients, the new key is denied (fail closed)
+    and a warning is logged, since resetting someone else's bucket would hand them
+    a full allowance. Each operation runs under an exclusive ``flock`` on the file,
+    held for a few microseconds.
+    """
+
+    def __init__(self, path: str | Path | None = None, *, slots: int = 65_536, probe: int = 16) -> None:
+        import fcntl
+
+        self._fcntl = fcntl
+        self.path = Path(path) if path else _default_shm_path()
+        self.slots = int(slots)
+        self.probe = max(1, min(int(probe), self.slots))
+        size = _HEADER.size + self.slots * _SLOT.size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+            magic, stored_slots = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or stored_slots != self.slots:
+                self._map[:] = bytes(size)
+                _HEADER.pack_into(self._map, 0, _MAGIC, self.slots)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _offset(self, index: int) -> int:
+        return _HEADER.size + (index % self.slots) * _SLOT.size
+
+    def take_sync(self, key: str, now: float, policy: BucketPolicy) -> tuple[bool, float]:
+        key_hash = _key_hash(key)
+        start = key_hash % self.slots
+        with self._thread_lock:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+            try:
+                target = None
+                tokens = policy.capacity
+                last_update = now
+                free = None
+                for step in range(self.probe):
+                    offset = self._offset(start + step)
+                    slot_hash, slot_tokens, slot_update = _SLOT.unpack_from(self._map, offset)
+                    if slot_hash == key_hash:
+                        target = offset
+                        tokens, last_update = slot_tokens, slot_update
+                        break
+                    if free is None and (slot_hash == 0 or slot_update + policy.ttl <= now):
+                        free = offset
+                if target is None:
+                    if free is None:
+                        logger.warning(
+                            "Rate limit shared table full (%d slots probed in %s), denying request",
+                            self.probe,
+                            self.path,
+                        )
+                        return False, 0.0
+                    target = free
+                tokens = _refill(tokens, last_update, now, policy)
+                allowed, tokens = _consume(tokens)
+                _SLOT.pack_into(self._map, target, key_hash, tokens, now)
+            finally:
+                self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+        return allowed, tokens
+
+    async def take(self, key: str, now: float, policy: BucketPolicy) -> tuple[bool, float]:
+        return self.take_sync(key, now, policy)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+# =============================================================================
+# Redis protocol store
+# =============================================================================
+
+# Same algorithm as _refill/_consume, run atomically on the server.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local ttl_ms = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], ttl_ms)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisProtocolError(RuntimeError):
+    """Error reply from the server or malformed RESP payload."""
+
+
+def _encode_command(*args: object) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        raw = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(raw), raw))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> object:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise RedisProtocolError("Connection closed by server")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode("utf-8")
+    if prefix == b"-":
+        raise RedisProtocolError(payload.decode("utf-8"))
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        count = int(payload)
+        if count < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(count)]
+    raise RedisProtocolError(f"Unexpected RESP reply: {line!r}")
+
+
+@dataclass
+class _RedisConnection:
+    lock: asyncio.Lock
+    reader: asyncio.StreamReader | None = None
+    writer: asyncio.StreamWriter | None = None
+
+
+class RedisBucketStore:
+    """
+    Token bucket evaluated by Lua over the Redis protocol.
+
+    One connection is kept per event loop, and everything on it (connect, AUTH,
+    SELECT, command and reply) happens under its lock. Any failure inside the lock,
+    timeouts included, closes the socket before the lock is released: a reply left
+    unread can never be handed to the next caller. The script is loaded once
+    (``SCRIPT LOAD``) and then called with ``EVALSHA``; after a ``NOSCRIPT`` (server
+    restart) it is reloaded. If Redis is unreachable, the request is allowed and a
+    warning is logged.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", *, key_prefix: str = "", timeout: float = 0.2) -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self.key_prefix = key_prefix
+        self.timeout = float(timeout)
+        self._sha: str | None = None
+        self._connections: dict[int, _RedisConnection] = {}
+
+    def _connection(self) -> _RedisConnection:
+        loop_id = id(asyncio.get_running_loop())
+        conn = self._connections.get(loop_id)
+        if conn is None:
+            conn = self._connections[loop_id] = _RedisConnection(asyncio.Lock())
+        return conn
+
+    async def _call(self, conn: _RedisConnection, *args: object) -> object:
+        if conn.writer is None or conn.writer.is_closing():
+            conn.reader, conn.writer = await asyncio.open_connection(self.host, self.port)
+            if self.password:
+                await self._send(conn, "AUTH", self.password)
+            if self.db:
+                await self._send(conn, "SELECT", self.db)
+        return await self._send(conn, *args)
+
+    @staticmethod
+    async def _send(conn: _RedisConnection, *args: object) -> object:
+        conn.writer.write(_encode_command(*args))
+        await conn.writer.drain()
+        return await _read_reply(conn.reader)
+
+    @staticmethod
+    def _discard(conn: _RedisConnection) -> None:
+        if conn.writer is not None:
+            conn.writer.close()
+        conn.reader = conn.writer = None
+
+    async def execute(self, *args: object) -> object:
+        conn = self._connection()
+        async with conn.lock:
+            try:
+                return await asyncio.wait_for(self._call(conn, *args), timeout=self.timeout)
+            except BaseException:
+                self._discard(conn)
+                raise
+
+    async def _evalsha(self, key: str, *argv: object) -> object:
+        if self._sha is None:
+            sha = await self.execute("SCRIPT", "LOAD", TOKEN_BUCKET_LUA)
+            self._sha = sha.decode("ascii") if isinstance(sha, bytes) else str(sha)
+        try:
+            return await self.execute("EVALSHA", self._sha, 1, key, *argv)
+        except RedisProtocolError as exc:
+            if not str(exc).startswith("NOSCRIPT"):
+                raise
+            self._sha = None
+            return await self._evalsha(key, *argv)
+
+    async def take(self, key: str, now: float, policy: BucketPolicy) -> tuple[bool, float]:
+        ttl_ms = max(1, int(math.ceil(policy.ttl * 1000)))
+        try:
+            allowed, tokens = await self._evalsha(
+                self.key_prefix + key,
+                repr(policy.capacity),
+                repr(policy.refill_rate),
+                repr(now),
+                ttl_ms,
+            )
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RedisProtocolError) as exc:
+            logger.warning("Rate limit Redis backend unavailable, allowing request: %s", exc)
+            return True, policy.capacity
+        return bool(int(allowed)), float(tokens)
+
+
+# =============================================================================
+# Factory
+# =============================================================================
+
+_DEFAULT_STORE: BucketStore | None = None
+_DEFAULT_STORE_LOCK = threading.Lock()
+
+
+def build_bucket_store(backend: str | None = None) -> BucketStore:
+    """Build the named backend (defaults to ``RATE_LIMIT_BACKEND``, then ``memory``)."""
+
+    name = (backend or os.getenv("RATE_LIMIT_BACKEND", "memory")).strip().lower()
+    if name == "shm":
+        return SharedMemoryBucketStore(
+            os.getenv("RATE_LIMIT_SHM_PATH") or None,
+            slots=int(os.getenv("RATE_LIMIT_SHM_SLOTS", "65536")),
+        )
+    if name == "redis":
+        return RedisBucketStore(
+            os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"),
+            key_prefix=os.getenv("RATE_LIMIT_REDIS_PREFIX", "epicerie:"),
+        )
+    if name != "memory":
+        logger.warning("Unknown RATE_LIMIT_BACKEND=%s, using in-memory storage", name)
+    return MemoryBucketStore()
+
+
+def get_bucket_store() -> BucketStore:
+    """Process-wide store, built on first use."""
+
+    global _DEFAULT_STORE
+    if _DEFAULT_STORE is None:
+        with _DEFAULT_STORE_LOCK:
+            if _DEFAULT_STORE is None:
+                _DEFAULT_STORE = build_bucket_store()
+    return _DEFAULT_STORE
+
+
+__all__ = [
+    "BucketPolicy",
+    "BucketStore",
+    "MemoryBucketStore",
+    "RedisBucketStore",
+    "SharedMemoryBucketStore",
+    "TOKEN_BUCKET_LUA",
+    "build_bucket_store",
+    "get_bucket_store",
+]
@@ -1,8 +1,8 @@
 """
 Rate Limiter Middleware - Token bucket algorithm with sliding window.
 
-Provides configurable rate limiting for API endpoints using in-memory
-or Redis-backed storage.
+Provides configurable rate limiting for API endpoints. Buckets live in a
+pluggable store: in-memory, shared memory (all workers of a host) or Redis.
 
 Usage:
     @router.get("/api/data")
@@ -15,13 +15,14 @@ from __future__ import annotations
 
 import time
 import logging
-from collections import defaultdict
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from functools import wraps
 from typing import Callable, Any
 
 from fastapi import Request, HTTPException, status
 
+from .rate_limit_backends import BucketPolicy, BucketStore, get_bucket_store
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,32 +40,22 @@ class RateLimitConfig:
         return f"{self.key_prefix}:{self.requests}:{self.window}"
 
 
-@dataclass
-class RateLimitEntry:
-    """Tracks rate limit state for a single client."""
-
-    tokens: float
-    last_update: float
-    request_count: int = 0
-
-
 class RateLimiter:
     """
-    In-memory rate limiter using token bucket algorithm.
+    Token bucket rate limiter over a pluggable bucket store.
 
-    For production with multiple workers, consider using Redis.
+    The store defaults to the process-wide one selected by ``RATE_LIMIT_BACKEND``
+    (see ``rate_limit_backends``). Use ``shm`` or ``redis`` so that every worker
+    shares the same buckets.
     """
 
-    def __init__(self, config: RateLimitConfig | None = None):
+    def __init__(self, config: RateLimitConfig | None = None, store: BucketStore | None = None):
         self.config = config or RateLimitConfig()
-        self._buckets: dict[str, RateLimitEntry] = defaultdict(
-            lambda: RateLimitEntry(
-                tokens=float(self.config.requests + self.config.burst),
-                last_update=time.time(),
-            )
+        self.store = store or get_bucket_store()
+        self.policy = BucketPolicy(
+            capacity=float(self.config.requests + self.config.burst),
+            refill_rate=self.config.requests / self.config.window,
         )
-        self._cleanup_interval = 300  # Clean up every 5 minutes
-        self._last_cleanup = time.time()
 
     def _get_client_key(self, request: Request) -> str:
         """Extract client identifier from request."""
@@ -81,36 +72,6 @@ class RateLimiter:
         path = request.url.path
         return f"{self.config.key}:{client_ip}:{path}"
 
-    def _refill_tokens(self, entry: RateLimitEntry, now: float) -> None:
-        """Refill tokens based on time elapsed."""
-        elapsed = now - entry.last_update
-        # Refill rate: requests per window
-        refill_rate = self.config.requests / self.config.window
-        new_tokens = elapsed * refill_rate
-        entry.tokens = min(
-            self.config.requests + self.config.burst,
-            entry.tokens + new_tokens,
-        )
-        entry.last_update = now
-
-    def _cleanup_expired(self, now: float) -> None:
-        """Remove expired entries to prevent memory bloat."""
-        if now - self._last_cleanup < self._cleanup_interval:
-            return
-
-        expiry = now - (self.config.window * 2)
-        expired_keys = [
-            key
-            for key, entry in self._buckets.items()
-            if entry.last_update < expiry
-        ]
-        for key in expired_keys:
-            del self._buckets[key]
-
-        self._last_cleanup = now
-        if expired_keys:
-            logger.debug(f"Cleaned up {len(expired_keys)} expired rate limit entries")
-
     async def check(self, request: Request) -> tuple[bool, dict[str, str]]:
         """
         Check if request is allowed.
@@ -120,22 +81,10 @@ class RateLimiter:
         """
         now = time.time()
         key = self._get_client_key(request)
-        entry = self._buckets[key]
-
-        # Refill tokens
-        self._refill_tokens(entry, now)
-
-        # Periodic cleanup
-        self._cleanup_expired(now)
-
-        # Check if request is allowed
-        is_allowed = entry.tokens >= 1.0
-        if is_allowed:
-            entry.tokens -= 1.0
-            entry.request_count += 1
+        is_allowed, tokens = await self.store.take(key, now, self.policy)
 
         # Calculate remaining and reset time
-        remaining = max(0, int(entry.tokens))
+        remaining = max(0, int(tokens))
         reset_time = int(now + self.config.window)
 
         headers = {
@@ -146,9 +95,8 @@ class RateLimiter:
 
         if not is_allowed:
             # Calculate retry-after
-            tokens_needed = 1.0 - entry.tokens
-            refill_rate = self.config.requests / self.config.window
-            retry_after = int(tokens_needed / refill_rate) + 1
+            tokens_needed = 1.0 - tokens
+            retry_after = int(tokens_needed / self.policy.refill_rate) + 1
             headers["Retry-After"] = str(retry_after)
 
         return is_allowed, headers
@@ -239,10 +187,11 @@ class RateLimitMiddleware:
         window: int = 60,
         burst: int = 50,
         exclude_paths: list[str] | None = None,
+        store: BucketStore | None = None,
     ):
         self.app = app
         self.config = RateLimitConfig(requests=requests, window=window, burst=burst)
-        self.limiter = RateLimiter(self.config)
+        self.limiter = RateLimiter(self.config, store=store)
         self.exclude_paths = set(exclude_paths or ["/health", "/ready", "/docs", "/openapi.json"])
 
     async def __call__(self, scope, receive, send):
@@ -49,6 +49,7 @@ class PagingMeta(BaseModel):
     page: int
     per_page: int
     total: int
+    next_cursor: Optional[str] = None
 
 
 class ProductPage(BaseModel):
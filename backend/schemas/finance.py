@@ -212,6 +212,16 @@ class FinanceTransactionSearchResponse(BaseModel):
     filters_applied: dict[str, object]
 
 
+class FinanceTransactionKeysetResponse(BaseModel):
+    items: list[dict]
+    size: int
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    sort: str
+    filters_applied: dict[str, object]
+
+
 class FinanceAutreSuggestion(BaseModel):
     key: str
     count: int
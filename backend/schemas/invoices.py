@@ -27,6 +27,9 @@ class InvoiceLine(BaseModel):
     catalogue_id: Optional[int] = None
     catalogue_nom: Optional[str] = None
     catalogue_categorie: Optional[str] = None
+    # Produit au libellé approchant, proposé à la validation (jamais appliqué d'office).
+    suggestion_id: Optional[int] = None
+    suggestion_nom: Optional[str] = None
     facture_date: Optional[str] = None
     invoice_id: Optional[str] = None
 
@@ -0,0 +1,26 @@
+"""Pydantic schemas for background ingestion jobs."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+
+class IngestionJobStatus(BaseModel):
+    id: str
+    kind: str
+    status: Literal["PENDING", "RUNNING", "DONE", "ERROR"]
+    done: int = Field(0, ge=0)
+    total: int | None = None
+    import_id: int | None = None
+    result: Any | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class IngestionJobList(BaseModel):
+    items: list[IngestionJobStatus]
@@ -18,4 +18,18 @@ class BackupListResponse(BaseModel):
     backups: List[BackupEntry]
 
 
-__all__ = ["BackupEntry", "BackupListResponse"]
+class StockLedgerCompaction(BaseModel):
+    previous_watermark: int
+    watermark: int
+    products: int
+
+
+class ForecastRefreshEntry(BaseModel):
+    tenant_id: int
+    mode: str
+    products: int
+    last_movement_id: int
+    duration_ms: int
+
+
+__all__ = ["BackupEntry", "BackupListResponse", "ForecastRefreshEntry", "StockLedgerCompaction"]
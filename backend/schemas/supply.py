@@ -59,6 +59,10 @@ class SupplyPlanResponseSchema(BaseModel):
     summary: SupplyPlanSummarySchema
     available_categories: List[str]
     items: List[SupplyPlanItemSchema]
+    items_total: Optional[int] = Field(
+        default=None,
+        description="Nombre d'articles correspondant aux filtres, avant pagination.",
+    )
     supplier_breakdown: List[SupplierBreakdownSchema]
 
 
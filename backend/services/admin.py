@@ -11,16 +11,20 @@ from core.backup_manager import (
     build_backup_timeline,
     check_backup_tools,
     compute_backup_statistics,
-    create_backup,
     delete_backup,
     integrity_report,
     list_backups,
     load_backup_settings,
     plan_next_backup,
-    restore_backup,
     save_backup_settings,
     suggest_retention_cleanup,
 )
+from backend.services.backups import (
+    create_streaming_backup,
+    is_table_backup,
+    restore_directory_backup,
+    restore_streaming_backup,
+)
 from core.data_repository import query_df
 from core.user_service import ALLOWED_ROLES, list_users as list_users_df, reset_user_password, update_user_role
 
@@ -210,12 +214,19 @@ def save_settings(payload: dict[str, Any]) -> dict[str, Any]:
 
 
 def create_backup_now(label: str | None = None) -> dict[str, Any]:
-    metadata = create_backup(label=label, database_url=None)
+    metadata = create_streaming_backup(label=label, database_url=None)
     return serialize_backup(metadata)
 
 
 def restore_backup_file(filename: str) -> None:
-    restore_backup(filename, database_url=None)
+    if is_table_backup(filename):
+        # Données seules : rejouées sur la base en place, elles doubleraient les lignes
+        # et redéclencheraient les triggers de stock et de cumuls.
+        raise BackupError(f"{filename} ne contient que des données de tables : restauration manuelle uniquement.")
+    if filename.endswith(".dump"):
+        restore_directory_backup(filename, clean=True, database_url=None)
+    else:
+        restore_streaming_backup(filename, database_url=None)
 
 
 def delete_backup_file(filename: str) -> None:
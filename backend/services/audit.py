@@ -2,21 +2,56 @@
 
 from __future__ import annotations
 
+import logging
 from datetime import date, datetime
 from typing import Iterable, List, Sequence
 
 import numpy as np
 import pandas as pd
 from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 
 from backend.services.catalog_data import fetch_customer_catalog
 from core.data_repository import get_engine, query_df
+from core.repositories import is_undefined_table
+from core.repositories.stock_movements import LEDGER_BALANCES_SQL
+
+LOGGER = logging.getLogger(__name__)
 
 CRITICAL_THRESHOLD = 10
 MODERATE_THRESHOLD = 3
 CLOSED_STATUS = "Clôturé"
 
-_DIAGNOSTIC_SQL = """
+_DIAGNOSTIC_SELECT = """
+    SELECT
+        id,
+        nom,
+        stock_actuel,
+        stock_calcule,
+        ROUND(stock_actuel - stock_calcule, 3) AS ecart
+    FROM stock_compare
+    WHERE ABS(stock_actuel - stock_calcule) > 0.001
+    ORDER BY ABS(stock_actuel - stock_calcule) DESC, nom
+"""
+
+# Stock calculé = checkpoint du grand livre + mouvements après le watermark.
+_DIAGNOSTIC_SQL = f"""
+    WITH ledger AS ({LEDGER_BALANCES_SQL}),
+    stock_compare AS (
+        SELECT
+            p.id,
+            p.nom,
+            p.stock_actuel,
+            COALESCE(l.stock, 0) AS stock_calcule
+        FROM produits p
+        LEFT JOIN ledger l ON l.produit_id = p.id
+        WHERE p.tenant_id = :tenant_id
+    )
+    {_DIAGNOSTIC_SELECT}
+"""
+
+# Historique complet : base sans checkpoint (migration non appliquée).
+_DIAGNOSTIC_FULL_SQL = """
     WITH stock_compare AS (
         SELECT
             p.id,
@@ -36,20 +71,18 @@ _DIAGNOSTIC_SQL = """
         WHERE p.tenant_id = :tenant_id
         GROUP BY p.id, p.nom, p.stock_actuel
     )
-    SELECT
-        id,
-        nom,
-        stock_actuel,
-        stock_calcule,
-        ROUND(stock_actuel - stock_calcule, 3) AS ecart
-    FROM stock_compare
-    WHERE ABS(stock_actuel - stock_calcule) > 0.001
-    ORDER BY ABS(stock_actuel - stock_calcule) DESC, nom
-"""
+""" + _DIAGNOSTIC_SELECT
 
 
 def _fetch_stock_diagnostics_df(tenant_id: int) -> pd.DataFrame:
-    return query_df(_DIAGNOSTIC_SQL, params={"tenant_id": int(tenant_id)})
+    params = {"tenant_id": int(tenant_id)}
+    try:
+        return query_df(_DIAGNOSTIC_SQL, params=params)
+    except ProgrammingError as exc:
+        if not is_undefined_table(exc):
+            raise
+        LOGGER.warning("Checkpoint de stock indisponible, recalcul sur tout l'historique: %s", exc)
+        return query_df(_DIAGNOSTIC_FULL_SQL, params=params)
 
 
 def _load_actions_df(tenant_id: int) -> pd.DataFrame:
@@ -0,0 +1,461 @@
+"""Sauvegardes PostgreSQL en flux, parallèles et par table.
+
+``core.backup_manager.create_backup`` récupère toute la sortie de ``pg_dump`` en
+mémoire avant de la compresser (et ``restore_backup`` relit le fichier entier pour
+l'envoyer à ``psql``) : la mémoire du backend suit la taille de la base. Ici la
+sortie est lue par blocs de ``BACKUP_CHUNK_BYTES`` et compressée au fil de l'eau
+dans un fichier ``.part`` renommé en fin de dump, dans le même répertoire et avec
+la même extension ``.sql.gz`` : listing, rétention et contrôle d'intégrité de
+``core.backup_manager`` s'appliquent sans changement.
+
+Deux variantes pour les grosses bases :
+
+- format répertoire (``pg_dump -Fd -j N`` / ``pg_restore -j N``), une table par
+  worker ; les dossiers ``*.dump`` ne sont pas listés par ``list_backups`` ;
+- dump des seules données des tables à forte rotation (``HIGH_CHURN_TABLES``),
+  éventuellement limité aux partitions mensuelles récentes de ``mouvements_stock``.
+
+Le dump complet commence par ``DROP ... IF EXISTS`` (``--clean --if-exists``) et se
+rejoue dans une seule transaction : une erreur annule toute la restauration. Les
+sauvegardes de tables (``*_tables.sql.gz``) ne contiennent que des ``COPY`` : rejouées
+sur une base peuplée, elles dupliqueraient les lignes et redéclencheraient les
+triggers de stock et de cumuls. ``is_table_backup`` permet de les écarter ; on les
+restaure à la main, tables vidées, dans une session ``session_replication_role = replica``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+from sqlalchemy.engine import make_url
+
+from core.backup_manager import BackupError, check_backup_tools, get_backup_directory
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[dict[str, object]], None]
+
+# Tables réécrites en continu : ventes, grand livre de stock, relevés et écritures.
+HIGH_CHURN_TABLES: tuple[str, ...] = (
+    "mouvements_stock",
+    "stock_ledger_checkpoint",
+    "stock_ledger_watermark",
+    "produits_price_history",
+    "latest_price_history",
+    "audit_actions",
+    "restaurant_bank_statements",
+    "finance_bank_statement_lines",
+    "finance_transactions",
+    "finance_transaction_lines",
+    "finance_rollup_daily",
+)
+
+_DEFAULT_CHUNK_BYTES = 1024 * 1024
+_PROGRESS_LOG_BYTES = 64 * 1024 * 1024
+_STDERR_TAIL = 2000
+TABLE_BACKUP_SUFFIX = "_tables.sql.gz"
+_FULL_DUMP_ARGS = ("--clean", "--if-exists")
+_LABEL_RE = re.compile(r"[^0-9A-Za-z_-]+")
+_TABLE_DONE_RE = re.compile(r"(?:dumping contents of table|processing data for table) \"?([^\"\s]+)\"?")
+
+
+@dataclass(frozen=True)
+class StreamedBackup:
+    name: str
+    path: Path
+    size_bytes: int
+    raw_bytes: int
+    created_at: datetime
+    duration_s: float
+    format: str = "plain"
+    tables: tuple[str, ...] = field(default_factory=tuple)
+
+
+def _chunk_bytes() -> int:
+    return max(64 * 1024, int(os.getenv("BACKUP_CHUNK_BYTES", str(_DEFAULT_CHUNK_BYTES))))
+
+
+def _compress_level() -> int:
+    return min(9, max(1, int(os.getenv("BACKUP_COMPRESS_LEVEL", "6"))))
+
+
+def default_jobs() -> int:
+    configured = os.getenv("BACKUP_JOBS", "").strip()
+    if configured:
+        return max(1, int(configured))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _connection(database_url: str | None) -> tuple[str, dict[str, str]]:
+    """URL libpq sans mot de passe (transmis par ``PGPASSWORD``) et environnement du sous-processus."""
+
+    raw = database_url or os.getenv("DATABASE_URL")
+    if not raw:
+        raise BackupError("DATABASE_URL n'est pas défini : impossible de joindre la base.")
+    url = make_url(raw)
+    env = dict(os.environ)
+    if url.password:
+        env["PGPASSWORD"] = str(url.password)
+    # ``URL.set(password=None)`` laisse le mot de passe en place.
+    libpq = url._replace(drivername="postgresql", password=None).render_as_string(hide_password=False)
+    return libpq, env
+
+
+def _pg_dump_binary() -> str:
+    status = check_backup_tools()[0]
+    if not status.available:
+        raise BackupError(
+            f"pg_dump introuvable ({status.configured}) : définir PG_DUMP_PATH ou PG_DUMP_BIN."
+        )
+    return str(status.resolved or status.configured)
+
+
+def _psql_binary() -> str:
+    status = check_backup_tools()[1]
+    if not status.available:
+        raise BackupError(f"psql introuvable ({status.configured}) : définir PSQL_PATH ou PSQL_BIN.")
+    return str(status.resolved or status.configured)
+
+
+def _pg_restore_binary() -> str:
+    configured = os.getenv("PG_RESTORE_PATH") or os.getenv("PG_RESTORE_BIN")
+    if configured:
+        return configured
+    # Même installation que pg_dump : le binaire voisin est le bon.
+    sibling = Path(_pg_dump_binary()).with_name("pg_restore")
+    if sibling.exists():
+        return str(sibling)
+    resolved = shutil.which("pg_restore")
+    if resolved is None:
+        raise BackupError("pg_restore introuvable : définir PG_RESTORE_PATH ou PG_RESTORE_BIN.")
+    return resolved
+
+
+def _backup_target(label: str | None, suffix: str, backup_dir: Path | None) -> Path:
+    directory = Path(backup_dir) if backup_dir is not None else get_backup_directory(create=True)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    slug = _LABEL_RE.sub("-", (label or "").strip()).strip("-")
+    return directory / (f"backup_{stamp}_{slug}{suffix}" if slug else f"backup_{stamp}{suffix}")
+
+
+def is_table_backup(filename: str) -> bool:
+    """Vrai pour une sauvegarde ``--data-only`` produite par :func:`create_table_backup`."""
+
+    return Path(filename).name.endswith(TABLE_BACKUP_SUFFIX)
+
+
+def _stderr_tail(handle) -> str:
+    handle.seek(0)
+    return handle.read().decode("utf-8", "replace")[-_STDERR_TAIL:].strip()
+
+
+def _directory_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+
+
+def stream_dump(
+    destination: Path,
+    *,
+    args: Sequence[str] = (),
+    database_url: str | None = None,
+    progress: ProgressCallback | None = None,
+) -> tuple[int, int]:
+    """Compresse la sortie de ``pg_dump`` dans ``destination`` bloc par bloc.
+
+    Retourne ``(octets lus, octets écrits)``. En cas d'échec le fichier partiel est
+    supprimé et ``BackupError`` reprend la fin de la sortie d'erreur de ``pg_dump``.
+    """
+
+    url, env = _connection(database_url)
+    cmd = [_pg_dump_binary(), url, *args]
+    partial = destination.with_name(destination.name + ".part")
+    chunk_size = _chunk_bytes()
+    raw_bytes = 0
+    next_log = _PROGRESS_LOG_BYTES
+    # stderr dans un fichier : un tube non lu bloquerait pg_dump une fois plein.
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, env=env)
+        except FileNotFoundError as exc:
+            raise BackupError(f"pg_dump introuvable : définir PG_DUMP_PATH ou PG_DUMP_BIN ({exc}).") from exc
+        try:
+            with gzip.open(partial, "wb", compresslevel=_compress_level()) as target:
+                while True:
+                    chunk = process.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    raw_bytes += len(chunk)
+                    if progress is not None:
+                        progress({"bytes": raw_bytes})
+                    if raw_bytes >= next_log:
+                        logger.info("Sauvegarde %s : %.0f Mo exportés", destination.name, raw_bytes / 1048576)
+                        next_log += _PROGRESS_LOG_BYTES
+            returncode = process.wait()
+        except BaseException:
+            process.kill()
+            process.wait()
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            process.stdout.close()
+        if returncode != 0:
+            partial.unlink(missing_ok=True)
+            raise BackupError(f"pg_dump a échoué (code {returncode}) : {_stderr_tail(stderr)}")
+    partial.replace(destination)
+    return raw_bytes, destination.stat().st_size
+
+
+def create_streaming_backup(
+    label: str | None = None,
+    *,
+    database_url: str | None = None,
+    backup_dir: Path | None = None,
+    progress: ProgressCallback | None = None,
+) -> StreamedBackup:
+    """Dump SQL complet compressé en flux (``.sql.gz``), mémoire constante."""
+
+    destination = _backup_target(label, ".sql.gz", backup_dir)
+    started = time.perf_counter()
+    raw_bytes, size = stream_dump(destination, args=_FULL_DUMP_ARGS, database_url=database_url, progress=progress)
+    return StreamedBackup(
+        name=destination.name,
+        path=destination,
+        size_bytes=size,
+        raw_bytes=raw_bytes,
+        created_at=datetime.now(timezone.utc),
+        duration_s=time.perf_counter() - started,
+    )
+
+
+def _movement_partitions(since: date, until: date | None = None) -> list[str]:
+    """Partitions mensuelles de ``mouvements_stock`` couvrant ``since`` → ``until``, plus ``DEFAULT``."""
+
+    until = until or date.today()
+    month = date(since.year, since.month, 1)
+    names = []
+    while month <= until:
+        names.append(f"mouvements_stock_p{month:%Y%m}")
+        month = date(month.year + (month.month // 12), month.month % 12 + 1, 1)
+    names.append("mouvements_stock_default")
+    return names
+
+
+def _table_args(tables: Iterable[str], since: date | None) -> tuple[list[str], tuple[str, ...]]:
+    selected: list[str] = []
+    for table in tables:
+        if table == "mouvements_stock":
+            # pg_dump -t sur une table partitionnée ne sort que le parent (vide) :
+            # on nomme les partitions, toutes ou seulement les mois récents.
+            selected.extend(_movement_partitions(since) if since is not None else ["mouvements_stock_p*"])
+            selected.append("mouvements_stock_default")
+        else:
+            selected.append(table)
+    unique = tuple(dict.fromkeys(selected))
+    args = ["--data-only"]
+    for table in unique:
+        args.extend(["-t", f"public.{table}"])
+    return args, unique
+
+
+def create_table_backup(
+    label: str | None = None,
+    *,
+    tables: Sequence[str] = HIGH_CHURN_TABLES,
+    since: date | None = None,
+    database_url: str | None = None,
+    backup_dir: Path | None = None,
+    progress: ProgressCallback | None = None,
+) -> StreamedBackup:
+    """Données des tables ``tables`` seulement (``--data-only``), en flux, dans ``*_tables.sql.gz``.
+
+    Avec ``since``, seuls les mois de ``mouvements_stock`` à partir de ``since``
+    sont exportés : les partitions closes ne changent plus et restent couvertes
+    par la dernière sauvegarde complète.
+    """
+
+    args, selected = _table_args(tables, since)
+    destination = _backup_target(label, TABLE_BACKUP_SUFFIX, backup_dir)
+    started = time.perf_counter()
+    raw_bytes, size = stream_dump(destination, args=args, database_url=database_url, progress=progress)
+    return StreamedBackup(
+        name=destination.name,
+        path=destination,
+        size_bytes=size,
+        raw_bytes=raw_bytes,
+        created_at=datetime.now(timezone.utc),
+        duration_s=time.perf_counter() - started,
+        format="tables",
+        tables=selected,
+    )
+
+
+def _run_verbose(cmd: list[str], env: dict[str, str], *, tool: str, progress: ProgressCallback | None) -> None:
+    """Lance ``pg_dump``/``pg_restore --verbose`` et remonte chaque table traitée."""
+
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+    except FileNotFoundError as exc:
+        raise BackupError(f"{tool} introuvable ({exc}).") from exc
+    done = 0
+    tail: list[str] = []
+    for raw in process.stderr:
+        line = raw.decode("utf-8", "replace").rstrip()
+        tail = (tail + [line])[-20:]
+        match = _TABLE_DONE_RE.search(line)
+        if match:
+            done += 1
+            if progress is not None:
+                progress({"table": match.group(1), "tables_done": done})
+    process.stderr.close()
+    returncode = process.wait()
+    if returncode != 0:
+        raise BackupError(f"{tool} a échoué (code {returncode}) : {' | '.join(tail)[-_STDERR_TAIL:]}")
+
+
+def create_directory_backup(
+    label: str | None = None,
+    *,
+    jobs: int | None = None,
+    database_url: str | None = None,
+    backup_dir: Path | None = None,
+    progress: ProgressCallback | None = None,
+) -> StreamedBackup:
+    """Dump au format répertoire, ``jobs`` tables exportées en parallèle."""
+
+    url, env = _connection(database_url)
+    destination = _backup_target(label, ".dump", backup_dir)
+    jobs = jobs or default_jobs()
+    cmd = [
+        _pg_dump_binary(),
+        "--format=directory",
+        f"--jobs={jobs}",
+        f"--compress={_compress_level()}",
+        "--verbose",
+        f"--file={destination}",
+        url,
+    ]
+    started = time.perf_counter()
+    try:
+        _run_verbose(cmd, env, tool="pg_dump", progress=progress)
+    except BaseException:
+        shutil.rmtree(destination, ignore_errors=True)
+        raise
+    return StreamedBackup(
+        name=destination.name,
+        path=destination,
+        size_bytes=_directory_size(destination),
+        raw_bytes=0,
+        created_at=datetime.now(timezone.utc),
+        duration_s=time.perf_counter() - started,
+        format="directory",
+    )
+
+
+def _resolve_backup(filename: str, backup_dir: Path | None) -> Path:
+    directory = Path(backup_dir) if backup_dir is not None else get_backup_directory(create=False)
+    path = (directory / filename).resolve()
+    if path.parent != directory.resolve() or not path.exists():
+        raise BackupError(f"Sauvegarde introuvable : {filename}")
+    return path
+
+
+def restore_directory_backup(
+    filename: str,
+    *,
+    jobs: int | None = None,
+    clean: bool = False,
+    database_url: str | None = None,
+    backup_dir: Path | None = None,
+    progress: ProgressCallback | None = None,
+) -> None:
+    """Restaure un dump ``*.dump`` avec ``pg_restore -j``."""
+
+    path = _resolve_backup(filename, backup_dir)
+    if not path.is_dir():
+        raise BackupError(f"{filename} n'est pas une sauvegarde au format répertoire.")
+    url, env = _connection(database_url)
+    cmd = [_pg_restore_binary(), f"--jobs={jobs or default_jobs()}", "--verbose", f"--dbname={url}"]
+    if clean:
+        cmd.extend(["--clean", "--if-exists"])
+    cmd.append(str(path))
+    _run_verbose(cmd, env, tool="pg_restore", progress=progress)
+
+
+def restore_streaming_backup(
+    filename: str,
+    *,
+    database_url: str | None = None,
+    backup_dir: Path | None = None,
+    progress: ProgressCallback | None = None,
+) -> None:
+    """Rejoue un ``.sql``/``.sql.gz`` dans ``psql`` par blocs, sans charger le fichier.
+
+    ``ON_ERROR_STOP`` arrête ``psql`` à la première erreur SQL et ``--single-transaction``
+    annule alors tout ce qui a été rejoué : son code retour non nul lève :class:`BackupError`
+    et la base reste dans son état d'avant la restauration.
+    """
+
+    path = _resolve_backup(filename, backup_dir)
+    url, env = _connection(database_url)
+    opener = gzip.open if path.suffix == ".gz" else open
+    chunk_size = _chunk_bytes()
+    sent = 0
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen(
+                [_psql_binary(), "-v", "ON_ERROR_STOP=1", "--single-transaction", url],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr,
+                env=env,
+            )
+        except FileNotFoundError as exc:
+            raise BackupError(f"psql introuvable : définir PSQL_PATH ou PSQL_BIN ({exc}).") from exc
+        try:
+            with opener(path, "rb") as source:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    process.stdin.write(chunk)
+                    sent += len(chunk)
+                    if progress is not None:
+                        progress({"bytes": sent})
+        except BrokenPipeError:
+            pass  # psql s'est arrêté : son code retour et stderr disent pourquoi
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = process.wait()
+        if returncode != 0:
+            raise BackupError(f"psql a échoué (code {returncode}) : {_stderr_tail(stderr)}")
+
+
+__all__ = [
+    "HIGH_CHURN_TABLES",
+    "StreamedBackup",
+    "TABLE_BACKUP_SUFFIX",
+    "create_directory_backup",
+    "create_streaming_backup",
+    "create_table_backup",
+    "default_jobs",
+    "is_table_backup",
+    "restore_directory_backup",
+    "restore_streaming_backup",
+    "stream_dump",
+]
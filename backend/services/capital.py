@@ -80,65 +80,63 @@ def _fetch_entities() -> list[dict[str, object]]:
     return list(grouped.values())
 
 
-def _latest_price_total(tenant_id: int) -> Decimal:
-    df = query_df(
-        text(
-            """
-            SELECT COALESCE(SUM(prix_achat * COALESCE(quantite, 1)), 0) AS stock_value
-            FROM latest_price_history
-            WHERE tenant_id = :tenant_id
-            """
-        ),
-        params={"tenant_id": int(tenant_id)},
+# Tous les tenants en une requête : valeur du stock au dernier prix connu (table
+# latest_price_history maintenue par trigger) et solde des relevés restaurant.
+_TENANT_BALANCES_SQL = """
+    WITH stock AS (
+        SELECT tenant_id, SUM(prix_achat * COALESCE(quantite, 1)) AS stock_value
+        FROM latest_price_history
+        GROUP BY tenant_id
+    ),
+    bank AS (
+        SELECT tenant_id, SUM(
+            CASE
+                WHEN LOWER(type) LIKE 'entrée%' THEN montant
+                ELSE -montant
+            END
+        ) AS balance
+        FROM restaurant_bank_statements
+        GROUP BY tenant_id
     )
-    if df.empty:
-        return Decimal("0")
-    return Decimal(str(df.iloc[0].stock_value or 0))
-
-
-def _bank_balance(tenant_id: int) -> Decimal:
-    df = query_df(
-        text(
-            """
-            SELECT COALESCE(SUM(
-                CASE
-                    WHEN LOWER(type) LIKE 'entrée%' THEN montant
-                    ELSE -montant
-                END
-            ), 0) AS balance
-            FROM restaurant_bank_statements
-            WHERE tenant_id = :tenant_id
-            """
-        ),
-        params={"tenant_id": int(tenant_id)},
-    )
-    if df.empty:
-        return Decimal("0")
-    return Decimal(str(df.iloc[0].balance or 0))
+    SELECT
+        t.id,
+        t.code,
+        t.name,
+        COALESCE(s.stock_value, 0) AS stock_value,
+        COALESCE(b.balance, 0) AS bank_balance
+    FROM tenants t
+    LEFT JOIN stock s ON s.tenant_id = t.id
+    LEFT JOIN bank b ON b.tenant_id = t.id
+    ORDER BY t.id
+"""
+
+
+def _fetch_tenant_balances() -> pd.DataFrame:
+    return query_df(text(_TENANT_BALANCES_SQL))
 
 
 def _cash_balance(tenant_id: int) -> Decimal:
     return Decimal("0")
 
 
-def _tenant_snapshots() -> dict[int, dict[str, object]]:
-    tenants_df = _fetch_tenants()
+def _tenant_snapshots(snapshot_date: datetime | None = None) -> dict[int, dict[str, object]]:
+    snapshot_date = snapshot_date or datetime.utcnow()
+    balances_df = _fetch_tenant_balances()
     snapshots: dict[int, dict[str, object]] = {}
-    for row in tenants_df.itertuples():
-        tenant_id = int(row.id)
-        stock_value = _latest_price_total(tenant_id=tenant_id)
-        bank_balance = _bank_balance(tenant_id=tenant_id)
+    for row in balances_df.to_dict("records"):
+        tenant_id = int(row["id"])
+        stock_value = Decimal(str(row["stock_value"] or 0))
+        bank_balance = Decimal(str(row["bank_balance"] or 0))
         cash_balance = _cash_balance(tenant_id=tenant_id)
-        assets = stock_value + bank_balance + cash_balance
         snapshots[tenant_id] = {
             "tenant_id": tenant_id,
-            "code": row.code,
-            "name": row.name,
+            "code": row["code"],
+            "name": row["name"],
             "stock_value": stock_value,
             "bank_balance": bank_balance,
             "cash_balance": cash_balance,
-            "total_assets": assets,
-            "snapshot_date": datetime.utcnow(),
+            "total_assets": stock_value + bank_balance + cash_balance,
+            "snapshot_date": snapshot_date,
         }
     return snapshots
 
@@ -218,35 +216,34 @@ def build_capital_overview(limit_latest_prices: int = 20) -> dict[str, object]:
 
 def persist_daily_snapshot(snapshot_date: datetime | None = None) -> None:
     snapshot_date = snapshot_date or datetime.utcnow()
-    tenants_df = _fetch_tenants()
+    snapshots = _tenant_snapshots(snapshot_date)
+    if not snapshots:
+        return
     eng = get_engine()
     with eng.begin() as conn:
-        for row in tenants_df.itertuples():
-            tenant_id = int(row.id)
-            stock_value = _latest_price_total(tenant_id=tenant_id)
-            bank_balance = _bank_balance(tenant_id=tenant_id)
-            cash_balance = _cash_balance(tenant_id=tenant_id)
-            total_assets = stock_value + bank_balance + cash_balance
-            conn.execute(
-                text(
-                    """
-                    INSERT INTO capital_snapshot (tenant_id, snapshot_date, stock_value, bank_balance, cash_balance, total_assets, created_at)
-                    VALUES (:tenant_id, :snapshot_date, :stock_value, :bank_balance, :cash_balance, :total_assets, NOW())
-                    ON CONFLICT (tenant_id, snapshot_date)
-                    DO UPDATE SET
-                        stock_value = EXCLUDED.stock_value,
-                        bank_balance = EXCLUDED.bank_balance,
-                        cash_balance = EXCLUDED.cash_balance,
-                        total_assets = EXCLUDED.total_assets,
-                        created_at = NOW()
-                    """
-                ),
+        conn.execute(
+            text(
+                """
+                INSERT INTO capital_snapshot (tenant_id, snapshot_date, stock_value, bank_balance, cash_balance, total_assets, created_at)
+                VALUES (:tenant_id, :snapshot_date, :stock_value, :bank_balance, :cash_balance, :total_assets, NOW())
+                ON CONFLICT (tenant_id, snapshot_date)
+                DO UPDATE SET
+                    stock_value = EXCLUDED.stock_value,
+                    bank_balance = EXCLUDED.bank_balance,
+                    cash_balance = EXCLUDED.cash_balance,
+                    total_assets = EXCLUDED.total_assets,
+                    created_at = NOW()
+                """
+            ),
+            [
                 {
-                    "tenant_id": tenant_id,
+                    "tenant_id": snapshot["tenant_id"],
                     "snapshot_date": snapshot_date,
-                    "stock_value": float(stock_value),
-                    "bank_balance": float(bank_balance),
-                    "cash_balance": float(cash_balance),
-                    "total_assets": float(total_assets),
-                },
-            )
+                    "stock_value": float(snapshot["stock_value"]),
+                    "bank_balance": float(snapshot["bank_balance"]),
+                    "cash_balance": float(snapshot["cash_balance"]),
+                    "total_assets": float(snapshot["total_assets"]),
+                }
+                for snapshot in snapshots.values()
+            ],
+        )
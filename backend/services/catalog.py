@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import base64
+import binascii
+import json
+import os
+import threading
+import time
 from typing import Any, Dict, Iterable, Optional, Tuple
 
 from sqlalchemy import text
 from sqlalchemy.engine import Connection
 
 from core.data_repository import get_engine
+from backend.services.dashboard import invalidate_dashboard_cache
+from backend.services.supply import invalidate_supply_cache
 from core.product_service import parse_barcode_input
 from core.products_loader import insert_or_update_barcode
 
@@ -21,6 +29,7 @@ class ProductNotFound(CatalogServiceError):
 PRODUCT_COLUMNS = (
     "id, nom, tenant_id, prix_achat, prix_vente, tva, categorie, seuil_alerte, stock_actuel, actif"
 )
+_PREFIXED_COLUMNS = ", ".join(f"p.{column.strip()}" for column in PRODUCT_COLUMNS.split(","))
 
 
 def _row_to_dict(row: Any) -> Dict[str, Any]:
@@ -56,6 +65,81 @@ def _derive_status(stock: float, seuil: float) -> str:
     return "warning" if stock < seuil else "ok"
 
 
+def _count_ttl() -> float:
+    return float(os.getenv("CATALOG_COUNT_TTL_SECONDS", "30"))
+
+
+class _CountCache:
+    """Totaux du listing par tenant et filtres ; invalidés par les écritures catalogue.
+
+    Le TTL couvre ce que ce module ne voit pas passer (ventes qui changent le
+    statut de stock, imports).
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple, tuple[float, int, int]] = {}
+        self._generations: dict[int, int] = {}
+        self._guard = threading.Lock()
+
+    def get(self, key: tuple) -> int | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, generation, total = entry
+        if expires_at <= time.monotonic() or generation != self._generations.get(key[0], 0):
+            return None
+        return total
+
+    def generation(self, tenant_id: int) -> int:
+        return self._generations.get(tenant_id, 0)
+
+    def put(self, key: tuple, generation: int, total: int, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, generation, total)
+
+    def invalidate(self, tenant_id: int | None = None) -> None:
+        with self._guard:
+            tenants = {key[0] for key in self._entries} if tenant_id is None else {int(tenant_id)}
+            for tid in tenants:
+                self._generations[tid] = self._generations.get(tid, 0) + 1
+            for key in [key for key in self._entries if key[0] in tenants]:
+                self._entries.pop(key, None)
+
+
+_COUNT_CACHE = _CountCache()
+
+
+def invalidate_catalog_count_cache(tenant_id: int | None = None) -> None:
+    _COUNT_CACHE.invalidate(tenant_id)
+
+
+def encode_cursor(record: dict[str, Any]) -> str:
+    """Curseur opaque ``(nom, id)`` du dernier produit d'une page."""
+
+    raw = json.dumps([record["nom"], int(record["id"])], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        nom, product_id = json.loads(raw.decode("utf-8"))
+        return str(nom), int(product_id)
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise ValueError("Curseur de pagination invalide.") from exc
+
+
+def next_cursor(items: list[dict[str, Any]], per_page: int) -> str | None:
+    """Curseur de la page suivante, ``None`` si ``items`` est la dernière page."""
+
+    if len(items) < max(1, min(per_page, 200)):
+        return None
+    return encode_cursor(items[-1])
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 def list_products_page(
     tenant_id: int,
     *,
@@ -64,51 +148,102 @@ def list_products_page(
     status: str | None = None,
     page: int = 1,
     per_page: int = 25,
+    cursor: str | None = None,
 ) -> Tuple[list[dict[str, Any]], int]:
+    """Page du catalogue triée par ``(nom, id)``, codes-barres agrégés dans la même requête.
+
+    Avec ``cursor`` (cf. ``next_cursor``) la page démarre après le dernier produit
+    de la précédente (pagination par clé, coût constant) et ``page`` est ignoré.
+    Le total est mis en cache par tenant et filtres.
+    """
+
     page = max(1, page)
     per_page = max(1, min(per_page, 200))
     offset = (page - 1) * per_page
 
-    where_clauses = ["tenant_id = :tenant_id"]
+    where_clauses = ["p.tenant_id = :tenant_id"]
     params: dict[str, Any] = {"tenant_id": tenant_id}
 
     if search:
-        where_clauses.append("LOWER(nom) LIKE :search")
-        params["search"] = f"%{search.lower()}%"
+        # Index GIN trigrammes sur LOWER(nom) et LOWER(code).
+        where_clauses.append(
+            """(
+                LOWER(p.nom) LIKE :search ESCAPE '\\'
+                OR EXISTS (
+                    SELECT 1 FROM produits_barcodes sb
+                    WHERE sb.produit_id = p.id
+                      AND sb.tenant_id = p.tenant_id
+                      AND LOWER(sb.code) LIKE :search ESCAPE '\\'
+                )
+            )"""
+        )
+        params["search"] = f"%{_escape_like(search.lower())}%"
     if category:
-        where_clauses.append("categorie = :category")
+        where_clauses.append("p.categorie = :category")
         params["category"] = category
     if status:
         if status == "critical":
-            where_clauses.append("stock_actuel <= 0")
+            where_clauses.append("p.stock_actuel <= 0")
         elif status == "warning":
-            where_clauses.append("(stock_actuel > 0 AND seuil_alerte > 0 AND stock_actuel < seuil_alerte)")
+            where_clauses.append("(p.stock_actuel > 0 AND p.seuil_alerte > 0 AND p.stock_actuel < p.seuil_alerte)")
         elif status == "ok":
-            where_clauses.append("(stock_actuel > 0 AND (seuil_alerte = 0 OR stock_actuel >= seuil_alerte))")
+            where_clauses.append("(p.stock_actuel > 0 AND (p.seuil_alerte = 0 OR p.stock_actuel >= p.seuil_alerte))")
 
     where_sql = "WHERE " + " AND ".join(where_clauses)
-    base_sql = f"SELECT {PRODUCT_COLUMNS} FROM produits {where_sql}"
+    page_clauses = list(where_clauses)
+    page_params = {**params, "limit": per_page}
+    if cursor:
+        after_nom, after_id = decode_cursor(cursor)
+        page_clauses.append("(p.nom, p.id) > (:after_nom, :after_id)")
+        page_params.update(after_nom=after_nom, after_id=after_id)
+        offset_sql = ""
+    else:
+        page_params["offset"] = offset
+        offset_sql = "OFFSET :offset"
+
+    page_sql = f"""
+        WITH page AS (
+            SELECT {_PREFIXED_COLUMNS}
+            FROM produits p
+            WHERE {" AND ".join(page_clauses)}
+            ORDER BY p.nom, p.id
+            LIMIT :limit {offset_sql}
+        )
+        SELECT page.*, COALESCE(bc.codes, ARRAY[]::text[]) AS codes
+        FROM page
+        LEFT JOIN LATERAL (
+            SELECT array_agg(pb.code ORDER BY pb.code) AS codes
+            FROM produits_barcodes pb
+            WHERE pb.produit_id = page.id AND pb.tenant_id = page.tenant_id
+        ) bc ON TRUE
+        ORDER BY page.nom, page.id
+    """
+
+    cache_key = (int(tenant_id), params.get("search"), category, status)
+    ttl = _count_ttl()
+    total = _COUNT_CACHE.get(cache_key) if ttl > 0 else None
 
     with get_engine().begin() as conn:
-        count_row = conn.execute(text(f"SELECT COUNT(*) FROM produits {where_sql}"), params).fetchone()
-        total = int(count_row[0] if count_row else 0)
+        if total is None:
+            generation = _COUNT_CACHE.generation(int(tenant_id))
+            count_row = conn.execute(text(f"SELECT COUNT(*) FROM produits p {where_sql}"), params).fetchone()
+            total = int(count_row[0] if count_row else 0)
+            if ttl > 0:
+                _COUNT_CACHE.put(cache_key, generation, total, ttl)
 
-        rows = conn.execute(
-            text(f"{base_sql} ORDER BY nom LIMIT :limit OFFSET :offset"),
-            {**params, "limit": per_page, "offset": offset},
-        ).fetchall()
+        rows = conn.execute(text(page_sql), page_params).fetchall()
 
-        results: list[dict[str, Any]] = []
-        for row in rows:
-            record = _row_to_dict(row)
-            record["codes"] = _fetch_barcodes(conn, int(record["id"]), tenant_id)
-            stock = float(record.get("stock_actuel") or 0)
-            seuil = record.get("seuil_alerte")
-            seuil_value = float(seuil) if seuil is not None else None
-            record["status"] = _derive_status(stock, seuil_value if seuil_value is not None else 0)
-            results.append(record)
+    results: list[dict[str, Any]] = []
+    for row in rows:
+        record = _row_to_dict(row)
+        record["codes"] = [str(code) for code in (record.get("codes") or [])]
+        stock = float(record.get("stock_actuel") or 0)
+        seuil = record.get("seuil_alerte")
+        seuil_value = float(seuil) if seuil is not None else None
+        record["status"] = _derive_status(stock, seuil_value if seuil_value is not None else 0)
+        results.append(record)
 
-        return results, total
+    return results, total
 
 
 def get_product(product_id: int, tenant_id: int) -> dict[str, Any]:
@@ -149,7 +284,10 @@ def create_product(
         for code in codes:
             insert_or_update_barcode(conn, int(record["id"]), code, tenant_id=tenant_id)
         record["codes"] = _fetch_barcodes(conn, int(record["id"]), tenant_id)
-        return record
+    invalidate_dashboard_cache(tenant_id)
+    invalidate_supply_cache(tenant_id)
+    invalidate_catalog_count_cache(tenant_id)
+    return record
 
 
 def update_product(
@@ -176,6 +314,9 @@ def update_product(
             )
             if result.rowcount == 0:
                 raise ProductNotFound(f"Produit {product_id} introuvable.")
+            invalidate_dashboard_cache(tenant_id)
+            invalidate_supply_cache(tenant_id)
+            invalidate_catalog_count_cache(tenant_id)
 
         if codes is not None:
             desired = set(parse_barcode_input(codes))
@@ -205,6 +346,9 @@ def delete_product(product_id: int, *, tenant_id: int) -> None:
         )
         if result.rowcount == 0:
             raise ProductNotFound(f"Produit {product_id} introuvable.")
+    invalidate_dashboard_cache(tenant_id)
+    invalidate_supply_cache(tenant_id)
+    invalidate_catalog_count_cache(tenant_id)
 
 
 def get_product_by_barcode(barcode: str, *, tenant_id: int) -> dict[str, Any]:
@@ -0,0 +1,373 @@
+"""Index en mémoire pour rapprocher les lignes de facture du catalogue.
+
+Un index par tenant regroupe les codes-barres normalisés, les noms en minuscules et
+un index de trigrammes (même découpage que ``pg_trgm``) pour retrouver les libellés
+fournisseurs approchants. Il est reconstruit lorsque ``catalog_versions.version``
+change (triggers sur ``produits``/``produits_barcodes``) ; sans cette table, l'index
+expire après ``CATALOG_MATCH_TTL_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from core.data_repository import query_df
+
+logger = logging.getLogger(__name__)
+
+MATCH_COLUMNS = [
+    "code",
+    "produit_id",
+    "produit_nom",
+    "categorie",
+    "prix_achat_catalogue",
+    "prix_vente_catalogue",
+    "tva_catalogue",
+]
+
+_CATALOG_SQL = """
+    SELECT
+        p.id AS produit_id,
+        p.nom AS produit_nom,
+        p.categorie,
+        COALESCE(p.prix_achat, 0) AS prix_achat_catalogue,
+        COALESCE(p.prix_vente, 0) AS prix_vente_catalogue,
+        COALESCE(p.tva, 0) AS tva_catalogue,
+        pb.code
+    FROM produits p
+    LEFT JOIN produits_barcodes pb
+        ON pb.produit_id = p.id
+       AND pb.tenant_id = p.tenant_id
+    WHERE p.tenant_id = :tenant_id
+    ORDER BY p.id, pb.is_principal DESC NULLS LAST, pb.id
+"""
+
+_VERSION_SQL = "SELECT version FROM catalog_versions WHERE tenant_id = :tenant_id"
+
+_TENANTS_SQL = "SELECT DISTINCT tenant_id FROM produits"
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_FUZZY_CACHE_MAX = 4096
+
+# Contenance d'un libellé (« 33 cl », « 1,5L », « 500G ») ramenée à une unité de base.
+_SIZE = re.compile(r"(?<![0-9a-wyz.,])(\d+(?:[.,]\d+)?)\s*(kg|mg|g|cl|ml|dl|l)(?![a-z])")
+_SIZE_UNITS = {
+    "mg": ("g", 0.001),
+    "g": ("g", 1.0),
+    "kg": ("g", 1000.0),
+    "ml": ("ml", 1.0),
+    "cl": ("ml", 10.0),
+    "dl": ("ml", 100.0),
+    "l": ("ml", 1000.0),
+}
+
+
+def normalize_code(value: object) -> str:
+    return str(value or "").strip().lower()
+
+
+def normalize_label(value: object) -> str:
+    """Minuscules sans accents ni ponctuation, pour la recherche approchée."""
+
+    decomposed = unicodedata.normalize("NFKD", str(value or "").lower())
+    ascii_only = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", ascii_only).strip()
+
+
+def size_tokens(value: object) -> frozenset[str]:
+    """Contenances d'un libellé en unités de base : ``"Riz 1KG"`` -> ``{"1000g"}``."""
+
+    decomposed = unicodedata.normalize("NFKD", str(value or "").lower())
+    ascii_only = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    tokens = set()
+    for amount, unit in _SIZE.findall(ascii_only):
+        base, factor = _SIZE_UNITS[unit]
+        tokens.add(f"{float(amount.replace(',', '.')) * factor:g}{base}")
+    return frozenset(tokens)
+
+
+def trigrams(label: str) -> set[str]:
+    """Trigrammes d'un libellé normalisé (mots complétés comme ``pg_trgm``)."""
+
+    grams: set[str] = set()
+    for word in label.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True)
+class CatalogMatch:
+    produit_id: int
+    produit_nom: str
+    categorie: str | None
+    prix_achat_catalogue: float
+    prix_vente_catalogue: float
+    tva_catalogue: float
+    barcode: str | None
+
+
+class CatalogMatchIndex:
+    """Codes-barres, noms exacts et trigrammes d'un catalogue tenant."""
+
+    def __init__(self, products: Iterable[tuple[CatalogMatch, list[str]]], *, version: int | None = None) -> None:
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_code: dict[str, CatalogMatch] = {}
+        self.by_name: dict[str, CatalogMatch] = {}
+        self._products: list[CatalogMatch] = []
+        postings: dict[str, list[int]] = {}
+        sizes: list[int] = []
+        by_size: dict[frozenset[str], list[int]] = {}
+        for product, codes in products:
+            position = len(self._products)
+            self._products.append(product)
+            for code in codes:
+                self.by_code.setdefault(normalize_code(code), product)
+            self.by_name.setdefault(product.produit_nom.strip().lower(), product)
+            grams = trigrams(normalize_label(product.produit_nom))
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+            by_size.setdefault(size_tokens(product.produit_nom), []).append(position)
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._sizes = np.asarray(sizes, dtype=np.float64)
+        self._by_size = {key: np.asarray(ids, dtype=np.int32) for key, ids in by_size.items()}
+        self._fuzzy_cache: dict[tuple[str, float], CatalogMatch | None] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, *, version: int | None = None) -> "CatalogMatchIndex":
+        products: dict[int, tuple[CatalogMatch, list[str]]] = {}
+        for row in df.to_dict("records"):
+            produit_id = int(row["produit_id"])
+            code = row.get("code")
+            code = None if code is None or pd.isna(code) or not str(code).strip() else str(code)
+            entry = products.get(produit_id)
+            if entry is None:
+                categorie = row.get("categorie")
+                entry = (
+                    CatalogMatch(
+                        produit_id=produit_id,
+                        produit_nom=str(row["produit_nom"]),
+                        categorie=None if categorie is None or pd.isna(categorie) else str(categorie),
+                        prix_achat_catalogue=float(row.get("prix_achat_catalogue") or 0.0),
+                        prix_vente_catalogue=float(row.get("prix_vente_catalogue") or 0.0),
+                        tva_catalogue=float(row.get("tva_catalogue") or 0.0),
+                        # Requête triée : le premier code est le code principal.
+                        barcode=code,
+                    ),
+                    [],
+                )
+                products[produit_id] = entry
+            if code is not None:
+                entry[1].append(code)
+        return cls(products.values(), version=version)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def match_code(self, code: object) -> CatalogMatch | None:
+        key = normalize_code(code)
+        return self.by_code.get(key) if key else None
+
+    def match_name(self, name: object) -> CatalogMatch | None:
+        key = str(name or "").strip().lower()
+        return self.by_name.get(key) if key else None
+
+    def match_fuzzy(self, name: object, *, threshold: float | None = None) -> CatalogMatch | None:
+        """Produit au nom le plus proche (similarité de trigrammes), si unique et suffisante.
+
+        Seuls les produits de même contenance sont candidats (« 50CL » ne propose jamais
+        un « 33cl »). Le résultat reste une suggestion à faire valider : il ne doit pas
+        renseigner ``produit_id`` ni les codes d'une ligne.
+        """
+
+        min_score = fuzzy_threshold() if threshold is None else float(threshold)
+        label = normalize_label(name)
+        if not label or not self._products:
+            return None
+        cache_key = (label, min_score)
+        if cache_key in self._fuzzy_cache:
+            return self._fuzzy_cache[cache_key]
+
+        grams = trigrams(label)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        same_size = self._by_size.get(size_tokens(name))
+        match: CatalogMatch | None = None
+        if lists and same_size is not None:
+            shared = np.bincount(np.concatenate(lists), minlength=len(self._products)).astype(np.float64)
+            scores = np.zeros(len(self._products), dtype=np.float64)
+            scores[same_size] = shared[same_size] / (len(grams) + self._sizes[same_size] - shared[same_size])
+            best = int(np.argmax(scores))
+            best_score = scores[best]
+            # Deux candidats à égalité : libellé ambigu, on ne devine pas.
+            if best_score >= min_score and np.count_nonzero(scores == best_score) == 1:
+                match = self._products[best]
+
+        if len(self._fuzzy_cache) >= _FUZZY_CACHE_MAX:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[cache_key] = match
+        return match
+
+
+def fuzzy_threshold() -> float:
+    return float(os.getenv("CATALOG_FUZZY_THRESHOLD", "0.5"))
+
+
+def _ttl_seconds() -> float:
+    return float(os.getenv("CATALOG_MATCH_TTL_SECONDS", "60"))
+
+
+def _catalog_version(tenant_id: int) -> int | None:
+    """Version courante du catalogue, ``None`` si elle n'est pas disponible."""
+
+    try:
+        df = query_df(_VERSION_SQL, params={"tenant_id": int(tenant_id)})
+    except Exception as exc:
+        logger.debug("catalog_versions indisponible: %s", exc)
+        return None
+    if df.empty:
+        return 0
+    return int(df.iloc[0]["version"])
+
+
+def _load_index(tenant_id: int, version: int | None) -> CatalogMatchIndex:
+    df = query_df(_CATALOG_SQL, params={"tenant_id": int(tenant_id)})
+    return CatalogMatchIndex.from_frame(df, version=version)
+
+
+_INDEXES: dict[int, CatalogMatchIndex] = {}
+_LOCKS: dict[int, threading.Lock] = {}
+_GUARD = threading.Lock()
+
+
+def _lock_for(tenant_id: int) -> threading.Lock:
+    with _GUARD:
+        return _LOCKS.setdefault(tenant_id, threading.Lock())
+
+
+def _is_current(index: CatalogMatchIndex | None, version: int | None) -> bool:
+    if index is None:
+        return False
+    if version is not None:
+        return index.version == version
+    return time.monotonic() - index.loaded_at < _ttl_seconds()
+
+
+def get_catalog_match_index(tenant_id: int) -> CatalogMatchIndex:
+    """Index du tenant, reconstruit si le catalogue a changé depuis son chargement."""
+
+    tenant_id = int(tenant_id)
+    version = _catalog_version(tenant_id)
+    index = _INDEXES.get(tenant_id)
+    if _is_current(index, version):
+        return index
+    with _lock_for(tenant_id):
+        index = _INDEXES.get(tenant_id)
+        if _is_current(index, version):
+            return index
+        index = _load_index(tenant_id, version)
+        _INDEXES[tenant_id] = index
+        return index
+
+
+def invalidate_catalog_match_index(tenant_id: int | None = None) -> None:
+    with _GUARD:
+        if tenant_id is None:
+            _INDEXES.clear()
+        else:
+            _INDEXES.pop(int(tenant_id), None)
+
+
+def match_invoice_products(invoice_df: pd.DataFrame, *, tenant_id: int = 1) -> pd.DataFrame:
+    """Équivalent indexé de ``core.inventory_service.match_invoice_products``."""
+
+    if not isinstance(invoice_df, pd.DataFrame) or invoice_df.empty or "codes" not in invoice_df.columns:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+
+    codes: set[str] = set()
+    for raw in invoice_df["codes"].tolist():
+        if isinstance(raw, str):
+            codes.add(normalize_code(raw))
+        elif isinstance(raw, Iterable):
+            codes.update(normalize_code(part) for part in raw)
+    codes.discard("")
+    if not codes:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+
+    try:
+        index = get_catalog_match_index(tenant_id)
+    except Exception as exc:
+        logger.warning("Index catalogue indisponible pour le tenant %s: %s", tenant_id, exc)
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+
+    rows = []
+    for code in sorted(codes):
+        match = index.match_code(code)
+        if match is not None:
+            rows.append(
+                (
+                    code,
+                    match.produit_id,
+                    match.produit_nom,
+                    match.categorie,
+                    match.prix_achat_catalogue,
+                    match.prix_vente_catalogue,
+                    match.tva_catalogue,
+                )
+            )
+    return pd.DataFrame(rows, columns=MATCH_COLUMNS)
+
+
+def warm_catalog_match_indexes() -> int:
+    """Charge l'index de chaque tenant ayant un catalogue ; retourne le nombre chargé."""
+
+    tenants = query_df(_TENANTS_SQL)
+    loaded = 0
+    for tenant_id in tenants["tenant_id"].dropna().astype(int).tolist() if not tenants.empty else []:
+        get_catalog_match_index(tenant_id)
+        loaded += 1
+    return loaded
+
+
+def warm_catalog_match_indexes_if_enabled() -> None:
+    """Préchauffe les index en tâche de fond (``CATALOG_MATCH_WARMUP``).
+
+    Appelé par le lifespan de l'application : rien ne part à l'import ni à ``create_app``.
+    """
+
+    if os.getenv("CATALOG_MATCH_WARMUP", "1").strip().lower() not in {"1", "true", "yes", "on"}:
+        return
+
+    def _warm() -> None:
+        try:
+            count = warm_catalog_match_indexes()
+            logger.info("Index de rapprochement catalogue préchargés: %s tenant(s)", count)
+        except Exception as exc:  # pragma: no cover - mise en garde démarrage
+            logger.warning("Préchargement des index catalogue impossible: %s", exc)
+
+    threading.Thread(target=_warm, name="catalog-match-warmup", daemon=True).start()
+
+
+__all__ = [
+    "CatalogMatch",
+    "CatalogMatchIndex",
+    "get_catalog_match_index",
+    "invalidate_catalog_match_index",
+    "match_invoice_products",
+    "normalize_label",
+    "size_tokens",
+    "trigrams",
+    "warm_catalog_match_indexes",
+    "warm_catalog_match_indexes_if_enabled",
+]
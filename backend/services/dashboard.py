@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
 
 import pandas as pd
 from sqlalchemy import text
 
-from core.data_repository import query_df
+from core.data_repository import get_engine, query_df
 
 
 def fetch_kpis(tenant_id: int) -> dict[str, float | int]:
@@ -144,16 +148,210 @@ def fetch_margin_alerts(*, tenant_id: int, limit: int = 5) -> List[dict[str, Any
     return df.to_dict(orient='records') if not df.empty else []
 
 
-def fetch_dashboard_metrics(*, tenant_id: int) -> dict[str, Any]:
+# Toutes les sections du tableau de bord en un seul aller-retour : le CTE ``prod`` est
+# matérialisé une fois (un seul parcours de produits) et chaque section est agrégée en
+# JSON côté base, ce qui évite de construire un DataFrame par section.
+_DASHBOARD_BUNDLE_SQL = """
+    WITH prod AS MATERIALIZED (
+        SELECT id, nom, categorie, actif, stock_actuel, prix_vente, prix_achat
+        FROM produits
+        WHERE tenant_id = :tenant_id
+    )
+    SELECT json_build_object(
+        'kpis', (
+            SELECT json_build_object(
+                'total_produits', COUNT(id),
+                'valeur_stock_ht', COALESCE(SUM(stock_actuel * prix_vente), 0),
+                'quantite_stock_total', COALESCE(SUM(stock_actuel), 0),
+                'alerte_stock_bas', COALESCE(SUM(CASE WHEN stock_actuel <= 5 AND stock_actuel > 0 THEN 1 ELSE 0 END), 0),
+                'stock_epuise', COALESCE(SUM(CASE WHEN stock_actuel = 0 THEN 1 ELSE 0 END), 0)
+            )
+            FROM prod
+        ),
+        'top_stock_value', (
+            SELECT COALESCE(json_agg(t ORDER BY t.valeur_stock DESC), '[]'::json)
+            FROM (
+                SELECT nom, (stock_actuel * prix_vente) AS valeur_stock
+                FROM prod
+                ORDER BY valeur_stock DESC
+                LIMIT :limit
+            ) t
+        ),
+        'top_sales', (
+            SELECT COALESCE(json_agg(t ORDER BY t.quantite_vendue DESC), '[]'::json)
+            FROM (
+                SELECT p.nom, COALESCE(SUM(m.quantite), 0) AS quantite_vendue
+                FROM mouvements_stock m
+                JOIN prod p ON m.produit_id = p.id
+                WHERE m.type = 'SORTIE'
+                  AND m.tenant_id = :tenant_id
+                GROUP BY p.nom
+                ORDER BY quantite_vendue DESC
+                LIMIT :limit
+            ) t
+        ),
+        'status_distribution', (
+            SELECT COALESCE(json_agg(t ORDER BY t.nombre DESC), '[]'::json)
+            FROM (
+                SELECT
+                    CASE
+                        WHEN stock_actuel <= 0 THEN 'Épuisé'
+                        WHEN stock_actuel < 5 THEN 'Alerte Basse'
+                        ELSE 'Stock OK'
+                    END AS statut_stock,
+                    COUNT(*) AS nombre
+                FROM prod
+                GROUP BY 1
+            ) t
+        ),
+        'supplier_breakdown', (
+            SELECT COALESCE(json_agg(t ORDER BY t.valeur DESC), '[]'::json)
+            FROM (
+                SELECT
+                    COALESCE(NULLIF(TRIM(m.source), ''), 'Non renseigné') AS fournisseur,
+                    COUNT(*) AS mouvements,
+                    SUM(m.quantite) AS quantite,
+                    SUM(m.quantite * COALESCE(p.prix_achat, 0)) AS valeur
+                FROM mouvements_stock m
+                JOIN prod p ON p.id = m.produit_id
+                WHERE m.type = 'ENTREE'
+                  AND m.tenant_id = :tenant_id
+                GROUP BY fournisseur
+                ORDER BY valeur DESC
+                LIMIT :limit
+            ) t
+        ),
+        'weekly_variation', (
+            SELECT COALESCE(json_agg(t ORDER BY t.semaine ASC), '[]'::json)
+            FROM (
+                SELECT
+                    DATE_TRUNC('week', m.date_mvt) AS semaine,
+                    SUM(CASE WHEN m.type = 'ENTREE' THEN m.quantite ELSE 0 END) AS entrees,
+                    SUM(CASE WHEN m.type = 'SORTIE' THEN m.quantite ELSE 0 END) AS sorties
+                FROM mouvements_stock m
+                WHERE m.date_mvt >= now() - make_interval(weeks => :weeks)
+                  AND m.tenant_id = :tenant_id
+                GROUP BY semaine
+            ) t
+        ),
+        'margin_alerts', (
+            SELECT COALESCE(json_agg(t ORDER BY t.marge_pct ASC), '[]'::json)
+            FROM (
+                SELECT
+                    p.id, p.nom, p.categorie,
+                    COALESCE(p.prix_vente, 0) AS prix_vente,
+                    COALESCE(p.prix_achat, 0) AS prix_achat,
+                    CASE WHEN COALESCE(p.prix_vente, 0) = 0 THEN 0
+                         ELSE ((p.prix_vente - p.prix_achat) / NULLIF(p.prix_vente, 0)) * 100
+                    END AS marge_pct
+                FROM prod p
+                WHERE p.actif = TRUE
+                ORDER BY marge_pct ASC
+                LIMIT :limit
+            ) t
+        )
+    )
+"""
+
+
+def _cache_ttl() -> float:
+    return float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "30"))
+
+
+class _TenantCache:
+    """Cache TTL par tenant, avec un seul calcul concurrent par tenant (anti-ruée)."""
+
+    def __init__(self) -> None:
+        self._entries: dict[int, tuple[float, int, dict[str, Any]]] = {}
+        self._generations: dict[int, int] = {}
+        self._locks: dict[int, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, tenant_id: int) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(tenant_id, threading.Lock())
+
+    def _fresh(self, tenant_id: int, now: float) -> dict[str, Any] | None:
+        entry = self._entries.get(tenant_id)
+        if entry is None:
+            return None
+        expires_at, generation, value = entry
+        if expires_at <= now or generation != self._generations.get(tenant_id, 0):
+            return None
+        return value
+
+    def get_or_compute(self, tenant_id: int, ttl: float, compute: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        cached = self._fresh(tenant_id, time.monotonic())
+        if cached is not None:
+            return cached
+        with self._lock_for(tenant_id):
+            # Un autre thread a pu remplir l'entrée pendant l'attente du verrou.
+            cached = self._fresh(tenant_id, time.monotonic())
+            if cached is not None:
+                return cached
+            generation = self._generations.get(tenant_id, 0)
+            value = compute()
+            self._entries[tenant_id] = (time.monotonic() + ttl, generation, value)
+            return value
+
+    def invalidate(self, tenant_id: int | None = None) -> None:
+        with self._guard:
+            tenants = list(self._entries) if tenant_id is None else [int(tenant_id)]
+            for tid in tenants:
+                # La génération couvre aussi un calcul en cours démarré avant l'écriture.
+                self._generations[tid] = self._generations.get(tid, 0) + 1
+                self._entries.pop(tid, None)
+
+
+_CACHE = _TenantCache()
+
+
+def invalidate_dashboard_cache(tenant_id: int | None = None) -> None:
+    """À appeler après toute écriture sur ``produits`` ou ``mouvements_stock``."""
+    _CACHE.invalidate(tenant_id)
+
+
+def _normalize_kpis(raw: dict[str, Any] | None) -> dict[str, float | int]:
+    raw = raw or {}
     return {
-        'kpis': fetch_kpis(tenant_id=tenant_id),
-        'top_stock_value': fetch_top_stock_value(tenant_id=tenant_id),
-        'top_sales': fetch_top_sales(tenant_id=tenant_id),
-        'status_distribution': fetch_status_distribution(tenant_id=tenant_id),
-        'supplier_breakdown': fetch_supplier_breakdown(tenant_id=tenant_id),
-        'weekly_variation': fetch_weekly_variation(tenant_id=tenant_id),
-        'margin_alerts': fetch_margin_alerts(tenant_id=tenant_id),
+        'total_produits': int(raw.get('total_produits') or 0),
+        'valeur_stock_ht': float(raw.get('valeur_stock_ht') or 0),
+        'quantite_stock_total': float(raw.get('quantite_stock_total') or 0),
+        'alerte_stock_bas': int(raw.get('alerte_stock_bas') or 0),
+        'stock_epuise': int(raw.get('stock_epuise') or 0),
     }
 
 
-__all__ = ['fetch_dashboard_metrics']
+def fetch_dashboard_bundle(*, tenant_id: int, limit: int = 5, weeks: int = 8) -> dict[str, Any]:
+    """Calcule toutes les sections du tableau de bord en une seule requête."""
+    params = {'tenant_id': int(tenant_id), 'limit': int(limit), 'weeks': max(1, int(weeks))}
+    with get_engine().connect() as conn:
+        payload = conn.execute(text(_DASHBOARD_BUNDLE_SQL), params).scalar()
+    if isinstance(payload, (str, bytes)):
+        payload = json.loads(payload)
+    payload = dict(payload or {})
+    payload['kpis'] = _normalize_kpis(payload.get('kpis'))
+    for section in (
+        'top_stock_value',
+        'top_sales',
+        'status_distribution',
+        'supplier_breakdown',
+        'weekly_variation',
+        'margin_alerts',
+    ):
+        payload[section] = payload.get(section) or []
+    return payload
+
+
+def fetch_dashboard_metrics(*, tenant_id: int, use_cache: bool = True) -> dict[str, Any]:
+    """Métriques du tableau de bord, servies depuis le cache du tenant si possible.
+
+    Le résultat mis en cache est partagé entre les appelants : il ne doit pas être modifié.
+    """
+    ttl = _cache_ttl()
+    if not use_cache or ttl <= 0:
+        return fetch_dashboard_bundle(tenant_id=tenant_id)
+    return _CACHE.get_or_compute(int(tenant_id), ttl, lambda: fetch_dashboard_bundle(tenant_id=tenant_id))
+
+
+__all__ = ['fetch_dashboard_bundle', 'fetch_dashboard_metrics', 'invalidate_dashboard_cache']
@@ -44,6 +44,7 @@ from backend.services.finance.rules import (
     update_rule,
     delete_rule,
     record_import,
+    rules_matcher,
 )
 
 from backend.services.finance.invoices import (
@@ -65,6 +66,7 @@ from backend.services.finance.stats import (
     timeline_stats,
     category_breakdown,
     treasury_summary,
+    rebuild_rollups,
     refresh_materialized_views,
 )
 
@@ -78,7 +80,9 @@ from backend.services.finance.metrics import (
 )
 
 from backend.services.finance.imports import (
+    create_import,
     list_imports,
+    update_import_progress,
 )
 
 from backend.services.finance.core import (
@@ -114,6 +118,7 @@ __all__ = [
     "update_rule",
     "delete_rule",
     "record_import",
+    "rules_matcher",
     # invoices
     "create_vendor",
     "list_vendors",
@@ -129,6 +134,7 @@ __all__ = [
     "timeline_stats",
     "category_breakdown",
     "treasury_summary",
+    "rebuild_rollups",
     "refresh_materialized_views",
     # dashboard
     "dashboard_summary",
@@ -136,7 +142,9 @@ __all__ = [
     "record_import_metrics",
     "record_reco_run",
     # imports
+    "create_import",
     "list_imports",
+    "update_import_progress",
     # core
     "run_reconciliation",
     "list_matches",
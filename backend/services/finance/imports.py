@@ -35,7 +35,32 @@ def list_imports() -> List[dict]:
     return df.where(df.notna(), None).to_dict("records") if not df.empty else []
 
 
-def update_import_progress(import_id: int, inserted: int, total: int | None = None, status: str | None = None) -> None:
+def create_import(account_id: int, file_name: str, *, source: str = "IMPORT", status: str = "PENDING") -> int:
+    """Crée la ligne finance_imports d'un import planifié et retourne son id."""
+
+    eng = get_engine()
+    with eng.begin() as conn:
+        return int(
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO finance_imports (account_id, file_name, source, inserted, total, status)
+                    VALUES (:account_id, :file_name, :source, 0, NULL, :status)
+                    RETURNING id
+                    """
+                ),
+                {"account_id": account_id, "file_name": file_name, "source": source, "status": status},
+            ).scalar_one()
+        )
+
+
+def update_import_progress(
+    import_id: int,
+    inserted: int,
+    total: int | None = None,
+    status: str | None = None,
+    error: str | None = None,
+) -> None:
     eng = get_engine()
     with eng.begin() as conn:
         conn.execute(
@@ -45,9 +70,10 @@ def update_import_progress(import_id: int, inserted: int, total: int | None = No
                 SET inserted = :inserted,
                     total = COALESCE(:total, total),
                     status = COALESCE(:status, status),
+                    error = COALESCE(:error, error),
                     updated_at = now()
                 WHERE id = :id
                 """
             ),
-            {"id": import_id, "inserted": inserted, "total": total, "status": status},
+            {"id": import_id, "inserted": inserted, "total": total, "status": status, "error": error},
         )
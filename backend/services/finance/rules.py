@@ -2,12 +2,23 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Tuple
 
 from sqlalchemy import text
 
 from core.data_repository import get_engine, query_df
 from backend.schemas.finance_rules import FinanceRuleCreate
+from backend.services.finance_categorization import (
+    BASE_CATEGORY_RULES,
+    CategoryMatcher,
+    CategoryRules,
+    compile_category_rules,
+)
+
+# Matchers compilés par entité, indexés sur la version de leurs règles en base.
+_MATCHERS: Dict[int | None, Tuple[tuple, CategoryMatcher]] = {}
+_MATCHERS_LOCK = threading.Lock()
 
 
 def list_rules(entity_id: int | None = None, is_active: bool | None = None) -> List[dict]:
@@ -48,6 +59,56 @@ def list_rules(entity_id: int | None = None, is_active: bool | None = None) -> L
     return df.where(df.notna(), None).to_dict("records") if not df.empty else []
 
 
+def matching_rules(entity_id: int | None = None) -> CategoryRules:
+    """Règles actives de la DB (prioritaires) suivies des règles de base, au format du matcher.
+
+    Voir :func:`rules_matcher` pour la version compilée et mise en cache.
+    """
+
+    db_rules = tuple(
+        (tuple(rule["keywords"]), rule.get("category_name") or rule.get("category_code") or "", None)
+        for rule in list_rules(entity_id=entity_id, is_active=True)
+        if rule.get("keywords")
+    )
+    return db_rules + BASE_CATEGORY_RULES
+
+
+def _rules_version(entity_id: int | None) -> tuple:
+    where_sql = "WHERE entity_id = :entity_id" if entity_id is not None else ""
+    df = query_df(
+        text(
+            f"""
+            SELECT COUNT(*) AS nb, MAX(id) AS max_id, MAX(updated_at) AS updated_at
+            FROM finance_rules
+            {where_sql}
+            """
+        ),
+        params={"entity_id": int(entity_id)} if entity_id is not None else None,
+    )
+    if df.empty:
+        return (0, None, None)
+    row = df.iloc[0]
+    return (int(row["nb"] or 0), row["max_id"], row["updated_at"])
+
+
+def rules_matcher(entity_id: int | None = None) -> CategoryMatcher:
+    """Matcher des règles de l'entité, recompilé seulement quand ses règles changent.
+
+    La version (nombre, id max, dernière mise à jour des règles) est relue à chaque appel :
+    une requête d'agrégat suffit, les règles ne sont rechargées qu'après modification.
+    """
+
+    version = _rules_version(entity_id)
+    with _MATCHERS_LOCK:
+        cached = _MATCHERS.get(entity_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    matcher = compile_category_rules(matching_rules(entity_id))
+    with _MATCHERS_LOCK:
+        _MATCHERS[entity_id] = (version, matcher)
+    return matcher
+
+
 def create_rule(payload: FinanceRuleCreate) -> dict:
     eng = get_engine()
     with eng.begin() as conn:
@@ -1,4 +1,4 @@
-"""Services de synthèse finance (catégories, comptes)."""
+"""Services de synthèse finance (catégories, comptes, chronologie, trésorerie)."""
 
 from __future__ import annotations
 
@@ -7,45 +7,69 @@ from typing import Any, Dict, List
 
 from sqlalchemy import text
 
-from core.data_repository import query_df
+from core.data_repository import get_engine, query_df
 
 logger = logging.getLogger(__name__)
 
-# Active l'utilisation des vues matérialisées (plus rapide, mais données légèrement décalées)
-USE_MATERIALIZED_VIEWS = True
+# Lecture des agrégats dans finance_rollup_daily, maintenue par triggers à chaque écriture
+# de transaction/ligne (cf. migration 20241212) : le coût ne dépend plus de l'historique.
+USE_ROLLUP_TABLES = True
+
+_ROLLUP_INSERT_SQL = """
+    INSERT INTO finance_rollup_daily
+        (entity_id, day, account_id, category_id, direction, amount, line_count)
+    SELECT t.entity_id, t.date_operation::date, t.account_id, COALESCE(tl.category_id, 0),
+           t.direction::text, SUM(COALESCE(tl.montant_ttc, 0)), COUNT(*)
+    FROM finance_transaction_lines tl
+    JOIN finance_transactions t ON t.id = tl.transaction_id
+    WHERE t.direction IN ('IN', 'OUT')
+    {entity_clause}
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+
+def _rollup_filters(
+    entity_id: int | None,
+    months: int | None = None,
+    direction: str | None = None,
+) -> tuple[str, Dict[str, Any]]:
+    clauses: List[str] = ["r.line_count <> 0"]
+    params: Dict[str, Any] = {}
+    if entity_id is not None:
+        clauses.append("r.entity_id = :entity_id")
+        params["entity_id"] = int(entity_id)
+    if months is not None and months > 0:
+        clauses.append("r.day >= CURRENT_DATE - make_interval(months => :months)")
+        params["months"] = int(months)
+    if direction:
+        clauses.append("r.direction = :direction")
+        params["direction"] = direction
+    return "WHERE " + " AND ".join(clauses), params
 
 
 def categories_stats(entity_id: int | None = None) -> List[dict]:
-    params: Dict[str, Any] = {}
-
-    # Essayer d'abord la vue matérialisée (plus rapide)
-    if USE_MATERIALIZED_VIEWS:
+    if USE_ROLLUP_TABLES:
         try:
-            clauses: List[str] = []
-            if entity_id is not None:
-                clauses.append("entity_id = :entity_id")
-                params["entity_id"] = int(entity_id)
-            where_sql = "WHERE " + " AND ".join(clauses) if clauses else ""
-
+            where_sql, params = _rollup_filters(entity_id)
             df = query_df(
                 text(
                     f"""
-                    SELECT id, name, code,
-                           SUM(inflow) AS inflow,
-                           SUM(outflow) AS outflow,
-                           SUM(lines) AS lines
-                    FROM mv_finance_category_stats
+                    SELECT c.id, c.name, c.code,
+                           SUM(CASE WHEN r.direction = 'IN' THEN r.amount ELSE 0 END) AS inflow,
+                           SUM(CASE WHEN r.direction = 'OUT' THEN r.amount ELSE 0 END) AS outflow,
+                           SUM(r.line_count) AS lines
+                    FROM finance_rollup_daily r
+                    LEFT JOIN finance_categories c ON c.id = NULLIF(r.category_id, 0)
                     {where_sql}
-                    GROUP BY id, name, code
-                    ORDER BY SUM(outflow) DESC NULLS LAST, SUM(inflow) DESC NULLS LAST
+                    GROUP BY c.id, c.name, c.code
+                    ORDER BY outflow DESC NULLS LAST, inflow DESC NULLS LAST
                     """
                 ),
                 params=params or None,
             )
-            if not df.empty:
-                return df.where(df.notna(), None).to_dict("records")
+            return df.where(df.notna(), None).to_dict("records") if not df.empty else []
         except Exception as exc:
-            logger.debug("Materialized view unavailable, falling back: %s", exc)
+            logger.debug("Rollup table unavailable, falling back: %s", exc)
 
     # Fallback sur la requête directe
     clauses = ["t.direction IN ('IN','OUT')"]
@@ -78,39 +102,31 @@ def categories_stats(entity_id: int | None = None) -> List[dict]:
 
 
 def accounts_overview(entity_id: int | None = None) -> List[dict]:
-    params: Dict[str, Any] = {}
-
-    # Essayer d'abord la vue matérialisée (plus rapide)
-    if USE_MATERIALIZED_VIEWS:
+    if USE_ROLLUP_TABLES:
         try:
-            clauses: List[str] = []
-            if entity_id is not None:
-                clauses.append("entity_id = :entity_id")
-                params["entity_id"] = int(entity_id)
-            where_sql = "WHERE " + " AND ".join(clauses) if clauses else ""
-
+            where_sql, params = _rollup_filters(entity_id)
             df = query_df(
                 text(
                     f"""
-                    SELECT id, label,
-                           SUM(inflow) AS inflow,
-                           SUM(outflow) AS outflow,
-                           MAX(last_activity) AS last_activity
-                    FROM mv_finance_account_stats
+                    SELECT a.id, a.label,
+                           SUM(CASE WHEN r.direction = 'IN' THEN r.amount ELSE 0 END) AS inflow,
+                           SUM(CASE WHEN r.direction = 'OUT' THEN r.amount ELSE 0 END) AS outflow,
+                           MAX(r.day) AS last_activity
+                    FROM finance_rollup_daily r
+                    JOIN finance_accounts a ON a.id = r.account_id
                     {where_sql}
-                    GROUP BY id, label
-                    ORDER BY label
+                    GROUP BY a.id, a.label
+                    ORDER BY a.label
                     """
                 ),
                 params=params or None,
             )
-            if not df.empty:
-                rows = df.where(df.notna(), None).to_dict("records")
-                for r in rows:
-                    r["balance"] = (r.get("inflow") or 0) - (r.get("outflow") or 0)
-                return rows
+            rows = df.where(df.notna(), None).to_dict("records") if not df.empty else []
+            for r in rows:
+                r["balance"] = (r.get("inflow") or 0) - (r.get("outflow") or 0)
+            return rows
         except Exception as exc:
-            logger.debug("Materialized view unavailable, falling back: %s", exc)
+            logger.debug("Rollup table unavailable, falling back: %s", exc)
 
     # Fallback sur la requête directe
     clauses = ["t.direction IN ('IN','OUT')"]
@@ -144,18 +160,29 @@ def accounts_overview(entity_id: int | None = None) -> List[dict]:
     return rows
 
 
-def refresh_materialized_views() -> dict:
-    """Rafraîchit les vues matérialisées de stats finance. À appeler périodiquement."""
-    from core.data_repository import exec_sql
+def rebuild_rollups(entity_id: int | None = None) -> dict:
+    """Reconstruit finance_rollup_daily depuis les lignes (réparation / reprise d'historique).
 
-    refreshed = []
-    for view_name in ["mv_finance_category_stats", "mv_finance_account_stats"]:
-        try:
-            exec_sql(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}"))
-            refreshed.append(view_name)
-        except Exception as exc:
-            logger.warning("Failed to refresh %s: %s", view_name, exc)
-    return {"refreshed": refreshed}
+    Les triggers maintiennent la table au fil de l'eau ; la reconstruction n'est utile
+    qu'après une désactivation des triggers ou un chargement hors base.
+    """
+    params: Dict[str, Any] = {}
+    delete_clause = ""
+    entity_clause = ""
+    if entity_id is not None:
+        params["entity_id"] = int(entity_id)
+        delete_clause = "WHERE entity_id = :entity_id"
+        entity_clause = "AND t.entity_id = :entity_id"
+
+    with get_engine().begin() as conn:
+        conn.execute(text(f"DELETE FROM finance_rollup_daily {delete_clause}"), params)
+        result = conn.execute(text(_ROLLUP_INSERT_SQL.format(entity_clause=entity_clause)), params)
+    return {"rebuilt": "finance_rollup_daily", "entity_id": entity_id, "rows": int(result.rowcount or 0)}
+
+
+def refresh_materialized_views() -> dict:
+    """Conservé pour compatibilité : les stats lisent désormais finance_rollup_daily."""
+    return rebuild_rollups()
 
 
 def timeline_stats(
@@ -167,6 +194,63 @@ def timeline_stats(
     Retourne la chronologie agrégée des flux (inflow/outflow) par période.
     granularity: 'daily', 'weekly', 'monthly'
     """
+    # Déterminer le format de regroupement
+    if granularity == "daily":
+        date_trunc = "day"
+        date_format = "YYYY-MM-DD"
+    elif granularity == "weekly":
+        date_trunc = "week"
+        date_format = "IYYY-IW"
+    else:  # monthly par défaut
+        date_trunc = "month"
+        date_format = "YYYY-MM"
+
+    df = None
+    if USE_ROLLUP_TABLES:
+        try:
+            where_sql, params = _rollup_filters(entity_id, months)
+            df = query_df(
+                text(
+                    f"""
+                    SELECT
+                      TO_CHAR(DATE_TRUNC('{date_trunc}', r.day), '{date_format}') AS period,
+                      DATE_TRUNC('{date_trunc}', r.day)::date AS period_start,
+                      SUM(CASE WHEN r.direction = 'IN' THEN r.amount ELSE 0 END) AS inflow,
+                      SUM(CASE WHEN r.direction = 'OUT' THEN r.amount ELSE 0 END) AS outflow,
+                      SUM(r.line_count) AS tx_count
+                    FROM finance_rollup_daily r
+                    {where_sql}
+                    GROUP BY DATE_TRUNC('{date_trunc}', r.day)
+                    ORDER BY DATE_TRUNC('{date_trunc}', r.day)
+                    """
+                ),
+                params=params or None,
+            )
+        except Exception as exc:
+            logger.debug("Rollup table unavailable, falling back: %s", exc)
+            df = None
+
+    if df is None:
+        df = _timeline_from_lines(entity_id, months, date_trunc, date_format)
+
+    if df.empty:
+        return []
+
+    rows = df.where(df.notna(), None).to_dict("records")
+
+    # Calculer le solde cumulé
+    cumulative = 0.0
+    for r in rows:
+        inflow = float(r.get("inflow") or 0)
+        outflow = float(r.get("outflow") or 0)
+        r["net"] = inflow - outflow
+        cumulative += r["net"]
+        r["cumulative_balance"] = cumulative
+
+    return rows
+
+
+def _timeline_from_lines(entity_id: int | None, months: int | None, date_trunc: str, date_format: str):
     params: Dict[str, Any] = {}
     clauses: List[str] = ["t.direction IN ('IN','OUT')"]
 
@@ -180,18 +264,7 @@ def timeline_stats(
 
     where_sql = "WHERE " + " AND ".join(clauses)
 
-    # Déterminer le format de regroupement
-    if granularity == "daily":
-        date_trunc = "day"
-        date_format = "YYYY-MM-DD"
-    elif granularity == "weekly":
-        date_trunc = "week"
-        date_format = "IYYY-IW"
-    else:  # monthly par défaut
-        date_trunc = "month"
-        date_format = "YYYY-MM"
-
-    df = query_df(
+    return query_df(
         text(
             f"""
             SELECT
@@ -210,22 +283,6 @@ def timeline_stats(
         params=params or None,
     )
 
-    if df.empty:
-        return []
-
-    rows = df.where(df.notna(), None).to_dict("records")
-
-    # Calculer le solde cumulé
-    cumulative = 0.0
-    for r in rows:
-        inflow = float(r.get("inflow") or 0)
-        outflow = float(r.get("outflow") or 0)
-        r["net"] = inflow - outflow
-        cumulative += r["net"]
-        r["cumulative_balance"] = cumulative
-
-    return rows
-
 
 def category_breakdown(
     entity_id: int | None = None,
@@ -236,6 +293,34 @@ def category_breakdown(
     Retourne la répartition par catégorie pour les graphiques (pie/bar charts).
     direction: 'IN', 'OUT', ou None pour les deux.
     """
+    direction_filter = direction.upper() if direction and direction.upper() in ("IN", "OUT") else None
+    if USE_ROLLUP_TABLES:
+        try:
+            where_sql, params = _rollup_filters(entity_id, months, direction_filter)
+            if direction_filter is None:
+                where_sql += " AND r.direction IN ('IN', 'OUT')"
+            df = query_df(
+                text(
+                    f"""
+                    SELECT
+                      COALESCE(c.id, 0) AS category_id,
+                      COALESCE(c.name, 'Non catégorisé') AS category_name,
+                      COALESCE(c.code, 'uncategorized') AS category_code,
+                      SUM(r.amount) AS amount,
+                      SUM(r.line_count) AS tx_count
+                    FROM finance_rollup_daily r
+                    LEFT JOIN finance_categories c ON c.id = NULLIF(r.category_id, 0)
+                    {where_sql}
+                    GROUP BY c.id, c.name, c.code
+                    ORDER BY SUM(r.amount) DESC
+                    """
+                ),
+                params=params or None,
+            )
+            return _with_percentages(df)
+        except Exception as exc:
+            logger.debug("Rollup table unavailable, falling back: %s", exc)
+
     params: Dict[str, Any] = {}
     clauses: List[str] = []
 
@@ -274,7 +359,10 @@ def category_breakdown(
         ),
         params=params or None,
     )
+    return _with_percentages(df)
+
 
+def _with_percentages(df) -> List[dict]:
     if df.empty:
         return []
 
@@ -293,6 +381,28 @@ def treasury_summary(entity_id: int | None = None) -> dict:
     """
     Retourne un résumé de trésorerie: totaux, solde, alertes.
     """
+    if USE_ROLLUP_TABLES:
+        try:
+            where_sql, params = _rollup_filters(entity_id)
+            df = query_df(
+                text(
+                    f"""
+                    SELECT
+                      SUM(CASE WHEN r.direction = 'IN' THEN r.amount ELSE 0 END) AS total_inflow,
+                      SUM(CASE WHEN r.direction = 'OUT' THEN r.amount ELSE 0 END) AS total_outflow,
+                      SUM(r.line_count) AS total_transactions,
+                      MIN(r.day) AS first_date,
+                      MAX(r.day) AS last_date
+                    FROM finance_rollup_daily r
+                    {where_sql}
+                    """
+                ),
+                params=params or None,
+            )
+            return _treasury_row(df)
+        except Exception as exc:
+            logger.debug("Rollup table unavailable, falling back: %s", exc)
+
     params: Dict[str, Any] = {}
     clauses: List[str] = ["t.direction IN ('IN','OUT')"]
 
@@ -318,7 +428,10 @@ def treasury_summary(entity_id: int | None = None) -> dict:
         ),
         params=params or None,
     )
+    return _treasury_row(df)
+
 
+def _treasury_row(df) -> dict:
     if df.empty:
         return {
             "total_inflow": 0,
@@ -2,15 +2,19 @@
 
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
 
 from sqlalchemy import text
 
 from core.data_repository import get_engine, query_df
+from backend.services.finance_categorization import _normalize_for_matching
 from backend.schemas.finance import (
     FinanceBatchCategorizeRequest,
     FinanceTransactionCreate,
+    FinanceTransactionKeysetResponse,
     FinanceTransactionSearchResponse,
     FinanceTransactionUpdate,
 )
@@ -124,6 +128,8 @@ def create_transaction(payload: FinanceTransactionCreate) -> dict[str, Any]:
                 },
             )
 
+        link_statement_lines(conn, transaction_ids=[tx_id])
+
     return {
         "id": tx_id,
         "entity_id": payload.entity_id,
@@ -248,26 +254,42 @@ def lock_transaction(transaction_id: int) -> dict[str, Any]:
 # --- Recherche paginée et batch recatégorisation ---
 
 
-def search_transactions(
-    *,
-    entity_id: Optional[int] = None,
-    account_id: Optional[int] = None,
-    category_id: Optional[int] = None,
-    date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
-    amount_min: Optional[float] = None,
-    amount_max: Optional[float] = None,
-    q: Optional[str] = None,
-    page: int = 1,
-    size: int = 50,
-    sort: str = "-date_operation",
-) -> FinanceTransactionSearchResponse:
-    """Recherche paginée sur les lignes de transaction (avec catégorie et libellé)."""
+_STATEMENT_LINE_JOIN = "LEFT JOIN finance_bank_statement_lines b ON b.id = t.statement_line_id"
 
-    safe_page = max(1, int(page))
-    safe_size = max(1, min(int(size), 500))
-    offset = (safe_page - 1) * safe_size
+_AMOUNT_EXPR = "COALESCE(tl.montant_ttc, tl.montant_ht, 0)"
 
+_SEARCH_COLUMNS = f"""
+              tl.id AS line_id,
+              t.id AS transaction_id,
+              t.entity_id,
+              t.account_id,
+              a.label AS account_label,
+              t.direction,
+              t.source,
+              t.date_operation,
+              t.date_value,
+              t.amount AS transaction_amount,
+              {_AMOUNT_EXPR} AS amount,
+              tl.category_id,
+              c.code AS category_code,
+              c.name AS category_name,
+              COALESCE(b.libelle_banque, t.note, '') AS label,
+              t.currency,
+              t.status
+"""
+
+
+def _search_filters(
+    *,
+    entity_id: Optional[int],
+    account_id: Optional[int],
+    category_id: Optional[int],
+    date_from: Optional[str],
+    date_to: Optional[str],
+    amount_min: Optional[float],
+    amount_max: Optional[float],
+    q: Optional[str],
+) -> tuple[list[str], Dict[str, Any]]:
     clauses: list[str] = ["t.direction IN ('IN', 'OUT')"]
     params: Dict[str, Any] = {}
     if entity_id is not None:
@@ -285,23 +307,66 @@ def search_transactions(
     if date_to:
         clauses.append("t.date_operation <= :date_to")
         params["date_to"] = date_to
-    amount_expr = "COALESCE(tl.montant_ttc, tl.montant_ht, 0)"
     if amount_min is not None:
-        clauses.append(f"{amount_expr} >= :amount_min")
+        clauses.append(f"{_AMOUNT_EXPR} >= :amount_min")
         params["amount_min"] = float(amount_min)
     if amount_max is not None:
-        clauses.append(f"{amount_expr} <= :amount_max")
+        clauses.append(f"{_AMOUNT_EXPR} <= :amount_max")
         params["amount_max"] = float(amount_max)
     if q:
         clauses.append(
             "(COALESCE(b.libelle_banque, t.note, '') ILIKE :q OR COALESCE(t.note, '') ILIKE :q)"
         )
         params["q"] = f"%{q}%"
+    return clauses, params
 
-    where_sql = ""
-    if clauses:
-        where_sql = "WHERE " + " AND ".join(clauses)
 
+def _search_from(where_sql: str) -> str:
+    # La ligne de relevé est résolue une fois pour toutes (statement_line_id, cf. migration
+    # 20241211) : plus de LATERAL ni de regex sur ref_externe à chaque recherche.
+    return f"""
+        FROM finance_transaction_lines tl
+        JOIN finance_transactions t ON t.id = tl.transaction_id
+        JOIN finance_accounts a ON a.id = t.account_id
+        LEFT JOIN finance_categories c ON c.id = tl.category_id
+        {_STATEMENT_LINE_JOIN}
+        {where_sql}
+    """
+
+
+def search_transactions(
+    *,
+    entity_id: Optional[int] = None,
+    account_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    amount_min: Optional[float] = None,
+    amount_max: Optional[float] = None,
+    q: Optional[str] = None,
+    page: int = 1,
+    size: int = 50,
+    sort: str = "-date_operation",
+) -> FinanceTransactionSearchResponse:
+    """Recherche paginée sur les lignes de transaction (avec catégorie et libellé)."""
+
+    safe_page = max(1, int(page))
+    safe_size = max(1, min(int(size), 500))
+    offset = (safe_page - 1) * safe_size
+
+    clauses, params = _search_filters(
+        entity_id=entity_id,
+        account_id=account_id,
+        category_id=category_id,
+        date_from=date_from,
+        date_to=date_to,
+        amount_min=amount_min,
+        amount_max=amount_max,
+        q=q,
+    )
+    where_sql = "WHERE " + " AND ".join(clauses)
+
+    amount_expr = _AMOUNT_EXPR
     sort_map = {
         "date_operation": "t.date_operation ASC, tl.id ASC",
         "-date_operation": "t.date_operation DESC, tl.id DESC",
@@ -314,28 +379,7 @@ def search_transactions(
     }
     order_by = sort_map.get(sort, sort_map["-date_operation"])
 
-    base_select = f"""
-        FROM finance_transaction_lines tl
-        JOIN finance_transactions t ON t.id = tl.transaction_id
-        JOIN finance_accounts a ON a.id = t.account_id
-        LEFT JOIN finance_categories c ON c.id = tl.category_id
-        LEFT JOIN LATERAL (
-          SELECT b2.libelle_banque
-          FROM finance_bank_statement_lines b2
-          JOIN finance_bank_statements bs ON bs.id = b2.statement_id
-          WHERE (
-            (t.ref_externe LIKE 'stmtline:%' AND b2.id = CAST(substring(t.ref_externe FROM 'stmtline:(\\d+)') AS BIGINT))
-            OR (
-              (t.ref_externe IS NULL OR t.ref_externe = '' OR t.ref_externe NOT LIKE 'stmtline:%')
-              AND bs.account_id = t.account_id
-              AND b2.date_operation = t.date_operation
-              AND ABS(ABS(b2.montant) - t.amount) < 0.01
-            )
-          )
-          LIMIT 1
-        ) b ON true
-        {where_sql}
-    """
+    base_select = _search_from(where_sql)
 
     count_df = query_df(
         text(f"SELECT COUNT(*) AS total {base_select}"),
@@ -347,23 +391,7 @@ def search_transactions(
         text(
             f"""
             SELECT
-              tl.id AS line_id,
-              t.id AS transaction_id,
-              t.entity_id,
-              t.account_id,
-              a.label AS account_label,
-              t.direction,
-              t.source,
-              t.date_operation,
-              t.date_value,
-              t.amount AS transaction_amount,
-              {amount_expr} AS amount,
-              tl.category_id,
-              c.code AS category_code,
-              c.name AS category_name,
-              COALESCE(b.libelle_banque, t.note, '') AS label,
-              t.currency,
-              t.status
+            {_SEARCH_COLUMNS}
             {base_select}
             ORDER BY {order_by}
             LIMIT :limit OFFSET :offset
@@ -392,8 +420,211 @@ def search_transactions(
     )
 
 
+def encode_search_cursor(date_operation: Any, transaction_id: int, line_id: int) -> str:
+    """Encode la position ``(date_operation, transaction_id, line_id)`` d'une ligne en curseur opaque."""
+
+    day = date_operation.isoformat() if hasattr(date_operation, "isoformat") else str(date_operation)
+    raw = f"{day[:10]}|{int(transaction_id)}|{int(line_id)}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> tuple[date, int, int]:
+    """Décode un curseur produit par :func:`encode_search_cursor`."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        day, transaction_id, line_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+        return date.fromisoformat(day), int(transaction_id), int(line_id)
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Curseur de pagination invalide.") from exc
+
+
+def _estimate_rows(conn, sql: str, params: Dict[str, Any]) -> int:
+    """Nombre de lignes estimé par le planificateur (EXPLAIN, sans exécuter la requête)."""
+
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (IndexError, KeyError, TypeError):
+        return 0
+
+
+KEYSET_SORTS = ("date_operation", "-date_operation")
+
+
+def search_transactions_keyset(
+    *,
+    entity_id: Optional[int] = None,
+    account_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    amount_min: Optional[float] = None,
+    amount_max: Optional[float] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    size: int = 50,
+    sort: str = "-date_operation",
+    count: str = "none",
+) -> FinanceTransactionKeysetResponse:
+    """Recherche paginée par curseur sur ``(date_operation, transaction_id, line_id)``.
+
+    Le coût d'une page ne dépend plus de sa profondeur (pas d'OFFSET) : l'ordre suit
+    l'index ``(date_operation, id)`` des transactions, ``line_id`` ne départageant que les
+    lignes d'une même transaction. Le total est optionnel : ``count="none"`` (défaut),
+    ``"estimate"`` (EXPLAIN) ou ``"exact"``.
+    """
+
+    safe_size = max(1, min(int(size), 500))
+    if sort not in KEYSET_SORTS:
+        raise ValueError("sort doit valoir date_operation ou -date_operation.")
+    descending = sort == "-date_operation"
+    count_mode = (count or "none").lower()
+    if count_mode not in {"none", "estimate", "exact"}:
+        raise ValueError("count doit valoir none, estimate ou exact.")
+
+    clauses, params = _search_filters(
+        entity_id=entity_id,
+        account_id=account_id,
+        category_id=category_id,
+        date_from=date_from,
+        date_to=date_to,
+        amount_min=amount_min,
+        amount_max=amount_max,
+        q=q,
+    )
+    count_where = "WHERE " + " AND ".join(clauses)
+    if cursor:
+        cursor_date, cursor_tx, cursor_line = decode_search_cursor(cursor)
+        clauses.append(
+            f"(t.date_operation, t.id, tl.id) {'<' if descending else '>'} (:cursor_date, :cursor_tx, :cursor_line)"
+        )
+        params.update({"cursor_date": cursor_date, "cursor_tx": cursor_tx, "cursor_line": cursor_line})
+    where_sql = "WHERE " + " AND ".join(clauses)
+    direction = "DESC" if descending else "ASC"
+
+    data_sql = text(
+        f"""
+        SELECT
+        {_SEARCH_COLUMNS}
+        {_search_from(where_sql)}
+        ORDER BY t.date_operation {direction}, t.id {direction}, tl.id {direction}
+        LIMIT :limit
+        """
+    )
+
+    total: Optional[int] = None
+    eng = get_engine()
+    with eng.connect() as conn:
+        # Une ligne de plus que la page pour savoir s'il existe une suite.
+        rows = conn.execute(data_sql, {**params, "limit": safe_size + 1}).mappings().all()
+        count_params = {k: v for k, v in params.items() if not k.startswith("cursor_")}
+        if count_mode == "exact":
+            total = int(
+                conn.execute(text(f"SELECT COUNT(*) {_search_from(count_where)}"), count_params).scalar() or 0
+            )
+        elif count_mode == "estimate":
+            total = _estimate_rows(conn, f"SELECT 1 {_search_from(count_where)}", count_params)
+
+    items = [dict(row) for row in rows[:safe_size]]
+    next_cursor = None
+    if len(rows) > safe_size and items:
+        last = items[-1]
+        next_cursor = encode_search_cursor(last["date_operation"], last["transaction_id"], last["line_id"])
+
+    return FinanceTransactionKeysetResponse(
+        items=items,
+        size=safe_size,
+        next_cursor=next_cursor,
+        total=total,
+        total_is_estimate=count_mode == "estimate",
+        sort=sort,
+        filters_applied={
+            "entity_id": entity_id,
+            "account_id": account_id,
+            "category_id": category_id,
+            "date_from": date_from,
+            "date_to": date_to,
+            "amount_min": amount_min,
+            "amount_max": amount_max,
+            "q": q,
+        },
+    )
+
+
+def link_statement_lines(
+    conn,
+    *,
+    account_id: Optional[int] = None,
+    transaction_ids: Optional[Sequence[int]] = None,
+) -> int:
+    """Renseigne ``statement_line_id`` des transactions encore sans lien.
+
+    Les références ``stmtline:`` sont résolues par trigger à l'insertion ; cette passe
+    ensembliste couvre le rapprochement montant/date (même compte, même jour). Elle est
+    appelée dans la transaction qui insère les transactions (``transaction_ids``) ou les
+    lignes de relevé (``account_id``). Retourne le nombre de transactions liées.
+    """
+
+    clauses: list[str] = []
+    params: Dict[str, Any] = {}
+    if account_id is not None:
+        clauses.append("AND t2.account_id = :account_id")
+        params["account_id"] = int(account_id)
+    if transaction_ids is not None:
+        ids = [int(tx_id) for tx_id in transaction_ids]
+        if not ids:
+            return 0
+        clauses.append("AND t2.id = ANY(CAST(:transaction_ids AS bigint[]))")
+        params["transaction_ids"] = ids
+    scope_sql = "\n                  ".join(clauses)
+    result = conn.execute(
+        text(
+            f"""
+            UPDATE finance_transactions t
+            SET statement_line_id = m.line_id
+            FROM (
+                SELECT DISTINCT ON (t2.id) t2.id AS transaction_id, l.id AS line_id
+                FROM finance_transactions t2
+                JOIN finance_bank_statement_lines l
+                  ON l.account_id = t2.account_id
+                 AND l.date_operation = t2.date_operation
+                 AND ABS(ABS(l.montant) - t2.amount) < 0.01
+                WHERE t2.statement_line_id IS NULL
+                  AND (t2.ref_externe IS NULL OR t2.ref_externe NOT LIKE 'stmtline:%')
+                  {scope_sql}
+                ORDER BY t2.id, l.id
+            ) m
+            WHERE t.id = m.transaction_id
+            """
+        ),
+        params,
+    )
+    return int(result.rowcount or 0)
+
+
+# Même règle que ``CategoryMatcher`` : mot-clé contenu dans le libellé en majuscules, ou
+# mot-clé normalisé (A-Z0-9) contenu dans le libellé normalisé.
+_KEYWORD_MATCH_SQL = """(
+            UPPER(COALESCE(b.libelle_banque, t.note, '')) LIKE ANY(CAST(:raw_patterns AS text[]))
+            OR regexp_replace(UPPER(COALESCE(b.libelle_banque, t.note, '')), '[^A-Z0-9]', '', 'g')
+               LIKE ANY(CAST(:normalized_patterns AS text[]))
+        )"""
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 def batch_categorize(payload: FinanceBatchCategorizeRequest) -> Dict[str, Any]:
-    """Applique une catégorie à une liste d'IDs ou à un motif (keywords)."""
+    """Applique une catégorie à une liste d'IDs ou à un motif (keywords).
+
+    Les mots-clés suivent la sémantique du matcher de ``finance_categorization`` (libellé
+    brut ou normalisé sans ponctuation, insensible à la casse) mais sont évalués par
+    PostgreSQL : une seule requête ``UPDATE`` filtre et met à jour les lignes.
+    """
 
     if not payload.transaction_ids and not payload.rule:
         raise ValueError("transaction_ids ou rule est requis.")
@@ -405,47 +636,38 @@ def batch_categorize(payload: FinanceBatchCategorizeRequest) -> Dict[str, Any]:
         params["tx_ids"] = list({int(x) for x in payload.transaction_ids})
 
     if payload.rule:
-        keywords = [kw.strip() for kw in payload.rule.keywords if kw.strip()]
+        # Les jokers SQL ``%`` hérités de l'ancien filtre ILIKE sont ignorés.
+        keywords = [kw.replace("%", "").strip() for kw in payload.rule.keywords if kw.replace("%", "").strip()]
         if not keywords:
             raise ValueError("Aucun mot-clé valide fourni pour la règle.")
-        like_clauses = []
-        for idx, kw in enumerate(keywords):
-            key = f"kw{idx}"
-            like_clauses.append(f"(COALESCE(b.libelle_banque, t.note, '') ILIKE :{key})")
-            params[key] = f"%{kw}%"
-        clauses.append("(" + " OR ".join(like_clauses) + ")")
+        clauses.append(_KEYWORD_MATCH_SQL)
+        params["raw_patterns"] = [f"%{_escape_like(kw.upper())}%" for kw in keywords]
+        params["normalized_patterns"] = [
+            f"%{normalized}%" for normalized in (_normalize_for_matching(kw) for kw in keywords) if normalized
+        ]
         if payload.rule.apply_to_autre_only:
             clauses.append("c.code = 'autre'")
 
     where_sql = " AND ".join(clauses)
-    if not where_sql:
-        raise ValueError("Aucune condition appliquée pour la recatégorisation.")
-
-    sql = text(
+    update_sql = text(
         f"""
-        WITH target AS (
-          SELECT tl.id
-          FROM finance_transaction_lines tl
-          JOIN finance_transactions t ON t.id = tl.transaction_id
-          LEFT JOIN finance_categories c ON c.id = tl.category_id
-          LEFT JOIN finance_bank_statement_lines b
-            ON t.ref_externe LIKE 'stmtline:%'
-           AND b.id = CAST(substring(t.ref_externe FROM 'stmtline:(\\d+)') AS BIGINT)
-          WHERE {where_sql}
-        )
-        UPDATE finance_transaction_lines tl
+        UPDATE finance_transaction_lines
         SET category_id = :category_id
-        FROM target
-        WHERE tl.id = target.id
-        RETURNING tl.id
+        WHERE id IN (
+            SELECT tl.id
+            FROM finance_transaction_lines tl
+            JOIN finance_transactions t ON t.id = tl.transaction_id
+            LEFT JOIN finance_categories c ON c.id = tl.category_id
+            {_STATEMENT_LINE_JOIN}
+            WHERE {where_sql}
+        )
         """
     )
 
     eng = get_engine()
     with eng.begin() as conn:
-        rows = conn.execute(sql, params).fetchall()
-    updated = len(rows)
-    return {"updated": updated, "category_id": int(payload.category_id)}
+        updated = conn.execute(update_sql, params).rowcount
+    return {"updated": int(updated or 0), "category_id": int(payload.category_id)}
 
 
 def suggest_autre_top(entity_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
@@ -467,9 +689,7 @@ def suggest_autre_top(entity_id: Optional[int] = None, limit: int = 50) -> List[
         FROM finance_transaction_lines tl
         JOIN finance_transactions t ON t.id = tl.transaction_id
         LEFT JOIN finance_categories c ON c.id = tl.category_id
-        LEFT JOIN finance_bank_statement_lines b
-          ON t.ref_externe LIKE 'stmtline:%'
-         AND b.id = CAST(substring(t.ref_externe FROM 'stmtline:(\\d+)') AS BIGINT)
+        {_STATEMENT_LINE_JOIN}
         {where_sql}
         GROUP BY key
         ORDER BY cnt DESC
@@ -6,13 +6,15 @@ Contient:
 - BASE_CATEGORY_RULES: ~70 regles de mots-cles pour auto-categorisation
 - SOURCE_TO_TARGET: Mapping categories sources -> taxonomie cible
 - Fonctions de normalisation de libelles bancaires
+- CategoryMatcher: moteur precompile (une passe regex par libelle) pour les regles
 """
 
 from __future__ import annotations
 
 import re
 import unicodedata
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 # =============================================================================
 # TAXONOMIE CIBLE (12 postes + encaissements)
@@ -374,6 +376,117 @@ def _normalize_for_matching(text: str) -> str:
 # =============================================================================
 
 
+CategoryRules = Tuple[Tuple[Tuple[str, ...], str, Tuple[str, ...] | None], ...]
+
+
+class CategoryMatcher:
+    """
+    Moteur de matching precompile pour un jeu de regles.
+
+    Pour chaque sens (Entree/Sortie), tous les mots-cles des regles autorisees sont
+    fusionnes dans une alternance unique placee dans un lookahead. A chaque position du
+    libelle, le moteur regex essaie les alternatives dans l'ordre : elles sont triees par
+    rang de regle, la premiere trouvee est donc la meilleure pour cette position. Le
+    minimum sur toutes les positions donne la premiere regle qui matche, soit exactement
+    la semantique "premiere regle gagnante" de la boucle historique, en une passe sur le
+    libelle brut et une passe sur le libelle normalise.
+    """
+
+    _ENTRY_TYPES = ("Entree", "Sortie")
+
+    def __init__(self, rules: CategoryRules) -> None:
+        self.rules = rules
+        self._categories = [category_name for _keywords, category_name, _allowed in rules]
+        self._raw: Dict[str, Tuple[Optional[re.Pattern[str]], Dict[str, int]]] = {}
+        self._normalized: Dict[str, Tuple[Optional[re.Pattern[str]], Dict[str, int]]] = {}
+        for entry_type in self._ENTRY_TYPES:
+            raw_ranks: Dict[str, int] = {}
+            normalized_ranks: Dict[str, int] = {}
+            for rank, (keywords, _category, allowed_types) in enumerate(rules):
+                if allowed_types and entry_type not in allowed_types:
+                    continue
+                for keyword in keywords:
+                    raw_kw = keyword.upper()
+                    normalized_kw = _normalize_for_matching(keyword)
+                    if raw_kw:
+                        raw_ranks.setdefault(raw_kw, rank)
+                    if normalized_kw:
+                        normalized_ranks.setdefault(normalized_kw, rank)
+            self._raw[entry_type] = (_compile_alternation(raw_ranks), raw_ranks)
+            self._normalized[entry_type] = (_compile_alternation(normalized_ranks), normalized_ranks)
+
+    def match_rank(self, entry_type: str, label: str) -> Optional[int]:
+        """Retourne l'index de la premiere regle qui matche (ou None)."""
+        best: Optional[int] = None
+        for table, text in (
+            (self._raw[entry_type], label.upper()),
+            (self._normalized[entry_type], _normalize_for_matching(label)),
+        ):
+            pattern, ranks = table
+            if pattern is None:
+                continue
+            for found in pattern.finditer(text):
+                rank = ranks[found.group(1)]
+                if best is None or rank < best:
+                    best = rank
+                    if best == 0:
+                        return best
+        return best
+
+    def match(self, entry_type: str, label: str) -> Optional[str]:
+        """Categorie source de la premiere regle qui matche pour ce sens."""
+        rank = self.match_rank(entry_type, label or "")
+        return None if rank is None else self._categories[rank]
+
+    def match_many(self, entry_types: Iterable[str], labels: Iterable[str]) -> List[Optional[str]]:
+        """Version vectorisee de :meth:`match` (libelles identiques calcules une fois)."""
+        memo: Dict[Tuple[str, str], Optional[str]] = {}
+        results: List[Optional[str]] = []
+        for entry_type, label in zip(entry_types, labels):
+            key = (entry_type, label or "")
+            if key not in memo:
+                memo[key] = self.match(*key)
+            results.append(memo[key])
+        return results
+
+
+def _compile_alternation(ranks: Dict[str, int]) -> Optional[re.Pattern[str]]:
+    if not ranks:
+        return None
+    # A rang egal, les mots-cles les plus longs d'abord (sans incidence sur la regle retenue).
+    ordered = sorted(ranks, key=lambda kw: (ranks[kw], -len(kw)))
+    return re.compile("(?=(" + "|".join(re.escape(kw) for kw in ordered) + "))")
+
+
+def compile_category_rules(rules: CategoryRules = BASE_CATEGORY_RULES) -> CategoryMatcher:
+    """Compile le matcher d'un jeu de regles.
+
+    Pas de cache ici : les regles de base passent par :func:`base_category_matcher`, celles
+    d'une entite par ``finance.rules.rules_matcher`` (cache indexe sur la version des regles).
+    """
+    if rules is BASE_CATEGORY_RULES:
+        return base_category_matcher()
+    return CategoryMatcher(rules)
+
+
+@lru_cache(maxsize=1)
+def base_category_matcher() -> CategoryMatcher:
+    """Matcher des BASE_CATEGORY_RULES, compile une fois par processus."""
+    return CategoryMatcher(BASE_CATEGORY_RULES)
+
+
+def _as_rules(rules: Sequence) -> CategoryRules:
+    """Convertit des regles (listes issues de la DB par ex.) en tuples hachables."""
+    return tuple(
+        (tuple(keywords or ()), category_name, tuple(allowed_types) if allowed_types else None)
+        for keywords, category_name, allowed_types in rules
+    )
+
+
+def _entry_type(direction: str) -> str:
+    return "Entree" if direction == "IN" else "Sortie"
+
+
 def match_category_rules(
     direction: str,
     label: str,
@@ -390,17 +503,9 @@ def match_category_rules(
     Returns:
         Code categorie source si match, None sinon
     """
-    upper = label.upper()
-    normalized = _normalize_for_matching(label)
-    entry_type = "Entree" if direction == "IN" else "Sortie"
-
-    for keywords, category_name, allowed_types in rules:
-        if allowed_types and entry_type not in allowed_types:
-            continue
-        if any(k.upper() in upper or _normalize_for_matching(k) in normalized for k in keywords):
-            return category_name
-
-    return None
+    if not isinstance(rules, tuple):
+        rules = _as_rules(rules)
+    return compile_category_rules(rules).match(_entry_type(direction), label)
 
 
 def infer_target_category(category_name: str, entry_type: str = "Sortie") -> str:
@@ -456,6 +561,15 @@ def infer_target_category(category_name: str, entry_type: str = "Sortie") -> str
     return "frais_generaux"
 
 
+def _auto_result(direction: str, source_cat: Optional[str]) -> Tuple[Optional[str], str]:
+    if source_cat:
+        return source_cat, infer_target_category(source_cat, _entry_type(direction))
+    # Fallback
+    if direction == "IN":
+        return None, "encaissements"
+    return None, "frais_generaux"
+
+
 def auto_categorize(direction: str, label: str) -> Tuple[Optional[str], str]:
     """
     Categorise automatiquement une transaction.
@@ -467,19 +581,35 @@ def auto_categorize(direction: str, label: str) -> Tuple[Optional[str], str]:
     Returns:
         Tuple (categorie_source, categorie_cible_code)
     """
-    entry_type = "Entree" if direction == "IN" else "Sortie"
-
     # Essayer les regles de mots-cles
-    source_cat = match_category_rules(direction, label)
+    return _auto_result(direction, match_category_rules(direction, label))
 
-    if source_cat:
-        target_code = infer_target_category(source_cat, entry_type)
-        return source_cat, target_code
 
-    # Fallback
-    if direction == "IN":
-        return None, "encaissements"
-    return None, "frais_generaux"
+def auto_categorize_many(
+    directions: Sequence[str],
+    labels: Sequence[str],
+    rules: CategoryRules | CategoryMatcher = BASE_CATEGORY_RULES,
+) -> List[Tuple[Optional[str], str]]:
+    """
+    Version vectorisee de :func:`auto_categorize` pour un lot de libelles.
+
+    Args:
+        directions: "IN" ou "OUT" pour chaque libelle
+        labels: Libelles bancaires (meme longueur que ``directions``)
+        rules: Regles a appliquer (BASE_CATEGORY_RULES par defaut) ou matcher deja
+            compile, par exemple ``finance.rules.rules_matcher(entity_id)``
+
+    Returns:
+        Liste de tuples (categorie_source, categorie_cible_code)
+    """
+    if len(directions) != len(labels):
+        raise ValueError("directions et labels doivent avoir la meme longueur.")
+    if isinstance(rules, CategoryMatcher):
+        matcher = rules
+    else:
+        matcher = compile_category_rules(rules if isinstance(rules, tuple) else _as_rules(rules))
+    sources = matcher.match_many((_entry_type(d) for d in directions), labels)
+    return [_auto_result(direction, source) for direction, source in zip(directions, sources)]
 
 
 # =============================================================================
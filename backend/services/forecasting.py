@@ -0,0 +1,397 @@
+"""Prévisions de consommation par produit, calculées par lots et stockées en base.
+
+Le plan d'approvisionnement et la vue prévisions du restaurant lisent
+``product_consumption_forecasts`` au lieu de recalculer tout le catalogue depuis
+``mouvements_stock`` à chaque requête. Le calcul travaille sur une matrice
+produits × jours des sorties de stock (``FORECAST_HISTORY_DAYS`` jours complets,
+jusqu'à la veille) :
+
+- niveau : moyenne pondérée exponentiellement (``FORECAST_ALPHA``), à partir de
+  la première vente du produit dans la fenêtre ;
+- tendance : pente des moindres carrés avec les mêmes poids, amortie
+  (``FORECAST_DAMPING``) sur l'horizon demandé.
+
+``refresh_forecasts`` (job planifié) refait tout le tenant une fois par jour, et
+entre-temps seulement les produits ayant reçu des mouvements depuis le dernier
+passage (imports à date passée notamment). Les lectures ne recalculent jamais :
+tant que le job n'est pas passé, le tenant n'a simplement pas de prévisions. Le
+script du job peut ajuster les gros tenants dans un pool de processus
+(``--workers`` / ``FORECAST_WORKERS``), jamais le processus de l'API.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from core.data_repository import get_engine, query_df
+from core.repositories import is_undefined_table
+
+logger = logging.getLogger(__name__)
+
+_SALES_SQL = """
+    SELECT produit_id, date_mvt::date AS jour, SUM(quantite) AS quantite
+    FROM mouvements_stock
+    WHERE tenant_id = :tenant_id
+      AND type = 'SORTIE'
+      AND date_mvt >= :since
+      AND date_mvt < :until
+      {product_clause}
+    GROUP BY produit_id, date_mvt::date
+"""
+
+_WATERMARK_SQL = """
+    SELECT COALESCE(MAX(id), 0) AS last_id
+    FROM mouvements_stock
+    WHERE tenant_id = :tenant_id
+"""
+
+_TOUCHED_PRODUCTS_SQL = """
+    SELECT DISTINCT produit_id
+    FROM mouvements_stock
+    WHERE tenant_id = :tenant_id AND id > :after_id
+"""
+
+_RUN_SQL = """
+    SELECT fit_date, last_movement_id, generated_at
+    FROM product_forecast_runs
+    WHERE tenant_id = :tenant_id
+"""
+
+_SNAPSHOT_SQL = """
+    SELECT produit_id, level, trend, generated_at
+    FROM product_consumption_forecasts
+    WHERE tenant_id = :tenant_id
+"""
+
+_TENANTS_SQL = "SELECT DISTINCT tenant_id FROM produits"
+
+_UPSERT_SQL = """
+    INSERT INTO product_consumption_forecasts AS f
+        (tenant_id, produit_id, level, trend, history_days, generated_at)
+    SELECT :tenant_id, u.produit_id, u.level, u.trend, :history_days, :generated_at
+    FROM unnest(
+        CAST(:ids AS int[]), CAST(:levels AS double precision[]), CAST(:trends AS double precision[])
+    ) AS u(produit_id, level, trend)
+    ON CONFLICT (tenant_id, produit_id) DO UPDATE
+    SET level = EXCLUDED.level,
+        trend = EXCLUDED.trend,
+        history_days = EXCLUDED.history_days,
+        generated_at = EXCLUDED.generated_at
+"""
+
+_RUN_UPSERT_SQL = """
+    INSERT INTO product_forecast_runs AS r
+        (tenant_id, fit_date, last_movement_id, generated_at, products, duration_ms)
+    VALUES (:tenant_id, :fit_date, :last_movement_id, :generated_at, :products, :duration_ms)
+    ON CONFLICT (tenant_id) DO UPDATE
+    SET fit_date = EXCLUDED.fit_date,
+        last_movement_id = EXCLUDED.last_movement_id,
+        generated_at = EXCLUDED.generated_at,
+        products = EXCLUDED.products,
+        duration_ms = EXCLUDED.duration_ms
+"""
+
+
+def _history_days() -> int:
+    return max(7, int(os.getenv("FORECAST_HISTORY_DAYS", "84")))
+
+
+def _alpha() -> float:
+    return min(1.0, max(0.01, float(os.getenv("FORECAST_ALPHA", "0.1"))))
+
+
+def _damping() -> float:
+    return min(1.0, max(0.0, float(os.getenv("FORECAST_DAMPING", "0.9"))))
+
+
+def _pool_min_products() -> int:
+    return int(os.getenv("FORECAST_POOL_MIN_PRODUCTS", "5000"))
+
+
+# --------------------------------------------------------------------------- ajustement
+
+
+def fit_consumption_models(matrix: np.ndarray, alpha: float = 0.1) -> tuple[np.ndarray, np.ndarray]:
+    """Niveau et tendance journaliers de chaque ligne d'une matrice produits × jours.
+
+    La dernière colonne est le jour le plus récent. Les jours précédant la première
+    vente d'un produit sont ignorés (produit récent) ; un produit sans vente a un
+    niveau et une tendance nuls.
+    """
+
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n_products, n_days = matrix.shape
+    if n_products == 0 or n_days == 0:
+        return np.zeros(n_products), np.zeros(n_products)
+
+    active = np.cumsum(matrix > 0, axis=1) > 0
+    decay = (1.0 - alpha) ** np.arange(n_days - 1, -1, -1, dtype=np.float64)
+    weights = active * decay
+    total = weights.sum(axis=1)
+    safe_total = np.where(total > 0, total, 1.0)
+
+    level = (weights * matrix).sum(axis=1) / safe_total
+
+    x = np.arange(n_days, dtype=np.float64)
+    x_mean = (weights * x).sum(axis=1) / safe_total
+    dx = x[None, :] - x_mean[:, None]
+    denom = (weights * dx * dx).sum(axis=1)
+    numer = (weights * dx * (matrix - level[:, None])).sum(axis=1)
+    trend = np.where(denom > 0, numer / np.where(denom > 0, denom, 1.0), 0.0)
+
+    # Niveau ramené au dernier jour : la moyenne pondérée est centrée sur x_mean.
+    level = level + trend * ((n_days - 1) - x_mean)
+    level = np.where(total > 0, np.clip(level, 0.0, None), 0.0)
+    trend = np.where(total > 0, trend, 0.0)
+    return level, trend
+
+
+def _fit_chunk(args: tuple[np.ndarray, float]) -> tuple[np.ndarray, np.ndarray]:
+    matrix, alpha = args
+    return fit_consumption_models(matrix, alpha)
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    # Pas de fork : l'enfant hériterait des connexions SQLAlchemy et des verrous du parent.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _fit(matrix: np.ndarray, alpha: float, workers: int) -> tuple[np.ndarray, np.ndarray]:
+    if workers <= 1 or matrix.shape[0] < _pool_min_products():
+        return fit_consumption_models(matrix, alpha)
+    chunks = np.array_split(matrix, workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+        results = list(executor.map(_fit_chunk, [(chunk, alpha) for chunk in chunks]))
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def horizon_mean(level: np.ndarray, trend: np.ndarray, horizon: int, damping: float | None = None) -> np.ndarray:
+    """Consommation journalière moyenne attendue sur les ``horizon`` prochains jours."""
+
+    phi = _damping() if damping is None else damping
+    horizon = max(1, int(horizon))
+    steps = phi ** np.arange(1, horizon + 1, dtype=np.float64)
+    # Tendance cumulée amortie : sum_{k<=h} sum_{j<=k} phi^j, moyennée sur h jours.
+    drift = np.cumsum(steps).sum() / horizon
+    return np.clip(level + trend * drift, 0.0, None)
+
+
+# --------------------------------------------------------------------------- données
+
+
+def _sales_matrix(
+    tenant_id: int, until: date, days: int, product_ids: Sequence[int] | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Identifiants produits et matrice des sorties journalières ``[until - days, until[``."""
+
+    since = until - timedelta(days=days)
+    params: dict[str, object] = {"tenant_id": int(tenant_id), "since": since, "until": until}
+    product_clause = ""
+    if product_ids is not None:
+        product_clause = "AND produit_id = ANY(:product_ids)"
+        params["product_ids"] = [int(pid) for pid in product_ids]
+    df = query_df(_SALES_SQL.format(product_clause=product_clause), params=params)
+
+    if product_ids is not None:
+        ids = np.asarray(sorted({int(pid) for pid in product_ids}), dtype=np.int64)
+    elif df.empty:
+        ids = np.zeros(0, dtype=np.int64)
+    else:
+        ids = np.unique(df["produit_id"].astype(np.int64).to_numpy())
+    matrix = np.zeros((len(ids), days), dtype=np.float64)
+    if df.empty or len(ids) == 0:
+        return ids, matrix
+
+    rows = np.searchsorted(ids, df["produit_id"].astype(np.int64).to_numpy())
+    jours = pd.to_datetime(df["jour"]).dt.date
+    cols = np.array([(jour - since).days for jour in jours], dtype=np.int64)
+    np.add.at(matrix, (rows, cols), df["quantite"].astype(float).to_numpy())
+    return ids, matrix
+
+
+def _movement_watermark(tenant_id: int) -> int:
+    df = query_df(_WATERMARK_SQL, params={"tenant_id": int(tenant_id)})
+    if df.empty:
+        return 0
+    return int(df.iloc[0]["last_id"] or 0)
+
+
+def _last_run(tenant_id: int) -> dict | None:
+    df = query_df(_RUN_SQL, params={"tenant_id": int(tenant_id)})
+    if df.empty:
+        return None
+    return df.iloc[0].to_dict()
+
+
+# --------------------------------------------------------------------------- rafraîchissement
+
+
+@dataclass(frozen=True)
+class ForecastRefresh:
+    tenant_id: int
+    mode: str
+    products: int
+    last_movement_id: int
+    duration_ms: int
+
+
+def refresh_forecasts(
+    tenant_id: int,
+    *,
+    full: bool = False,
+    today: date | None = None,
+    workers: int = 0,
+) -> ForecastRefresh:
+    """Réajuste les prévisions du tenant et les enregistre.
+
+    Passage complet si demandé, si aucun n'a eu lieu aujourd'hui (la fenêtre a glissé)
+    ou si le tenant n'a pas encore de prévisions ; sinon seuls les produits ayant de
+    nouveaux mouvements sont réajustés. Sans nouveau mouvement, rien n'est fait.
+    ``workers`` > 1 ajuste dans un pool de processus (script du job uniquement).
+    """
+
+    started = time.perf_counter()
+    tenant_id = int(tenant_id)
+    today = today or date.today()
+    watermark = _movement_watermark(tenant_id)
+    run = _last_run(tenant_id)
+
+    fit_date = run.get("fit_date") if run else None
+    if isinstance(fit_date, datetime):
+        fit_date = fit_date.date()
+    incremental = not full and run is not None and fit_date == today
+    if incremental and int(run.get("last_movement_id") or 0) >= watermark:
+        return ForecastRefresh(tenant_id, "unchanged", 0, watermark, 0)
+
+    product_ids: list[int] | None = None
+    if incremental:
+        touched = query_df(
+            _TOUCHED_PRODUCTS_SQL, params={"tenant_id": tenant_id, "after_id": int(run.get("last_movement_id") or 0)}
+        )
+        product_ids = touched["produit_id"].astype(int).tolist() if not touched.empty else []
+
+    days = _history_days()
+    ids, matrix = _sales_matrix(tenant_id, today, days, product_ids)
+    level, trend = _fit(matrix, _alpha(), workers)
+
+    generated_at = datetime.now(timezone.utc)
+    with get_engine().begin() as conn:
+        # Un seul rafraîchissement à la fois par tenant (job planifié et endpoint admin).
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext('product_forecasts'), :tenant_id)"),
+            {"tenant_id": tenant_id},
+        )
+        if not incremental:
+            conn.execute(
+                text("DELETE FROM product_consumption_forecasts WHERE tenant_id = :tenant_id"),
+                {"tenant_id": tenant_id},
+            )
+        if len(ids):
+            conn.execute(
+                text(_UPSERT_SQL),
+                {
+                    "tenant_id": tenant_id,
+                    "ids": ids.tolist(),
+                    "levels": level.tolist(),
+                    "trends": trend.tolist(),
+                    "history_days": days,
+                    "generated_at": generated_at,
+                },
+            )
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        conn.execute(
+            text(_RUN_UPSERT_SQL),
+            {
+                "tenant_id": tenant_id,
+                "fit_date": today,
+                "last_movement_id": watermark,
+                "generated_at": generated_at,
+                "products": len(ids),
+                "duration_ms": duration_ms,
+            },
+        )
+    mode = "incremental" if incremental else "full"
+    logger.info("Prévisions tenant %s (%s) : %s produit(s) en %s ms", tenant_id, mode, len(ids), duration_ms)
+    return ForecastRefresh(tenant_id, mode, len(ids), watermark, duration_ms)
+
+
+def refresh_all_forecasts(*, full: bool = False, workers: int = 0) -> list[ForecastRefresh]:
+    """Rafraîchit chaque tenant ayant un catalogue (job planifié)."""
+
+    tenants = query_df(_TENANTS_SQL)
+    results: list[ForecastRefresh] = []
+    for tenant_id in tenants["tenant_id"].dropna().astype(int).tolist() if not tenants.empty else []:
+        results.append(refresh_forecasts(tenant_id, full=full, workers=workers))
+    return results
+
+
+# --------------------------------------------------------------------------- lecture
+
+
+@dataclass(frozen=True)
+class ForecastSnapshot:
+    ids: np.ndarray
+    level: np.ndarray
+    trend: np.ndarray
+    generated_at: datetime | None
+
+    def daily_consumption(self, horizon: int) -> dict[int, float]:
+        values = horizon_mean(self.level, self.trend, horizon)
+        return dict(zip(self.ids.tolist(), values.tolist()))
+
+
+def _snapshot_from_frame(df: pd.DataFrame) -> ForecastSnapshot:
+    generated = df["generated_at"].max() if "generated_at" in df.columns and not df.empty else None
+    if isinstance(generated, pd.Timestamp):
+        generated = generated.to_pydatetime()
+    return ForecastSnapshot(
+        ids=df["produit_id"].astype(np.int64).to_numpy() if not df.empty else np.zeros(0, dtype=np.int64),
+        level=df["level"].astype(float).to_numpy() if not df.empty else np.zeros(0),
+        trend=df["trend"].astype(float).to_numpy() if not df.empty else np.zeros(0),
+        generated_at=generated,
+    )
+
+
+def load_forecast_snapshot(tenant_id: int) -> ForecastSnapshot:
+    """Prévisions enregistrées du tenant ; vides tant que le job n'est pas passé."""
+
+    tenant_id = int(tenant_id)
+    try:
+        df = query_df(_SNAPSHOT_SQL, params={"tenant_id": tenant_id})
+    except ProgrammingError as exc:
+        if not is_undefined_table(exc):
+            raise
+        logger.warning("Table des prévisions absente (migration non appliquée) : %s", exc)
+        df = pd.DataFrame()
+    return _snapshot_from_frame(df)
+
+
+def forecast_daily_consumption(*, tenant_id: int, horizon: int = 30) -> dict[int, float]:
+    """Consommation journalière prévue par produit (``produit_id`` → unités/jour)."""
+
+    return load_forecast_snapshot(tenant_id).daily_consumption(horizon)
+
+
+__all__ = [
+    "ForecastRefresh",
+    "ForecastSnapshot",
+    "fit_consumption_models",
+    "forecast_daily_consumption",
+    "horizon_mean",
+    "load_forecast_snapshot",
+    "refresh_all_forecasts",
+    "refresh_forecasts",
+]
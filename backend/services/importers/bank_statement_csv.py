@@ -6,11 +6,12 @@ import csv
 import hashlib
 import io
 from datetime import date
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable
 
 from sqlalchemy import text
 
 from core.data_repository import get_engine, query_df
+from backend.services.finance.transactions import link_statement_lines
 
 
 def _parse_amount(value: str) -> float:
@@ -81,12 +82,277 @@ def _checksum(account_id: int, entry: dict[str, Any]) -> str:
     return hashlib.sha1(base.encode("utf-8")).hexdigest()
 
 
-def import_csv(content: bytes | str, account_id: int, *, source: str = "CSV") -> dict[str, int]:
-    """Insère un CSV dans finance_bank_statements/lines avec dédoublonnage."""
+def _dedupe_entries(entries: Iterable[dict[str, Any]], account_id: int) -> list[dict[str, Any]]:
+    """Retire les doublons internes au fichier, dans l'ordre des clés checksum puis ref_banque.
 
-    entries = parse_csv(content)
+    Une ligne est conservée si elle est la première du fichier pour son checksum, puis la
+    première, parmi ces survivantes, pour sa ``ref_banque``. Les chemins ligne à ligne et
+    COPY partagent cette règle ; ils ne contrôlent ensuite que les lignes déjà en base.
+    """
+
+    seen_checksums: set[str] = set()
+    seen_refs: set[str] = set()
+    unique: list[dict[str, Any]] = []
+    for entry in entries:
+        checksum = _checksum(account_id, entry)
+        if checksum in seen_checksums:
+            continue
+        seen_checksums.add(checksum)
+        ref = entry.get("ref_banque")
+        if ref is not None:
+            if ref in seen_refs:
+                continue
+            seen_refs.add(ref)
+        unique.append(entry)
+    return unique
+
+
+# Taille des lots envoyés au serveur via COPY (borne la mémoire du tampon CSV).
+_COPY_CHUNK_SIZE = 10_000
+
+
+def _content_hash(content: bytes | str) -> str:
+    raw = content.encode("utf-8") if isinstance(content, str) else content
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _resolve_statement_id(
+    conn,
+    *,
+    account_id: int,
+    period_start: date,
+    period_end: date,
+    source: str,
+    content_hash: str,
+) -> int:
+    stmt_row = conn.execute(
+        text(
+            """
+            INSERT INTO finance_bank_statements (account_id, period_start, period_end, source, file_name, hash)
+            VALUES (:account_id, :period_start, :period_end, :source, :file_name, :hash)
+            ON CONFLICT (account_id, hash) DO NOTHING
+            RETURNING id
+            """
+        ),
+        {
+            "account_id": account_id,
+            "period_start": period_start,
+            "period_end": period_end,
+            "source": source,
+            "file_name": source,
+            "hash": content_hash,
+        },
+    ).fetchone()
+    if stmt_row:
+        return int(stmt_row[0])
+
+    # Rechercher un statement existant sur la même période.
+    existing = conn.execute(
+        text(
+            """
+            SELECT id FROM finance_bank_statements
+            WHERE account_id = :account_id
+              AND period_start = :period_start
+              AND period_end = :period_end
+            LIMIT 1
+            """
+        ),
+        {"account_id": account_id, "period_start": period_start, "period_end": period_end},
+    ).fetchone()
+    if existing:
+        return int(existing.id)
+
+    # fallback: crée sans hash
+    return conn.execute(
+        text(
+            """
+            INSERT INTO finance_bank_statements (account_id, period_start, period_end, source)
+            VALUES (:account_id, :period_start, :period_end, :source)
+            RETURNING id
+            """
+        ),
+        {"account_id": account_id, "period_start": period_start, "period_end": period_end, "source": source},
+    ).scalar_one()
+
+
+def _insert_lines_rowwise(conn, entries: list[dict[str, Any]], *, account_id: int, statement_id: int) -> int:
+    inserted = 0
+    for entry in _dedupe_entries(entries, account_id):
+        checksum = _checksum(account_id, entry)
+        # Vérifier les doublons cross-statement (même compte, n'importe quel relevé)
+        dup = conn.execute(
+            text(
+                """
+                SELECT 1 FROM finance_bank_statement_lines l
+                JOIN finance_bank_statements s ON s.id = l.statement_id
+                WHERE s.account_id = :account_id
+                  AND (l.checksum = :checksum OR (l.ref_banque IS NOT DISTINCT FROM :ref_banque AND l.ref_banque IS NOT NULL))
+                LIMIT 1
+                """
+            ),
+            {"account_id": account_id, "checksum": checksum, "ref_banque": entry.get("ref_banque")},
+        ).fetchone()
+        if dup:
+            continue
+        conn.execute(
+            text(
+                """
+                INSERT INTO finance_bank_statement_lines (
+                    statement_id,
+                    account_id,
+                    date_operation,
+                    date_valeur,
+                    libelle_banque,
+                    montant,
+                    ref_banque,
+                    checksum
+                ) VALUES (
+                    :statement_id,
+                    :account_id,
+                    :date_operation,
+                    :date_operation,
+                    :libelle_banque,
+                    :montant,
+                    :ref_banque,
+                    :checksum
+                )
+                """
+            ),
+            {
+                "statement_id": statement_id,
+                "account_id": account_id,
+                "date_operation": entry["date_operation"],
+                "libelle_banque": entry["libelle_banque"],
+                "montant": entry["montant"],
+                "ref_banque": entry.get("ref_banque"),
+                "checksum": checksum,
+            },
+        )
+        inserted += 1
+    return inserted
+
+
+def _iter_copy_chunks(entries: Iterable[dict[str, Any]], account_id: int) -> Iterable[io.StringIO]:
+    """Sérialise les lignes en CSV (format COPY) par lots de ``_COPY_CHUNK_SIZE``."""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    pending = 0
+    for seq, entry in enumerate(entries):
+        # Un champ vide non quoté est lu comme NULL par COPY (ref_banque absente).
+        writer.writerow(
+            [
+                seq,
+                entry["date_operation"].isoformat(),
+                entry["libelle_banque"],
+                repr(float(entry["montant"])),
+                entry.get("ref_banque") or "",
+                _checksum(account_id, entry),
+            ]
+        )
+        pending += 1
+        if pending >= _COPY_CHUNK_SIZE:
+            buffer.seek(0)
+            yield buffer
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        yield buffer
+
+
+def _insert_lines_bulk(conn, entries: list[dict[str, Any]], *, account_id: int, statement_id: int) -> int:
+    """Charge les lignes via COPY dans une table temporaire puis fusionne en une requête."""
+
+    conn.execute(
+        text(
+            """
+            CREATE TEMP TABLE tmp_bank_csv_import (
+                seq integer,
+                date_operation date,
+                libelle_banque text,
+                montant numeric,
+                ref_banque text,
+                checksum text
+            ) ON COMMIT DROP
+            """
+        )
+    )
+    cursor = conn.connection.cursor()
+    try:
+        for chunk in _iter_copy_chunks(_dedupe_entries(entries, account_id), account_id):
+            cursor.copy_expert(
+                "COPY tmp_bank_csv_import (seq, date_operation, libelle_banque, montant, ref_banque, checksum) "
+                "FROM STDIN WITH (FORMAT csv)",
+                chunk,
+            )
+    finally:
+        cursor.close()
+
+    # Les doublons internes au fichier sont déjà retirés (``_dedupe_entries``) : il reste à
+    # écarter les ref_banque déjà connues sur le compte, puis l'index unique (account_id, checksum).
+    result = conn.execute(
+        text(
+            """
+            INSERT INTO finance_bank_statement_lines (
+                statement_id,
+                account_id,
+                date_operation,
+                date_valeur,
+                libelle_banque,
+                montant,
+                ref_banque,
+                checksum
+            )
+            SELECT
+                :statement_id,
+                :account_id,
+                s.date_operation,
+                s.date_operation,
+                COALESCE(s.libelle_banque, ''),
+                s.montant,
+                s.ref_banque,
+                s.checksum
+            FROM tmp_bank_csv_import s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM finance_bank_statement_lines l
+                WHERE l.account_id = :account_id
+                  AND s.ref_banque IS NOT NULL
+                  AND l.ref_banque = s.ref_banque
+            )
+            ORDER BY s.seq
+            ON CONFLICT (account_id, checksum) WHERE checksum IS NOT NULL DO NOTHING
+            """
+        ),
+        {"statement_id": statement_id, "account_id": account_id},
+    )
+    return int(result.rowcount or 0)
+
+
+def import_csv(
+    content: bytes | str,
+    account_id: int,
+    *,
+    source: str = "CSV",
+    bulk: bool = True,
+    entries: list[dict[str, Any]] | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict[str, int]:
+    """Insère un CSV dans finance_bank_statements/lines avec dédoublonnage.
+
+    ``bulk=True`` (défaut) charge les lignes via COPY et dédoublonne en une seule requête ;
+    ``bulk=False`` conserve le traitement ligne à ligne.
+    ``entries`` permet de fournir le résultat de ``parse_csv`` déjà calculé (pool CPU des
+    jobs d'ingestion) ; ``progress(inserted, total)`` est appelé une fois le CSV parsé.
+    """
+
+    if entries is None:
+        entries = parse_csv(content)
     if not entries:
         return {"inserted": 0, "duplicates": 0, "total": 0}
+    if progress is not None:
+        progress(0, len(entries))
 
     # Récupère entity_id pour validation éventuelle.
     df_acc = query_df(
@@ -100,111 +366,19 @@ def import_csv(content: bytes | str, account_id: int, *, source: str = "CSV") ->
     period_end = max(e["date_operation"] for e in entries)
 
     engine = get_engine()
-    content_hash = hashlib.sha1(str(len(content)).encode("utf-8") if not isinstance(content, bytes) else content).hexdigest()
-    inserted = 0
-    duplicates = 0
+    insert_lines = _insert_lines_bulk if bulk else _insert_lines_rowwise
 
     with engine.begin() as conn:
-        stmt_row = conn.execute(
-            text(
-                """
-                INSERT INTO finance_bank_statements (account_id, period_start, period_end, source, file_name, hash)
-                VALUES (:account_id, :period_start, :period_end, :source, :file_name, :hash)
-                ON CONFLICT (account_id, hash) DO NOTHING
-                RETURNING id
-                """
-            ),
-            {
-                "account_id": account_id,
-                "period_start": period_start,
-                "period_end": period_end,
-                "source": source,
-                "file_name": source,
-                "hash": content_hash,
-            },
-        ).fetchone()
-        if stmt_row:
-            statement_id = int(stmt_row[0])
-        else:
-            # Rechercher un statement existant sur la même période.
-            existing = conn.execute(
-                text(
-                    """
-                    SELECT id FROM finance_bank_statements
-                    WHERE account_id = :account_id
-                      AND period_start = :period_start
-                      AND period_end = :period_end
-                    LIMIT 1
-                    """
-                ),
-                {"account_id": account_id, "period_start": period_start, "period_end": period_end},
-            ).fetchone()
-            statement_id = int(existing.id) if existing else None
-            if statement_id is None:
-                # fallback: crée sans hash
-                statement_id = conn.execute(
-                    text(
-                        """
-                        INSERT INTO finance_bank_statements (account_id, period_start, period_end, source)
-                        VALUES (:account_id, :period_start, :period_end, :source)
-                        RETURNING id
-                        """
-                    ),
-                    {"account_id": account_id, "period_start": period_start, "period_end": period_end, "source": source},
-                ).scalar_one()
-
-        for entry in entries:
-            checksum = _checksum(account_id, entry)
-            # Vérifier les doublons cross-statement (même compte, n'importe quel relevé)
-            dup = conn.execute(
-                text(
-                    """
-                    SELECT 1 FROM finance_bank_statement_lines l
-                    JOIN finance_bank_statements s ON s.id = l.statement_id
-                    WHERE s.account_id = :account_id
-                      AND (l.checksum = :checksum OR (l.ref_banque IS NOT DISTINCT FROM :ref_banque AND l.ref_banque IS NOT NULL))
-                    LIMIT 1
-                    """
-                ),
-                {"account_id": account_id, "checksum": checksum, "ref_banque": entry.get("ref_banque")},
-            ).fetchone()
-            if dup:
-                duplicates += 1
-                continue
-            conn.execute(
-                text(
-                    """
-                    INSERT INTO finance_bank_statement_lines (
-                        statement_id,
-                        account_id,
-                        date_operation,
-                        date_valeur,
-                        libelle_banque,
-                        montant,
-                        ref_banque,
-                        checksum
-                    ) VALUES (
-                        :statement_id,
-                        :account_id,
-                        :date_operation,
-                        :date_operation,
-                        :libelle_banque,
-                        :montant,
-                        :ref_banque,
-                        :checksum
-                    )
-                    """
-                ),
-                {
-                    "statement_id": statement_id,
-                    "account_id": account_id,
-                    "date_operation": entry["date_operation"],
-                    "libelle_banque": entry["libelle_banque"],
-                    "montant": entry["montant"],
-                    "ref_banque": entry.get("ref_banque"),
-                    "checksum": checksum,
-                },
-            )
-            inserted += 1
+        statement_id = _resolve_statement_id(
+            conn,
+            account_id=account_id,
+            period_start=period_start,
+            period_end=period_end,
+            source=source,
+            content_hash=_content_hash(content),
+        )
+        inserted = insert_lines(conn, entries, account_id=account_id, statement_id=statement_id)
+        if inserted:
+            link_statement_lines(conn, account_id=account_id)
 
-    return {"inserted": inserted, "duplicates": duplicates, "total": len(entries)}
+    return {"inserted": inserted, "duplicates": len(entries) - inserted, "total": len(entries)}
@@ -0,0 +1,258 @@
+"""Jobs d'ingestion en arrière-plan (factures PDF, relevés bancaires).
+
+Les uploads ne sont plus traités dans la boucle d'événements : l'API enregistre un
+job, répond immédiatement avec son identifiant, et le job s'exécute dans un pool de
+threads d'orchestration (I/O base de données) qui délègue les étapes CPU (extraction
+de texte, parsing) à un pool de processus. Le nombre de jobs en attente ou en cours
+est borné : au-delà, ``submit`` lève ``JobQueueFullError`` (l'API répond 503).
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "PENDING"
+JOB_RUNNING = "RUNNING"
+JOB_DONE = "DONE"
+JOB_ERROR = "ERROR"
+
+
+class JobQueueFullError(RuntimeError):
+    """File d'ingestion pleine : le client doit réessayer plus tard."""
+
+
+class JobNotFoundError(LookupError):
+    """Job inconnu, expiré ou appartenant à un autre tenant."""
+
+
+@dataclass
+class IngestionJob:
+    id: str
+    kind: str
+    tenant_id: int
+    import_id: int | None = None
+    status: str = JOB_PENDING
+    done: int = 0
+    total: int | None = None
+    result: Any = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    future: Future | None = field(default=None, repr=False)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "import_id": self.import_id,
+            "result": self.result if self.status == JOB_DONE else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobContext:
+    """Accès du job à son avancement et au pool CPU."""
+
+    def __init__(self, job: IngestionJob, manager: "IngestionJobManager") -> None:
+        self.job = job
+        self._manager = manager
+
+    def progress(self, done: int, total: int | None = None) -> None:
+        self.job.done = int(done)
+        if total is not None:
+            self.job.total = int(total)
+
+    def run_cpu(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Exécute ``func`` (fonction de module, picklable) dans le pool de processus."""
+
+        return self._manager.run_cpu(func, *args, **kwargs)
+
+
+JobRunner = Callable[[JobContext], Any]
+
+
+class IngestionJobManager:
+    """File bornée de jobs, pool d'orchestration et pool CPU partagés par le processus."""
+
+    def __init__(
+        self,
+        *,
+        max_pending: int = 16,
+        workers: int = 2,
+        cpu_workers: int | None = None,
+        ttl_seconds: float = 3600.0,
+        max_finished: int = 256,
+    ) -> None:
+        self.max_pending = max(1, int(max_pending))
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_finished = max(1, int(max_finished))
+        self.cpu_workers = cpu_workers
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+        self._lock = threading.Lock()
+        self._runner = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="ingest")
+        self._cpu_pool: ProcessPoolExecutor | None = None
+        self._cpu_lock = threading.Lock()
+
+    # ------------------------------------------------------------------ soumission
+
+    def submit(
+        self,
+        kind: str,
+        run: JobRunner,
+        *,
+        tenant_id: int,
+        import_id: int | None = None,
+    ) -> IngestionJob:
+        """Planifie ``run(context)`` ; lève ``JobQueueFullError`` si la file est pleine."""
+
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFullError(f"File d'ingestion pleine ({self.max_pending} jobs).")
+        job = IngestionJob(id=uuid.uuid4().hex, kind=kind, tenant_id=int(tenant_id), import_id=import_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict(time.time())
+        try:
+            job.future = self._runner.submit(self._execute, job, run)
+        except Exception:
+            # Pool arrêté (shutdown) : le job n'a jamais été planifié, on l'oublie.
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            self._slots.release()
+            raise
+        return job
+
+    def _execute(self, job: IngestionJob, run: JobRunner) -> Any:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = run(JobContext(job, self))
+            job.status = JOB_DONE
+            return job.result
+        except Exception as exc:
+            job.error = str(exc)
+            job.status = JOB_ERROR
+            logger.warning("Job d'ingestion %s (%s) en échec: %s", job.id, job.kind, exc)
+            raise
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+
+    def run_cpu(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        pool = self._cpu()
+        if pool is None:
+            return func(*args, **kwargs)
+        try:
+            return pool.submit(func, *args, **kwargs).result()
+        except BrokenProcessPool:
+            # Worker tué (OOM...) : on recrée le pool au prochain job et on termine ici.
+            logger.warning("Pool CPU d'ingestion cassé, exécution dans le thread courant.")
+            with self._cpu_lock:
+                self._cpu_pool = None
+            return func(*args, **kwargs)
+
+    def _cpu(self) -> ProcessPoolExecutor | None:
+        if self.cpu_workers == 0:
+            return None
+        with self._cpu_lock:
+            if self._cpu_pool is None:
+                # forkserver : les workers ne sont pas forkés depuis un processus multi-thread
+                # (threads d'orchestration, pool SQLAlchemy) dont ils hériteraient les verrous.
+                self._cpu_pool = ProcessPoolExecutor(
+                    max_workers=self.cpu_workers or None,
+                    mp_context=_cpu_context(),
+                )
+            return self._cpu_pool
+
+    # ------------------------------------------------------------------ consultation
+
+    def get(self, job_id: str, *, tenant_id: int) -> IngestionJob:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.tenant_id != int(tenant_id):
+            raise JobNotFoundError(job_id)
+        return job
+
+    def list(self, *, tenant_id: int, kind: str | None = None) -> list[IngestionJob]:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.tenant_id == int(tenant_id)]
+        if kind:
+            jobs = [job for job in jobs if job.kind == kind]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def _evict(self, now: float) -> None:
+        # Ne retire que des jobs terminés : expirés, ou les plus anciens au-delà de max_finished.
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        excess = len(finished) - self.max_finished
+        for job_id in finished:
+            job = self._jobs[job_id]
+            if excess > 0 or job.finished_at + self.ttl_seconds <= now:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def shutdown(self) -> None:
+        self._runner.shutdown(wait=False, cancel_futures=True)
+        with self._cpu_lock:
+            if self._cpu_pool is not None:
+                self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+                self._cpu_pool = None
+
+
+def _cpu_context() -> multiprocessing.context.BaseContext:
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+_MANAGER: IngestionJobManager | None = None
+_MANAGER_LOCK = threading.Lock()
+
+
+def get_job_manager() -> IngestionJobManager:
+    """Retourne le gestionnaire partagé du processus (configuré via l'environnement)."""
+
+    global _MANAGER
+    if _MANAGER is None:
+        with _MANAGER_LOCK:
+            if _MANAGER is None:
+                cpu_workers = os.getenv("INGESTION_CPU_WORKERS")
+                _MANAGER = IngestionJobManager(
+                    max_pending=int(os.getenv("INGESTION_MAX_PENDING", "16")),
+                    workers=int(os.getenv("INGESTION_WORKERS", "2")),
+                    cpu_workers=int(cpu_workers) if cpu_workers else None,
+                    ttl_seconds=float(os.getenv("INGESTION_JOB_TTL_SECONDS", "3600")),
+                )
+    return _MANAGER
+
+
+__all__ = [
+    "IngestionJob",
+    "IngestionJobManager",
+    "JobContext",
+    "JobNotFoundError",
+    "JobQueueFullError",
+    "JobRunner",
+    "JOB_DONE",
+    "JOB_ERROR",
+    "JOB_PENDING",
+    "JOB_RUNNING",
+    "get_job_manager",
+]
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import io
 import logging
 from pathlib import Path
 from datetime import date, datetime, time, timezone
@@ -9,10 +10,12 @@ from datetime import date, datetime, time, timezone
 import pandas as pd
 from sqlalchemy import text
 
+from backend.services.catalog_match import CatalogMatch, get_catalog_match_index, match_invoice_products
+from backend.services.dashboard import invalidate_dashboard_cache
 from backend.services.invoice_utils import prepare_invoice_dataframe
 from core import invoice_extractor, products_loader
 from core.data_repository import exec_sql, query_df
-from core.inventory_service import match_invoice_products, register_invoice_reception
+from core.inventory_service import register_invoice_reception
 from core.pdf_utils import split_pdf_into_invoices
 from core.price_history_service import record_price_history
 from sqlalchemy import text as sa_text
@@ -47,6 +50,21 @@ def extract_invoice_lines(
     )
 
 
+def extract_invoice_file(
+    content: bytes,
+    filename: str | None,
+    *,
+    margin_percent: float = 40.0,
+    supplier_hint: str | None = None,
+) -> pd.DataFrame:
+    """Texte + lignes d'un fichier facture, sans accès base (exécutable dans un pool de processus)."""
+
+    buffer = io.BytesIO(content)
+    buffer.name = filename  # type: ignore[attr-defined]
+    text_content = invoice_extractor.extract_text_from_file(buffer)
+    return extract_invoice_lines(text_content, margin_percent=margin_percent, supplier_hint=supplier_hint)
+
+
 def enrich_lines_with_catalog(
     lines: pd.DataFrame,
     *,
@@ -79,77 +97,35 @@ def enrich_lines_with_catalog(
             df["produit_id"] = df["produit_id"].fillna(df["catalogue_id"])
 
     # Rattrapage par nom (utile pour les factures Eurociel sans code-barres ou avec codes TVA type C2/C07)
-    # On associe sur lower(nom) et on récupère le code principal du produit.
-    # Cela permet de peupler codes / produit_id même quand "codes" est vide ou contient un code TVA.
-    if not df.empty:
-        names = sorted({str(n).strip().lower() for n in df.get("nom", []) if str(n).strip()})
-        if names:
-            placeholders = ", ".join(f":n{i}" for i in range(len(names)))
-            params = {f"n{i}": name for i, name in enumerate(names)}
-            params["tenant_id"] = int(tenant_id)
-            sql = f"""
-                SELECT
-                    lower(p.nom) AS nom_lower,
-                    p.id AS produit_id,
-                    p.nom AS produit_nom,
-                    p.categorie,
-                    COALESCE(p.prix_achat, 0) AS prix_achat_catalogue,
-                    COALESCE(p.prix_vente, 0) AS prix_vente_catalogue,
-                    COALESCE(p.tva, 0) AS tva_catalogue,
-                    pb.code AS barcode
-                FROM produits p
-                LEFT JOIN LATERAL (
-                    SELECT code
-                    FROM produits_barcodes
-                    WHERE produit_id = p.id
-                    ORDER BY is_principal DESC, id
-                    LIMIT 1
-                ) pb ON TRUE
-                WHERE lower(p.nom) IN ({placeholders})
-                  AND p.tenant_id = :tenant_id
-            """
-            try:
-                name_matches = query_df(sql, params=params)
-            except Exception:
-                name_matches = pd.DataFrame()
-
-            if not name_matches.empty:
-                name_matches = name_matches.rename(
-                    columns={
-                        "nom_lower": "_nom_lower",
-                        "produit_id": "name_catalogue_id",
-                        "produit_nom": "name_catalogue_nom",
-                        "categorie": "name_catalogue_categorie",
-                        "prix_achat_catalogue": "name_prix_achat_catalogue",
-                        "prix_vente_catalogue": "name_prix_vente_catalogue",
-                        "tva_catalogue": "name_tva_catalogue",
-                        "barcode": "name_barcode",
-                    }
-                )
-                df["_nom_lower"] = df["nom"].astype(str).str.lower().str.strip()
-                df = df.merge(name_matches, on="_nom_lower", how="left")
-                # Remplit les champs catalogue/produit manquants avec le match par nom
-                for target, src in [
-                    ("catalogue_id", "name_catalogue_id"),
-                    ("catalogue_nom", "name_catalogue_nom"),
-                    ("catalogue_categorie", "name_catalogue_categorie"),
-                ]:
-                    if target not in df.columns:
-                        df[target] = df[src]
-                    else:
-                        df[target] = df[target].fillna(df[src])
-                if "produit_id" not in df.columns:
-                    df["produit_id"] = df["name_catalogue_id"]
+    # Un nom identique (lower) vaut correspondance : produit_id et code principal sont repris.
+    # Un libellé seulement approchant n'est qu'une suggestion (suggestion_id / suggestion_nom)
+    # à valider par l'utilisateur : il ne renseigne jamais produit_id ni codes.
+    if not df.empty and "nom" in df.columns:
+        name_hits, suggestions = _match_catalog_names(df, tenant_id=tenant_id)
+        if any(hit is not None for hit in name_hits):
+
+            def _hit_column(attr: str) -> pd.Series:
+                values = pd.Series([getattr(hit, attr) if hit else None for hit in name_hits], index=df.index)
+                return pd.to_numeric(values) if attr == "produit_id" else values
+
+            for target, attr in [
+                ("catalogue_id", "produit_id"),
+                ("catalogue_nom", "produit_nom"),
+                ("catalogue_categorie", "categorie"),
+                ("produit_id", "produit_id"),
+            ]:
+                if target not in df.columns:
+                    df[target] = _hit_column(attr)
                 else:
-                    df["produit_id"] = df["produit_id"].fillna(df["name_catalogue_id"])
-                if "codes" in df.columns:
-                    # Évite l'erreur pandas "dict-value and non-None to_replace" en utilisant fillna/mask.
-                    df["codes"] = df["codes"].replace("", pd.NA)
-                    df["codes"] = df["codes"].fillna(df["name_barcode"])
-                # Nettoyage colonnes temporaires
-                df.drop(columns=["_nom_lower"], inplace=True, errors="ignore")
-                tmp_cols = [c for c in df.columns if c.startswith("name_")]
-                df.drop(columns=tmp_cols, inplace=True, errors="ignore")
+                    df[target] = df[target].fillna(_hit_column(attr))
+            if "codes" in df.columns:
+                # Évite l'erreur pandas "dict-value and non-None to_replace" en utilisant fillna/mask.
+                df["codes"] = df["codes"].replace("", pd.NA)
+                df["codes"] = df["codes"].fillna(_hit_column("barcode"))
+        df["suggestion_id"] = pd.to_numeric(
+            pd.Series([hit.produit_id if hit else None for hit in suggestions], index=df.index, dtype=object)
+        )
+        df["suggestion_nom"] = pd.Series([hit.produit_nom if hit else None for hit in suggestions], index=df.index)
     df.drop(columns=["_code_lower"], inplace=True, errors="ignore")
     for column in ("catalogue_id", "catalogue_nom", "catalogue_categorie"):
         if column not in df.columns:
@@ -159,6 +135,31 @@ def enrich_lines_with_catalog(
     return prepare_invoice_dataframe(df, margin_rate)
 
 
+def _match_catalog_names(
+    df: pd.DataFrame, *, tenant_id: int
+) -> tuple[list[CatalogMatch | None], list[CatalogMatch | None]]:
+    """Par ligne : produit de même nom exact, et suggestion par libellé approchant pour
+    les lignes restées sans produit."""
+
+    try:
+        index = get_catalog_match_index(tenant_id)
+    except Exception as exc:
+        LOGGER.warning("Index catalogue indisponible pour le tenant %s: %s", tenant_id, exc)
+        return [None] * len(df), [None] * len(df)
+
+    if "catalogue_id" in df.columns:
+        resolved = df["catalogue_id"].notna().tolist()
+    else:
+        resolved = [False] * len(df)
+    hits: list[CatalogMatch | None] = []
+    suggestions: list[CatalogMatch | None] = []
+    for name, done in zip(df["nom"].tolist(), resolved):
+        hit = index.match_name(name)
+        hits.append(hit)
+        suggestions.append(index.match_fuzzy(name) if hit is None and not done else None)
+    return hits, suggestions
+
+
 def _has_missing_product_ids(df: pd.DataFrame) -> bool:
     """Return True when at least one invoice line lacks a valid produit_id."""
 
@@ -224,6 +225,7 @@ def apply_invoice_import(
         tenant_id=tenant_id,
     )
     record_processed_invoices(prepared_df, supplier=supplier, tenant_id=tenant_id)
+    invalidate_dashboard_cache(tenant_id)
     return result
 
 
@@ -255,10 +257,12 @@ def import_catalog_from_invoice(
         tenant_id=tenant_id,
     )
     record_processed_invoices(invoice_df, supplier=supplier, tenant_id=tenant_id)
+    invalidate_dashboard_cache(tenant_id)
     return summary
 
 
 __all__ = [
+    "extract_invoice_file",
     "extract_invoice_lines",
     "enrich_lines_with_catalog",
     "apply_invoice_import",
@@ -1,10 +1,14 @@
-"""Maintenance helpers (backups listing)."""
+"""Maintenance helpers (backups listing, stock ledger compaction, movement partitions, forecasts)."""
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from dataclasses import asdict
+from datetime import date, datetime, timezone
 from pathlib import Path
 
+from backend.services.forecasting import refresh_forecasts
+from core.repositories.stock_movements import SqlStockMovementRepository
+
 BACKUP_DIR = Path("/backups")
 
 
@@ -30,3 +34,35 @@ def list_backups(limit: int | None = None) -> list[dict[str, object]]:
             }
         )
     return entries
+
+
+def compact_stock_ledger(max_movements: int | None = None) -> dict[str, int]:
+    """Intègre les nouveaux mouvements au checkpoint du grand livre de stock (tous tenants)."""
+
+    return SqlStockMovementRepository().compact_ledger(max_movements=max_movements)
+
+
+def ensure_movement_partitions(months_ahead: int = 3) -> int:
+    """Crée les partitions mensuelles de mouvements_stock à venir ; retourne le nombre créé."""
+
+    return SqlStockMovementRepository().ensure_partitions(months_ahead=months_ahead)
+
+
+def archive_movement_partitions(
+    before: date,
+    *,
+    schema: str = "archive",
+    drop: bool = False,
+    dry_run: bool = False,
+) -> list[dict[str, object]]:
+    """Sort de mouvements_stock les partitions mensuelles antérieures à ``before``."""
+
+    return SqlStockMovementRepository().archive_partitions(
+        before=before, schema=schema, drop=drop, dry_run=dry_run
+    )
+
+
+def refresh_consumption_forecasts(tenant_id: int, *, full: bool = False) -> dict[str, object]:
+    """Réajuste les prévisions de consommation du tenant (incrémental par défaut, sans pool)."""
+
+    return asdict(refresh_forecasts(tenant_id, full=full))
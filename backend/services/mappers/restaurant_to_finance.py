@@ -1,16 +1,42 @@
-"""Backfill restaurant -> finance tables (comptes, catégories, fournisseurs, transactions, relevés)."""
+"""Backfill restaurant -> finance tables (comptes, catégories, fournisseurs, transactions, relevés).
+
+Deux modes pour les dépenses (``restaurant_depenses`` -> ``finance_transactions``) :
+
+* historique : une ligne Python par dépense, dans une seule transaction ;
+* ensembliste (``bulk=True``) : ``INSERT ... SELECT`` par lots de ``chunk_size`` dépenses,
+  jointures sur les correspondances catégories/centres de coûts/comptes, point de
+  reprise persisté par tenant (``finance_backfill_progress``) et tenants en parallèle.
+  Les dépenses écartées faute de catégorie ou de compte finance restent en attente
+  (``pending_ids``) et sont relues au passage suivant, malgré le point de reprise.
+
+Dans les deux modes, une dépense dont la catégorie restaurant n'a pas de correspondance
+finance est catégorisée d'après son libellé (règles de l'entité puis règles de base), et
+les transactions insérées sont rapprochées des lignes de relevé dans la même transaction.
+"""
 
 from __future__ import annotations
 
 import hashlib
+import logging
 import math
 import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
 
 from sqlalchemy import text
 
 from core.data_repository import get_engine, query_df
+from backend.services.finance.rules import rules_matcher
+from backend.services.finance.transactions import link_statement_lines
+from backend.services.finance_categorization import auto_categorize_many
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_JOB = "restaurant_depenses"
 
 
 def _slugify(value: str) -> str:
@@ -72,6 +98,46 @@ def _ensure_categories(engine, tenant_entity_map: Dict[int, int]) -> Dict[Tuple[
     return mapping
 
 
+def _auto_category_ids(conn, entity_id: int, labels: List[str]) -> List[int | None]:
+    """Catégorise des libellés de dépenses avec les règles de l'entité (DB puis base).
+
+    Une règle DB renvoie le nom de sa catégorie ; sinon le code de la taxonomie cible
+    est résolu parmi les ``finance_categories`` de l'entité.
+    """
+
+    if not labels:
+        return []
+    results = auto_categorize_many(["OUT"] * len(labels), labels, rules_matcher(entity_id))
+    rows = conn.execute(
+        text("SELECT id, code, name FROM finance_categories WHERE entity_id = :entity_id"),
+        {"entity_id": int(entity_id)},
+    ).fetchall()
+    by_name = {row.name: int(row.id) for row in rows}
+    by_code = {row.code: int(row.id) for row in rows}
+    return [by_name.get(source) or by_code.get(target) for source, target in results]
+
+
+def _auto_categories(
+    conn,
+    expenses: Iterable[Tuple[Any, Any, Any, Any]],
+    tenant_entity_map: Dict[int, int],
+    category_map: Dict[Tuple[int, int], int],
+) -> Dict[int, int]:
+    """Catégories déduites du libellé pour les dépenses ``(id, tenant_id, categorie_id, libelle)``
+    dont la catégorie restaurant n'a pas de correspondance finance."""
+
+    pending: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+    for depense_id, tenant_id, categorie_id, libelle in expenses:
+        entity_id = tenant_entity_map.get(int(tenant_id))
+        if entity_id and category_map.get((tenant_id, categorie_id)) is None:
+            pending[entity_id].append((int(depense_id), str(libelle or "")))
+    resolved: Dict[int, int] = {}
+    for entity_id, items in pending.items():
+        category_ids = _auto_category_ids(conn, entity_id, [label for _, label in items])
+        resolved.update({depense_id: cat for (depense_id, _), cat in zip(items, category_ids) if cat is not None})
+    return resolved
+
+
 def _ensure_cost_centers(engine, tenant_entity_map: Dict[int, int]) -> Dict[Tuple[int, int], int]:
     mapping: Dict[Tuple[int, int], int] = {}
     src = query_df(text("SELECT id, tenant_id, nom FROM restaurant_cost_centers"))
@@ -251,6 +317,7 @@ def _backfill_bank_statements(engine, tenant_entity_map, account_map) -> None:
     if rows.empty:
         return
     statement_cache: Dict[tuple[int, int, int], int] = {}
+    linked_accounts: set[int] = set()
     with engine.begin() as conn:
         for row in rows.itertuples():
             entity_id = tenant_entity_map.get(int(row.tenant_id))
@@ -311,6 +378,7 @@ def _backfill_bank_statements(engine, tenant_entity_map, account_map) -> None:
                     """
                     INSERT INTO finance_bank_statement_lines (
                         statement_id,
+                        account_id,
                         date_operation,
                         date_valeur,
                         libelle_banque,
@@ -321,6 +389,7 @@ def _backfill_bank_statements(engine, tenant_entity_map, account_map) -> None:
                         checksum
                     ) VALUES (
                         :statement_id,
+                        :account_id,
                         :date_operation,
                         :date_valeur,
                         :libelle_banque,
@@ -334,6 +403,7 @@ def _backfill_bank_statements(engine, tenant_entity_map, account_map) -> None:
                 ),
                 {
                     "statement_id": statement_id,
+                    "account_id": account_id,
                     "date_operation": row.date,
                     "date_valeur": row.date,
                     "libelle_banque": row.libelle,
@@ -342,6 +412,9 @@ def _backfill_bank_statements(engine, tenant_entity_map, account_map) -> None:
                     "checksum": checksum,
                 },
             )
+            linked_accounts.add(int(account_id))
+        for account_id in sorted(linked_accounts):
+            link_statement_lines(conn, account_id=account_id)
 
 
 def _backfill_transactions(engine, tenant_entity_map, category_map, cost_center_map, vendor_map, account_map) -> None:
@@ -374,12 +447,19 @@ def _backfill_transactions(engine, tenant_entity_map, category_map, cost_center_
         if r.depense_id and r.account:
             statement_account_map[int(r.depense_id)] = r.account
 
+    inserted_ids: List[int] = []
     with engine.begin() as conn:
+        auto_categories = _auto_categories(
+            conn,
+            rows[["id", "tenant_id", "categorie_id", "libelle"]].itertuples(index=False),
+            tenant_entity_map,
+            category_map,
+        )
         for row in rows.itertuples():
             entity_id = tenant_entity_map.get(int(row.tenant_id))
             if not entity_id:
                 continue
-            category_id = category_map.get((row.tenant_id, row.categorie_id))
+            category_id = category_map.get((row.tenant_id, row.categorie_id)) or auto_categories.get(int(row.id))
             cost_center_id = cost_center_map.get((row.tenant_id, row.cost_center_id))
             vendor_id = vendor_map.get((row.tenant_id, row.fournisseur_id))
 
@@ -493,14 +573,415 @@ def _backfill_transactions(engine, tenant_entity_map, category_map, cost_center_
                     "description": row.libelle,
                 },
             )
+            inserted_ids.append(int(tx_id))
+        link_statement_lines(conn, transaction_ids=inserted_ids)
+
+
+# --------------------------------------------------------------------------- mode ensembliste
+
+# Correspondances passées en tableaux (unnest) : pas de table temporaire à maintenir.
+_BULK_SOURCE_SQL = """
+    WITH cat_map AS (
+        SELECT * FROM unnest(CAST(:cat_src AS int[]), CAST(:cat_dst AS bigint[])) AS m(src_id, category_id)
+    ),
+    cc_map AS (
+        SELECT * FROM unnest(CAST(:cc_src AS int[]), CAST(:cc_dst AS bigint[])) AS m(src_id, cost_center_id)
+    ),
+    acc_map AS (
+        SELECT * FROM unnest(CAST(:acc_label AS text[]), CAST(:acc_dst AS bigint[])) AS m(label, account_id)
+    ),
+    auto_map AS (
+        SELECT * FROM unnest(CAST(:auto_src AS bigint[]), CAST(:auto_dst AS bigint[])) AS m(depense_id, category_id)
+    ),
+    chunk AS (
+        SELECT
+            d.id,
+            d.categorie_id,
+            d.cost_center_id,
+            d.libelle,
+            d.montant_ht,
+            d.tva_pct,
+            d.date_operation,
+            d.source,
+            d.ref_externe,
+            d.montant_ht * (1 + COALESCE(d.tva_pct, 0) / 100.0) AS montant_ttc
+        FROM restaurant_depenses d
+        WHERE d.tenant_id = :tenant_id
+          AND (d.id > :after_id OR d.id = ANY(CAST(:retry_ids AS bigint[])))
+        ORDER BY d.id
+        LIMIT :chunk_size
+    ),
+    mapped AS (
+        SELECT
+            c.*,
+            COALESCE(am.account_id, CAST(:fallback_account_id AS bigint)) AS account_id,
+            COALESCE(cm.category_id, au.category_id) AS category_id,
+            ccm.cost_center_id AS finance_cost_center_id
+        FROM chunk c
+        LEFT JOIN LATERAL (
+            SELECT s.account
+            FROM restaurant_bank_statements s
+            WHERE s.depense_id = c.id
+            ORDER BY s.id DESC
+            LIMIT 1
+        ) st ON TRUE
+        LEFT JOIN acc_map am ON am.label = st.account
+        LEFT JOIN cat_map cm ON cm.src_id = c.categorie_id
+        LEFT JOIN auto_map au ON au.depense_id = c.id
+        LEFT JOIN cc_map ccm ON ccm.src_id = c.cost_center_id
+    ),
+    eligible AS (
+        SELECT *
+        FROM mapped m
+        WHERE m.montant_ht IS NOT NULL
+          AND ABS(m.montant_ttc) > 1e-6
+          AND m.account_id IS NOT NULL
+          AND m.category_id IS NOT NULL
+    ),
+    -- Dépenses valides mais sans catégorie ou compte finance : gardées pour le passage
+    -- suivant (pending_ids), une fois la correspondance créée.
+    waiting AS (
+        SELECT m.id
+        FROM mapped m
+        WHERE m.montant_ht IS NOT NULL
+          AND ABS(m.montant_ttc) > 1e-6
+          AND (m.account_id IS NULL OR m.category_id IS NULL)
+    )
+"""
+
+_BULK_INSERT_SQL = _BULK_SOURCE_SQL + """
+    ,
+    numbered AS (
+        SELECT e.*, nextval(pg_get_serial_sequence('finance_transactions', 'id')) AS tx_id
+        FROM eligible e
+    ),
+    inserted AS (
+        INSERT INTO finance_transactions (
+            id, entity_id, account_id, counterparty_account_id, direction, source,
+            date_operation, date_value, amount, currency, ref_externe, note, status
+        )
+        SELECT
+            n.tx_id, :entity_id, n.account_id, NULL, 'OUT', COALESCE(n.source, 'MANUEL'),
+            n.date_operation, n.date_operation, n.montant_ttc, 'EUR', n.ref_externe, n.libelle, 'CONFIRMED'
+        FROM numbered n
+        ORDER BY n.date_operation, n.id
+        ON CONFLICT (ref_externe) DO NOTHING
+        RETURNING id
+    ),
+    lines AS (
+        INSERT INTO finance_transaction_lines (
+            transaction_id, category_id, cost_center_id, montant_ht, tva_pct, montant_ttc, description, position
+        )
+        SELECT n.tx_id, n.category_id, n.finance_cost_center_id, n.montant_ht, n.tva_pct, n.montant_ttc, n.libelle, 1
+        FROM numbered n
+        JOIN inserted i ON i.id = n.tx_id
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM chunk) AS scanned,
+        (SELECT MAX(id) FROM chunk) AS last_id,
+        (SELECT COUNT(*) FROM mapped WHERE category_id IS NULL) AS missing_category,
+        (SELECT array_agg(id) FROM waiting) AS waiting_ids,
+        (SELECT COUNT(*) FROM eligible) AS eligible,
+        (SELECT COUNT(*) FROM lines) AS inserted,
+        (SELECT array_agg(id) FROM inserted) AS transaction_ids
+"""
+
+# Dry-run : mêmes jointures, lecture seule. Une référence déjà présente (ou répétée
+# dans le lot) compte comme doublon, comme ``ON CONFLICT DO NOTHING``.
+_BULK_DRY_RUN_SQL = _BULK_SOURCE_SQL + """
+    SELECT
+        (SELECT COUNT(*) FROM chunk) AS scanned,
+        (SELECT MAX(id) FROM chunk) AS last_id,
+        (SELECT COUNT(*) FROM mapped WHERE category_id IS NULL) AS missing_category,
+        (SELECT array_agg(id) FROM waiting) AS waiting_ids,
+        (SELECT COUNT(*) FROM eligible) AS eligible,
+        (
+            SELECT COUNT(*) FILTER (WHERE e.ref_externe IS NULL)
+                 + COUNT(DISTINCT e.ref_externe) FILTER (
+                       WHERE e.ref_externe IS NOT NULL
+                         AND NOT EXISTS (SELECT 1 FROM finance_transactions t WHERE t.ref_externe = e.ref_externe)
+                   )
+            FROM eligible e
+        ) AS inserted
+"""
+
+# Dépenses du lot sans correspondance de catégorie : catégorisées en Python par le matcher.
+_UNMAPPED_CHUNK_SQL = """
+    SELECT c.id, c.tenant_id, c.categorie_id, c.libelle
+    FROM (
+        SELECT d.id, d.tenant_id, d.categorie_id, d.libelle
+        FROM restaurant_depenses d
+        WHERE d.tenant_id = :tenant_id
+          AND (d.id > :after_id OR d.id = ANY(CAST(:retry_ids AS bigint[])))
+        ORDER BY d.id
+        LIMIT :chunk_size
+    ) c
+    WHERE c.categorie_id IS NULL OR NOT (c.categorie_id = ANY(CAST(:cat_src AS int[])))
+"""
+
+_PROGRESS_SQL = """
+    SELECT last_id, pending_ids
+    FROM finance_backfill_progress
+    WHERE job = :job AND tenant_id = :tenant_id
+"""
+
+_PROGRESS_UPSERT_SQL = """
+    INSERT INTO finance_backfill_progress (job, tenant_id, last_id, rows_inserted, pending_ids, updated_at)
+    VALUES (:job, :tenant_id, :last_id, :inserted, CAST(:pending_ids AS bigint[]), now())
+    ON CONFLICT (job, tenant_id) DO UPDATE
+    SET last_id = EXCLUDED.last_id,
+        rows_inserted = finance_backfill_progress.rows_inserted + EXCLUDED.rows_inserted,
+        pending_ids = EXCLUDED.pending_ids,
+        updated_at = now()
+"""
+
+
+class _ConnectionEngine:
+    """Expose une connexion unique via ``begin()`` (étapes ``_ensure_*`` d'un dry-run)."""
+
+    def __init__(self, conn) -> None:
+        self._conn = conn
+
+    @contextmanager
+    def begin(self):
+        with self._conn.begin_nested():
+            yield self._conn
+
+
+def _map_params(
+    tenant_id: int,
+    category_map: Dict[Tuple[int, int], int],
+    cost_center_map: Dict[Tuple[int, int], int],
+    account_map: Dict[Tuple[int, str], int],
+) -> dict[str, list]:
+    cats = [(src, dst) for (tid, src), dst in category_map.items() if int(tid) == tenant_id]
+    centers = [(src, dst) for (tid, src), dst in cost_center_map.items() if int(tid) == tenant_id]
+    accounts = [(label, dst) for (tid, label), dst in account_map.items() if int(tid) == tenant_id]
+    return {
+        "cat_src": [int(src) for src, _ in cats],
+        "cat_dst": [int(dst) for _, dst in cats],
+        "cc_src": [int(src) for src, _ in centers],
+        "cc_dst": [int(dst) for _, dst in centers],
+        "acc_label": [str(label) for label, _ in accounts],
+        "acc_dst": [int(dst) for _, dst in accounts],
+    }
+
+
+def _fallback_account(conn, entity_id: int) -> int | None:
+    row = conn.execute(
+        text("SELECT id FROM finance_accounts WHERE entity_id = :entity_id ORDER BY id LIMIT 1"),
+        {"entity_id": entity_id},
+    ).fetchone()
+    return int(row.id) if row else None
+
+
+def _backfill_tenant_bulk(
+    engine,
+    tenant_id: int,
+    entity_id: int,
+    map_params: dict[str, list],
+    *,
+    chunk_size: int,
+    dry_run: bool,
+    reset: bool,
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    stats: dict[str, Any] = {
+        "entity_id": entity_id,
+        "chunks": 0,
+        "scanned": 0,
+        "eligible": 0,
+        "inserted": 0,
+        "missing_category": 0,
+    }
+    with engine.connect() as conn:
+        after_id = 0
+        retry_ids: list[int] = []
+        if not reset:
+            row = conn.execute(text(_PROGRESS_SQL), {"job": BACKFILL_JOB, "tenant_id": tenant_id}).fetchone()
+            if row:
+                after_id = int(row.last_id)
+                retry_ids = sorted(int(pid) for pid in row.pending_ids or [])
+        stats["resumed_from"] = after_id
+        stats["retried"] = len(retry_ids)
+        fallback_account_id = _fallback_account(conn, entity_id)
+        conn.rollback()
+
+        # Les dépenses en attente (ids < after_id) passent en tête du premier lot, triées
+        # avec les nouvelles ; celles qui manquent encore de correspondance y retournent.
+        waiting: list[int] = []
+        sql = text(_BULK_DRY_RUN_SQL if dry_run else _BULK_INSERT_SQL)
+        while True:
+            params = {
+                **map_params,
+                "tenant_id": tenant_id,
+                "entity_id": entity_id,
+                "after_id": after_id,
+                "retry_ids": retry_ids,
+                "chunk_size": chunk_size,
+                "fallback_account_id": fallback_account_id,
+            }
+            # Un lot et son point de reprise sont validés ensemble : une reprise ne rejoue rien.
+            with conn.begin():
+                unmapped = conn.execute(text(_UNMAPPED_CHUNK_SQL), params).fetchall()
+                auto = _auto_categories(conn, unmapped, {tenant_id: entity_id}, {})
+                params["auto_src"] = list(auto)
+                params["auto_dst"] = list(auto.values())
+                result = conn.execute(sql, params).one()
+                if not result.scanned:
+                    # Rien à lire : les ids encore en attente ont disparu de restaurant_depenses.
+                    retry_ids = []
+                    break
+                last_id = int(result.last_id)
+                after_id = max(after_id, last_id)
+                retry_ids = [pid for pid in retry_ids if pid > last_id]
+                waiting.extend(int(pid) for pid in result.waiting_ids or [])
+                if not dry_run:
+                    link_statement_lines(conn, transaction_ids=result.transaction_ids or [])
+                    conn.execute(
+                        text(_PROGRESS_UPSERT_SQL),
+                        {
+                            "job": BACKFILL_JOB,
+                            "tenant_id": tenant_id,
+                            "last_id": after_id,
+                            "inserted": int(result.inserted),
+                            "pending_ids": sorted(retry_ids + waiting),
+                        },
+                    )
+            stats["chunks"] += 1
+            for key in ("scanned", "eligible", "inserted", "missing_category"):
+                stats[key] += int(getattr(result, key))
+            if result.scanned < chunk_size:
+                break
+    stats["last_id"] = after_id
+    stats["waiting"] = len(retry_ids) + len(waiting)
+    if stats["waiting"]:
+        logger.warning(
+            "Backfill finance du tenant %s : %s dépense(s) en attente d'une catégorie ou d'un compte",
+            tenant_id,
+            stats["waiting"],
+        )
+    stats["skipped_duplicates"] = stats["eligible"] - stats["inserted"]
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def backfill_transactions_bulk(
+    engine,
+    tenant_entity_map: Dict[int, int],
+    category_map: Dict[Tuple[int, int], int],
+    cost_center_map: Dict[Tuple[int, int], int],
+    account_map: Dict[Tuple[int, str], int],
+    *,
+    tenants: Iterable[int] | None = None,
+    chunk_size: int = 5000,
+    workers: int = 4,
+    dry_run: bool = False,
+    reset: bool = False,
+) -> dict[int, dict[str, Any]]:
+    """Backfill ensembliste des dépenses, un thread (et une connexion) par tenant."""
+
+    selected = sorted(tenant_entity_map) if tenants is None else sorted({int(t) for t in tenants})
+    jobs = {tid: tenant_entity_map[tid] for tid in selected if tid in tenant_entity_map}
+    results: dict[int, dict[str, Any]] = {}
+    if not jobs:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(int(workers), len(jobs))), thread_name_prefix="backfill") as pool:
+        futures = {
+            tid: pool.submit(
+                _backfill_tenant_bulk,
+                engine,
+                tid,
+                entity_id,
+                _map_params(tid, category_map, cost_center_map, account_map),
+                chunk_size=max(1, int(chunk_size)),
+                dry_run=dry_run,
+                reset=reset,
+            )
+            for tid, entity_id in jobs.items()
+        }
+        for tid, future in futures.items():
+            try:
+                results[tid] = future.result()
+            except Exception as exc:
+                # Les lots déjà validés restent acquis : relancer reprend au point enregistré.
+                logger.error("Backfill finance du tenant %s interrompu: %s", tid, exc)
+                results[tid] = {"entity_id": jobs[tid], "error": str(exc)}
+    return results
+
+
+def run_backfill(
+    *,
+    bulk: bool = False,
+    tenants: Iterable[int] | None = None,
+    chunk_size: int = 5000,
+    workers: int = 4,
+    dry_run: bool = False,
+    reset: bool = False,
+) -> dict[str, Any] | None:
+    """Lance le backfill complet.
+
+    Sans ``bulk``, comportement historique (ligne à ligne, aucun rapport). En mode
+    ensembliste, retourne un rapport (volumes et durées par étape et par tenant).
+    ``dry_run`` annule les référentiels créés, n'importe pas les relevés et ne fait que
+    compter les dépenses à transférer ; ``reset`` ignore le point de reprise.
+    """
 
-
-def run_backfill() -> None:
     engine = get_engine()
     tenant_entity_map = _tenant_to_entity()
-    category_map = _ensure_categories(engine, tenant_entity_map)
-    cost_center_map = _ensure_cost_centers(engine, tenant_entity_map)
-    vendor_map = _ensure_vendors(engine, tenant_entity_map)
-    account_map = _ensure_accounts(engine, tenant_entity_map)
-    _backfill_bank_statements(engine, tenant_entity_map, account_map)
-    _backfill_transactions(engine, tenant_entity_map, category_map, cost_center_map, vendor_map, account_map)
+    if not bulk:
+        category_map = _ensure_categories(engine, tenant_entity_map)
+        cost_center_map = _ensure_cost_centers(engine, tenant_entity_map)
+        vendor_map = _ensure_vendors(engine, tenant_entity_map)
+        account_map = _ensure_accounts(engine, tenant_entity_map)
+        _backfill_bank_statements(engine, tenant_entity_map, account_map)
+        _backfill_transactions(engine, tenant_entity_map, category_map, cost_center_map, vendor_map, account_map)
+        return None
+
+    report: dict[str, Any] = {"dry_run": dry_run, "chunk_size": chunk_size, "timings": {}}
+    started = time.perf_counter()
+
+    def _dimensions(target) -> tuple[dict, dict, dict]:
+        step = time.perf_counter()
+        category_map = _ensure_categories(target, tenant_entity_map)
+        cost_center_map = _ensure_cost_centers(target, tenant_entity_map)
+        _ensure_vendors(target, tenant_entity_map)
+        account_map = _ensure_accounts(target, tenant_entity_map)
+        report["timings"]["dimensions"] = round(time.perf_counter() - step, 3)
+        return category_map, cost_center_map, account_map
+
+    if dry_run:
+        with engine.connect() as conn:
+            outer = conn.begin()
+            try:
+                category_map, cost_center_map, account_map = _dimensions(_ConnectionEngine(conn))
+            finally:
+                outer.rollback()
+        report["timings"]["bank_statements"] = None
+    else:
+        category_map, cost_center_map, account_map = _dimensions(engine)
+        step = time.perf_counter()
+        _backfill_bank_statements(engine, tenant_entity_map, account_map)
+        report["timings"]["bank_statements"] = round(time.perf_counter() - step, 3)
+
+    step = time.perf_counter()
+    report["tenants"] = backfill_transactions_bulk(
+        engine,
+        tenant_entity_map,
+        category_map,
+        cost_center_map,
+        account_map,
+        tenants=tenants,
+        chunk_size=chunk_size,
+        workers=workers,
+        dry_run=dry_run,
+        reset=reset,
+    )
+    report["timings"]["transactions"] = round(time.perf_counter() - step, 3)
+    report["timings"]["total"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+__all__ = ["BACKFILL_JOB", "backfill_transactions_bulk", "run_backfill"]
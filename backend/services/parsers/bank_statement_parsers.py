@@ -108,29 +108,31 @@ class LCLParser:
     def parse(cls, pdf_path: str | Path) -> ParsedStatement:
         """Parse un relevé LCL et retourne les transactions nettoyées."""
         pdf_path = Path(pdf_path)
+        return cls.parse_pages(extract_pages(pdf_path), str(pdf_path))
+
+    @classmethod
+    def parse_pages(cls, pages: list[str], source_file: str) -> ParsedStatement:
+        """Parse le texte déjà extrait d'un relevé LCL (une entrée par page)."""
         result = ParsedStatement(
             bank_type="LCL",
-            source_file=str(pdf_path),
+            source_file=source_file,
         )
 
-        with pdfplumber.open(pdf_path) as pdf:
-            all_text = []
-
-            for page_num, page in enumerate(pdf.pages, 1):
-                raw_text = page.extract_text() or ""
-                result.raw_pages.append(raw_text)
+        all_text = []
+        for page_num, raw_text in enumerate(pages, 1):
+            result.raw_pages.append(raw_text)
 
-                # Extraire les métadonnées de la première page
-                if page_num == 1:
-                    cls._extract_metadata(raw_text, result)
+            # Extraire les métadonnées de la première page
+            if page_num == 1:
+                cls._extract_metadata(raw_text, result)
 
-                # Nettoyer la page
-                cleaned = cls._clean_page(raw_text)
-                all_text.append(cleaned)
+            # Nettoyer la page
+            cleaned = cls._clean_page(raw_text)
+            all_text.append(cleaned)
 
-            # Parser toutes les transactions
-            full_text = "\n".join(all_text)
-            result.transactions = cls._parse_transactions(full_text, str(pdf_path))
+        # Parser toutes les transactions
+        full_text = "\n".join(all_text)
+        result.transactions = cls._parse_transactions(full_text, source_file)
 
         return result
 
@@ -321,26 +323,28 @@ class BNPParser:
     def parse(cls, pdf_path: str | Path) -> ParsedStatement:
         """Parse un relevé BNP et retourne les transactions nettoyées."""
         pdf_path = Path(pdf_path)
+        return cls.parse_pages(extract_pages(pdf_path), str(pdf_path))
+
+    @classmethod
+    def parse_pages(cls, pages: list[str], source_file: str) -> ParsedStatement:
+        """Parse le texte déjà extrait d'un relevé BNP (une entrée par page)."""
         result = ParsedStatement(
             bank_type="BNP",
-            source_file=str(pdf_path),
+            source_file=source_file,
         )
 
-        with pdfplumber.open(pdf_path) as pdf:
-            all_text = []
+        all_text = []
+        for page_num, raw_text in enumerate(pages, 1):
+            result.raw_pages.append(raw_text)
 
-            for page_num, page in enumerate(pdf.pages, 1):
-                raw_text = page.extract_text() or ""
-                result.raw_pages.append(raw_text)
+            if page_num == 1:
+                cls._extract_metadata(raw_text, result)
 
-                if page_num == 1:
-                    cls._extract_metadata(raw_text, result)
+            cleaned = cls._clean_page(raw_text)
+            all_text.append(cleaned)
 
-                cleaned = cls._clean_page(raw_text)
-                all_text.append(cleaned)
-
-            full_text = "\n".join(all_text)
-            result.transactions = cls._parse_transactions(full_text, str(pdf_path))
+        full_text = "\n".join(all_text)
+        result.transactions = cls._parse_transactions(full_text, source_file)
 
         return result
 
@@ -506,26 +510,28 @@ class SUMUPParser:
     def parse(cls, pdf_path: str | Path) -> ParsedStatement:
         """Parse un relevé SumUp et retourne les transactions nettoyées."""
         pdf_path = Path(pdf_path)
+        return cls.parse_pages(extract_pages(pdf_path), str(pdf_path))
+
+    @classmethod
+    def parse_pages(cls, pages: list[str], source_file: str) -> ParsedStatement:
+        """Parse le texte déjà extrait d'un relevé SumUp (une entrée par page)."""
         result = ParsedStatement(
             bank_type="SUMUP",
-            source_file=str(pdf_path),
+            source_file=source_file,
         )
 
-        with pdfplumber.open(pdf_path) as pdf:
-            all_text = []
+        all_text = []
+        for page_num, raw_text in enumerate(pages, 1):
+            result.raw_pages.append(raw_text)
 
-            for page_num, page in enumerate(pdf.pages, 1):
-                raw_text = page.extract_text() or ""
-                result.raw_pages.append(raw_text)
+            if page_num == 1:
+                cls._extract_metadata(raw_text, result)
 
-                if page_num == 1:
-                    cls._extract_metadata(raw_text, result)
+            cleaned = cls._clean_page(raw_text)
+            all_text.append(cleaned)
 
-                cleaned = cls._clean_page(raw_text)
-                all_text.append(cleaned)
-
-            full_text = "\n".join(all_text)
-            result.transactions = cls._parse_transactions(full_text, str(pdf_path))
+        full_text = "\n".join(all_text)
+        result.transactions = cls._parse_transactions(full_text, source_file)
 
         return result
 
@@ -642,30 +648,50 @@ class SUMUPParser:
 # =============================================================================
 
 
+PARSERS = {
+    "LCL": LCLParser,
+    "BNP": BNPParser,
+    "SUMUP": SUMUPParser,
+}
+
+
+def extract_pages(pdf_path: str | Path) -> list[str]:
+    """Extrait le texte brut de chaque page du PDF (une seule ouverture du fichier)."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+def detect_bank_type_from_text(first_page: str) -> str:
+    """Détecte le type de banque à partir du texte de la première page."""
+    if "CREDIT LYONNAIS" in first_page or "LCL" in first_page:
+        return "LCL"
+    elif "BNPPARIBAS" in first_page or "BNP PARIBAS" in first_page:
+        return "BNP"
+    elif "SumUp" in first_page or "SUMUP" in first_page:
+        return "SUMUP"
+    else:
+        return "UNKNOWN"
+
+
 def detect_bank_type(pdf_path: str | Path) -> str:
     """Détecte automatiquement le type de banque d'un relevé PDF."""
     with pdfplumber.open(pdf_path) as pdf:
         first_page = pdf.pages[0].extract_text() or ""
+    return detect_bank_type_from_text(first_page)
+
 
-        if "CREDIT LYONNAIS" in first_page or "LCL" in first_page:
-            return "LCL"
-        elif "BNPPARIBAS" in first_page or "BNP PARIBAS" in first_page:
-            return "BNP"
-        elif "SumUp" in first_page or "SUMUP" in first_page:
-            return "SUMUP"
-        else:
-            return "UNKNOWN"
+def parse_statement_pages(pages: list[str], source_file: str | Path) -> ParsedStatement:
+    """Détecte la banque et parse un relevé dont le texte est déjà extrait."""
+    bank_type = detect_bank_type_from_text(pages[0] if pages else "")
+    parser = PARSERS.get(bank_type)
+    if parser is None:
+        raise ValueError(f"Type de banque non reconnu pour {source_file}")
+    return parser.parse_pages(pages, str(source_file))
 
 
 def parse_statement(pdf_path: str | Path) -> ParsedStatement:
-    """Parse automatiquement un relevé en détectant son type."""
-    bank_type = detect_bank_type(pdf_path)
-
-    if bank_type == "LCL":
-        return LCLParser.parse(pdf_path)
-    elif bank_type == "BNP":
-        return BNPParser.parse(pdf_path)
-    elif bank_type == "SUMUP":
-        return SUMUPParser.parse(pdf_path)
-    else:
-        raise ValueError(f"Type de banque non reconnu pour {pdf_path}")
+    """Parse automatiquement un relevé en détectant son type.
+
+    Le texte du PDF n'est extrait qu'une fois : il sert à la détection puis au parsing.
+    """
+    return parse_statement_pages(extract_pages(pdf_path), Path(pdf_path))
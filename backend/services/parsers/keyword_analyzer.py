@@ -7,18 +7,21 @@ pour chaque catégorie parmi les 12 catégories définies.
 
 from __future__ import annotations
 
+import os
 import re
-from collections import Counter, defaultdict
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 from .bank_statement_parsers import (
     ParsedStatement,
     Transaction,
-    parse_statement,
     detect_bank_type,
 )
+from .statement_pipeline import parse_statements
 
 
 # =============================================================================
@@ -341,20 +344,66 @@ class AnalysisResult:
     all_keywords: Counter = field(default_factory=Counter)
 
 
+# Mots significatifs d'un libellé (statistiques des mots non catégorisés).
+_WORD_RE = re.compile(r"\b[A-Z]{3,}\b")
+
+# Nombre de libellés distincts mémorisés par analyseur (les relevés répètent beaucoup
+# les mêmes libellés : REMISE CB, PRLV URSSAF, ...).
+_SCAN_CACHE_SIZE = 65_536
+
+
 class KeywordAnalyzer:
-    """Analyseur de mots-clés pour catégoriser les transactions."""
+    """Analyseur de mots-clés pour catégoriser les transactions.
+
+    Tous les mots-clés de toutes les catégories sont fusionnés dans une seule regex
+    (alternance dans un lookahead, mots-clés les plus longs d'abord) : un seul passage
+    sur le libellé renvoie, à chaque position, le plus long mot-clé qui y commence. Les
+    mots-clés plus courts commençant à la même position en sont forcément des préfixes,
+    ils sont donc déduits sans autre recherche. Le résultat est identique à une recherche
+    séparée de chaque mot-clé.
+    """
 
-    def __init__(self):
-        self.categories = CATEGORIES
-        # Compiler les patterns pour performance
-        self._compiled_patterns: dict[str, list[tuple[re.Pattern, str]]] = {}
-        for cat_code, cat_info in self.categories.items():
-            patterns = []
-            for kw in cat_info["keywords"]:
-                # Créer un pattern insensible à la casse
-                pattern = re.compile(re.escape(kw), re.IGNORECASE)
-                patterns.append((pattern, kw))
-            self._compiled_patterns[cat_code] = patterns
+    def __init__(self, categories: dict[str, dict[str, Any]] | None = None):
+        self.categories = categories if categories is not None else CATEGORIES
+        self._category_codes = list(self.categories)
+
+        # Occurrences (rang catégorie, rang mot-clé, mot-clé d'origine) par mot-clé normalisé.
+        self._occurrences: dict[str, list[tuple[int, int, str]]] = {}
+        for cat_index, cat_info in enumerate(self.categories.values()):
+            for kw_index, kw in enumerate(cat_info["keywords"]):
+                self._occurrences.setdefault(kw.upper(), []).append((cat_index, kw_index, kw))
+
+        keywords = sorted(self._occurrences, key=len, reverse=True)
+        self._pattern = (
+            re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))") if keywords else None
+        )
+        # Mots-clés impliqués par une correspondance (lui-même + ses préfixes).
+        self._implied: dict[str, tuple[str, ...]] = {
+            kw: tuple(other for other in keywords if kw.startswith(other)) for kw in keywords
+        }
+        self._scan = lru_cache(maxsize=_SCAN_CACHE_SIZE)(self._scan_label)
+
+    def _scan_label(self, label: str) -> tuple[tuple[str, ...], str | None, tuple[str, ...]]:
+        """Analyse un libellé : (mots significatifs, catégorie, mots-clés trouvés)."""
+        text = label.upper()
+        words = tuple(_WORD_RE.findall(text))
+        if self._pattern is None:
+            return words, None, ()
+
+        found: set[str] = set()
+        for match in self._pattern.finditer(text):
+            found.update(self._implied[match.group(1)])
+        if not found:
+            return words, None, ()
+
+        hits = sorted(occurrence for kw in found for occurrence in self._occurrences[kw])
+        per_category: dict[int, list[str]] = {}
+        for cat_index, _kw_index, kw in hits:
+            per_category.setdefault(cat_index, []).append(kw)
+
+        # Prendre la catégorie avec le plus de correspondances (la première en cas d'égalité)
+        best_index = max(per_category, key=lambda c: len(per_category[c]))
+        return words, self._category_codes[best_index], tuple(per_category[best_index])
 
     def analyze_transaction(
         self, transaction: Transaction
@@ -365,42 +414,29 @@ class KeywordAnalyzer:
         Returns:
             (category_code, [matched_keywords]) ou (None, []) si non catégorisé
         """
-        text = transaction.libelle.upper()
-        matches: dict[str, list[str]] = defaultdict(list)
-
-        for cat_code, patterns in self._compiled_patterns.items():
-            for pattern, keyword in patterns:
-                if pattern.search(text):
-                    matches[cat_code].append(keyword)
-
-        if not matches:
-            return None, []
-
-        # Prendre la catégorie avec le plus de correspondances
-        best_cat = max(matches.keys(), key=lambda c: len(matches[c]))
-        return best_cat, matches[best_cat]
+        _words, cat_code, keywords = self._scan(transaction.libelle)
+        return cat_code, list(keywords)
 
-    def analyze_statement(self, statement: ParsedStatement) -> AnalysisResult:
-        """Analyse un relevé complet et retourne les statistiques."""
-        result = AnalysisResult(source_files=[statement.source_file])
-
-        # Initialiser les stats par catégorie
+    def _empty_result(self) -> AnalysisResult:
+        result = AnalysisResult()
         for cat_code, cat_info in self.categories.items():
             result.categories[cat_code] = CategoryStats(
                 code=cat_code,
                 name=cat_info["name"],
             )
+        return result
+
+    def analyze_statement(self, statement: ParsedStatement) -> AnalysisResult:
+        """Analyse un relevé complet et retourne les statistiques."""
+        result = self._empty_result()
+        result.source_files.append(statement.source_file)
 
         for tx in statement.transactions:
             result.total_transactions += 1
 
-            # Extraire tous les mots significatifs du libellé
-            words = re.findall(r"\b[A-Z]{3,}\b", tx.libelle.upper())
-            for word in words:
-                result.all_keywords[word] += 1
-
-            # Catégoriser
-            cat_code, keywords = self.analyze_transaction(tx)
+            # Mots significatifs et catégorie issus du même passage sur le libellé
+            words, cat_code, keywords = self._scan(tx.libelle)
+            result.all_keywords.update(words)
 
             if cat_code:
                 result.categorized_transactions += 1
@@ -422,52 +458,80 @@ class KeywordAnalyzer:
             else:
                 result.uncategorized_transactions += 1
                 # Compter les mots non catégorisés
-                for word in words:
-                    result.uncategorized_keywords[word] += 1
+                result.uncategorized_keywords.update(words)
 
         return result
 
+    @staticmethod
+    def _merge(combined: AnalysisResult, result: AnalysisResult) -> None:
+        """Fusionne le résultat d'un relevé dans le résultat agrégé."""
+        combined.total_transactions += result.total_transactions
+        combined.categorized_transactions += result.categorized_transactions
+        combined.uncategorized_transactions += result.uncategorized_transactions
+
+        # Fusionner les stats par catégorie
+        for cat_code, stats in result.categories.items():
+            combined_stats = combined.categories[cat_code]
+            combined_stats.transaction_count += stats.transaction_count
+            combined_stats.total_matches += stats.total_matches
+            combined_stats.total_debit += stats.total_debit
+            combined_stats.total_credit += stats.total_credit
+
+            for kw, count in stats.keyword_counts.items():
+                combined_stats.keyword_counts[kw] = (
+                    combined_stats.keyword_counts.get(kw, 0) + count
+                )
+
+            combined_stats.examples.extend(stats.examples[:3])
+
+        # Fusionner les compteurs
+        combined.all_keywords.update(result.all_keywords)
+        combined.uncategorized_keywords.update(result.uncategorized_keywords)
+
     def analyze_multiple_statements(
-        self, statements: list[ParsedStatement]
+        self,
+        statements: list[ParsedStatement],
+        *,
+        workers: int | None = None,
     ) -> AnalysisResult:
-        """Analyse plusieurs relevés et agrège les résultats."""
-        combined = AnalysisResult()
+        """Analyse plusieurs relevés et agrège les résultats.
 
-        # Initialiser les stats
-        for cat_code, cat_info in self.categories.items():
-            combined.categories[cat_code] = CategoryStats(
-                code=cat_code,
-                name=cat_info["name"],
-            )
+        Args:
+            statements: Relevés déjà parsés
+            workers: Nombre de processus d'analyse (None = nombre de CPU, 1 = séquentiel)
+        """
+        combined = self._empty_result()
+        combined.source_files.extend(statement.source_file for statement in statements)
+
+        max_workers = min(workers or os.cpu_count() or 1, len(statements))
+        if max_workers <= 1:
+            results = [self.analyze_statement(statement) for statement in statements]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker_analyzer,
+                initargs=(self.categories,),
+            ) as executor:
+                # map() conserve l'ordre des relevés : la fusion reste déterministe.
+                results = list(executor.map(_analyze_statement_in_worker, statements))
+
+        for result in results:
+            self._merge(combined, result)
 
-        for statement in statements:
-            combined.source_files.append(statement.source_file)
-            result = self.analyze_statement(statement)
+        return combined
 
-            combined.total_transactions += result.total_transactions
-            combined.categorized_transactions += result.categorized_transactions
-            combined.uncategorized_transactions += result.uncategorized_transactions
 
-            # Fusionner les stats par catégorie
-            for cat_code, stats in result.categories.items():
-                combined_stats = combined.categories[cat_code]
-                combined_stats.transaction_count += stats.transaction_count
-                combined_stats.total_matches += stats.total_matches
-                combined_stats.total_debit += stats.total_debit
-                combined_stats.total_credit += stats.total_credit
+_WORKER_ANALYZER: KeywordAnalyzer | None = None
 
-                for kw, count in stats.keyword_counts.items():
-                    combined_stats.keyword_counts[kw] = (
-                        combined_stats.keyword_counts.get(kw, 0) + count
-                    )
 
-                combined_stats.examples.extend(stats.examples[:3])
+def _init_worker_analyzer(categories: dict[str, dict[str, Any]]) -> None:
+    global _WORKER_ANALYZER
+    _WORKER_ANALYZER = KeywordAnalyzer(categories)
 
-            # Fusionner les compteurs
-            combined.all_keywords.update(result.all_keywords)
-            combined.uncategorized_keywords.update(result.uncategorized_keywords)
 
-        return combined
+def _analyze_statement_in_worker(statement: ParsedStatement) -> AnalysisResult:
+    assert _WORKER_ANALYZER is not None
+    return _WORKER_ANALYZER.analyze_statement(statement)
 
 
 def analyze_releve_folder(folder_path: str | Path) -> AnalysisResult:
@@ -484,13 +548,13 @@ def analyze_releve_folder(folder_path: str | Path) -> AnalysisResult:
     pdf_files = list(folder.glob("*.pdf"))
 
     statements = []
-    for pdf_file in pdf_files:
-        try:
-            statement = parse_statement(pdf_file)
-            statements.append(statement)
-            print(f"✓ Parsé: {pdf_file.name} ({len(statement.transactions)} transactions)")
-        except Exception as e:
-            print(f"✗ Erreur {pdf_file.name}: {e}")
+    for parsed in parse_statements(pdf_files):
+        if parsed.statement is None:
+            print(f"✗ Erreur {parsed.path.name}: {parsed.error}")
+            continue
+        statements.append(parsed.statement)
+        origin = " (cache)" if parsed.cached else ""
+        print(f"✓ Parsé: {parsed.path.name} ({len(parsed.statement.transactions)} transactions){origin}")
 
     analyzer = KeywordAnalyzer()
     return analyzer.analyze_multiple_statements(statements)
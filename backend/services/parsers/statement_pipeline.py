@@ -0,0 +1,240 @@
+"""
+Pipeline de parsing des relevés PDF : parallèle et mis en cache sur disque.
+
+Chaque PDF n'est lu qu'une fois (le texte extrait sert à la détection de la banque
+puis au parsing), les fichiers sont répartis sur un pool de processus et le résultat
+est conservé dans un cache disque indexé par l'empreinte SHA-256 du contenu : un
+relevé inchangé n'est jamais re-parsé, même s'il a été renommé ou déplacé.
+
+Les entrées sont du JSON (aucun code exécuté à la relecture) et le répertoire doit
+appartenir à l'utilisateur courant sans droits pour les autres, sinon le cache est ignoré.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import stat
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterable
+
+from .bank_statement_parsers import ParsedStatement, Transaction, extract_pages, parse_statement_pages
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter dès qu'un parseur change de comportement : invalide le cache existant.
+PARSER_CACHE_VERSION = 2
+
+# Un répertoire par utilisateur : le répertoire temporaire système est partagé.
+_DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / f"epicerie-statement-cache-{getattr(os, 'getuid', lambda: 'user')()}"
+
+
+@dataclass
+class StatementParseResult:
+    """Résultat du pipeline pour un fichier : relevé parsé ou message d'erreur."""
+
+    path: Path
+    statement: ParsedStatement | None = None
+    error: str | None = None
+    cached: bool = False
+
+
+def content_hash(data: bytes) -> str:
+    """Empreinte SHA-256 du contenu d'un PDF."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _statement_to_json(statement: ParsedStatement) -> dict[str, Any]:
+    payload = asdict(statement)
+    for tx in payload["transactions"]:
+        for key in ("debit", "credit"):
+            if tx[key] is not None:
+                tx[key] = str(tx[key])
+    return payload
+
+
+def _statement_from_json(payload: dict[str, Any]) -> ParsedStatement:
+    transactions = []
+    for tx in payload.pop("transactions", []):
+        for key in ("debit", "credit"):
+            if tx.get(key) is not None:
+                tx[key] = Decimal(tx[key])
+        transactions.append(Transaction(**tx))
+    return ParsedStatement(**payload, transactions=transactions)
+
+
+def _is_private_directory(directory: Path) -> bool:
+    """Crée le répertoire en 0700 et vérifie qu'il n'est ni partagé ni détourné (lien)."""
+    try:
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        info = os.lstat(directory)
+    except OSError as exc:
+        logger.warning("Cache des relevés indisponible (%s): %s", directory, exc)
+        return False
+    if not stat.S_ISDIR(info.st_mode):
+        logger.warning("Cache des relevés ignoré : %s n'est pas un répertoire", directory)
+        return False
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        logger.warning("Cache des relevés ignoré : %s appartient à un autre utilisateur", directory)
+        return False
+    if info.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+        logger.warning("Cache des relevés ignoré : %s est accessible aux autres utilisateurs", directory)
+        return False
+    return True
+
+
+class StatementCache:
+    """Cache disque des relevés parsés (un fichier JSON par empreinte de contenu)."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self._usable: bool | None = None
+
+    @property
+    def usable(self) -> bool:
+        if self._usable is None:
+            self._usable = _is_private_directory(self.directory)
+        return self._usable
+
+    def _entry_path(self, digest: str) -> Path:
+        return self.directory / f"v{PARSER_CACHE_VERSION}" / digest[:2] / f"{digest}.json"
+
+    def get(self, digest: str) -> ParsedStatement | None:
+        if not self.usable:
+            return None
+        entry = self._entry_path(digest)
+        try:
+            with entry.open("r", encoding="utf-8") as handle:
+                return _statement_from_json(json.load(handle))
+        except FileNotFoundError:
+            return None
+        except Exception as exc:  # entrée tronquée ou illisible : on re-parse
+            logger.warning("Entrée de cache illisible %s: %s", entry, exc)
+            return None
+
+    def put(self, digest: str, statement: ParsedStatement) -> None:
+        if not self.usable:
+            return
+        entry = self._entry_path(digest)
+        entry.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # Écriture atomique : plusieurs processus peuvent produire la même entrée.
+        fd, tmp_name = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(_statement_to_json(statement), handle, ensure_ascii=False)
+            os.replace(tmp_name, entry)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+
+def default_cache() -> StatementCache | None:
+    """Cache configuré via ``BANK_STATEMENT_CACHE_DIR`` (vide ou ``off`` pour désactiver)."""
+    directory = os.getenv("BANK_STATEMENT_CACHE_DIR")
+    if directory is None:
+        return StatementCache(_DEFAULT_CACHE_DIR)
+    directory = directory.strip()
+    if not directory or directory.lower() in {"0", "false", "no", "off"}:
+        return None
+    return StatementCache(directory)
+
+
+def _parse_pdf_bytes(path: Path, data: bytes) -> ParsedStatement:
+    return parse_statement_pages(extract_pages(io.BytesIO(data)), path)
+
+
+def _parse_in_worker(path: Path, data: bytes) -> tuple[ParsedStatement | None, str | None]:
+    try:
+        return _parse_pdf_bytes(path, data), None
+    except Exception as exc:
+        return None, str(exc)
+
+
+def parse_statements(
+    pdf_paths: Iterable[str | Path],
+    *,
+    workers: int | None = None,
+    cache: StatementCache | None | bool = True,
+) -> list[StatementParseResult]:
+    """
+    Parse une liste de relevés PDF en parallèle, en s'appuyant sur le cache disque.
+
+    Args:
+        pdf_paths: Fichiers à parser (l'ordre est conservé dans le résultat)
+        workers: Taille du pool de processus (``1`` force le mode séquentiel)
+        cache: ``True`` pour le cache par défaut, ``False``/``None`` pour le désactiver
+
+    Returns:
+        Un StatementParseResult par fichier ; les erreurs de parsing n'interrompent pas le lot.
+    """
+    if cache is True:
+        cache = default_cache()
+    elif cache is False:
+        cache = None
+
+    results: list[StatementParseResult] = []
+    pending: list[tuple[StatementParseResult, str, bytes]] = []
+    for raw_path in pdf_paths:
+        path = Path(raw_path)
+        result = StatementParseResult(path=path)
+        results.append(result)
+        try:
+            data = path.read_bytes()
+        except OSError as exc:
+            result.error = str(exc)
+            continue
+        digest = content_hash(data)
+        cached = cache.get(digest) if cache is not None else None
+        if cached is not None:
+            # Le même contenu peut provenir d'un autre chemin : on rattache le fichier courant.
+            cached.source_file = str(path)
+            for tx in cached.transactions:
+                tx.source_file = str(path)
+            result.statement = cached
+            result.cached = True
+            continue
+        pending.append((result, digest, data))
+
+    if not pending:
+        return results
+
+    max_workers = workers if workers is not None else min(len(pending), os.cpu_count() or 1)
+    if max_workers <= 1 or len(pending) == 1:
+        outcomes = [_parse_in_worker(result.path, data) for result, _, data in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(
+                executor.map(
+                    _parse_in_worker,
+                    [result.path for result, _, _ in pending],
+                    [data for _, _, data in pending],
+                )
+            )
+
+    for (result, digest, _), (statement, error) in zip(pending, outcomes):
+        result.statement = statement
+        result.error = error
+        if statement is not None and cache is not None:
+            try:
+                cache.put(digest, statement)
+            except OSError as exc:
+                logger.warning("Impossible d'écrire le cache pour %s: %s", result.path, exc)
+
+    return results
+
+
+__all__ = [
+    "PARSER_CACHE_VERSION",
+    "StatementCache",
+    "StatementParseResult",
+    "content_hash",
+    "default_cache",
+    "parse_statements",
+]
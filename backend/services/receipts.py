@@ -0,0 +1,138 @@
+"""Rendu asynchrone et cache des tickets de caisse PDF.
+
+Le checkout enregistre la vente puis confie le rendu du ticket à un pool de threads :
+la réponse HTTP ne contient plus qu'un identifiant de ticket, servi ensuite par
+``GET /pos/receipts/{receipt_id}`` depuis un cache LRU borné avec expiration (TTL).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+ReceiptRenderer = Callable[[], dict]
+
+
+class ReceiptNotFoundError(LookupError):
+    """Ticket inconnu ou expiré."""
+
+
+class ReceiptPendingError(RuntimeError):
+    """Ticket encore en cours de génération."""
+
+
+@dataclass
+class _ReceiptEntry:
+    filename: str
+    tenant_id: int
+    expires_at: float
+    future: Future
+
+
+class ReceiptStore:
+    """Cache LRU + TTL des tickets, alimenté par un pool de rendu en arrière-plan."""
+
+    def __init__(self, *, max_entries: int = 512, ttl_seconds: float = 900.0, workers: int = 2) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: OrderedDict[str, _ReceiptEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="receipt")
+
+    def submit(self, render: ReceiptRenderer, *, filename: str, tenant_id: int) -> str:
+        """Planifie le rendu d'un ticket et retourne son identifiant."""
+
+        receipt_id = uuid.uuid4().hex
+        future = self._executor.submit(render)
+        future.add_done_callback(_log_render_failure)
+        entry = _ReceiptEntry(
+            filename=filename,
+            tenant_id=int(tenant_id),
+            expires_at=time.monotonic() + self.ttl_seconds,
+            future=future,
+        )
+        with self._lock:
+            self._entries[receipt_id] = entry
+            self._evict(time.monotonic())
+        return receipt_id
+
+    def get(self, receipt_id: str, *, tenant_id: int, timeout: float | None = 5.0) -> tuple[str, bytes]:
+        """Retourne ``(filename, contenu PDF)`` en attendant au plus ``timeout`` secondes."""
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(receipt_id)
+            if entry is None or entry.tenant_id != int(tenant_id):
+                raise ReceiptNotFoundError(receipt_id)
+            if entry.expires_at <= now:
+                del self._entries[receipt_id]
+                raise ReceiptNotFoundError(receipt_id)
+            self._entries.move_to_end(receipt_id)
+
+        try:
+            receipt = entry.future.result(timeout=timeout)
+        except FutureTimeoutError as exc:
+            raise ReceiptPendingError(receipt_id) from exc
+        content = receipt.get("content") if isinstance(receipt, dict) else None
+        if not isinstance(content, (bytes, bytearray)):
+            raise ReceiptNotFoundError(receipt_id)
+        return entry.filename, bytes(content)
+
+    def _evict(self, now: float) -> None:
+        # Les entrées sont ordonnées par dernier accès, pas par expiration (``get`` déplace
+        # en fin sans prolonger le TTL) : on purge d'abord toutes les expirées, puis on
+        # retire les moins récemment consultées tant que la capacité est dépassée.
+        expired = [receipt_id for receipt_id, entry in self._entries.items() if entry.expires_at <= now]
+        for receipt_id in expired:
+            del self._entries[receipt_id]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _log_render_failure(future: Future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Échec du rendu du ticket de caisse: %s", exc)
+
+
+_STORE: ReceiptStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_receipt_store() -> ReceiptStore:
+    """Retourne le store partagé du processus (configuré via l'environnement)."""
+
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = ReceiptStore(
+                    max_entries=int(os.getenv("POS_RECEIPT_CACHE_SIZE", "512")),
+                    ttl_seconds=float(os.getenv("POS_RECEIPT_TTL_SECONDS", "900")),
+                    workers=int(os.getenv("POS_RECEIPT_WORKERS", "2")),
+                )
+    return _STORE
+
+
+__all__ = [
+    "ReceiptNotFoundError",
+    "ReceiptPendingError",
+    "ReceiptStore",
+    "get_receipt_store",
+]
@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
+import csv
+import io
 from dataclasses import dataclass
-from typing import Any, Dict, Tuple
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, Sequence, Tuple
 
 from pandas import DataFrame
+from sqlalchemy import text
 
-from core.data_repository import query_df
+from core.data_repository import get_engine, query_df
 
 
 def _as_records(df: DataFrame) -> list[dict[str, Any]]:
@@ -347,7 +352,228 @@ def export_dataset(report_type: str, limit: int, *, tenant_id: int) -> Tuple[str
     return definition.filename, csv_payload
 
 
+# --- Exports en flux (mémoire constante) ---
+
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrows", "application/vnd.apache.arrow.stream"),
+}
+
+_STREAM_BATCH_ROWS = 5_000
+
+
+class ExportFormatUnavailableError(RuntimeError):
+    """Format colonnaire demandé alors que pyarrow n'est pas installé."""
+
+
+@dataclass(frozen=True)
+class DatasetStream:
+    """Export prêt à être servi : nom de fichier, type MIME et générateur de blocs."""
+
+    filename: str
+    media_type: str
+    chunks: Iterator[bytes]
+
+
+def _iter_dataset_batches(
+    definition: ReportExport,
+    *,
+    tenant_id: int,
+    limit: int | None,
+    batch_rows: int,
+) -> Iterator[tuple[Sequence[str], Sequence[Any], list[Sequence[Any]]]]:
+    """Parcourt le jeu de données par lots via un curseur serveur.
+
+    Produit ``(colonnes, type_codes, lignes)`` pour chaque lot ; ``limit=None`` exporte
+    tout l'historique (``LIMIT NULL`` côté PostgreSQL).
+    """
+
+    params = {"limit": limit, "tenant_id": int(tenant_id)}
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_rows).execute(
+            text(definition.sql), params
+        )
+        try:
+            columns = list(result.keys())
+            description = getattr(result.cursor, "description", None) or []
+            type_codes = [getattr(col, "type_code", None) for col in description] or [None] * len(columns)
+            emitted = False
+            for partition in result.partitions(batch_rows):
+                emitted = True
+                yield columns, type_codes, [tuple(row) for row in partition]
+            if not emitted:
+                yield columns, type_codes, []
+        finally:
+            result.close()
+
+
+def _iter_csv_chunks(batches: Iterator[tuple[Sequence[str], Sequence[Any], list[Sequence[Any]]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    for columns, _, rows in batches:
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+# OID PostgreSQL -> type Arrow. Les NUMERIC sont exportés en float64 (usage analytique) ;
+# les types non listés sont sérialisés en texte.
+_ARROW_TYPE_BY_OID = {
+    16: "bool",
+    20: "int64",
+    21: "int64",
+    23: "int64",
+    700: "float64",
+    701: "float64",
+    1700: "float64",
+    1082: "date32",
+    1114: "timestamp",
+    1184: "timestamptz",
+}
+
+
+def _arrow_field(pa: Any, name: str, type_code: Any) -> Any:
+    kind = _ARROW_TYPE_BY_OID.get(type_code, "string")
+    if kind == "timestamp":
+        return pa.field(name, pa.timestamp("us"))
+    if kind == "timestamptz":
+        return pa.field(name, pa.timestamp("us", tz="UTC"))
+    return pa.field(name, getattr(pa, kind)())
+
+
+def _arrow_value(value: Any, arrow_type: Any, pa: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return float(value)
+    if pa.types.is_string(arrow_type) and not isinstance(value, str):
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return str(value)
+    return value
+
+
+class _ChunkSink(io.RawIOBase):
+    """Sortie binaire qui accumule les octets écrits jusqu'à leur consommation.
+
+    ``tell()`` reflète le total écrit : le pied de page Parquet y lit ses offsets.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        payload = b"".join(self._parts)
+        self._parts.clear()
+        return payload
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow as pa  # type: ignore
+    except ImportError as exc:  # pragma: no cover - dépend de l'environnement
+        raise ExportFormatUnavailableError("Export colonnaire indisponible : installez pyarrow.") from exc
+    return pa
+
+
+def _iter_arrow_chunks(
+    batches: Iterator[tuple[Sequence[str], Sequence[Any], list[Sequence[Any]]]],
+    *,
+    fmt: str,
+    pa: Any,
+) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    writer = None
+    schema = None
+    try:
+        for columns, type_codes, rows in batches:
+            if writer is None:
+                schema = pa.schema([_arrow_field(pa, name, code) for name, code in zip(columns, type_codes)])
+                if fmt == "parquet":
+                    import pyarrow.parquet as pq  # type: ignore
+
+                    writer = pq.ParquetWriter(sink, schema)
+                else:
+                    writer = pa.ipc.new_stream(sink, schema)
+            arrays = [
+                pa.array([_arrow_value(row[idx], field.type, pa) for row in rows], type=field.type)
+                for idx, field in enumerate(schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        if writer is not None:
+            writer.close()
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+def stream_dataset(
+    report_type: str,
+    *,
+    tenant_id: int,
+    limit: int | None = 5000,
+    fmt: str = "csv",
+    batch_rows: int = _STREAM_BATCH_ROWS,
+) -> DatasetStream:
+    """Prépare l'export en flux d'un jeu ``EXPORT_DEFINITIONS``.
+
+    Les lignes sont lues par lots depuis un curseur serveur et converties au fil de
+    l'eau (CSV, Parquet ou flux Arrow IPC) : la mémoire reste bornée par ``batch_rows``
+    quelle que soit la taille de l'export, ce qui permet ``limit=None`` (historique complet).
+    La requête n'est exécutée qu'à la consommation de ``chunks``.
+    """
+
+    definition = EXPORT_DEFINITIONS.get(report_type)
+    if definition is None:
+        raise ValueError(f"Rapport inconnu: {report_type}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu: {fmt}")
+    safe_limit = None if limit is None else max(10, int(limit))
+    batches = _iter_dataset_batches(
+        definition,
+        tenant_id=tenant_id,
+        limit=safe_limit,
+        batch_rows=max(1, int(batch_rows)),
+    )
+
+    extension, media_type = EXPORT_FORMATS[fmt]
+    filename = definition.filename.rsplit(".", 1)[0] + extension
+    if fmt == "csv":
+        chunks = _iter_csv_chunks(batches)
+    else:
+        chunks = _iter_arrow_chunks(batches, fmt=fmt, pa=_import_pyarrow())
+    return DatasetStream(filename=filename, media_type=media_type, chunks=chunks)
+
+
 __all__ = [
+    "DatasetStream",
+    "EXPORT_FORMATS",
+    "ExportFormatUnavailableError",
     "build_overview",
     "export_dataset",
+    "stream_dataset",
 ]
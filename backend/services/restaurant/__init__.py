@@ -59,6 +59,7 @@ from backend.services.restaurant.bank_statements import (
     create_bank_statement,
     update_bank_statement,
     import_bank_statements_from_pdf,
+    insert_bank_statements_bulk,
     create_expense_from_bank_statement,
     get_bank_statement_summary,
     transfer_from_epicerie,
@@ -119,6 +120,7 @@ __all__ = [
     "create_bank_statement",
     "update_bank_statement",
     "import_bank_statements_from_pdf",
+    "insert_bank_statements_bulk",
     "create_expense_from_bank_statement",
     "get_bank_statement_summary",
     "transfer_from_epicerie",
@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
-from collections import OrderedDict, defaultdict
+import os
+import threading
+import time
+from collections import defaultdict
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import pandas as pd
 from sqlalchemy import text
@@ -18,6 +21,7 @@ from backend.services.restaurant.utils import (
     _resolve_group_name,
     _ensure_depense_category,
 )
+from backend.services.ingestion_jobs import get_job_manager
 from backend.services.restaurant.pdf_parser import parse_bank_statement_pdf
 from backend.services.restaurant.expenses import get_expense_detail
 
@@ -42,9 +46,7 @@ def list_bank_statements(tenant_id: int, account: str | None = None) -> List[dic
         JOIN finance_transactions t ON t.id = tl.transaction_id
         JOIN finance_accounts a ON a.id = t.account_id
         LEFT JOIN finance_categories c ON c.id = tl.category_id
-        LEFT JOIN finance_bank_statement_lines b
-          ON t.ref_externe LIKE 'stmtline:%'
-         AND b.id = CAST(substring(t.ref_externe FROM 'stmtline:(\\d+)') AS BIGINT)
+        LEFT JOIN finance_bank_statement_lines b ON b.id = t.statement_line_id
         WHERE t.entity_id = :entity_id
           AND t.status = 'CONFIRMED'
           AND t.direction IN ('IN', 'OUT')
@@ -180,45 +182,59 @@ def update_bank_statement(tenant_id: int, entry_id: int, payload: dict[str, Any]
     return dict(row._mapping)
 
 
-def import_bank_statements_from_pdf(tenant_id: int, account: str, pdf_bytes: bytes) -> dict[str, int]:
-    """Parse a PDF statement and insert new operations for the given account."""
-    entries = parse_bank_statement_pdf(pdf_bytes)
-    if not entries:
-        return {"inserted": 0, "total": 0}
+_BULK_IMPORT_CHUNK = 5000
 
+# Une requête par lot : lignes passées en tableaux (unnest), doublons écartés par
+# uq_restaurant_bank_statements_entry (tenant, compte, date, md5(libellé), montant).
+_BULK_INSERT_SQL = """
+    INSERT INTO restaurant_bank_statements (
+        tenant_id, account, date, libelle, categorie, montant, type, mois, source
+    )
+    SELECT :tenant, :account, r.date, r.libelle, r.categorie, r.montant, r.type, r.mois, r.source
+    FROM unnest(
+        CAST(:dates AS date[]),
+        CAST(:libelles AS text[]),
+        CAST(:categories AS text[]),
+        CAST(:montants AS numeric[]),
+        CAST(:types AS text[]),
+        CAST(:mois AS text[]),
+        CAST(:sources AS text[])
+    ) AS r(date, libelle, categorie, montant, type, mois, source)
+    ON CONFLICT DO NOTHING
+    RETURNING id
+"""
+
+
+def insert_bank_statements_bulk(tenant_id: int, account: str, entries: List[dict[str, Any]]) -> dict[str, int]:
+    """Insert parsed statement lines in one statement per chunk, skipping known lines."""
     inserted = 0
     with get_engine().begin() as conn:
-        for entry in entries:
-            params = {
-                "tenant": tenant_id,
-                "account": account,
-                "date": entry["date"],
-                "libelle": entry["libelle"],
-                "categorie": entry.get("categorie"),
-                "montant": entry["montant"],
-                "type": entry["type"],
-                "mois": entry["mois"],
-                "source": entry.get("source", "pdf"),
-            }
-            row = conn.execute(
-                text(
-                    """
-                    INSERT INTO restaurant_bank_statements (
-                        tenant_id, account, date, libelle, categorie,
-                        montant, type, mois, source
-                    ) VALUES (
-                        :tenant, :account, :date, :libelle, :categorie,
-                        :montant, :type, :mois, :source
-                    )
-                    ON CONFLICT DO NOTHING
-                    RETURNING id
-                    """
-                ),
-                params,
-            ).fetchone()
-            if row:
-                inserted += 1
-    return {"inserted": inserted, "total": len(entries)}
+        for start in range(0, len(entries), _BULK_IMPORT_CHUNK):
+            chunk = entries[start:start + _BULK_IMPORT_CHUNK]
+            rows = conn.execute(
+                text(_BULK_INSERT_SQL),
+                {
+                    "tenant": tenant_id,
+                    "account": account,
+                    "dates": [entry["date"] for entry in chunk],
+                    "libelles": [entry["libelle"] for entry in chunk],
+                    "categories": [entry.get("categorie") for entry in chunk],
+                    "montants": [entry["montant"] for entry in chunk],
+                    "types": [entry["type"] for entry in chunk],
+                    "mois": [entry["mois"] for entry in chunk],
+                    "sources": [entry.get("source", "pdf") for entry in chunk],
+                },
+            ).fetchall()
+            inserted += len(rows)
+    return {"inserted": inserted, "total": len(entries), "duplicates": len(entries) - inserted}
+
+
+def import_bank_statements_from_pdf(tenant_id: int, account: str, pdf_bytes: bytes) -> dict[str, int]:
+    """Parse a PDF statement in the shared CPU pool and bulk-insert new operations."""
+    entries = get_job_manager().run_cpu(parse_bank_statement_pdf, pdf_bytes)
+    if not entries:
+        return {"inserted": 0, "total": 0, "duplicates": 0}
+    return insert_bank_statements_bulk(tenant_id, account, entries)
 
 
 def create_expense_from_bank_statement(tenant_id: int, entry_id: int, payload: dict[str, Any]) -> dict[str, Any]:
@@ -312,27 +328,15 @@ def transfer_from_epicerie(tenant_id: int, produit_restaurant_id: int, quantite:
     return {"movements": rows}
 
 
-def get_bank_statement_summary(
-    tenant_id: int, account: str | None = None, months: int = 6, grouping: str | None = None
-) -> Dict[str, Any]:
-    """Build daily/weekly/monthly aggregates and category groups."""
-    entity_id = _get_restaurant_entity_id()
-    window: int | None = None
-    if months and months > 0:
-        window = max(1, min(months, 120))
-    preset_name, preset = _get_grouping_preset(grouping)
-    account_clause = "AND a.label = :account" if account else ""
-    date_clause = ""
-    if window is not None:
-        date_clause = f"AND t.date_operation >= (CURRENT_DATE - INTERVAL '{window} months')"
-    sql = text(
-        f"""
+# Une passe sur les lignes confirmées : jours, semaines ISO, mois et catégories
+# agrégés par GROUPING SETS ; seules les catégories passent ensuite par le préréglage.
+_SUMMARY_BUCKETS_SQL = """
+    WITH lines AS (
         SELECT
-          t.date_operation::date AS date,
-          TO_CHAR(t.date_operation, 'YYYY-MM') AS mois,
-          c.name AS categorie,
-          COALESCE(tl.montant_ttc, tl.montant_ht, 0) AS montant,
-          CASE WHEN t.direction = 'IN' THEN 'Entree' ELSE 'Sortie' END AS type
+            t.date_operation::date AS jour,
+            c.name AS categorie,
+            COALESCE(tl.montant_ttc, tl.montant_ht, 0) AS montant,
+            t.direction = 'IN' AS entree
         FROM finance_transaction_lines tl
         JOIN finance_transactions t ON t.id = tl.transaction_id
         JOIN finance_accounts a ON a.id = t.account_id
@@ -342,123 +346,179 @@ def get_bank_statement_summary(
           AND t.direction IN ('IN', 'OUT')
           {account_clause}
           {date_clause}
-        ORDER BY t.date_operation ASC, tl.id ASC
-        """
     )
+    SELECT
+        CASE
+            WHEN GROUPING(jour) = 0 THEN 'day'
+            WHEN GROUPING(semaine) = 0 THEN 'week'
+            WHEN GROUPING(mois) = 0 THEN 'month'
+            ELSE 'category'
+        END AS bucket,
+        jour,
+        semaine,
+        week_start,
+        mois,
+        categorie,
+        COALESCE(SUM(montant) FILTER (WHERE entree), 0) AS entrees,
+        COALESCE(SUM(montant) FILTER (WHERE NOT entree), 0) AS sorties,
+        COUNT(*) FILTER (WHERE entree) AS nb_entrees,
+        COUNT(*) FILTER (WHERE NOT entree) AS nb_sorties
+    FROM (
+        SELECT
+            lines.*,
+            TO_CHAR(jour, 'IYYY-"W"IW') AS semaine,
+            date_trunc('week', jour)::date AS week_start,
+            TO_CHAR(jour, 'YYYY-MM') AS mois
+        FROM lines
+    ) l
+    GROUP BY GROUPING SETS ((jour), (semaine, week_start), (mois), (categorie))
+"""
+
+# Version globale des écritures finance (index des clés primaires, O(log n)).
+_SUMMARY_VERSION_SQL = """
+    SELECT
+        (SELECT COALESCE(MAX(id), 0) FROM finance_transactions) AS last_tx,
+        (SELECT COALESCE(MAX(id), 0) FROM finance_transaction_lines) AS last_line
+"""
+
+
+def _summary_cache_ttl() -> float:
+    return float(os.getenv("RESTAURANT_SUMMARY_CACHE_TTL_SECONDS", "120"))
+
+
+class _SummaryCache:
+    """Résumés par (entité, compte, mois, regroupement), valides tant qu'aucune écriture
+    finance n'est arrivée ; le TTL couvre les modifications (statut, catégorie)."""
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple, tuple[float, int, tuple, Dict[str, Any]]] = {}
+        self._generation = 0
+        self._locks: dict[tuple, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, key: tuple) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fresh(self, key: tuple, version: tuple, now: float) -> Dict[str, Any] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, generation, cached_version, value = entry
+        if expires_at <= now or generation != self._generation or cached_version != version:
+            return None
+        return value
+
+    def get_or_compute(
+        self, key: tuple, version: tuple, ttl: float, compute: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        cached = self._fresh(key, version, time.monotonic())
+        if cached is not None:
+            return cached
+        with self._lock_for(key):
+            cached = self._fresh(key, version, time.monotonic())
+            if cached is not None:
+                return cached
+            generation = self._generation
+            value = compute()
+            self._entries[key] = (time.monotonic() + ttl, generation, version, value)
+            return value
+
+    def invalidate(self) -> None:
+        with self._guard:
+            self._generation += 1
+            self._entries.clear()
+
+
+_SUMMARY_CACHE = _SummaryCache()
+
+
+def invalidate_bank_statement_summary_cache() -> None:
+    _SUMMARY_CACHE.invalidate()
+
+
+def _finance_version() -> tuple:
+    df = query_df(_SUMMARY_VERSION_SQL)
+    if df.empty:
+        return (0, 0)
+    return (int(df.iloc[0]["last_tx"] or 0), int(df.iloc[0]["last_line"] or 0))
+
+
+def _bucket_totals(entrees: Any, sorties: Any) -> Dict[str, float]:
+    entrees_value = _safe_float(entrees)
+    sorties_value = _safe_float(sorties)
+    return {
+        "entrees": round(entrees_value, 2),
+        "sorties": round(sorties_value, 2),
+        "net": round(entrees_value - sorties_value, 2),
+    }
+
+
+def _as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _build_bank_statement_summary(
+    entity_id: int, account: str | None, window: int | None, preset_name: str, preset: Dict[str, Any]
+) -> Dict[str, Any]:
+    account_clause = "AND a.label = :account" if account else ""
+    date_clause = ""
+    if window is not None:
+        date_clause = f"AND t.date_operation >= (CURRENT_DATE - INTERVAL '{window} months')"
     params: Dict[str, Any] = {"entity_id": entity_id}
     if account:
         params["account"] = account
-    df = query_df(sql, params)
-
-    monthly_ordered: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
-    weekly_ordered: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
-    daily_ordered: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
-    groups_totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {"entrees": 0.0, "sorties": 0.0})
+    df = query_df(
+        text(_SUMMARY_BUCKETS_SQL.format(account_clause=account_clause, date_clause=date_clause)),
+        params,
+    )
+    records = df.to_dict("records") if not df.empty else []
 
-    if not df.empty:
-        for row in df.to_dict("records"):
-            row_date = row.get("date")
-            if isinstance(row_date, str):
-                try:
-                    row_date = datetime.strptime(row_date, "%Y-%m-%d").date()
-                except ValueError:
-                    row_date = None
-            if not isinstance(row_date, date):
-                row_date = date.today()
-            month_key = row.get("mois") or row_date.strftime("%Y-%m")
-            iso_week = row_date.isocalendar()
-            week_key = f"{iso_week.year}-W{iso_week.week:02d}"
-            week_start = row_date - timedelta(days=row_date.weekday())
-            week_end = week_start + timedelta(days=6)
-            day_key = row_date.isoformat()
-            entry_type = row.get("type") or "Sortie"
-            amount = _safe_float(row.get("montant"))
-            month_bucket = monthly_ordered.setdefault(
-                month_key, {"mois": month_key, "entrees": 0.0, "sorties": 0.0}
-            )
-            week_bucket = weekly_ordered.setdefault(
-                week_key,
-                {
-                    "semaine": week_key,
-                    "start_date": week_start,
-                    "end_date": week_end,
-                    "entrees": 0.0,
-                    "sorties": 0.0,
-                },
-            )
-            day_bucket = daily_ordered.setdefault(
-                day_key,
-                {
-                    "jour": row_date,
-                    "entrees": 0.0,
-                    "sorties": 0.0,
-                },
-            )
-            if entry_type == "Entree":
-                month_bucket["entrees"] += amount
-                week_bucket["entrees"] += amount
-                day_bucket["entrees"] += amount
-            else:
-                month_bucket["sorties"] += amount
-                week_bucket["sorties"] += amount
-                day_bucket["sorties"] += amount
-
-            group_name = _resolve_group_name(row.get("categorie"), entry_type, preset)
-            group_bucket = groups_totals[group_name]
-            if entry_type == "Entree":
-                group_bucket["entrees"] += amount
-            else:
-                group_bucket["sorties"] += amount
-
-    monthly_summary: List[Dict[str, Any]] = []
-    for bucket in monthly_ordered.values():
-        bucket["net"] = bucket["entrees"] - bucket["sorties"]
-        monthly_summary.append(
-            {
-                "mois": bucket["mois"],
-                "entrees": round(bucket["entrees"], 2),
-                "sorties": round(bucket["sorties"], 2),
-                "net": round(bucket["net"], 2),
-            }
-        )
+    daily_rows = sorted((row for row in records if row["bucket"] == "day"), key=lambda row: _as_date(row["jour"]))
+    daily_summary: List[Dict[str, Any]] = [
+        {"jour": _as_date(row["jour"]), **_bucket_totals(row["entrees"], row["sorties"])} for row in daily_rows
+    ]
 
+    weekly_rows = sorted(
+        (row for row in records if row["bucket"] == "week"), key=lambda row: _as_date(row["week_start"])
+    )
     weekly_summary: List[Dict[str, Any]] = []
-    for bucket in weekly_ordered.values():
-        net = bucket["entrees"] - bucket["sorties"]
+    for row in weekly_rows:
+        week_start = _as_date(row["week_start"])
         weekly_summary.append(
             {
-                "semaine": bucket["semaine"],
-                "start_date": bucket["start_date"],
-                "end_date": bucket["end_date"],
-                "entrees": round(bucket["entrees"], 2),
-                "sorties": round(bucket["sorties"], 2),
-                "net": round(net, 2),
+                "semaine": row["semaine"],
+                "start_date": week_start,
+                "end_date": week_start + timedelta(days=6),
+                **_bucket_totals(row["entrees"], row["sorties"]),
             }
         )
 
-    daily_summary: List[Dict[str, Any]] = []
-    for bucket in daily_ordered.values():
-        net = bucket["entrees"] - bucket["sorties"]
-        daily_summary.append(
-            {
-                "jour": bucket["jour"],
-                "entrees": round(bucket["entrees"], 2),
-                "sorties": round(bucket["sorties"], 2),
-                "net": round(net, 2),
-            }
-        )
+    monthly_summary: List[Dict[str, Any]] = [
+        {"mois": row["mois"], **_bucket_totals(row["entrees"], row["sorties"])}
+        for row in sorted((row for row in records if row["bucket"] == "month"), key=lambda row: row["mois"])
+    ]
 
-    group_summary: List[Dict[str, Any]] = []
-    for group_name, totals in groups_totals.items():
-        net = totals["entrees"] - totals["sorties"]
-        group_summary.append(
-            {
-                "group": group_name,
-                "entrees": round(totals["entrees"], 2),
-                "sorties": round(totals["sorties"], 2),
-                "net": round(net, 2),
-            }
-        )
+    # Le préréglage dépend du sens : entrées et sorties d'une catégorie sont rangées séparément.
+    groups_totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {"entrees": 0.0, "sorties": 0.0})
+    for row in records:
+        if row["bucket"] != "category":
+            continue
+        categorie = row.get("categorie")
+        if categorie is not None and pd.isna(categorie):
+            categorie = None
+        if row.get("nb_entrees"):
+            groups_totals[_resolve_group_name(categorie, "Entree", preset)]["entrees"] += _safe_float(row["entrees"])
+        if row.get("nb_sorties"):
+            groups_totals[_resolve_group_name(categorie, "Sortie", preset)]["sorties"] += _safe_float(row["sorties"])
+    group_summary: List[Dict[str, Any]] = [
+        {"group": group_name, **_bucket_totals(totals["entrees"], totals["sorties"])}
+        for group_name, totals in groups_totals.items()
+    ]
     group_summary.sort(key=lambda item: item["sorties"], reverse=True)
 
     forecast_value: float | None = None
@@ -488,3 +548,33 @@ def get_bank_statement_summary(
         "forecast_next_month": forecast_value,
         "presets": presets_meta,
     }
+
+
+def get_bank_statement_summary(
+    tenant_id: int,
+    account: str | None = None,
+    months: int = 6,
+    grouping: str | None = None,
+    *,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """Build daily/weekly/monthly aggregates and category groups.
+
+    Buckets are computed in SQL; the result is cached per (entity, account, months,
+    grouping) until a new finance transaction is recorded. Cached results are shared
+    between callers and must not be modified.
+    """
+    entity_id = _get_restaurant_entity_id()
+    window: int | None = None
+    if months and months > 0:
+        window = max(1, min(months, 120))
+    preset_name, preset = _get_grouping_preset(grouping)
+
+    def compute() -> Dict[str, Any]:
+        return _build_bank_statement_summary(entity_id, account, window, preset_name, preset)
+
+    ttl = _summary_cache_ttl()
+    if not use_cache or ttl <= 0:
+        return compute()
+    key = (entity_id, account, window, preset_name)
+    return _SUMMARY_CACHE.get_or_compute(key, _finance_version(), ttl, compute)
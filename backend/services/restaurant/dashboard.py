@@ -9,7 +9,7 @@ import numpy as np
 import pandas as pd
 
 from backend.services.catalog_data import fetch_customer_catalog
-from core.inventory_forecast import forecast_daily_consumption
+from backend.services.forecasting import load_forecast_snapshot
 from backend.services.restaurant.constants import ALLOWED_FORECAST_GRANULARITY
 from backend.services.restaurant.utils import _safe_float
 from backend.services.restaurant.expenses import (
@@ -88,8 +88,9 @@ def build_forecast_overview(
     safe_horizon = max(1, min(int(horizon_days), 180))
     granularity_key = granularity if granularity in ALLOWED_FORECAST_GRANULARITY else "weekly"
     catalog_df = fetch_customer_catalog(tenant_id=tenant_id)
-    forecast_map = forecast_daily_consumption(tenant_id=tenant_id, horizon=safe_horizon)
-    generated_at = datetime.utcnow()
+    snapshot = load_forecast_snapshot(tenant_id)
+    forecast_map = snapshot.daily_consumption(safe_horizon)
+    generated_at = snapshot.generated_at or datetime.utcnow()
 
     empty_result = {
         "horizon_days": safe_horizon,
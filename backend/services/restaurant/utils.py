@@ -9,6 +9,7 @@ from typing import Any, Dict, Tuple
 from sqlalchemy import text
 
 from core.data_repository import get_engine
+from backend.services.finance_categorization import CategoryMatcher, compile_category_rules
 from backend.services.restaurant.constants import (
     CATEGORY_RULES,
     CATEGORY_GROUP_PRESETS,
@@ -163,36 +164,27 @@ def _resolve_group_name(categorie: str | None, entry_type: str, preset: Dict[str
     return fallback.get("default", "Autres")
 
 
-def _normalize_for_keyword(text_val: str) -> str:
-    """Supprime la ponctuation pour effectuer des comparaisons robustes."""
-    return re.sub(r"[^A-Z0-9]", "", text_val.upper())
-
-
-def _keyword_matches(label_upper: str, normalized_label: str, keyword: str) -> bool:
-    """Teste la presence d'un mot-cle dans une etiquette brute ou normalisee."""
-    if not keyword:
-        return False
-    keyword_clean = keyword.upper().strip()
-    keyword_trimmed = keyword_clean.replace("%", "")
-    if keyword_trimmed and keyword_trimmed in label_upper:
-        return True
-    normalized_keyword = _normalize_for_keyword(keyword_trimmed)
-    if normalized_keyword and normalized_keyword in normalized_label:
-        return True
-    return False
+@lru_cache(maxsize=1)
+def _category_matcher() -> CategoryMatcher:
+    """Matcher precompile des CATEGORY_RULES (mots-cles nettoyes comme _keyword_matches)."""
+    rules = tuple(
+        (
+            tuple(keyword.upper().strip().replace("%", "") for keyword in keywords),
+            category,
+            allowed_types,
+        )
+        for keywords, category, allowed_types in CATEGORY_RULES
+    )
+    return compile_category_rules(rules)
 
 
 def _guess_category(label: str | None, entry_type: str) -> str | None:
     """Essaye de categoriser une ligne bancaire en se basant sur les mots-cles connues."""
     if not label:
         return "Encaissement" if entry_type == "Entree" else "Autres"
-    upper = label.upper()
-    normalized_label = _normalize_for_keyword(label)
-    for keywords, category, allowed_types in CATEGORY_RULES:
-        if allowed_types and entry_type not in allowed_types:
-            continue
-        if any(_keyword_matches(upper, normalized_label, keyword) for keyword in keywords):
-            return category
+    category = _category_matcher().match(entry_type, label)
+    if category:
+        return category
     if entry_type == "Entree":
         return "Encaissement"
     return "Autres"
@@ -8,6 +8,7 @@ import pandas as pd
 from sqlalchemy import text
 
 from core.data_repository import get_engine, query_df
+from backend.services.dashboard import invalidate_dashboard_cache
 
 
 def fetch_movement_timeseries(
@@ -123,6 +124,7 @@ def adjust_stock_level(
             ),
             payload,
         )
+    invalidate_dashboard_cache(tenant_id)
 
     # Trigger updates stock_actuel; fetch new value
     with engine.connect() as conn:
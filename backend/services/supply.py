@@ -1,15 +1,34 @@
-"""Supply planning computations reused by the REST API."""
+"""Supply planning computations reused by the REST API.
+
+Le plan repose sur une base par tenant (catalogue, fournisseurs récents, prévisions
+lues dans ``product_consumption_forecasts``) mise en cache et invalidée dès qu'un
+nouveau mouvement de stock est enregistré. Les
+colonnes qui dépendent des paramètres (couverture visée, seuils, filtres) sont
+recalculées sur des tableaux NumPy, et les articles sont émis depuis ces colonnes.
+"""
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, List, Sequence
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, List, Sequence
 
 import numpy as np
-import pandas as pd
 
 from backend.services.catalog_data import fetch_customer_catalog, fetch_recent_suppliers
-from core.inventory_forecast import forecast_daily_consumption
+from backend.services.forecasting import forecast_daily_consumption
+from core.data_repository import query_df
+
+PRIORITY_LEVELS = ("Critique", "Tendue", "Surveillance", "Confort")
+UNKNOWN_SUPPLIER = "Non renseigné"
+
+_MOVEMENT_WATERMARK_SQL = """
+    SELECT COALESCE(MAX(id), 0) AS last_id
+    FROM mouvements_stock
+    WHERE tenant_id = :tenant_id
+"""
 
 
 @dataclass(frozen=True)
@@ -21,16 +40,230 @@ class SupplyPlanParams:
     search: str | None
 
 
-def _sanitize_float(value) -> float | None:
-    if value is None:
-        return None
-    try:
-        numeric = float(value)
-    except (TypeError, ValueError):
-        return None
-    if np.isnan(numeric) or np.isinf(numeric):
+def _finite_or_none(values: np.ndarray) -> list[float | None]:
+    """Colonne JSON : NaN et infinis deviennent ``None``."""
+
+    out = values.astype(object)
+    out[~np.isfinite(values)] = None
+    return out.tolist()
+
+
+def _text_column(df, column: str, default: Any = None) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=object)
+    values = df[column].astype(object).to_numpy(copy=True)
+    values[df[column].isna().to_numpy()] = default
+    return values
+
+
+def _float_column(df, column: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=float)
+    return df[column].astype(float).fillna(0.0).to_numpy(copy=True)
+
+
+@dataclass
+class _SupplyBase:
+    """Colonnes indépendantes des paramètres, calculées une fois par version."""
+
+    ids: np.ndarray
+    names: np.ndarray
+    categories: np.ndarray
+    ean: np.ndarray
+    suppliers: np.ndarray
+    abc_class: np.ndarray
+    xyz_class: np.ndarray
+    daily_sales: np.ndarray
+    stock: np.ndarray
+    sale_price: np.ndarray
+    tva: np.ndarray
+    unit_margin: np.ndarray
+    margin_pct: np.ndarray
+    coverage: np.ndarray
+    search_text: np.ndarray
+    forecasts: dict[int, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _build_base(tenant_id: int) -> _SupplyBase | None:
+    catalog_df = fetch_customer_catalog(tenant_id=int(tenant_id))
+    if catalog_df.empty:
         return None
-    return numeric
+
+    supplier_df = fetch_recent_suppliers(tenant_id=int(tenant_id))
+    if not supplier_df.empty:
+        latest = supplier_df.drop_duplicates("produit_id").set_index("produit_id")["fournisseur"]
+        catalog_df = catalog_df.assign(fournisseur=catalog_df["id"].map(latest))
+
+    daily_sales = np.clip(_float_column(catalog_df, "ventes_30j") / 30.0, 0.0, None)
+    stock = np.clip(_float_column(catalog_df, "stock_actuel"), 0.0, None)
+    sale_price = _float_column(catalog_df, "prix_vente")
+    tva = _float_column(catalog_df, "tva")
+
+    tva_multiplier = 1.0 + np.clip(tva / 100.0, 0.0, None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sale_ht = sale_price / tva_multiplier
+        sale_ht[~np.isfinite(sale_ht)] = 0.0
+        unit_margin = sale_ht - _float_column(catalog_df, "prix_achat")
+        margin_pct = np.where(sale_ht > 0, unit_margin / np.where(sale_ht > 0, sale_ht, np.nan) * 100, np.nan)
+        coverage = np.where(daily_sales > 0, stock / daily_sales, np.where(stock > 0, np.inf, 0.0))
+
+    names = _text_column(catalog_df, "nom", "")
+    categories = _text_column(catalog_df, "categorie")
+    ean = _text_column(catalog_df, "ean")
+    search_text = np.array(
+        [
+            f"{nom}\x1f{cat if cat is not None else ''}\x1f{code}".lower()
+            for nom, cat, code in zip(names.tolist(), categories.tolist(), ean.tolist())
+        ],
+        dtype=object,
+    )
+
+    return _SupplyBase(
+        ids=catalog_df["id"].astype(int).to_numpy(copy=True),
+        names=names,
+        categories=categories,
+        ean=ean,
+        suppliers=_text_column(catalog_df, "fournisseur", UNKNOWN_SUPPLIER),
+        abc_class=_text_column(catalog_df, "abc_class"),
+        xyz_class=_text_column(catalog_df, "xyz_class"),
+        daily_sales=daily_sales,
+        stock=stock,
+        sale_price=sale_price,
+        tva=tva,
+        unit_margin=unit_margin,
+        margin_pct=margin_pct,
+        coverage=coverage,
+        search_text=search_text,
+    )
+
+
+def _forecast_for(base: _SupplyBase, tenant_id: int, horizon: int) -> np.ndarray:
+    cached = base.forecasts.get(horizon)
+    if cached is not None:
+        return cached
+    forecast_map = forecast_daily_consumption(tenant_id=int(tenant_id), horizon=horizon) or {}
+    values = np.array([forecast_map.get(pid, np.nan) for pid in base.ids.tolist()], dtype=float)
+    values = np.where(np.isnan(values), base.daily_sales, values)
+    base.forecasts[horizon] = values
+    return values
+
+
+def _movement_watermark(tenant_id: int) -> int:
+    df = query_df(_MOVEMENT_WATERMARK_SQL, params={"tenant_id": int(tenant_id)})
+    if df.empty:
+        return 0
+    return int(df.iloc[0]["last_id"] or 0)
+
+
+def _cache_ttl() -> float:
+    return float(os.getenv("SUPPLY_CACHE_TTL_SECONDS", "300"))
+
+
+class _SupplyBaseCache:
+    """Base par tenant, valide tant que le dernier mouvement et le TTL n'ont pas changé."""
+
+    def __init__(self) -> None:
+        self._entries: dict[int, tuple[float, int, int, _SupplyBase | None]] = {}
+        self._generations: dict[int, int] = {}
+        self._locks: dict[int, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, tenant_id: int) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(tenant_id, threading.Lock())
+
+    def _fresh(self, tenant_id: int, version: int, now: float) -> tuple[bool, _SupplyBase | None]:
+        entry = self._entries.get(tenant_id)
+        if entry is None:
+            return False, None
+        expires_at, generation, cached_version, base = entry
+        if expires_at <= now or generation != self._generations.get(tenant_id, 0) or cached_version != version:
+            return False, None
+        return True, base
+
+    def get(self, tenant_id: int, ttl: float) -> _SupplyBase | None:
+        version = _movement_watermark(tenant_id)
+        hit, base = self._fresh(tenant_id, version, time.monotonic())
+        if hit:
+            return base
+        with self._lock_for(tenant_id):
+            hit, base = self._fresh(tenant_id, version, time.monotonic())
+            if hit:
+                return base
+            generation = self._generations.get(tenant_id, 0)
+            base = _build_base(tenant_id)
+            self._entries[tenant_id] = (time.monotonic() + ttl, generation, version, base)
+            return base
+
+    def invalidate(self, tenant_id: int | None = None) -> None:
+        with self._guard:
+            tenants = list(self._entries) if tenant_id is None else [int(tenant_id)]
+            for tid in tenants:
+                self._generations[tid] = self._generations.get(tid, 0) + 1
+                self._entries.pop(tid, None)
+
+
+_CACHE = _SupplyBaseCache()
+
+
+def invalidate_supply_cache(tenant_id: int | None = None) -> None:
+    """À appeler après une modification du catalogue (prix, TVA, suppression...).
+
+    Les nouveaux mouvements de stock sont détectés sans appel explicite.
+    """
+
+    _CACHE.invalidate(tenant_id)
+
+
+def _load_base(tenant_id: int, use_cache: bool) -> _SupplyBase | None:
+    ttl = _cache_ttl()
+    if not use_cache or ttl <= 0:
+        return _build_base(tenant_id)
+    return _CACHE.get(int(tenant_id), ttl)
+
+
+def _empty_plan(params: SupplyPlanParams, categories: list[str]) -> dict[str, object]:
+    return {
+        "params": params.__dict__,
+        "summary": {
+            "analyzed": 0,
+            "recommended_count": 0,
+            "units_to_order": 0,
+            "value_total": 0.0,
+            "margin_total": 0.0,
+        },
+        "available_categories": categories,
+        "items": [],
+        "items_total": 0,
+        "supplier_breakdown": [],
+    }
+
+
+def _supplier_breakdown(
+    suppliers: np.ndarray, quantities: np.ndarray, values: np.ndarray, margins: np.ndarray
+) -> list[dict[str, object]]:
+    ordered = quantities > 0
+    if not ordered.any():
+        return []
+    names, inverse = np.unique(suppliers[ordered].astype(str), return_inverse=True)
+    articles = np.bincount(inverse, minlength=len(names))
+    units = np.bincount(inverse, weights=quantities[ordered], minlength=len(names))
+    value = np.bincount(inverse, weights=values[ordered], minlength=len(names))
+    margin = np.bincount(inverse, weights=margins[ordered], minlength=len(names))
+    order = np.argsort(-value, kind="stable")
+    return [
+        {"fournisseur": name, "articles": count, "quantite": int(qty), "valeur": val, "marge": mrg}
+        for name, count, qty, val, mrg in zip(
+            names[order].tolist(),
+            articles[order].tolist(),
+            units[order].tolist(),
+            value[order].tolist(),
+            margin[order].tolist(),
+        )
+    ]
 
 
 def compute_supply_plan(
@@ -41,8 +274,16 @@ def compute_supply_plan(
     search: str | None = None,
     *,
     tenant_id: int = 1,
+    priorities: Iterable[str] | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    use_cache: bool = True,
 ) -> dict[str, object]:
-    """Return the dynamic supply plan matching the former Streamlit view."""
+    """Return the dynamic supply plan matching the former Streamlit view.
+
+    ``priorities``, ``limit`` et ``offset`` ne portent que sur ``items`` : le résumé et
+    la répartition fournisseurs couvrent toujours l'ensemble des articles filtrés.
+    """
 
     safe_target = max(1, int(target_coverage))
     safe_alert = max(1, min(int(alert_threshold), safe_target))
@@ -61,214 +302,99 @@ def compute_supply_plan(
         search=normalized_search or None,
     )
 
-    catalog_df = fetch_customer_catalog(tenant_id=int(tenant_id))
-    if catalog_df.empty:
-        return {
-            "params": params.__dict__,
-            "summary": {
-                "analyzed": 0,
-                "recommended_count": 0,
-                "units_to_order": 0,
-                "value_total": 0.0,
-                "margin_total": 0.0,
-            },
-            "available_categories": [],
-            "items": [],
-            "supplier_breakdown": [],
-        }
-
-    planning_df = catalog_df.copy()
-    planning_df["ventes_jour"] = (planning_df["ventes_30j"].fillna(0.0) / 30.0).clip(lower=0.0)
-    planning_df["stock_actuel"] = planning_df["stock_actuel"].fillna(0.0).clip(lower=0.0)
-
-    forecast_map = forecast_daily_consumption(tenant_id=int(tenant_id), horizon=safe_target)
-    planning_df["ventes_prevision"] = planning_df["id"].map(lambda pid: forecast_map.get(int(pid)))
-    planning_df["ventes_prevision"] = planning_df["ventes_prevision"].fillna(planning_df["ventes_jour"])
-
-    daily_sales = planning_df["ventes_jour"]
-    stock_levels = planning_df["stock_actuel"]
-    planning_df["couverture_jours"] = np.where(
-        daily_sales > 0,
-        stock_levels / daily_sales,
-        np.where(stock_levels > 0, np.inf, 0.0),
-    )
-
-    supplier_df = fetch_recent_suppliers(tenant_id=int(tenant_id))
-    if not supplier_df.empty:
-        planning_df = planning_df.merge(
-            supplier_df.rename(columns={"produit_id": "id"}),
-            how="left",
-            on="id",
-        )
-    if "fournisseur" not in planning_df.columns:
-        planning_df["fournisseur"] = "Non renseigné"
-    else:
-        planning_df["fournisseur"] = planning_df["fournisseur"].fillna("Non renseigné")
-
-    planning_df["objectif_stock"] = np.maximum(safe_target * planning_df["ventes_jour"], 0.0)
-    raw_reorder = planning_df["objectif_stock"] - planning_df["stock_actuel"]
-    planning_df["quantite_a_commander"] = np.maximum(np.ceil(raw_reorder), 0).astype(int)
-    planning_df["objectif_stock_prevision"] = np.maximum(safe_target * planning_df["ventes_prevision"], 0.0)
-    raw_auto = planning_df["objectif_stock_prevision"] - planning_df["stock_actuel"]
-    planning_df["quantite_auto"] = np.maximum(np.ceil(raw_auto), 0).astype(int)
-    planning_df["tva"] = planning_df.get("tva", 0.0).fillna(0.0)
-    tva_factor = (planning_df["tva"] / 100.0).clip(lower=0.0)
-    tva_multiplier = (1 + tva_factor).replace(0, 1)
-    sale_ht = planning_df["prix_vente"].fillna(0.0) / tva_multiplier
-    sale_ht = sale_ht.replace([np.inf, -np.inf], 0.0).fillna(0.0)
-    planning_df["prix_vente_ht"] = sale_ht
-    planning_df["valeur_commande"] = planning_df["quantite_a_commander"] * planning_df["prix_vente"].fillna(0.0)
-    planning_df["ecart_couverture"] = planning_df["couverture_jours"] - float(safe_target)
-    planning_df["marge_unitaire"] = sale_ht - planning_df["prix_achat"].fillna(0.0)
-    planning_df["marge_pct"] = np.where(
-        sale_ht > 0,
-        (planning_df["marge_unitaire"] / sale_ht.replace(0, np.nan)) * 100,
-        np.nan,
-    )
-    planning_df["marge_commande"] = planning_df["marge_unitaire"] * planning_df["quantite_a_commander"]
+    base = _load_base(int(tenant_id), use_cache)
+    if base is None or not len(base):
+        return _empty_plan(params, [])
 
+    mask = np.ones(len(base), dtype=bool)
     if safe_min_sales > 0:
-        planning_df = planning_df[planning_df["ventes_jour"] >= safe_min_sales]
-
-    all_categories = sorted(
-        {cat for cat in planning_df["categorie"].dropna().unique().tolist() if isinstance(cat, str)}
-    )
-
+        mask &= base.daily_sales >= safe_min_sales
+    all_categories = sorted({cat for cat in base.categories[mask].tolist() if isinstance(cat, str)})
     if normalized_categories:
-        planning_df = planning_df[planning_df["categorie"].isin(normalized_categories)]
-
+        mask &= np.isin(base.categories, np.array(normalized_categories, dtype=object))
     if params.search:
         lowered = params.search.lower()
-        planning_df = planning_df[
-            planning_df["nom"].str.contains(lowered, case=False, na=False)
-            | planning_df["categorie"].str.contains(lowered, case=False, na=False)
-            | planning_df["ean"].astype(str).str.contains(lowered, case=False, na=False)
-        ]
-
-    if planning_df.empty:
-        return {
-            "params": params.__dict__,
-            "summary": {
-                "analyzed": 0,
-                "recommended_count": 0,
-                "units_to_order": 0,
-                "value_total": 0.0,
-                "margin_total": 0.0,
-            },
-            "available_categories": all_categories,
-            "items": [],
-            "supplier_breakdown": [],
-        }
-
-    if safe_min_sales <= 0:
-        rotation_mask = planning_df["ventes_jour"] > 0
-    else:
-        rotation_mask = planning_df["ventes_jour"] >= safe_min_sales
-
-    priority_levels = np.select(
+        mask &= np.fromiter((lowered in text for text in base.search_text.tolist()), dtype=bool, count=len(base))
+
+    rows = np.flatnonzero(mask)
+    if rows.size == 0:
+        return _empty_plan(params, all_categories)
+
+    daily_sales = base.daily_sales[rows]
+    stock = base.stock[rows]
+    coverage = base.coverage[rows]
+    sale_price = base.sale_price[rows]
+    forecast = _forecast_for(base, int(tenant_id), safe_target)[rows]
+
+    quantities = np.maximum(np.ceil(np.maximum(safe_target * daily_sales, 0.0) - stock), 0).astype(int)
+    auto_quantities = np.maximum(np.ceil(np.maximum(safe_target * forecast, 0.0) - stock), 0).astype(int)
+    order_values = quantities * sale_price
+    order_margins = base.unit_margin[rows] * quantities
+
+    rotation_mask = daily_sales > 0 if safe_min_sales <= 0 else daily_sales >= safe_min_sales
+    priority_rank = np.select(
         [
-            rotation_mask & (planning_df["couverture_jours"] <= safe_alert),
-            rotation_mask & (planning_df["quantite_a_commander"] > 0),
-            planning_df["quantite_a_commander"] > 0,
+            rotation_mask & (coverage <= safe_alert),
+            rotation_mask & (quantities > 0),
+            quantities > 0,
         ],
-        ["Critique", "Tendue", "Surveillance"],
-        default="Confort",
-    )
-    planning_df["niveau_priorite"] = priority_levels
-    priority_order = {"Critique": 0, "Tendue": 1, "Surveillance": 2, "Confort": 3}
-    planning_df["ordre_priorite"] = planning_df["niveau_priorite"].map(priority_order)
-
-    planning_df = planning_df.sort_values(
-        by=["ordre_priorite", "couverture_jours", "ventes_jour"],
-        ascending=[True, True, False],
+        [0, 1, 2],
+        default=3,
     )
+    # Tri : priorité, couverture croissante, ventes décroissantes (clé principale en dernier).
+    order = np.lexsort((-daily_sales, coverage, priority_rank))
 
     summary = {
-        "analyzed": int(len(planning_df)),
-        "recommended_count": int((planning_df["quantite_a_commander"] > 0).sum()),
-        "units_to_order": int(planning_df["quantite_a_commander"].sum()),
-        "value_total": float(planning_df["valeur_commande"].sum()),
-        "margin_total": float(planning_df["marge_commande"].sum()),
+        "analyzed": int(rows.size),
+        "recommended_count": int((quantities > 0).sum()),
+        "units_to_order": int(quantities.sum()),
+        "value_total": float(order_values.sum()),
+        "margin_total": float(order_margins.sum()),
     }
-
-    item_columns = [
-        "id",
-        "nom",
-        "categorie",
-        "ventes_jour",
-        "stock_actuel",
-        "couverture_jours",
-        "ecart_couverture",
-        "niveau_priorite",
-        "quantite_a_commander",
-        "quantite_auto",
-        "valeur_commande",
-        "ventes_prevision",
-        "marge_pct",
-        "marge_commande",
-        "tva",
-        "fournisseur",
-        "ean",
-        "abc_class",
-        "xyz_class",
-    ]
-
-    result_items: List[dict[str, object]] = []
-    for _, row in planning_df[item_columns].iterrows():
-        item = {
-            "id": int(row["id"]),
-            "nom": row["nom"],
-            "categorie": row.get("categorie"),
-            "ventes_jour": float(row["ventes_jour"]),
-            "stock_actuel": float(row["stock_actuel"]),
-            "couverture_jours": _sanitize_float(row["couverture_jours"]),
-            "ecart_couverture": _sanitize_float(row["ecart_couverture"]),
-            "niveau_priorite": row["niveau_priorite"],
-            "quantite_a_commander": int(row["quantite_a_commander"]),
-            "quantite_auto": int(row.get("quantite_auto") or 0),
-            "valeur_commande": float(row["valeur_commande"]),
-            "ventes_prevision": float(row.get("ventes_prevision") or row["ventes_jour"]),
-            "marge_pct": _sanitize_float(row["marge_pct"]),
-            "marge_commande": float(row["marge_commande"]),
-            "tva": _sanitize_float(row.get("tva")),
-            "fournisseur": row.get("fournisseur"),
-            "ean": row.get("ean"),
-            "abc_class": row.get("abc_class"),
-            "xyz_class": row.get("xyz_class"),
-        }
-        result_items.append(item)
-
-    supplier_breakdown: list[dict[str, object]] = []
-    order_candidates = planning_df[planning_df["quantite_a_commander"] > 0]
-    if not order_candidates.empty:
-        supplier_summary = (
-            order_candidates.groupby("fournisseur", as_index=False)
-            .agg(
-                articles=("id", "count"),
-                quantite=("quantite_a_commander", "sum"),
-                valeur=("valeur_commande", "sum"),
-                marge=("marge_commande", "sum"),
-            )
-            .sort_values("valeur", ascending=False)
-        )
-        for _, row in supplier_summary.iterrows():
-            supplier_breakdown.append(
-                {
-                    "fournisseur": row["fournisseur"],
-                    "articles": int(row["articles"]),
-                    "quantite": int(row["quantite"]),
-                    "valeur": float(row["valeur"]),
-                    "marge": float(row["marge"]),
-                }
-            )
+    supplier_breakdown = _supplier_breakdown(base.suppliers[rows], quantities, order_values, order_margins)
+
+    if priorities:
+        wanted = [PRIORITY_LEVELS.index(level) for level in set(priorities) if level in PRIORITY_LEVELS]
+        order = order[np.isin(priority_rank[order], wanted)]
+    items_total = int(order.size)
+    start = max(0, int(offset))
+    order = order[start:start + int(limit)] if limit is not None else order[start:]
+
+    picked = rows[order]
+    levels = np.array(PRIORITY_LEVELS, dtype=object)[priority_rank[order]]
+    forecast_out = forecast[order]
+    columns: dict[str, list[Any]] = {
+        "id": base.ids[picked].tolist(),
+        "nom": base.names[picked].tolist(),
+        "categorie": base.categories[picked].tolist(),
+        "ventes_jour": daily_sales[order].tolist(),
+        "stock_actuel": stock[order].tolist(),
+        "couverture_jours": _finite_or_none(coverage[order]),
+        "ecart_couverture": _finite_or_none(coverage[order] - float(safe_target)),
+        "niveau_priorite": levels.tolist(),
+        "quantite_a_commander": quantities[order].tolist(),
+        "quantite_auto": auto_quantities[order].tolist(),
+        "valeur_commande": order_values[order].tolist(),
+        "ventes_prevision": np.where(forecast_out != 0, forecast_out, daily_sales[order]).tolist(),
+        "marge_pct": _finite_or_none(base.margin_pct[picked]),
+        "marge_commande": order_margins[order].tolist(),
+        "tva": _finite_or_none(base.tva[picked]),
+        "fournisseur": base.suppliers[picked].tolist(),
+        "ean": base.ean[picked].tolist(),
+        "abc_class": base.abc_class[picked].tolist(),
+        "xyz_class": base.xyz_class[picked].tolist(),
+    }
+    keys = list(columns)
+    result_items: List[dict[str, object]] = [dict(zip(keys, values)) for values in zip(*columns.values())]
 
     return {
         "params": params.__dict__,
         "summary": summary,
         "available_categories": all_categories,
         "items": result_items,
+        "items_total": items_total,
         "supplier_breakdown": supplier_breakdown,
     }
 
 
-__all__ = ["compute_supply_plan"]
+__all__ = ["PRIORITY_LEVELS", "compute_supply_plan", "invalidate_supply_cache"]
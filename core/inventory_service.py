@@ -1,6 +1,7 @@
 # inventory_service.py  # Module de services pour les stocks (ventes, réceptions, tickets)
 from collections import defaultdict  # Fournit un dict avec valeurs par défaut
 from datetime import datetime  # Gestion des horodatages
+from functools import partial  # Rendu différé du ticket
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP  # Décimaux précis et arrondis
 from typing import Iterable  # Typage des collections
 
@@ -44,12 +45,18 @@ def process_sale_transaction(
     username: str,
     *,
     tenant_id: int = 1,
+    batched: bool = False,
+    defer_receipt: bool = False,
 ) -> tuple[bool, str | None, dict[str, bytes] | None]:
     """Enregistre une vente en décrémentant le stock et en traçant les mouvements."""  # Docstring vente
 
     # Args:
     #     cart: liste d'articles issus du panier (doit contenir au moins les clés ``id`` et ``qty``).
     #     username: nom d'utilisateur Streamlit effectuant la vente.
+    #     batched: active le chemin ensembliste (verrou unique, UPDATE ... FROM (VALUES ...),
+    #         consommation FIFO groupée) pour limiter les allers-retours sur les gros paniers.
+    #     defer_receipt: ne génère pas le PDF ; le reçu contient ``filename`` et ``render``,
+    #         un callable sans argument qui produit le ticket hors du chemin critique.
     #
     # Returns:
     #     Tuple (succès, message, reçu). En cas d'échec, le reçu vaut ``None``.
@@ -96,87 +103,92 @@ def process_sale_transaction(
 
     try:  # Transaction de vente
         with eng.begin() as conn:  # Démarre une transaction
-            # On liste les produits introuvables ou à stock insuffisant avant toute insertion.
-            missing_products: list[int] = []  # Produits absents
-            insufficient: list[str] = []  # Produits à stock insuffisant
-
-            for pid, item in aggregated.items():  # Parcourt chaque produit agrégé
-                stock_row = conn.execute(
-                    text("SELECT stock_actuel FROM produits WHERE id = :pid AND tenant_id = :tenant_id FOR UPDATE"),
-                    {"pid": pid, "tenant_id": int(tenant_id)},
-                ).fetchone()  # Verrouille la ligne produit
-
-                if stock_row is None:  # Produit introuvable
-                    missing_products.append(pid)  # Ajoute à la liste
-                    continue  # Passe au produit suivant
-
-                current_stock = Decimal(str(stock_row[0] or 0))  # Stock actuel
-                if current_stock < item["qty"]:  # Stock insuffisant
-                    insufficient.append(
-                        f"{item['label']} (stock {current_stock} < vente {item['qty']})"
-                    )  # Note le message
-
-            if missing_products:  # Si des produits manquent
-                return False, f"Produits introuvables: {', '.join(map(str, missing_products))}.", None  # Échec
-
-            if insufficient:  # Si stock insuffisant
-                return (
-                    False,
-                    "Stock insuffisant: " + ", ".join(insufficient),
-                    None,
-                )  # Échec avec détails
-
-            ordered_items = list(aggregated.items())  # Fige l'ordre
-            movements_payload = []  # Liste des payloads mouvements
-            for pid, item in ordered_items:  # Construit les payloads d'insertion
-                movements_payload.append(
-                    {
-                        "pid": pid,
-                        "qty": item["qty"],
-                        "source": f"Vente par {username or 'inconnu'}",
-                        "tenant_id": int(tenant_id),
-                    }
-                )  # Données pour mouvements_stock
-
-            result = conn.execute(
-                text(
-                    """
-                    INSERT INTO mouvements_stock (produit_id, type, quantite, source, tenant_id)
-                    VALUES (:pid, 'SORTIE', :qty, :source, :tenant_id)
-                    RETURNING id
-                    """
-                ),
-                movements_payload,
-            )  # Insère les mouvements de sortie
-            result.fetchall()  # consume to satisfy DB-API
-
-            # Mise à jour explicite du stock (sous verrou) pour chaque mouvement.
-            for payload in movements_payload:
-                conn.execute(
+            if batched:  # Chemin ensembliste : nombre d'allers-retours constant
+                error = _apply_sale_batched(conn, aggregated, username, int(tenant_id))  # Vente groupée
+                if error:  # Contrôle de stock en échec
+                    return False, error, None  # Échec avant toute écriture
+            else:  # Chemin ligne à ligne historique
+                # On liste les produits introuvables ou à stock insuffisant avant toute insertion.
+                missing_products: list[int] = []  # Produits absents
+                insufficient: list[str] = []  # Produits à stock insuffisant
+
+                for pid, item in aggregated.items():  # Parcourt chaque produit agrégé
+                    stock_row = conn.execute(
+                        text("SELECT stock_actuel FROM produits WHERE id = :pid AND tenant_id = :tenant_id FOR UPDATE"),
+                        {"pid": pid, "tenant_id": int(tenant_id)},
+                    ).fetchone()  # Verrouille la ligne produit
+
+                    if stock_row is None:  # Produit introuvable
+                        missing_products.append(pid)  # Ajoute à la liste
+                        continue  # Passe au produit suivant
+
+                    current_stock = Decimal(str(stock_row[0] or 0))  # Stock actuel
+                    if current_stock < item["qty"]:  # Stock insuffisant
+                        insufficient.append(
+                            f"{item['label']} (stock {current_stock} < vente {item['qty']})"
+                        )  # Note le message
+
+                if missing_products:  # Si des produits manquent
+                    return False, f"Produits introuvables: {', '.join(map(str, missing_products))}.", None  # Échec
+
+                if insufficient:  # Si stock insuffisant
+                    return (
+                        False,
+                        "Stock insuffisant: " + ", ".join(insufficient),
+                        None,
+                    )  # Échec avec détails
+
+                ordered_items = list(aggregated.items())  # Fige l'ordre
+                movements_payload = []  # Liste des payloads mouvements
+                for pid, item in ordered_items:  # Construit les payloads d'insertion
+                    movements_payload.append(
+                        {
+                            "pid": pid,
+                            "qty": item["qty"],
+                            "source": f"Vente par {username or 'inconnu'}",
+                            "tenant_id": int(tenant_id),
+                        }
+                    )  # Données pour mouvements_stock
+
+                result = conn.execute(
                     text(
                         """
-                        UPDATE produits
-                        SET stock_actuel = stock_actuel - :qty,
-                            updated_at = now()
-                        WHERE id = :pid AND tenant_id = :tenant_id
+                        INSERT INTO mouvements_stock (produit_id, type, quantite, source, tenant_id)
+                        VALUES (:pid, 'SORTIE', :qty, :source, :tenant_id)
+                        RETURNING id
                         """
                     ),
-                    {
-                        "pid": payload["pid"],
-                        "qty": payload["qty"],
-                        "tenant_id": payload["tenant_id"],
-                    },
-                )  # Décrémente le stock
-
-            for pid, item in ordered_items:  # Consume les couches de coût FIFO
-                inventory_costing.consume_layers(
-                    conn,
-                    tenant_id=int(tenant_id),
-                    product_id=pid,
-                    quantity=item["qty"],
-                )  # Débit des couches de coûts
-
-        receipt = _build_sale_receipt(aggregated, username)  # Génère le ticket PDF
+                    movements_payload,
+                )  # Insère les mouvements de sortie
+                result.fetchall()  # consume to satisfy DB-API
+
+                # Mise à jour explicite du stock (sous verrou) pour chaque mouvement.
+                for payload in movements_payload:
+                    conn.execute(
+                        text(
+                            """
+                            UPDATE produits
+                            SET stock_actuel = stock_actuel - :qty,
+                                updated_at = now()
+                            WHERE id = :pid AND tenant_id = :tenant_id
+                            """
+                        ),
+                        {
+                            "pid": payload["pid"],
+                            "qty": payload["qty"],
+                            "tenant_id": payload["tenant_id"],
+                        },
+                    )  # Décrémente le stock
+
+                for pid, item in ordered_items:  # Consume les couches de coût FIFO
+                    inventory_costing.consume_layers(
+                        conn,
+                        tenant_id=int(tenant_id),
+                        product_id=pid,
+                        quantity=item["qty"],
+                    )  # Débit des couches de coûts
+
+        receipt = _sale_receipt(aggregated, username, defer_receipt)  # Ticket PDF (ou rendu différé)
         return True, None, receipt  # Succès
 
     except sa_exc.IntegrityError as exc:  # Conflits ou contraintes en base
@@ -187,13 +199,159 @@ def process_sale_transaction(
         return False, f"Erreur inattendue lors de la vente: {exc}", None  # Échec générique
 
 
-def _build_sale_receipt(aggregated: dict[int, dict[str, Decimal | str]], username: str | None) -> dict[str, bytes]:
+def _check_locked_stock(
+    aggregated: dict[int, dict[str, Decimal | str]],
+    stock_by_pid: dict[int, Decimal],
+) -> str | None:
+    """Contrôle produits introuvables et stocks insuffisants sur les lignes verrouillées."""  # Docstring contrôle
+
+    missing_products = [pid for pid in aggregated if pid not in stock_by_pid]  # Produits absents
+    if missing_products:  # Si des produits manquent
+        return f"Produits introuvables: {', '.join(map(str, missing_products))}."  # Message d'erreur
+
+    insufficient = [
+        f"{item['label']} (stock {stock_by_pid[pid]} < vente {item['qty']})"
+        for pid, item in aggregated.items()
+        if stock_by_pid[pid] < item["qty"]
+    ]  # Produits à stock insuffisant
+    if insufficient:  # Si stock insuffisant
+        return "Stock insuffisant: " + ", ".join(insufficient)  # Message détaillé
+    return None  # Aucun problème
+
+
+def _consume_layers_bulk(conn, *, tenant_id: int, quantities: dict[int, Decimal]) -> None:
+    """Débite les couches FIFO de tous les produits vendus en un seul appel si possible."""  # Docstring FIFO groupé
+
+    # inventory_costing expose ``consume_layers_bulk`` dans les versions récentes ; on retombe
+    # sur la consommation produit par produit sinon pour rester compatible.
+    bulk = getattr(inventory_costing, "consume_layers_bulk", None)  # API groupée éventuelle
+    if callable(bulk):  # API disponible
+        bulk(conn, tenant_id=tenant_id, quantities=quantities)  # Un seul passage
+        return  # Terminé
+
+    for pid, qty in quantities.items():  # Repli historique
+        inventory_costing.consume_layers(
+            conn,
+            tenant_id=tenant_id,
+            product_id=pid,
+            quantity=qty,
+        )  # Débit des couches de coûts
+
+
+def _apply_sale_batched(
+    conn,
+    aggregated: dict[int, dict[str, Decimal | str]],
+    username: str | None,
+    tenant_id: int,
+) -> str | None:
+    """Applique une vente en requêtes ensemblistes (verrou, mouvements, stock, FIFO)."""  # Docstring vente groupée
+
+    # Les verrous sont pris dans l'ordre des identifiants : deux caisses qui vendent les mêmes
+    # produits ne peuvent donc pas s'interbloquer.
+    product_ids = sorted(aggregated)  # IDs triés pour un ordre de verrouillage stable
+    rows = conn.execute(
+        text(
+            """
+            SELECT id, stock_actuel
+            FROM produits
+            WHERE tenant_id = :tenant_id
+              AND id = ANY(:ids)
+            ORDER BY id
+            FOR UPDATE
+            """
+        ),
+        {"ids": product_ids, "tenant_id": tenant_id},
+    ).fetchall()  # Verrouille toutes les lignes en un aller-retour
+    stock_by_pid = {int(row[0]): Decimal(str(row[1] or 0)) for row in rows}  # Stock par produit
+
+    error = _check_locked_stock(aggregated, stock_by_pid)  # Contrôle de cohérence
+    if error:  # Vente impossible
+        return error  # Message d'erreur
+
+    movements_payload = [
+        {
+            "pid": pid,
+            "qty": aggregated[pid]["qty"],
+            "source": f"Vente par {username or 'inconnu'}",
+            "tenant_id": tenant_id,
+        }
+        for pid in product_ids
+    ]  # Données pour mouvements_stock
+    conn.execute(
+        text(
+            """
+            INSERT INTO mouvements_stock (produit_id, type, quantite, source, tenant_id)
+            VALUES (:pid, 'SORTIE', :qty, :source, :tenant_id)
+            """
+        ),
+        movements_payload,
+    )  # Insère les mouvements de sortie (executemany groupé)
+
+    values_sql = ", ".join(
+        f"(CAST(:pid_{idx} AS INTEGER), CAST(:qty_{idx} AS NUMERIC))" for idx in range(len(product_ids))
+    )  # Lignes VALUES paramétrées
+    params: dict[str, object] = {"tenant_id": tenant_id}  # Paramètres de la mise à jour
+    for idx, pid in enumerate(product_ids):  # Alimente les paramètres
+        params[f"pid_{idx}"] = pid  # Identifiant produit
+        params[f"qty_{idx}"] = aggregated[pid]["qty"]  # Quantité vendue
+    conn.execute(
+        text(
+            f"""
+            UPDATE produits AS p
+            SET stock_actuel = p.stock_actuel - v.qty,
+                updated_at = now()
+            FROM (VALUES {values_sql}) AS v(pid, qty)
+            WHERE p.id = v.pid
+              AND p.tenant_id = :tenant_id
+            """
+        ),
+        params,
+    )  # Décrémente tous les stocks en une requête
+
+    _consume_layers_bulk(
+        conn,
+        tenant_id=tenant_id,
+        quantities={pid: aggregated[pid]["qty"] for pid in product_ids},
+    )  # Débit des couches de coûts
+    return None  # Vente appliquée
+
+
+def _receipt_filename(timestamp: datetime) -> str:
+    """Nom de fichier du ticket pour un horodatage de vente."""  # Docstring nom de fichier
+
+    return f"ticket_{timestamp.strftime('%Y%m%d_%H%M%S')}.pdf"  # Nom de fichier
+
+
+def _sale_receipt(
+    aggregated: dict[int, dict[str, Decimal | str]],
+    username: str | None,
+    defer: bool,
+) -> dict[str, object]:
+    """Retourne le ticket généré, ou son rendu différé si ``defer`` est vrai."""  # Docstring ticket/différé
+
+    if not defer:  # Comportement historique : rendu immédiat
+        return _build_sale_receipt(aggregated, username)  # Génère le ticket PDF
+
+    timestamp = datetime.now()  # Horodatage figé au moment de la vente
+    snapshot = {pid: dict(item) for pid, item in aggregated.items()}  # Copie indépendante des lignes
+    return {
+        "filename": _receipt_filename(timestamp),
+        "render": partial(_build_sale_receipt, snapshot, username, timestamp=timestamp),
+    }  # Rendu à exécuter hors transaction
+
+
+def _build_sale_receipt(
+    aggregated: dict[int, dict[str, Decimal | str]],
+    username: str | None,
+    *,
+    timestamp: datetime | None = None,
+) -> dict[str, bytes]:
     """Construit un ticket PDF minimaliste à partir des lignes agrégées."""  # Docstring ticket
 
     #     Le ticket est ensuite encodé en base64 par l’API FastAPI si la vente réussit,
-    #     pour affichage dans la SPA.
+    #     pour affichage dans la SPA, ou servi par ``GET /pos/receipts/{id}`` en mode différé.
 
-    timestamp = datetime.now()  # Horodatage du ticket
+    timestamp = timestamp or datetime.now()  # Horodatage du ticket
     header_lines = [
         "LINCONTOURNABLE MARKET",
         "Epicerie urbaine",
@@ -252,7 +410,7 @@ def _build_sale_receipt(aggregated: dict[int, dict[str, Decimal | str]], usernam
     sanitized_lines = [sanitize_receipt_text(line) for line in header_lines + detail_lines + footer_lines]  # Nettoie toutes les lignes
     pdf_bytes = render_receipt_pdf(sanitized_lines)  # Génère le PDF
 
-    filename = f"ticket_{timestamp.strftime('%Y%m%d_%H%M%S')}.pdf"  # Nom de fichier
+    filename = _receipt_filename(timestamp)  # Nom de fichier
     return {"filename": filename, "content": pdf_bytes}  # Retourne le fichier et le contenu binaire
 
 
@@ -11,19 +11,28 @@ from .base import (
     Repository,
     ReadOnlyRepository,
     UnitOfWork,
+    is_undefined_table,
 )
 from .users import UserRepository, SqlUserRepository
-from .stock_movements import StockMovementRepository, SqlStockMovementRepository
+from .stock_movements import (
+    LEDGER_BALANCES_SQL,
+    SIGNED_QUANTITY_SQL,
+    StockMovementRepository,
+    SqlStockMovementRepository,
+)
 
 __all__ = [
     # Base
     "Repository",
     "ReadOnlyRepository",
     "UnitOfWork",
+    "is_undefined_table",
     # Users
     "UserRepository",
     "SqlUserRepository",
     # Stock
     "StockMovementRepository",
     "SqlStockMovementRepository",
+    "LEDGER_BALANCES_SQL",
+    "SIGNED_QUANTITY_SQL",
 ]
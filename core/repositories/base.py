@@ -14,6 +14,7 @@ from contextlib import contextmanager
 
 from sqlalchemy import text
 from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.exc import ProgrammingError
 
 T = TypeVar("T")
 ID = TypeVar("ID", int, str)
@@ -147,3 +148,15 @@ class SqlUnitOfWork:
     def rollback(self) -> None:
         if self._transaction:
             self._transaction.rollback()
+
+
+UNDEFINED_TABLE_SQLSTATE = "42P01"
+
+
+def is_undefined_table(exc: BaseException) -> bool:
+    """True when ``exc`` is PostgreSQL's "relation does not exist" (migration not applied)."""
+
+    if not isinstance(exc, ProgrammingError):
+        return False
+    orig = getattr(exc, "orig", None)
+    return getattr(orig, "pgcode", None) == UNDEFINED_TABLE_SQLSTATE
@@ -15,6 +15,33 @@ from sqlalchemy import text
 from core.data_repository import get_engine, query_df, exec_sql_return_id
 
 
+# Quantité signée d'un mouvement (convention de v_stock_courant).
+SIGNED_QUANTITY_SQL = """
+    CASE
+        WHEN m.type IN ('ENTREE', 'INVENTAIRE', 'TRANSFERT') THEN m.quantite
+        WHEN m.type = 'SORTIE' THEN -m.quantite
+        ELSE 0
+    END
+"""
+
+# Stock théorique par produit d'un tenant : checkpoint + mouvements postérieurs au
+# watermark. Ne parcourt que la queue de l'historique (index PK sur id).
+LEDGER_BALANCES_SQL = f"""
+    SELECT ledger.produit_id, SUM(ledger.qty) AS stock
+    FROM (
+        SELECT c.produit_id, c.balance AS qty
+        FROM stock_ledger_checkpoint c
+        WHERE c.tenant_id = :tenant_id
+        UNION ALL
+        SELECT m.produit_id, {SIGNED_QUANTITY_SQL} AS qty
+        FROM mouvements_stock m
+        WHERE m.tenant_id = :tenant_id
+          AND m.id > COALESCE((SELECT w.last_movement_id FROM stock_ledger_watermark w), 0)
+    ) ledger
+    GROUP BY ledger.produit_id
+"""
+
+
 class MovementType(str, Enum):
     ENTREE = "ENTREE"
     SORTIE = "SORTIE"
@@ -75,6 +102,22 @@ class StockMovementRepository(Protocol):
     ) -> Sequence[StockMovementSummary]:
         ...
 
+    def get_balances(
+        self, *, tenant_id: int, produit_ids: Sequence[int] | None = None
+    ) -> dict[int, Decimal]:
+        ...
+
+    def compact_ledger(self, *, max_movements: int | None = None) -> dict[str, int]:
+        ...
+
+    def ensure_partitions(self, *, months_ahead: int = 3) -> int:
+        ...
+
+    def archive_partitions(
+        self, *, before: date, schema: str = "archive", drop: bool = False, dry_run: bool = False
+    ) -> list[dict[str, object]]:
+        ...
+
 
 class SqlStockMovementRepository:
     """SQLAlchemy implementation of StockMovementRepository."""
@@ -120,7 +163,7 @@ class SqlStockMovementRepository:
             SELECT id, produit_id, type, quantite, source, tenant_id, date_mvt, created_at
             FROM mouvements_stock
             WHERE tenant_id = :tenant_id
-              AND date_mvt >= NOW() - INTERVAL ':days days'
+              AND date_mvt >= NOW() - make_interval(days => :days)
             ORDER BY date_mvt DESC
             LIMIT :limit
             """
@@ -170,7 +213,7 @@ class SqlStockMovementRepository:
                 ) AS net
             FROM mouvements_stock
             WHERE tenant_id = :tenant_id
-              AND date_mvt >= NOW() - INTERVAL ':weeks weeks'
+              AND date_mvt >= NOW() - make_interval(weeks => :weeks)
             GROUP BY DATE_TRUNC('week', date_mvt)
             ORDER BY date DESC
             """
@@ -222,6 +265,77 @@ class SqlStockMovementRepository:
             for row in df.to_dict("records")
         ]
 
+    def get_balances(
+        self, *, tenant_id: int, produit_ids: Sequence[int] | None = None
+    ) -> dict[int, Decimal]:
+        """Stock théorique par produit (checkpoint + mouvements après le watermark)."""
+
+        sql = f"SELECT produit_id, stock FROM ({LEDGER_BALANCES_SQL}) balances"
+        params: dict[str, object] = {"tenant_id": tenant_id}
+        if produit_ids is not None:
+            if not produit_ids:
+                return {}
+            sql += " WHERE produit_id = ANY(:produit_ids)"
+            params["produit_ids"] = [int(pid) for pid in produit_ids]
+        df = query_df(text(sql), params)
+        return {int(row["produit_id"]): Decimal(str(row["stock"])) for row in df.to_dict("records")}
+
+    def compact_ledger(self, *, max_movements: int | None = None) -> dict[str, int]:
+        """Avance le watermark du checkpoint (``stock_ledger_compact``)."""
+
+        engine = get_engine()
+        with engine.begin() as conn:
+            row = conn.execute(
+                text("SELECT previous_watermark, watermark, products FROM stock_ledger_compact(:max_movements)"),
+                {"max_movements": max_movements},
+            ).one()
+        return {
+            "previous_watermark": int(row.previous_watermark),
+            "watermark": int(row.watermark),
+            "products": int(row.products),
+        }
+
+    def ensure_partitions(self, *, months_ahead: int = 3) -> int:
+        """Crée les partitions mensuelles manquantes jusqu'à ``months_ahead`` mois."""
+
+        engine = get_engine()
+        with engine.begin() as conn:
+            created = conn.execute(
+                text("SELECT mouvements_stock_ensure_partitions(:months_ahead)"),
+                {"months_ahead": int(months_ahead)},
+            ).scalar()
+        return int(created or 0)
+
+    def archive_partitions(
+        self, *, before: date, schema: str = "archive", drop: bool = False, dry_run: bool = False
+    ) -> list[dict[str, object]]:
+        """Détache (ou supprime) les partitions entièrement antérieures à ``before``.
+
+        Le grand livre est compacté avant détachement : v_stock_courant et
+        ``get_balances`` restent justes sans les vieux mouvements.
+        """
+
+        engine = get_engine()
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT partition_name, range_end, movements, action
+                    FROM mouvements_stock_archive_partitions(:before, :schema, :drop, :dry_run)
+                    """
+                ),
+                {"before": before, "schema": schema, "drop": bool(drop), "dry_run": bool(dry_run)},
+            ).mappings().all()
+        return [
+            {
+                "partition": row["partition_name"],
+                "range_end": row["range_end"],
+                "movements": int(row["movements"] or 0),
+                "action": row["action"],
+            }
+            for row in rows
+        ]
+
     def _row_to_movement(self, row: dict) -> StockMovement:
         return StockMovement(
             id=row["id"],
@@ -246,9 +246,10 @@ CREATE TABLE IF NOT EXISTS produits_barcodes (
     created_at TIMESTAMP NOT NULL DEFAULT now()
 );
 
--- Mouvements
+-- Mouvements : partitions mensuelles sur date_mvt (mouvements_stock_pYYYYMM) et une
+-- partition DEFAULT pour les dates hors plage. La PK inclut la clé de partition.
 CREATE TABLE IF NOT EXISTS mouvements_stock (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     produit_id INT NOT NULL REFERENCES produits(id) ON DELETE CASCADE,
     tenant_id INT NOT NULL DEFAULT 1,
     type type_mouvement NOT NULL,
@@ -256,8 +257,76 @@ CREATE TABLE IF NOT EXISTS mouvements_stock (
     quantite NUMERIC(12,3) NOT NULL CHECK (quantite > 0),
     source TEXT,                -- Ex: Nom du fournisseur, Numéro de commande, Nom de l'utilisateur
     date_mvt TIMESTAMP NOT NULL DEFAULT now(),
-    created_at TIMESTAMP NOT NULL DEFAULT now()
-);
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, date_mvt)
+) PARTITION BY RANGE (date_mvt);
+
+-- Crée les partitions du mois courant (ou de p_from) jusqu'à p_months_ahead mois.
+-- Appelée chaque heure par le service "stock-ledger" du docker-compose.
+CREATE OR REPLACE FUNCTION mouvements_stock_ensure_partitions(
+    p_months_ahead INT DEFAULT 3,
+    p_from DATE DEFAULT NULL
+)
+RETURNS INT AS $$
+DECLARE
+    v_month DATE := date_trunc('month', COALESCE(p_from, CURRENT_DATE))::date;
+    v_last DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => GREATEST(p_months_ahead, 0)))::date;
+    v_upper DATE;
+    v_name TEXT;
+    v_created INT := 0;
+    v_default REGCLASS := to_regclass('mouvements_stock_default');
+    v_stranded BOOLEAN;
+    v_oldest DATE;
+BEGIN
+    -- Mois restés dans DEFAULT (job arrêté, mouvements antidatés) : rattrapés aussi.
+    IF p_from IS NULL AND v_default IS NOT NULL THEN
+        EXECUTE 'SELECT date_trunc(''month'', MIN(date_mvt))::date FROM mouvements_stock_default' INTO v_oldest;
+        v_month := LEAST(v_month, v_oldest);
+    END IF;
+    WHILE v_month <= v_last LOOP
+        v_name := format('mouvements_stock_p%s', to_char(v_month, 'YYYYMM'));
+        v_upper := (v_month + INTERVAL '1 month')::date;
+        IF to_regclass(v_name) IS NULL THEN
+            v_stranded := FALSE;
+            IF v_default IS NOT NULL THEN
+                EXECUTE 'SELECT EXISTS (SELECT 1 FROM mouvements_stock_default WHERE date_mvt >= $1 AND date_mvt < $2)'
+                INTO v_stranded USING v_month, v_upper;
+            END IF;
+            IF v_stranded THEN
+                -- Mois déjà alimenté via DEFAULT : la partition est remplie à part puis
+                -- attachée, sans repasser par les triggers (stock_actuel, grand livre).
+                EXECUTE 'LOCK TABLE mouvements_stock_default IN ACCESS EXCLUSIVE MODE';
+                EXECUTE format(
+                    'CREATE TABLE %I (LIKE mouvements_stock INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name
+                );
+                EXECUTE format(
+                    'INSERT INTO %I SELECT * FROM mouvements_stock_default WHERE date_mvt >= %L AND date_mvt < %L',
+                    v_name, v_month, v_upper
+                );
+                EXECUTE 'ALTER TABLE mouvements_stock_default DISABLE TRIGGER USER';
+                EXECUTE 'DELETE FROM mouvements_stock_default WHERE date_mvt >= $1 AND date_mvt < $2'
+                USING v_month, v_upper;
+                EXECUTE 'ALTER TABLE mouvements_stock_default ENABLE TRIGGER USER';
+                EXECUTE format(
+                    'ALTER TABLE mouvements_stock ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    v_name, v_month, v_upper
+                );
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF mouvements_stock FOR VALUES FROM (%L) TO (%L)',
+                    v_name, v_month, v_upper
+                );
+            END IF;
+            v_created := v_created + 1;
+        END IF;
+        v_month := v_upper;
+    END LOOP;
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT mouvements_stock_ensure_partitions();
+CREATE TABLE IF NOT EXISTS mouvements_stock_default PARTITION OF mouvements_stock DEFAULT;
 
 -- Utilisateurs applicatifs
 CREATE TABLE IF NOT EXISTS app_users (
@@ -342,14 +411,230 @@ CREATE UNIQUE INDEX IF NOT EXISTS uix_barcodes_code_ci ON public.produits_barcod
 
 -- Index pour les recherches fréquentes
 CREATE INDEX IF NOT EXISTS idx_barcode_produit ON produits_barcodes(produit_id);
+-- Listing catalogue : pagination par clé (nom, id) et recherche trigramme nom / codes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_produits_tenant_nom_id ON produits(tenant_id, nom, id);
+CREATE INDEX IF NOT EXISTS idx_produits_nom_trgm ON produits USING gin (LOWER(nom) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_barcodes_code_trgm ON produits_barcodes USING gin (LOWER(code) gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_mouvements_produit ON mouvements_stock(produit_id);
-CREATE INDEX IF NOT EXISTS idx_mouvements_date ON mouvements_stock(date_mvt);
+CREATE INDEX IF NOT EXISTS idx_mouvements_tenant_date ON mouvements_stock(tenant_id, date_mvt);
+CREATE INDEX IF NOT EXISTS idx_mouvements_entrees_produit
+    ON mouvements_stock(tenant_id, produit_id, date_mvt DESC) WHERE type = 'ENTREE';
+-- BRIN : date_mvt et id croissent avec l'insertion, quelques pages d'index par partition.
+CREATE INDEX IF NOT EXISTS brin_mouvements_date ON mouvements_stock USING BRIN (date_mvt);
+CREATE INDEX IF NOT EXISTS brin_mouvements_id ON mouvements_stock USING BRIN (id);
+CREATE INDEX IF NOT EXISTS idx_mouvements_tenant_id ON mouvements_stock(tenant_id, id);
+
+-- Version du catalogue par tenant : l'index de rapprochement des factures (en mémoire)
+-- se reconstruit quand elle change. Les mises à jour de stock_actuel ne l'incrémentent pas.
+CREATE TABLE IF NOT EXISTS catalog_versions (
+    tenant_id INT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        INSERT INTO catalog_versions AS v (tenant_id, version) VALUES (NEW.tenant_id, 1)
+        ON CONFLICT (tenant_id) DO UPDATE SET version = v.version + 1, updated_at = now();
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.tenant_id IS DISTINCT FROM NEW.tenant_id) THEN
+        INSERT INTO catalog_versions AS v (tenant_id, version) VALUES (OLD.tenant_id, 1)
+        ON CONFLICT (tenant_id) DO UPDATE SET version = v.version + 1, updated_at = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_catalog_version_produits ON produits;
+CREATE TRIGGER trg_catalog_version_produits
+AFTER INSERT OR DELETE ON produits
+FOR EACH ROW EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS trg_catalog_version_produits_update ON produits;
+CREATE TRIGGER trg_catalog_version_produits_update
+AFTER UPDATE OF nom, categorie, prix_achat, prix_vente, tva, tenant_id ON produits
+FOR EACH ROW EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS trg_catalog_version_barcodes ON produits_barcodes;
+CREATE TRIGGER trg_catalog_version_barcodes
+AFTER INSERT OR UPDATE OR DELETE ON produits_barcodes
+FOR EACH ROW EXECUTE FUNCTION bump_catalog_version();
 
 --------------------------------------------------------------------------------
 -- 5. VUES COHÉRENTES ET FONCTIONNELLES
 --------------------------------------------------------------------------------
 
--- VUE DU STOCK COURANT (Méthode 1: Solde Net basé sur l'historique)
+-- CHECKPOINT DU GRAND LIVRE DE STOCK
+-- Soldes par produit arrêtés à un id de mouvement (watermark) : le stock théorique
+-- = checkpoint + mouvements postérieurs au watermark, au lieu de tout l'historique.
+-- stock_ledger_compact() avance le watermark (service "stock-ledger" du docker-compose).
+CREATE TABLE IF NOT EXISTS stock_ledger_checkpoint (
+    tenant_id INT NOT NULL,
+    produit_id INT NOT NULL REFERENCES produits(id) ON DELETE CASCADE,
+    balance NUMERIC(14,3) NOT NULL DEFAULT 0,
+    last_movement_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (tenant_id, produit_id)
+);
+CREATE INDEX IF NOT EXISTS ix_stock_ledger_checkpoint_produit ON stock_ledger_checkpoint (produit_id);
+
+CREATE TABLE IF NOT EXISTS stock_ledger_watermark (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    last_movement_id BIGINT NOT NULL DEFAULT 0,
+    compacted_at TIMESTAMPTZ
+);
+INSERT INTO stock_ledger_watermark (id, last_movement_id) VALUES (TRUE, 0) ON CONFLICT DO NOTHING;
+
+-- Le verrou SHARE attend la fin des insertions en cours : aucun mouvement d'id
+-- inférieur au nouveau watermark ne peut être validé après la compaction.
+CREATE OR REPLACE FUNCTION stock_ledger_compact(p_max_movements BIGINT DEFAULT NULL)
+RETURNS TABLE (previous_watermark BIGINT, watermark BIGINT, products BIGINT) AS $$
+DECLARE
+    v_lo BIGINT;
+    v_hi BIGINT;
+    v_products BIGINT;
+BEGIN
+    SELECT w.last_movement_id INTO v_lo FROM stock_ledger_watermark w WHERE w.id FOR UPDATE;
+    LOCK TABLE mouvements_stock IN SHARE MODE;
+    SELECT COALESCE(MAX(m.id), v_lo) INTO v_hi FROM mouvements_stock m WHERE m.id > v_lo;
+    IF p_max_movements IS NOT NULL THEN
+        v_hi := LEAST(v_hi, v_lo + p_max_movements);
+    END IF;
+
+    INSERT INTO stock_ledger_checkpoint AS c (tenant_id, produit_id, balance, last_movement_id, updated_at)
+    SELECT m.tenant_id, m.produit_id, SUM(CASE
+        WHEN m.type IN ('ENTREE', 'INVENTAIRE', 'TRANSFERT') THEN m.quantite
+        WHEN m.type = 'SORTIE' THEN -m.quantite
+        ELSE 0
+    END), MAX(m.id), now()
+    FROM mouvements_stock m
+    WHERE m.id > v_lo AND m.id <= v_hi
+    GROUP BY m.tenant_id, m.produit_id
+    ON CONFLICT (tenant_id, produit_id) DO UPDATE
+    SET balance = c.balance + EXCLUDED.balance,
+        last_movement_id = GREATEST(c.last_movement_id, EXCLUDED.last_movement_id),
+        updated_at = now();
+    GET DIAGNOSTICS v_products = ROW_COUNT;
+
+    UPDATE stock_ledger_watermark w SET last_movement_id = v_hi, compacted_at = now() WHERE w.id;
+
+    RETURN QUERY SELECT v_lo, v_hi, v_products;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Détache (vers le schéma p_schema) ou supprime les partitions antérieures à p_before.
+-- Le grand livre est compacté d'abord : les soldes restent dans le checkpoint.
+CREATE OR REPLACE FUNCTION mouvements_stock_archive_partitions(
+    p_before DATE,
+    p_schema TEXT DEFAULT 'archive',
+    p_drop BOOLEAN DEFAULT FALSE,
+    p_dry_run BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (partition_name TEXT, range_end DATE, movements BIGINT, action TEXT) AS $$
+DECLARE
+    v_part RECORD;
+    v_con RECORD;
+    v_wm BIGINT;
+    v_max BIGINT;
+BEGIN
+    IF NOT p_dry_run THEN
+        LOCK TABLE mouvements_stock IN ACCESS EXCLUSIVE MODE;
+    END IF;
+    SELECT w.last_movement_id INTO v_wm FROM stock_ledger_watermark w WHERE w.id;
+
+    FOR v_part IN
+        SELECT c.oid::regclass AS rel, c.relname,
+               (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''([^'']+)''\)'))[1]::timestamp::date AS upper_bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'mouvements_stock'::regclass
+        ORDER BY 3
+    LOOP
+        CONTINUE WHEN v_part.upper_bound IS NULL OR v_part.upper_bound > p_before;
+
+        partition_name := v_part.relname;
+        range_end := v_part.upper_bound;
+        action := CASE WHEN p_drop THEN 'drop' ELSE 'detach' END;
+        EXECUTE format('SELECT COUNT(*), MAX(id) FROM %s', v_part.rel) INTO movements, v_max;
+
+        IF NOT p_dry_run THEN
+            IF v_max > COALESCE(v_wm, 0) THEN
+                PERFORM stock_ledger_compact();
+                SELECT w.last_movement_id INTO v_wm FROM stock_ledger_watermark w WHERE w.id;
+            END IF;
+            EXECUTE format('ALTER TABLE mouvements_stock DETACH PARTITION %s', v_part.rel);
+            IF p_drop THEN
+                EXECUTE format('DROP TABLE %s', v_part.rel);
+            ELSE
+                FOR v_con IN
+                    SELECT conname FROM pg_constraint WHERE conrelid = v_part.rel AND contype = 'f'
+                LOOP
+                    EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', v_part.rel, v_con.conname);
+                END LOOP;
+                EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', p_schema);
+                EXECUTE format('ALTER TABLE %s SET SCHEMA %I', v_part.rel, p_schema);
+            END IF;
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mouvement déjà compacté modifié/supprimé : correction du solde du checkpoint.
+CREATE OR REPLACE FUNCTION stock_ledger_guard()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_wm BIGINT;
+BEGIN
+    SELECT w.last_movement_id INTO v_wm FROM stock_ledger_watermark w WHERE w.id;
+    IF OLD.id <= COALESCE(v_wm, 0) THEN
+        UPDATE stock_ledger_checkpoint c
+        SET balance = c.balance - CASE
+        WHEN OLD.type IN ('ENTREE', 'INVENTAIRE', 'TRANSFERT') THEN OLD.quantite
+        WHEN OLD.type = 'SORTIE' THEN -OLD.quantite
+        ELSE 0
+    END, updated_at = now()
+        WHERE c.tenant_id = OLD.tenant_id AND c.produit_id = OLD.produit_id;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.id <= COALESCE(v_wm, 0) THEN
+        INSERT INTO stock_ledger_checkpoint AS c (tenant_id, produit_id, balance, last_movement_id)
+        VALUES (NEW.tenant_id, NEW.produit_id, CASE
+        WHEN NEW.type IN ('ENTREE', 'INVENTAIRE', 'TRANSFERT') THEN NEW.quantite
+        WHEN NEW.type = 'SORTIE' THEN -NEW.quantite
+        ELSE 0
+    END, NEW.id)
+        ON CONFLICT (tenant_id, produit_id) DO UPDATE
+        SET balance = c.balance + EXCLUDED.balance, updated_at = now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_stock_ledger_guard
+AFTER UPDATE OR DELETE ON mouvements_stock
+FOR EACH ROW EXECUTE FUNCTION stock_ledger_guard();
+
+-- Changer date_mvt peut déplacer la ligne de partition (DELETE + INSERT) : le solde
+-- serait compté deux fois par les triggers ci-dessus. La clé (id, date_mvt) est figée.
+CREATE OR REPLACE FUNCTION mouvements_stock_key_guard()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'mouvements_stock: id et date_mvt ne sont pas modifiables (mouvement %)', OLD.id
+        USING ERRCODE = 'feature_not_supported',
+              HINT = 'Supprimer le mouvement et en enregistrer un nouveau.';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_mouvements_stock_key_guard
+BEFORE UPDATE OF id, date_mvt ON mouvements_stock
+FOR EACH ROW
+WHEN (NEW.id IS DISTINCT FROM OLD.id OR NEW.date_mvt IS DISTINCT FROM OLD.date_mvt)
+EXECUTE FUNCTION mouvements_stock_key_guard();
+
+-- VUE DU STOCK COURANT (Solde net = checkpoint + mouvements après le watermark)
 CREATE OR REPLACE VIEW v_stock_courant AS
 SELECT
     p.id,
@@ -360,18 +645,24 @@ SELECT
     p.tva,
     p.seuil_alerte,
     p.actif,
-    -- Logique de calcul du solde
-    COALESCE(SUM(
-        CASE
-            WHEN m.type IN ('ENTREE', 'INVENTAIRE', 'TRANSFERT') THEN m.quantite -- NOTE: voir explication ci-dessous
-            WHEN m.type = 'SORTIE' THEN -m.quantite
-            ELSE 0
-        END
-    ), 0) AS stock
+    COALESCE(l.stock, 0) AS stock
 FROM produits p
-LEFT JOIN mouvements_stock m ON m.produit_id = p.id
-GROUP BY
-    p.id, p.nom, p.categorie, p.prix_achat, p.prix_vente, p.tva, p.seuil_alerte, p.actif
+LEFT JOIN (
+    SELECT ledger.produit_id, SUM(ledger.qty) AS stock
+    FROM (
+        SELECT c.produit_id, c.balance AS qty
+        FROM stock_ledger_checkpoint c
+        UNION ALL
+        SELECT m.produit_id, CASE
+        WHEN m.type IN ('ENTREE', 'INVENTAIRE', 'TRANSFERT') THEN m.quantite
+        WHEN m.type = 'SORTIE' THEN -m.quantite
+        ELSE 0
+    END -- NOTE: voir explication ci-dessous
+        FROM mouvements_stock m
+        WHERE m.id > (SELECT w.last_movement_id FROM stock_ledger_watermark w)
+    ) ledger
+    GROUP BY ledger.produit_id
+) l ON l.produit_id = p.id
 ORDER BY p.nom;
 
 /*
@@ -421,25 +712,89 @@ CREATE TABLE IF NOT EXISTS capital_snapshot (
 
 CREATE INDEX IF NOT EXISTS idx_capital_snapshot_tenant_date ON capital_snapshot (tenant_id, snapshot_date);
 
-CREATE OR REPLACE VIEW latest_price_history AS
-SELECT
-    code,
-    tenant_id,
-    fournisseur,
-    prix_achat,
-    quantite,
-    facture_date,
-    source_context,
-    created_at
-FROM (
-    SELECT *,
-           ROW_NUMBER() OVER (
-               PARTITION BY tenant_id, code
-               ORDER BY facture_date DESC NULLS LAST, created_at DESC
-           ) AS row_num
-    FROM produits_price_history
-) ranked
-WHERE row_num = 1;
+-- Prévisions de consommation précalculées (backend.services.forecasting)
+CREATE TABLE IF NOT EXISTS product_consumption_forecasts (
+    tenant_id INT NOT NULL,
+    produit_id INT NOT NULL REFERENCES produits(id) ON DELETE CASCADE,
+    level DOUBLE PRECISION NOT NULL DEFAULT 0,
+    trend DOUBLE PRECISION NOT NULL DEFAULT 0,
+    history_days INT NOT NULL,
+    generated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (tenant_id, produit_id)
+);
+
+CREATE TABLE IF NOT EXISTS product_forecast_runs (
+    tenant_id INT PRIMARY KEY,
+    fit_date DATE NOT NULL,
+    last_movement_id BIGINT NOT NULL DEFAULT 0,
+    generated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    products INT NOT NULL DEFAULT 0,
+    duration_ms INT NOT NULL DEFAULT 0
+);
+
+-- Dernier prix connu par (tenant, code) : table maintenue par trigger plutôt
+-- qu'une vue ROW_NUMBER() recalculée sur tout l'historique à chaque lecture.
+-- Les produits sans code (code NULL) gardent une ligne par tenant, comme la vue.
+CREATE INDEX IF NOT EXISTS idx_price_history_tenant_code_latest
+    ON produits_price_history (tenant_id, code, facture_date DESC NULLS LAST, created_at DESC NULLS LAST);
+
+CREATE TABLE IF NOT EXISTS latest_price_history AS
+SELECT DISTINCT ON (tenant_id, code)
+    code, tenant_id, fournisseur, prix_achat, quantite, facture_date, source_context, created_at
+FROM produits_price_history
+ORDER BY tenant_id, code, facture_date DESC NULLS LAST, created_at DESC NULLS LAST;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_latest_price_history_tenant_code
+    ON latest_price_history (tenant_id, code) NULLS NOT DISTINCT;
+
+CREATE OR REPLACE FUNCTION trg_latest_price_history()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- Recalcul en upsert : deux écritures concurrentes sur le même code ne se
+        -- heurtent pas à l'index unique ; la ligne ne part que si l'historique est vide.
+        INSERT INTO latest_price_history (code, tenant_id, fournisseur, prix_achat, quantite, facture_date, source_context, created_at)
+        SELECT code, tenant_id, fournisseur, prix_achat, quantite, facture_date, source_context, created_at
+        FROM produits_price_history
+        WHERE tenant_id = OLD.tenant_id AND code IS NOT DISTINCT FROM OLD.code
+        ORDER BY facture_date DESC NULLS LAST, created_at DESC NULLS LAST
+        LIMIT 1
+        ON CONFLICT (tenant_id, code) DO UPDATE SET
+            fournisseur = EXCLUDED.fournisseur,
+            prix_achat = EXCLUDED.prix_achat,
+            quantite = EXCLUDED.quantite,
+            facture_date = EXCLUDED.facture_date,
+            source_context = EXCLUDED.source_context,
+            created_at = EXCLUDED.created_at;
+        IF NOT FOUND THEN
+            DELETE FROM latest_price_history
+            WHERE tenant_id = OLD.tenant_id AND code IS NOT DISTINCT FROM OLD.code;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO latest_price_history AS l (code, tenant_id, fournisseur, prix_achat, quantite, facture_date, source_context, created_at)
+        VALUES (
+            NEW.code, NEW.tenant_id, NEW.fournisseur, NEW.prix_achat, NEW.quantite,
+            NEW.facture_date, NEW.source_context, NEW.created_at
+        )
+        ON CONFLICT (tenant_id, code) DO UPDATE SET
+            fournisseur = EXCLUDED.fournisseur,
+            prix_achat = EXCLUDED.prix_achat,
+            quantite = EXCLUDED.quantite,
+            facture_date = EXCLUDED.facture_date,
+            source_context = EXCLUDED.source_context,
+            created_at = EXCLUDED.created_at
+        WHERE (COALESCE(EXCLUDED.facture_date, '-infinity'), COALESCE(EXCLUDED.created_at, '-infinity'))
+           >= (COALESCE(l.facture_date, '-infinity'), COALESCE(l.created_at, '-infinity'));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_latest_price_history ON produits_price_history;
+CREATE TRIGGER trg_latest_price_history
+AFTER INSERT OR UPDATE OR DELETE ON produits_price_history
+FOR EACH ROW EXECUTE FUNCTION trg_latest_price_history();
 
 --------------------------------------------------------------------------------
 -- 6. TABLES D'AUDIT (assignations & journal)
@@ -601,6 +956,9 @@ CREATE TABLE IF NOT EXISTS restaurant_bank_statements (
 );
 
 CREATE INDEX IF NOT EXISTS idx_restaurant_bank_statements_tenant_account ON restaurant_bank_statements (tenant_id, account);
+CREATE INDEX IF NOT EXISTS idx_restaurant_bank_statements_depense
+    ON restaurant_bank_statements (depense_id) WHERE depense_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_restaurant_depenses_tenant_id ON restaurant_depenses (tenant_id, id);
 CREATE UNIQUE INDEX IF NOT EXISTS uq_restaurant_bank_statements_entry
     ON restaurant_bank_statements (tenant_id, account, date, (md5(libelle)), montant);
 
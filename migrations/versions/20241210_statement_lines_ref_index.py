@@ -0,0 +1,31 @@
+"""Index (account_id, ref_banque) pour la déduplication ensembliste des imports CSV."""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+revision: str = "20241210_stmt_lines_ref_idx"
+down_revision: Union[str, Sequence[str], None] = "20241209_statement_lines_dedup"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_indexes = {idx["name"] for idx in inspector.get_indexes("finance_bank_statement_lines")}
+    if "idx_statement_lines_account_ref" not in existing_indexes:
+        op.create_index(
+            "idx_statement_lines_account_ref",
+            "finance_bank_statement_lines",
+            ["account_id", "ref_banque"],
+            postgresql_where=sa.text("ref_banque IS NOT NULL"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_statement_lines_account_ref", table_name="finance_bank_statement_lines")
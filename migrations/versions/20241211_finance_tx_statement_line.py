@@ -0,0 +1,130 @@
+"""Lien persistant transaction -> ligne de relevé (finance_transactions.statement_line_id).
+
+Jusqu'ici chaque recherche retrouvait la ligne de relevé d'une transaction en
+ré-évaluant ``substring(ref_externe ...)`` ou un rapprochement flou montant/date.
+La colonne est remplie une fois : par trigger pour les références explicites
+``stmtline:<id|checksum>``, par ``link_statement_lines`` après import pour le reste.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+revision: str = "20241211_fin_tx_stmt_line"
+down_revision: Union[str, Sequence[str], None] = "20241210_stmt_lines_ref_idx"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("finance_transactions")}
+    if "statement_line_id" not in columns:
+        op.add_column(
+            "finance_transactions",
+            sa.Column(
+                "statement_line_id",
+                sa.BigInteger(),
+                sa.ForeignKey("finance_bank_statement_lines.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+        )
+
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_finance_transactions_statement_line "
+        "ON finance_transactions (statement_line_id) WHERE statement_line_id IS NOT NULL"
+    )
+    # Pagination par curseur sur (date_operation, id).
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_finance_transactions_date_id "
+        "ON finance_transactions (date_operation, id)"
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION finance_tx_resolve_statement_line()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NEW.ref_externe ~ '^stmtline:[0-9]+$' THEN
+                SELECT l.id INTO NEW.statement_line_id
+                FROM finance_bank_statement_lines l
+                WHERE l.id = CAST(substring(NEW.ref_externe FROM 10) AS BIGINT);
+            ELSIF NEW.ref_externe LIKE 'stmtline:%' THEN
+                SELECT l.id INTO NEW.statement_line_id
+                FROM finance_bank_statement_lines l
+                WHERE l.account_id = NEW.account_id
+                  AND l.checksum = substring(NEW.ref_externe FROM 10)
+                ORDER BY l.id
+                LIMIT 1;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_tx_statement_line ON finance_transactions")
+    op.execute(
+        """
+        CREATE TRIGGER trg_finance_tx_statement_line
+        BEFORE INSERT OR UPDATE OF ref_externe ON finance_transactions
+        FOR EACH ROW
+        WHEN (NEW.ref_externe LIKE 'stmtline:%')
+        EXECUTE FUNCTION finance_tx_resolve_statement_line()
+        """
+    )
+
+    # Rattrapage de l'existant : références explicites puis rapprochement flou.
+    op.execute(
+        """
+        UPDATE finance_transactions t
+        SET statement_line_id = l.id
+        FROM finance_bank_statement_lines l
+        WHERE t.statement_line_id IS NULL
+          AND t.ref_externe ~ '^stmtline:[0-9]+$'
+          AND l.id = CAST(substring(t.ref_externe FROM 10) AS BIGINT)
+        """
+    )
+    op.execute(
+        """
+        UPDATE finance_transactions t
+        SET statement_line_id = l.id
+        FROM finance_bank_statement_lines l
+        WHERE t.statement_line_id IS NULL
+          AND t.ref_externe LIKE 'stmtline:%'
+          AND t.ref_externe !~ '^stmtline:[0-9]+$'
+          AND l.account_id = t.account_id
+          AND l.checksum = substring(t.ref_externe FROM 10)
+        """
+    )
+    op.execute(
+        """
+        UPDATE finance_transactions t
+        SET statement_line_id = m.line_id
+        FROM (
+            SELECT DISTINCT ON (t2.id) t2.id AS transaction_id, l.id AS line_id
+            FROM finance_transactions t2
+            JOIN finance_bank_statements bs ON bs.account_id = t2.account_id
+            JOIN finance_bank_statement_lines l
+              ON l.statement_id = bs.id
+             AND l.date_operation = t2.date_operation
+             AND ABS(ABS(l.montant) - t2.amount) < 0.01
+            WHERE t2.statement_line_id IS NULL
+              AND (t2.ref_externe IS NULL OR t2.ref_externe NOT LIKE 'stmtline:%')
+            ORDER BY t2.id, l.id
+        ) m
+        WHERE t.id = m.transaction_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_tx_statement_line ON finance_transactions")
+    op.execute("DROP FUNCTION IF EXISTS finance_tx_resolve_statement_line()")
+    op.execute("DROP INDEX IF EXISTS ix_finance_transactions_date_id")
+    op.execute("DROP INDEX IF EXISTS ix_finance_transactions_statement_line")
+    op.drop_column("finance_transactions", "statement_line_id")
@@ -0,0 +1,190 @@
+"""Table d'agrégats finance maintenue incrémentalement (finance_rollup_daily).
+
+Remplace le ``REFRESH MATERIALIZED VIEW`` complet de mv_finance_category_stats /
+mv_finance_account_stats : une ligne par (entité, jour, compte, catégorie, sens),
+tenue à jour par triggers sur finance_transaction_lines et finance_transactions.
+Les stats (catégories, comptes, chronologie, trésorerie) se lisent dans cette table.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+revision: str = "20241212_finance_rollup_daily"
+down_revision: Union[str, Sequence[str], None] = "20241211_fin_tx_stmt_line"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Agrège un ensemble de lignes (transition table ``src``) et l'ajoute au rollup avec
+# le signe ``sign`` (+1 insertion, -1 suppression).
+_APPLY_LINES = """
+        INSERT INTO finance_rollup_daily AS r
+            (entity_id, day, account_id, category_id, direction, amount, line_count)
+        SELECT t.entity_id, t.date_operation::date, t.account_id, COALESCE(s.category_id, 0),
+               t.direction::text, {sign} * SUM(COALESCE(s.montant_ttc, 0)), {sign} * COUNT(*)
+        FROM {src} s
+        JOIN finance_transactions t ON t.id = s.transaction_id
+        WHERE t.direction IN ('IN', 'OUT')
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (entity_id, day, account_id, category_id, direction) DO UPDATE
+        SET amount = r.amount + EXCLUDED.amount,
+            line_count = r.line_count + EXCLUDED.line_count;
+"""
+
+# Même agrégat pour les lignes d'une transaction, avec ses dimensions ``rec`` (OLD/NEW).
+_APPLY_TRANSACTION = """
+        INSERT INTO finance_rollup_daily AS r
+            (entity_id, day, account_id, category_id, direction, amount, line_count)
+        SELECT {rec}.entity_id, {rec}.date_operation::date, {rec}.account_id,
+               COALESCE(tl.category_id, 0), {rec}.direction::text,
+               {sign} * SUM(COALESCE(tl.montant_ttc, 0)), {sign} * COUNT(*)
+        FROM finance_transaction_lines tl
+        WHERE tl.transaction_id = {rec}.id
+          AND {rec}.direction IN ('IN', 'OUT')
+        GROUP BY COALESCE(tl.category_id, 0)
+        ON CONFLICT (entity_id, day, account_id, category_id, direction) DO UPDATE
+        SET amount = r.amount + EXCLUDED.amount,
+            line_count = r.line_count + EXCLUDED.line_count;
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "finance_rollup_daily" not in inspector.get_table_names():
+        op.execute(
+            """
+            CREATE TABLE finance_rollup_daily (
+                entity_id BIGINT NOT NULL,
+                day DATE NOT NULL,
+                account_id BIGINT NOT NULL,
+                category_id BIGINT NOT NULL DEFAULT 0,
+                direction TEXT NOT NULL,
+                amount NUMERIC NOT NULL DEFAULT 0,
+                line_count BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (entity_id, day, account_id, category_id, direction)
+            )
+            """
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_finance_rollup_daily_account "
+        "ON finance_rollup_daily (account_id, day)"
+    )
+
+    # Lignes : triggers par instruction (transition tables) pour rester ensembliste
+    # lors des imports massifs.
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION finance_rollup_lines_apply()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                {_APPLY_LINES.format(sign=1, src="new_lines")}
+            END IF;
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                {_APPLY_LINES.format(sign=-1, src="old_lines")}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_lines_ins ON finance_transaction_lines")
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_lines_upd ON finance_transaction_lines")
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_lines_del ON finance_transaction_lines")
+    op.execute(
+        """
+        CREATE TRIGGER trg_finance_rollup_lines_ins
+        AFTER INSERT ON finance_transaction_lines
+        REFERENCING NEW TABLE AS new_lines
+        FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_lines_apply()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_finance_rollup_lines_upd
+        AFTER UPDATE ON finance_transaction_lines
+        REFERENCING OLD TABLE AS old_lines NEW TABLE AS new_lines
+        FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_lines_apply()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_finance_rollup_lines_del
+        AFTER DELETE ON finance_transaction_lines
+        REFERENCING OLD TABLE AS old_lines
+        FOR EACH STATEMENT EXECUTE FUNCTION finance_rollup_lines_apply()
+        """
+    )
+
+    # Transactions : changement de dimensions (date, sens, compte, entité) ou suppression.
+    # La suppression retire les lignes avant la cascade ; le trigger des lignes ne les
+    # retrouve alors plus (jointure sur la transaction) et ne les compte pas deux fois.
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION finance_rollup_transaction_apply()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            {_APPLY_TRANSACTION.format(sign=-1, rec="OLD")}
+            IF TG_OP = 'UPDATE' THEN
+                {_APPLY_TRANSACTION.format(sign=1, rec="NEW")}
+                RETURN NEW;
+            END IF;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_tx_upd ON finance_transactions")
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_tx_del ON finance_transactions")
+    op.execute(
+        """
+        CREATE TRIGGER trg_finance_rollup_tx_upd
+        AFTER UPDATE OF entity_id, account_id, direction, date_operation ON finance_transactions
+        FOR EACH ROW
+        WHEN (
+            OLD.entity_id IS DISTINCT FROM NEW.entity_id
+            OR OLD.account_id IS DISTINCT FROM NEW.account_id
+            OR OLD.direction IS DISTINCT FROM NEW.direction
+            OR OLD.date_operation::date IS DISTINCT FROM NEW.date_operation::date
+        )
+        EXECUTE FUNCTION finance_rollup_transaction_apply()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_finance_rollup_tx_del
+        BEFORE DELETE ON finance_transactions
+        FOR EACH ROW EXECUTE FUNCTION finance_rollup_transaction_apply()
+        """
+    )
+
+    # Remplissage initial (équivalent à backend.services.finance.stats.rebuild_rollups).
+    op.execute("DELETE FROM finance_rollup_daily")
+    op.execute(
+        """
+        INSERT INTO finance_rollup_daily
+            (entity_id, day, account_id, category_id, direction, amount, line_count)
+        SELECT t.entity_id, t.date_operation::date, t.account_id, COALESCE(tl.category_id, 0),
+               t.direction::text, SUM(COALESCE(tl.montant_ttc, 0)), COUNT(*)
+        FROM finance_transaction_lines tl
+        JOIN finance_transactions t ON t.id = tl.transaction_id
+        WHERE t.direction IN ('IN', 'OUT')
+        GROUP BY 1, 2, 3, 4, 5
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_tx_del ON finance_transactions")
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_tx_upd ON finance_transactions")
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_lines_del ON finance_transaction_lines")
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_lines_upd ON finance_transaction_lines")
+    op.execute("DROP TRIGGER IF EXISTS trg_finance_rollup_lines_ins ON finance_transaction_lines")
+    op.execute("DROP FUNCTION IF EXISTS finance_rollup_transaction_apply()")
+    op.execute("DROP FUNCTION IF EXISTS finance_rollup_lines_apply()")
+    op.execute("DROP TABLE IF EXISTS finance_rollup_daily")
@@ -0,0 +1,196 @@
+"""Checkpoint du grand livre de stock (stock_ledger_checkpoint + watermark).
+
+Le stock théorique (diagnostics d'audit, v_stock_courant) ne somme plus tout
+l'historique de mouvements_stock : soldes par produit arrêtés à un id de
+mouvement (watermark), plus les seuls mouvements postérieurs. La fonction
+``stock_ledger_compact()`` avance le watermark ; un trigger corrige le checkpoint
+si un mouvement déjà compacté est modifié ou supprimé.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+revision: str = "20241213_stock_ledger_checkpoint"
+down_revision: Union[str, Sequence[str], None] = "20241212_finance_rollup_daily"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Même convention que v_stock_courant et les diagnostics d'audit.
+_SIGNED = """CASE
+                WHEN {m}.type IN ('ENTREE', 'INVENTAIRE', 'TRANSFERT') THEN {m}.quantite
+                WHEN {m}.type = 'SORTIE' THEN -{m}.quantite
+                ELSE 0
+            END"""
+
+_V_STOCK_COURANT_LEDGER = f"""
+    CREATE OR REPLACE VIEW v_stock_courant AS
+    SELECT
+        p.id,
+        p.nom,
+        p.categorie,
+        p.prix_achat,
+        p.prix_vente,
+        p.tva,
+        p.seuil_alerte,
+        p.actif,
+        COALESCE(l.stock, 0) AS stock
+    FROM produits p
+    LEFT JOIN (
+        SELECT ledger.produit_id, SUM(ledger.qty) AS stock
+        FROM (
+            SELECT c.produit_id, c.balance AS qty
+            FROM stock_ledger_checkpoint c
+            UNION ALL
+            SELECT m.produit_id, {_SIGNED.format(m="m")}
+            FROM mouvements_stock m
+            WHERE m.id > (SELECT w.last_movement_id FROM stock_ledger_watermark w)
+        ) ledger
+        GROUP BY ledger.produit_id
+    ) l ON l.produit_id = p.id
+    ORDER BY p.nom
+"""
+
+_V_STOCK_COURANT_FULL = f"""
+    CREATE OR REPLACE VIEW v_stock_courant AS
+    SELECT
+        p.id,
+        p.nom,
+        p.categorie,
+        p.prix_achat,
+        p.prix_vente,
+        p.tva,
+        p.seuil_alerte,
+        p.actif,
+        COALESCE(SUM({_SIGNED.format(m="m")}), 0) AS stock
+    FROM produits p
+    LEFT JOIN mouvements_stock m ON m.produit_id = p.id
+    GROUP BY
+        p.id, p.nom, p.categorie, p.prix_achat, p.prix_vente, p.tva, p.seuil_alerte, p.actif
+    ORDER BY p.nom
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "stock_ledger_checkpoint" not in tables:
+        op.execute(
+            """
+            CREATE TABLE stock_ledger_checkpoint (
+                tenant_id INT NOT NULL,
+                produit_id INT NOT NULL REFERENCES produits(id) ON DELETE CASCADE,
+                balance NUMERIC(14,3) NOT NULL DEFAULT 0,
+                last_movement_id BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (tenant_id, produit_id)
+            )
+            """
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_stock_ledger_checkpoint_produit "
+        "ON stock_ledger_checkpoint (produit_id)"
+    )
+    if "stock_ledger_watermark" not in tables:
+        op.execute(
+            """
+            CREATE TABLE stock_ledger_watermark (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                last_movement_id BIGINT NOT NULL DEFAULT 0,
+                compacted_at TIMESTAMPTZ
+            )
+            """
+        )
+    op.execute("INSERT INTO stock_ledger_watermark (id, last_movement_id) VALUES (TRUE, 0) ON CONFLICT DO NOTHING")
+
+    # Compaction : intègre au checkpoint les mouvements (watermark, max(id)] puis avance
+    # le watermark. Le verrou SHARE attend la fin des insertions en cours : aucun
+    # mouvement d'id inférieur au nouveau watermark ne peut être validé après coup.
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION stock_ledger_compact(p_max_movements BIGINT DEFAULT NULL)
+        RETURNS TABLE (previous_watermark BIGINT, watermark BIGINT, products BIGINT) AS $$
+        DECLARE
+            v_lo BIGINT;
+            v_hi BIGINT;
+            v_products BIGINT;
+        BEGIN
+            SELECT w.last_movement_id INTO v_lo FROM stock_ledger_watermark w WHERE w.id FOR UPDATE;
+            LOCK TABLE mouvements_stock IN SHARE MODE;
+            SELECT COALESCE(MAX(m.id), v_lo) INTO v_hi FROM mouvements_stock m WHERE m.id > v_lo;
+            IF p_max_movements IS NOT NULL THEN
+                v_hi := LEAST(v_hi, v_lo + p_max_movements);
+            END IF;
+
+            INSERT INTO stock_ledger_checkpoint AS c (tenant_id, produit_id, balance, last_movement_id, updated_at)
+            SELECT m.tenant_id, m.produit_id, SUM({_SIGNED.format(m="m")}), MAX(m.id), now()
+            FROM mouvements_stock m
+            WHERE m.id > v_lo AND m.id <= v_hi
+            GROUP BY m.tenant_id, m.produit_id
+            ON CONFLICT (tenant_id, produit_id) DO UPDATE
+            SET balance = c.balance + EXCLUDED.balance,
+                last_movement_id = GREATEST(c.last_movement_id, EXCLUDED.last_movement_id),
+                updated_at = now();
+            GET DIAGNOSTICS v_products = ROW_COUNT;
+
+            UPDATE stock_ledger_watermark w
+            SET last_movement_id = v_hi, compacted_at = now()
+            WHERE w.id;
+
+            RETURN QUERY SELECT v_lo, v_hi, v_products;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+    # Mouvement déjà compacté modifié/supprimé : on corrige le solde du checkpoint.
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION stock_ledger_guard()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            v_wm BIGINT;
+        BEGIN
+            SELECT w.last_movement_id INTO v_wm FROM stock_ledger_watermark w WHERE w.id;
+            IF OLD.id <= COALESCE(v_wm, 0) THEN
+                UPDATE stock_ledger_checkpoint c
+                SET balance = c.balance - {_SIGNED.format(m="OLD")}, updated_at = now()
+                WHERE c.tenant_id = OLD.tenant_id AND c.produit_id = OLD.produit_id;
+            END IF;
+            IF TG_OP = 'UPDATE' AND NEW.id <= COALESCE(v_wm, 0) THEN
+                INSERT INTO stock_ledger_checkpoint AS c (tenant_id, produit_id, balance, last_movement_id)
+                VALUES (NEW.tenant_id, NEW.produit_id, {_SIGNED.format(m="NEW")}, NEW.id)
+                ON CONFLICT (tenant_id, produit_id) DO UPDATE
+                SET balance = c.balance + EXCLUDED.balance, updated_at = now();
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute("DROP TRIGGER IF EXISTS trg_stock_ledger_guard ON mouvements_stock")
+    op.execute(
+        """
+        CREATE TRIGGER trg_stock_ledger_guard
+        AFTER UPDATE OR DELETE ON mouvements_stock
+        FOR EACH ROW EXECUTE FUNCTION stock_ledger_guard()
+        """
+    )
+
+    op.execute("SELECT * FROM stock_ledger_compact()")
+    op.execute(_V_STOCK_COURANT_LEDGER)
+
+
+def downgrade() -> None:
+    op.execute(_V_STOCK_COURANT_FULL)
+    op.execute("DROP TRIGGER IF EXISTS trg_stock_ledger_guard ON mouvements_stock")
+    op.execute("DROP FUNCTION IF EXISTS stock_ledger_guard()")
+    op.execute("DROP FUNCTION IF EXISTS stock_ledger_compact(BIGINT)")
+    op.execute("DROP TABLE IF EXISTS stock_ledger_watermark")
+    op.execute("DROP TABLE IF EXISTS stock_ledger_checkpoint")
@@ -0,0 +1,28 @@
+"""Index (tenant_id, id) sur mouvements_stock : dernier mouvement d'un tenant en O(log n).
+
+Sert de version au cache du plan d'approvisionnement (invalidation sur nouveau mouvement).
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+revision: str = "20241214_mvt_tenant_idx"
+down_revision: Union[str, Sequence[str], None] = "20241213_stock_ledger_checkpoint"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    existing_indexes = {idx["name"] for idx in inspector.get_indexes("mouvements_stock")}
+    if "idx_mouvements_tenant_id" not in existing_indexes:
+        op.create_index("idx_mouvements_tenant_id", "mouvements_stock", ["tenant_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_mouvements_tenant_id", table_name="mouvements_stock")
@@ -0,0 +1,81 @@
+"""Compteur de version du catalogue par tenant (index de rapprochement des factures).
+
+Des triggers sur ``produits`` (colonnes de rapprochement uniquement : les mises à jour
+de ``stock_actuel`` n'en font pas partie) et ``produits_barcodes`` incrémentent
+``catalog_versions.version`` ; l'index en mémoire se reconstruit quand elle change.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+revision: str = "20241215_catalog_versions"
+down_revision: Union[str, Sequence[str], None] = "20241214_mvt_tenant_idx"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "catalog_versions" not in set(inspector.get_table_names()):
+        op.execute(
+            """
+            CREATE TABLE catalog_versions (
+                tenant_id INT PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_catalog_version()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP <> 'DELETE' THEN
+                INSERT INTO catalog_versions AS v (tenant_id, version) VALUES (NEW.tenant_id, 1)
+                ON CONFLICT (tenant_id) DO UPDATE SET version = v.version + 1, updated_at = now();
+            END IF;
+            IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.tenant_id IS DISTINCT FROM NEW.tenant_id) THEN
+                INSERT INTO catalog_versions AS v (tenant_id, version) VALUES (OLD.tenant_id, 1)
+                ON CONFLICT (tenant_id) DO UPDATE SET version = v.version + 1, updated_at = now();
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for statement in (
+        "DROP TRIGGER IF EXISTS trg_catalog_version_produits ON produits",
+        "DROP TRIGGER IF EXISTS trg_catalog_version_produits_update ON produits",
+        "DROP TRIGGER IF EXISTS trg_catalog_version_barcodes ON produits_barcodes",
+        """
+        CREATE TRIGGER trg_catalog_version_produits
+        AFTER INSERT OR DELETE ON produits
+        FOR EACH ROW EXECUTE FUNCTION bump_catalog_version()
+        """,
+        """
+        CREATE TRIGGER trg_catalog_version_produits_update
+        AFTER UPDATE OF nom, categorie, prix_achat, prix_vente, tva, tenant_id ON produits
+        FOR EACH ROW EXECUTE FUNCTION bump_catalog_version()
+        """,
+        """
+        CREATE TRIGGER trg_catalog_version_barcodes
+        AFTER INSERT OR UPDATE OR DELETE ON produits_barcodes
+        FOR EACH ROW EXECUTE FUNCTION bump_catalog_version()
+        """,
+    ):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_catalog_version_barcodes ON produits_barcodes")
+    op.execute("DROP TRIGGER IF EXISTS trg_catalog_version_produits_update ON produits")
+    op.execute("DROP TRIGGER IF EXISTS trg_catalog_version_produits ON produits")
+    op.execute("DROP FUNCTION IF EXISTS bump_catalog_version()")
+    op.execute("DROP TABLE IF EXISTS catalog_versions")
@@ -0,0 +1,70 @@
+"""Point de reprise du backfill restaurant -> finance et index associés.
+
+``finance_backfill_progress`` mémorise, par tenant, le dernier ``restaurant_depenses.id``
+traité : le backfill ensembliste avance par lots et reprend après une erreur.
+``pending_ids`` garde les dépenses passées faute de catégorie ou de compte : elles
+sont relues à chaque passage, jusqu'à ce que leur correspondance existe.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+revision: str = "20241216_fin_backfill_progress"
+down_revision: Union[str, Sequence[str], None] = "20241215_catalog_versions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "finance_backfill_progress" not in set(inspector.get_table_names()):
+        op.create_table(
+            "finance_backfill_progress",
+            sa.Column("job", sa.Text(), nullable=False),
+            sa.Column("tenant_id", sa.Integer(), nullable=False),
+            sa.Column("last_id", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.Column("rows_inserted", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.Column(
+                "pending_ids",
+                postgresql.ARRAY(sa.BigInteger()),
+                nullable=False,
+                server_default=sa.text("'{}'::bigint[]"),
+            ),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.PrimaryKeyConstraint("job", "tenant_id", name="pk_finance_backfill_progress"),
+        )
+    elif "pending_ids" not in {col["name"] for col in inspector.get_columns("finance_backfill_progress")}:
+        op.add_column(
+            "finance_backfill_progress",
+            sa.Column(
+                "pending_ids",
+                postgresql.ARRAY(sa.BigInteger()),
+                nullable=False,
+                server_default=sa.text("'{}'::bigint[]"),
+            ),
+        )
+
+    depenses_indexes = {idx["name"] for idx in inspector.get_indexes("restaurant_depenses")}
+    if "idx_restaurant_depenses_tenant_id" not in depenses_indexes:
+        op.create_index("idx_restaurant_depenses_tenant_id", "restaurant_depenses", ["tenant_id", "id"])
+    statements_indexes = {idx["name"] for idx in inspector.get_indexes("restaurant_bank_statements")}
+    if "idx_restaurant_bank_statements_depense" not in statements_indexes:
+        op.create_index(
+            "idx_restaurant_bank_statements_depense",
+            "restaurant_bank_statements",
+            ["depense_id"],
+            postgresql_where=sa.text("depense_id IS NOT NULL"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_restaurant_bank_statements_depense", table_name="restaurant_bank_statements")
+    op.drop_index("idx_restaurant_depenses_tenant_id", table_name="restaurant_depenses")
+    op.drop_table("finance_backfill_progress")
@@ -0,0 +1,140 @@
+"""Remplace la vue ``latest_price_history`` par une table maintenue par trigger.
+
+La vue recalculait un ``ROW_NUMBER()`` sur tout ``produits_price_history`` à chaque
+lecture (aperçu capital, API des prix). La table garde une ligne par
+``(tenant_id, code)`` ; le trigger la met à jour à chaque écriture de l'historique.
+Comme la vue, elle garde aussi la ligne des produits sans code-barres (``code`` NULL,
+regroupés par tenant) : l'index unique est ``NULLS NOT DISTINCT`` (PostgreSQL 15+).
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+revision: str = "20241217_latest_price_table"
+down_revision: Union[str, Sequence[str], None] = "20241216_fin_backfill_progress"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_LATEST_COLUMNS = "code, tenant_id, fournisseur, prix_achat, quantite, facture_date, source_context, created_at"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "produits_price_history" not in set(inspector.get_table_names()):
+        return
+
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_price_history_tenant_code_latest
+        ON produits_price_history (tenant_id, code, facture_date DESC NULLS LAST, created_at DESC NULLS LAST)
+        """
+    )
+    if "latest_price_history" in set(inspector.get_view_names()):
+        op.execute("DROP VIEW latest_price_history")
+    if "latest_price_history" not in set(inspector.get_table_names()):
+        op.execute(
+            f"""
+            CREATE TABLE latest_price_history AS
+            SELECT DISTINCT ON (tenant_id, code) {_LATEST_COLUMNS}
+            FROM produits_price_history
+            ORDER BY tenant_id, code, facture_date DESC NULLS LAST, created_at DESC NULLS LAST
+            """
+        )
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_latest_price_history_tenant_code "
+        "ON latest_price_history (tenant_id, code) NULLS NOT DISTINCT"
+    )
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION trg_latest_price_history()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                -- Recalcul en upsert : deux écritures concurrentes sur le même code ne se
+                -- heurtent pas à l'index unique ; la ligne ne part que si l'historique est vide.
+                INSERT INTO latest_price_history ({_LATEST_COLUMNS})
+                SELECT {_LATEST_COLUMNS}
+                FROM produits_price_history
+                WHERE tenant_id = OLD.tenant_id AND code IS NOT DISTINCT FROM OLD.code
+                ORDER BY facture_date DESC NULLS LAST, created_at DESC NULLS LAST
+                LIMIT 1
+                ON CONFLICT (tenant_id, code) DO UPDATE SET
+                    fournisseur = EXCLUDED.fournisseur,
+                    prix_achat = EXCLUDED.prix_achat,
+                    quantite = EXCLUDED.quantite,
+                    facture_date = EXCLUDED.facture_date,
+                    source_context = EXCLUDED.source_context,
+                    created_at = EXCLUDED.created_at;
+                IF NOT FOUND THEN
+                    DELETE FROM latest_price_history
+                    WHERE tenant_id = OLD.tenant_id AND code IS NOT DISTINCT FROM OLD.code;
+                END IF;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO latest_price_history AS l ({_LATEST_COLUMNS})
+                VALUES (
+                    NEW.code, NEW.tenant_id, NEW.fournisseur, NEW.prix_achat, NEW.quantite,
+                    NEW.facture_date, NEW.source_context, NEW.created_at
+                )
+                ON CONFLICT (tenant_id, code) DO UPDATE SET
+                    fournisseur = EXCLUDED.fournisseur,
+                    prix_achat = EXCLUDED.prix_achat,
+                    quantite = EXCLUDED.quantite,
+                    facture_date = EXCLUDED.facture_date,
+                    source_context = EXCLUDED.source_context,
+                    created_at = EXCLUDED.created_at
+                WHERE (COALESCE(EXCLUDED.facture_date, '-infinity'), COALESCE(EXCLUDED.created_at, '-infinity'))
+                   >= (COALESCE(l.facture_date, '-infinity'), COALESCE(l.created_at, '-infinity'));
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute("DROP TRIGGER IF EXISTS trg_latest_price_history ON produits_price_history")
+    op.execute(
+        """
+        CREATE TRIGGER trg_latest_price_history
+        AFTER INSERT OR UPDATE OR DELETE ON produits_price_history
+        FOR EACH ROW EXECUTE FUNCTION trg_latest_price_history()
+        """
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "produits_price_history" not in set(inspector.get_table_names()):
+        return
+    op.execute("DROP TRIGGER IF EXISTS trg_latest_price_history ON produits_price_history")
+    op.execute("DROP FUNCTION IF EXISTS trg_latest_price_history()")
+    op.execute("DROP TABLE IF EXISTS latest_price_history")
+    op.execute("DROP INDEX IF EXISTS idx_price_history_tenant_code_latest")
+    op.execute(
+        """
+        CREATE OR REPLACE VIEW latest_price_history AS
+        SELECT
+            code,
+            tenant_id,
+            fournisseur,
+            prix_achat,
+            quantite,
+            facture_date,
+            source_context,
+            created_at
+        FROM (
+            SELECT *,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY tenant_id, code
+                       ORDER BY facture_date DESC NULLS LAST, created_at DESC
+                   ) AS row_num
+            FROM produits_price_history
+        ) ranked
+        WHERE row_num = 1
+        """
+    )
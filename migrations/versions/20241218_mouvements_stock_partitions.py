@@ -0,0 +1,338 @@
+"""Partitionnement mensuel de mouvements_stock (RANGE sur date_mvt) et index BRIN.
+
+La table est reconstruite en table partitionnée : une partition par mois
+(``mouvements_stock_pYYYYMM``) et une partition ``DEFAULT`` pour les dates hors
+plage. La clé primaire devient ``(id, date_mvt)`` ; ``id`` reste alimenté par la
+même séquence. Les vues dépendantes (v_stock_courant, ...) sont recréées à
+l'identique et les triggers (stock_actuel, grand livre) reposés sur la table mère.
+
+``mouvements_stock_ensure_partitions()`` crée les mois à venir (service
+``stock-ledger`` du docker-compose) et sort de ``DEFAULT`` les lignes d'un mois
+avant de lui créer sa partition ; ``mouvements_stock_archive_partitions()``
+détache les vieux mois après compaction du grand livre. ``id`` et ``date_mvt``
+ne sont plus modifiables (trigger ``trg_mouvements_stock_key_guard``).
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect, text
+
+revision: str = "20241218_mvt_partitions"
+down_revision: Union[str, Sequence[str], None] = "20241217_latest_price_table"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_LEGACY = "mouvements_stock_legacy"
+
+# Vues (et vues de vues) qui lisent mouvements_stock, les plus profondes en dernier.
+_DEPENDENT_VIEWS_SQL = """
+    WITH RECURSIVE deps(oid, depth) AS (
+        SELECT r.ev_class, 1
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE d.refobjid = 'mouvements_stock'::regclass
+          AND r.ev_class <> d.refobjid
+        UNION
+        SELECT r.ev_class, deps.depth + 1
+        FROM deps
+        JOIN pg_depend d ON d.refobjid = deps.oid
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE r.ev_class <> deps.oid
+    )
+    SELECT c.oid::regclass::text AS name, c.relkind, pg_get_viewdef(c.oid) AS definition, MAX(deps.depth) AS depth
+    FROM deps
+    JOIN pg_class c ON c.oid = deps.oid
+    GROUP BY c.oid, c.relkind
+    ORDER BY depth
+"""
+
+ENSURE_PARTITIONS_SQL = """
+CREATE OR REPLACE FUNCTION mouvements_stock_ensure_partitions(
+    p_months_ahead INT DEFAULT 3,
+    p_from DATE DEFAULT NULL
+)
+RETURNS INT AS $$
+DECLARE
+    v_month DATE := date_trunc('month', COALESCE(p_from, CURRENT_DATE))::date;
+    v_last DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => GREATEST(p_months_ahead, 0)))::date;
+    v_upper DATE;
+    v_name TEXT;
+    v_created INT := 0;
+    v_default REGCLASS := to_regclass('mouvements_stock_default');
+    v_stranded BOOLEAN;
+    v_oldest DATE;
+BEGIN
+    -- Mois restés dans DEFAULT (job arrêté, mouvements antidatés) : rattrapés aussi.
+    IF p_from IS NULL AND v_default IS NOT NULL THEN
+        EXECUTE 'SELECT date_trunc(''month'', MIN(date_mvt))::date FROM mouvements_stock_default' INTO v_oldest;
+        v_month := LEAST(v_month, v_oldest);
+    END IF;
+    WHILE v_month <= v_last LOOP
+        v_name := format('mouvements_stock_p%s', to_char(v_month, 'YYYYMM'));
+        v_upper := (v_month + INTERVAL '1 month')::date;
+        IF to_regclass(v_name) IS NULL THEN
+            v_stranded := FALSE;
+            IF v_default IS NOT NULL THEN
+                EXECUTE 'SELECT EXISTS (SELECT 1 FROM mouvements_stock_default WHERE date_mvt >= $1 AND date_mvt < $2)'
+                INTO v_stranded USING v_month, v_upper;
+            END IF;
+            IF v_stranded THEN
+                -- Mois déjà alimenté via DEFAULT : la partition est remplie à part puis
+                -- attachée, sans repasser par les triggers (stock_actuel, grand livre).
+                EXECUTE 'LOCK TABLE mouvements_stock_default IN ACCESS EXCLUSIVE MODE';
+                EXECUTE format(
+                    'CREATE TABLE %I (LIKE mouvements_stock INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name
+                );
+                EXECUTE format(
+                    'INSERT INTO %I SELECT * FROM mouvements_stock_default WHERE date_mvt >= %L AND date_mvt < %L',
+                    v_name, v_month, v_upper
+                );
+                EXECUTE 'ALTER TABLE mouvements_stock_default DISABLE TRIGGER USER';
+                EXECUTE 'DELETE FROM mouvements_stock_default WHERE date_mvt >= $1 AND date_mvt < $2'
+                USING v_month, v_upper;
+                EXECUTE 'ALTER TABLE mouvements_stock_default ENABLE TRIGGER USER';
+                EXECUTE format(
+                    'ALTER TABLE mouvements_stock ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    v_name, v_month, v_upper
+                );
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF mouvements_stock FOR VALUES FROM (%L) TO (%L)',
+                    v_name, v_month, v_upper
+                );
+            END IF;
+            v_created := v_created + 1;
+        END IF;
+        v_month := v_upper;
+    END LOOP;
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Les mouvements d'une partition détachée sortent de v_stock_courant : on compacte
+# d'abord le grand livre pour que le checkpoint les contienne (id <= watermark).
+ARCHIVE_PARTITIONS_SQL = """
+CREATE OR REPLACE FUNCTION mouvements_stock_archive_partitions(
+    p_before DATE,
+    p_schema TEXT DEFAULT 'archive',
+    p_drop BOOLEAN DEFAULT FALSE,
+    p_dry_run BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (partition_name TEXT, range_end DATE, movements BIGINT, action TEXT) AS $$
+DECLARE
+    v_part RECORD;
+    v_con RECORD;
+    v_wm BIGINT;
+    v_max BIGINT;
+BEGIN
+    IF NOT p_dry_run THEN
+        LOCK TABLE mouvements_stock IN ACCESS EXCLUSIVE MODE;
+    END IF;
+    SELECT w.last_movement_id INTO v_wm FROM stock_ledger_watermark w WHERE w.id;
+
+    FOR v_part IN
+        SELECT c.oid::regclass AS rel, c.relname,
+               (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \\(''([^'']+)''\\)'))[1]::timestamp::date AS upper_bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'mouvements_stock'::regclass
+        ORDER BY 3
+    LOOP
+        CONTINUE WHEN v_part.upper_bound IS NULL OR v_part.upper_bound > p_before;
+
+        partition_name := v_part.relname;
+        range_end := v_part.upper_bound;
+        action := CASE WHEN p_drop THEN 'drop' ELSE 'detach' END;
+        EXECUTE format('SELECT COUNT(*), MAX(id) FROM %s', v_part.rel) INTO movements, v_max;
+
+        IF NOT p_dry_run THEN
+            IF v_max > COALESCE(v_wm, 0) THEN
+                PERFORM stock_ledger_compact();
+                SELECT w.last_movement_id INTO v_wm FROM stock_ledger_watermark w WHERE w.id;
+            END IF;
+            EXECUTE format('ALTER TABLE mouvements_stock DETACH PARTITION %s', v_part.rel);
+            IF p_drop THEN
+                EXECUTE format('DROP TABLE %s', v_part.rel);
+            ELSE
+                FOR v_con IN
+                    SELECT conname FROM pg_constraint WHERE conrelid = v_part.rel AND contype = 'f'
+                LOOP
+                    EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', v_part.rel, v_con.conname);
+                END LOOP;
+                EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', p_schema);
+                EXECUTE format('ALTER TABLE %s SET SCHEMA %I', v_part.rel, p_schema);
+            END IF;
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Changer date_mvt peut déplacer la ligne de partition : PostgreSQL l'exécute en
+# DELETE + INSERT, ce qui rejouerait trg_update_stock_actuel et fausserait le
+# checkpoint de stock_ledger_guard. La clé (id, date_mvt) est donc figée.
+KEY_GUARD_SQL = """
+CREATE OR REPLACE FUNCTION mouvements_stock_key_guard()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'mouvements_stock: id et date_mvt ne sont pas modifiables (mouvement %)', OLD.id
+        USING ERRCODE = 'feature_not_supported',
+              HINT = 'Supprimer le mouvement et en enregistrer un nouveau.';
+END;
+$$ LANGUAGE plpgsql
+"""
+
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_mouvements_produit ON mouvements_stock (produit_id)",
+    "CREATE INDEX IF NOT EXISTS idx_mouvements_tenant_id ON mouvements_stock (tenant_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_mouvements_tenant_date ON mouvements_stock (tenant_id, date_mvt)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_mouvements_entrees_produit
+    ON mouvements_stock (tenant_id, produit_id, date_mvt DESC) WHERE type = 'ENTREE'
+    """,
+    "CREATE INDEX IF NOT EXISTS brin_mouvements_date ON mouvements_stock USING BRIN (date_mvt)",
+    # Queue du grand livre (id > watermark) : les vieilles partitions sont écartées par bloc.
+    "CREATE INDEX IF NOT EXISTS brin_mouvements_id ON mouvements_stock USING BRIN (id)",
+)
+
+_TRIGGERS = (
+    (
+        "update_stock_actuel",
+        """
+        CREATE OR REPLACE TRIGGER trg_update_stock_actuel
+        AFTER INSERT ON mouvements_stock
+        FOR EACH ROW EXECUTE FUNCTION update_stock_actuel()
+        """,
+    ),
+    (
+        "mouvements_stock_key_guard",
+        """
+        CREATE OR REPLACE TRIGGER trg_mouvements_stock_key_guard
+        BEFORE UPDATE OF id, date_mvt ON mouvements_stock
+        FOR EACH ROW
+        WHEN (NEW.id IS DISTINCT FROM OLD.id OR NEW.date_mvt IS DISTINCT FROM OLD.date_mvt)
+        EXECUTE FUNCTION mouvements_stock_key_guard()
+        """,
+    ),
+    (
+        "stock_ledger_guard",
+        """
+        CREATE OR REPLACE TRIGGER trg_stock_ledger_guard
+        AFTER UPDATE OR DELETE ON mouvements_stock
+        FOR EACH ROW EXECUTE FUNCTION stock_ledger_guard()
+        """,
+    ),
+)
+
+
+def _is_partitioned(bind) -> bool:
+    return bool(
+        bind.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('mouvements_stock')")
+        ).scalar()
+    )
+
+
+def _function_exists(bind, name: str) -> bool:
+    return bool(bind.execute(text("SELECT 1 FROM pg_proc WHERE proname = :name"), {"name": name}).scalar())
+
+
+def _create_triggers(bind) -> None:
+    for function, statement in _TRIGGERS:
+        if _function_exists(bind, function):
+            op.execute(statement)
+
+
+def _rebuild(bind, *, partitioned: bool) -> None:
+    """Recopie mouvements_stock dans une nouvelle table (partitionnée ou non)."""
+
+    views = bind.execute(text(_DEPENDENT_VIEWS_SQL)).mappings().all()
+    for view in reversed(views):
+        kind = "MATERIALIZED VIEW" if view["relkind"] == "m" else "VIEW"
+        op.execute(f"DROP {kind} IF EXISTS {view['name']}")
+
+    sequence = bind.execute(text("SELECT pg_get_serial_sequence('mouvements_stock', 'id')")).scalar()
+    op.execute(f"ALTER TABLE mouvements_stock RENAME TO {_LEGACY}")
+    op.execute(f"DROP TRIGGER IF EXISTS trg_update_stock_actuel ON {_LEGACY}")
+    op.execute(f"DROP TRIGGER IF EXISTS trg_stock_ledger_guard ON {_LEGACY}")
+
+    if partitioned:
+        op.execute(f"UPDATE {_LEGACY} SET date_mvt = COALESCE(created_at, now()) WHERE date_mvt IS NULL")
+        op.execute(
+            f"""
+            CREATE TABLE mouvements_stock (LIKE {_LEGACY} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE (date_mvt)
+            """
+        )
+        op.execute("ALTER TABLE mouvements_stock ALTER COLUMN date_mvt SET NOT NULL")
+        op.execute(ENSURE_PARTITIONS_SQL)
+        first_month = bind.execute(text(f"SELECT MIN(date_mvt)::date FROM {_LEGACY}")).scalar()
+        op.execute(
+            text("SELECT mouvements_stock_ensure_partitions(3, :first_month)").bindparams(first_month=first_month)
+        )
+        op.execute("CREATE TABLE IF NOT EXISTS mouvements_stock_default PARTITION OF mouvements_stock DEFAULT")
+    else:
+        op.execute(f"CREATE TABLE mouvements_stock (LIKE {_LEGACY} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+
+    op.execute(f"INSERT INTO mouvements_stock SELECT * FROM {_LEGACY}")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY mouvements_stock.id")
+    op.execute(f"DROP TABLE {_LEGACY}")
+
+    primary_key = "(id, date_mvt)" if partitioned else "(id)"
+    op.execute(f"ALTER TABLE mouvements_stock ADD CONSTRAINT mouvements_stock_pkey PRIMARY KEY {primary_key}")
+    op.execute(
+        """
+        ALTER TABLE mouvements_stock ADD CONSTRAINT mouvements_stock_produit_id_fkey
+        FOREIGN KEY (produit_id) REFERENCES produits(id) ON DELETE CASCADE
+        """
+    )
+
+    for view in views:
+        kind = "MATERIALIZED VIEW" if view["relkind"] == "m" else "VIEW"
+        op.execute(f"CREATE {kind} {view['name']} AS {view['definition']}")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "mouvements_stock" not in set(inspector.get_table_names()):
+        return
+
+    if not _is_partitioned(bind):
+        _rebuild(bind, partitioned=True)
+    op.execute(ENSURE_PARTITIONS_SQL)
+    op.execute(ARCHIVE_PARTITIONS_SQL)
+    op.execute(KEY_GUARD_SQL)
+    op.execute("SELECT mouvements_stock_ensure_partitions()")
+
+    # Le b-tree sur date_mvt seul est remplacé par (tenant_id, date_mvt) et le BRIN.
+    op.execute("DROP INDEX IF EXISTS idx_mouvements_date")
+    for statement in _INDEXES:
+        op.execute(statement)
+    _create_triggers(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "mouvements_stock" not in set(inspector.get_table_names()) or not _is_partitioned(bind):
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS trg_mouvements_stock_key_guard ON mouvements_stock")
+    op.execute("DROP FUNCTION IF EXISTS mouvements_stock_key_guard()")
+    op.execute("DROP FUNCTION IF EXISTS mouvements_stock_archive_partitions(DATE, TEXT, BOOLEAN, BOOLEAN)")
+    op.execute("DROP FUNCTION IF EXISTS mouvements_stock_ensure_partitions(INT, DATE)")
+    _rebuild(bind, partitioned=False)
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_mouvements_produit ON mouvements_stock (produit_id)",
+        "CREATE INDEX IF NOT EXISTS idx_mouvements_date ON mouvements_stock (date_mvt)",
+        "CREATE INDEX IF NOT EXISTS idx_mouvements_tenant_id ON mouvements_stock (tenant_id, id)",
+    ):
+        op.execute(statement)
+    _create_triggers(bind)
@@ -0,0 +1,31 @@
+"""Index du listing catalogue : pagination par clé (nom, id) et recherche trigramme.
+
+``LOWER(nom) LIKE '%...%'`` ne peut pas utiliser ``uix_produits_nom_ci`` (btree) ;
+les index GIN ``gin_trgm_ops`` couvrent la recherche sur le nom et les codes-barres.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "20241219_catalog_listing_indexes"
+down_revision: Union[str, Sequence[str], None] = "20241218_mvt_partitions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_produits_tenant_nom_id ON produits (tenant_id, nom, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_produits_nom_trgm ON produits USING gin (LOWER(nom) gin_trgm_ops)")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_barcodes_code_trgm ON produits_barcodes USING gin (LOWER(code) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_barcodes_code_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_produits_nom_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_produits_tenant_nom_id")
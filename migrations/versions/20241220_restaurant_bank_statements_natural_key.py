@@ -0,0 +1,95 @@
+"""Clé naturelle des relevés restaurant : ré-imports PDF idempotents.
+
+``uq_restaurant_bank_statements_entry`` n'existait que dans ``db/init.sql`` ; sans
+lui, l'``INSERT ... ON CONFLICT DO NOTHING`` groupé de l'import PDF dupliquerait
+les lignes sur les bases migrées.
+
+Les doublons déjà présents ne sont pas supprimés : ils sont déplacés dans
+``restaurant_bank_statements_quarantine`` (avec ``kept_id``, la ligne conservée)
+pour être revus ; le downgrade les réintègre.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+import logging
+
+from alembic import op
+from sqlalchemy import inspect, text
+
+revision: str = "20241220_bank_stmt_natural_key"
+down_revision: Union[str, Sequence[str], None] = "20241219_catalog_listing_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_INDEX = "uq_restaurant_bank_statements_entry"
+_QUARANTINE = "restaurant_bank_statements_quarantine"
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if not inspector.has_table("restaurant_bank_statements"):
+        return
+    existing_indexes = {idx["name"] for idx in inspector.get_indexes("restaurant_bank_statements")}
+    if _INDEX in existing_indexes:
+        return
+
+    # Doublons existants : on garde la ligne rattachée à une dépense, sinon la plus
+    # ancienne ; les autres partent en quarantaine au lieu d'être supprimées.
+    op.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {_QUARANTINE} (
+            LIKE restaurant_bank_statements,
+            kept_id INT NOT NULL,
+            quarantined_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+    moved = bind.execute(
+        text(
+            f"""
+            WITH ranked AS (
+                SELECT
+                    id,
+                    FIRST_VALUE(id) OVER w AS kept_id,
+                    ROW_NUMBER() OVER w AS rn
+                FROM restaurant_bank_statements
+                WINDOW w AS (
+                    PARTITION BY tenant_id, account, date, md5(libelle), montant
+                    ORDER BY (depense_id IS NULL), id
+                )
+            ),
+            moved AS (
+                DELETE FROM restaurant_bank_statements s
+                USING ranked r
+                WHERE s.id = r.id AND r.rn > 1
+                RETURNING s.*, r.kept_id
+            )
+            INSERT INTO {_QUARANTINE}
+            SELECT * FROM moved
+            """
+        )
+    ).rowcount
+    if moved:
+        logger.warning("%s doublon(s) de restaurant_bank_statements déplacé(s) dans %s", moved, _QUARANTINE)
+    op.execute(
+        f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS {_INDEX}
+            ON restaurant_bank_statements (tenant_id, account, date, (md5(libelle)), montant)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX IF EXISTS {_INDEX}")
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if not inspector.has_table(_QUARANTINE):
+        return
+    columns = ", ".join(column["name"] for column in inspector.get_columns("restaurant_bank_statements"))
+    op.execute(f"INSERT INTO restaurant_bank_statements ({columns}) SELECT {columns} FROM {_QUARANTINE}")
+    op.execute(f"DROP TABLE {_QUARANTINE}")
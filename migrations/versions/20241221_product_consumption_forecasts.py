@@ -0,0 +1,56 @@
+"""Prévisions de consommation précalculées (backend.services.forecasting).
+
+``product_consumption_forecasts`` : niveau et tendance journaliers par produit ;
+``product_forecast_runs`` : dernier passage par tenant (date d'ajustement, dernier
+mouvement pris en compte) pour les rafraîchissements incrémentaux.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+revision: str = "20241221_consumption_forecasts"
+down_revision: Union[str, Sequence[str], None] = "20241220_bank_stmt_natural_key"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    if "product_consumption_forecasts" not in tables:
+        op.execute(
+            """
+            CREATE TABLE product_consumption_forecasts (
+                tenant_id INT NOT NULL,
+                produit_id INT NOT NULL REFERENCES produits(id) ON DELETE CASCADE,
+                level DOUBLE PRECISION NOT NULL DEFAULT 0,
+                trend DOUBLE PRECISION NOT NULL DEFAULT 0,
+                history_days INT NOT NULL,
+                generated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (tenant_id, produit_id)
+            )
+            """
+        )
+    if "product_forecast_runs" not in tables:
+        op.execute(
+            """
+            CREATE TABLE product_forecast_runs (
+                tenant_id INT PRIMARY KEY,
+                fit_date DATE NOT NULL,
+                last_movement_id BIGINT NOT NULL DEFAULT 0,
+                generated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                products INT NOT NULL DEFAULT 0,
+                duration_ms INT NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS product_forecast_runs")
+    op.execute("DROP TABLE IF EXISTS product_consumption_forecasts")
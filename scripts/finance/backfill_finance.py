@@ -0,0 +1,40 @@
+"""CLI du backfill restaurant -> finance (mode ensembliste, reprenable)."""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path as _PathHelper
+import sys
+
+sys.path.append(str(_PathHelper(__file__).resolve().parents[2]))
+
+from backend.services.mappers.restaurant_to_finance import run_backfill
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Transférer restaurant_depenses / relevés restaurant vers les tables finance_*."
+    )
+    parser.add_argument("--tenant", type=int, action="append", default=None, help="Limiter à un tenant (répétable).")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Dépenses par lot (défaut: 5000).")
+    parser.add_argument("--workers", type=int, default=4, help="Tenants traités en parallèle (défaut: 4).")
+    parser.add_argument("--dry-run", action="store_true", help="Compter et chronométrer sans rien écrire.")
+    parser.add_argument("--reset", action="store_true", help="Ignorer le point de reprise enregistré.")
+    parser.add_argument("--legacy", action="store_true", help="Ancien mode ligne à ligne (sans rapport).")
+    args = parser.parse_args()
+
+    report = run_backfill(
+        bulk=not args.legacy,
+        tenants=args.tenant,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        reset=args.reset,
+    )
+    if report is not None:
+        print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""CLI pour reconstruire la table d'agrégats finance_rollup_daily."""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path as _PathHelper
+import sys
+
+sys.path.append(str(_PathHelper(__file__).resolve().parents[2]))
+
+from backend.services.finance.stats import rebuild_rollups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Reconstruire finance_rollup_daily depuis les lignes de transaction."
+    )
+    parser.add_argument("--entity-id", type=int, default=None, help="Limiter à une entité.")
+    args = parser.parse_args()
+
+    print(json.dumps(rebuild_rollups(entity_id=args.entity_id), indent=2))
+
+
+if __name__ == "__main__":
+    main()
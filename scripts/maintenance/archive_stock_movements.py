@@ -0,0 +1,46 @@
+"""Archive les partitions mensuelles anciennes de mouvements_stock."""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.services.maintenance import archive_movement_partitions, ensure_movement_partitions
+
+
+def _months_back(months: int, today: date | None = None) -> date:
+    today = today or date.today()
+    index = today.year * 12 + (today.month - 1) - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Détacher (ou supprimer) les partitions de mouvements_stock plus anciennes que N mois."
+    )
+    parser.add_argument("--keep-months", type=int, default=24, help="Mois conservés en ligne (défaut: 24).")
+    parser.add_argument("--before", type=date.fromisoformat, default=None, help="Date limite explicite (AAAA-MM-JJ).")
+    parser.add_argument("--schema", default="archive", help="Schéma de destination des partitions détachées.")
+    parser.add_argument("--drop", action="store_true", help="Supprimer les partitions au lieu de les détacher.")
+    parser.add_argument("--dry-run", action="store_true", help="Lister les partitions concernées sans rien modifier.")
+    args = parser.parse_args()
+
+    before = args.before or _months_back(max(args.keep_months, 1))
+    report = {
+        "before": before,
+        "created": 0 if args.dry_run else ensure_movement_partitions(),
+        "partitions": archive_movement_partitions(
+            before, schema=args.schema, drop=args.drop, dry_run=args.dry_run
+        ),
+        "dry_run": args.dry_run,
+    }
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
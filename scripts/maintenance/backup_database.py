@@ -0,0 +1,70 @@
+"""Sauvegarde PostgreSQL en flux : complète, parallèle (format répertoire) ou par table."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from datetime import date
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.services.backups import (
+    HIGH_CHURN_TABLES,
+    create_directory_backup,
+    create_streaming_backup,
+    create_table_backup,
+    default_jobs,
+)
+
+
+def _progress(event: dict[str, object]) -> None:
+    if "table" in event:
+        print(f"[{event['tables_done']}] {event['table']}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sauvegarder la base sans charger le dump en mémoire.")
+    parser.add_argument(
+        "--mode",
+        choices=("full", "directory", "tables"),
+        default="full",
+        help="full: .sql.gz en flux ; directory: pg_dump -Fd -j ; tables: données des tables à forte rotation.",
+    )
+    parser.add_argument("--label", default=None, help="Suffixe du nom de fichier.")
+    parser.add_argument("--jobs", type=int, default=None, help=f"Workers en mode directory (défaut: {default_jobs()}).")
+    parser.add_argument(
+        "--table",
+        action="append",
+        default=None,
+        help=f"Table à exporter en mode tables (répétable ; défaut: {', '.join(HIGH_CHURN_TABLES)}).",
+    )
+    parser.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        default=None,
+        help="Mode tables : n'exporter que les mois de mouvements_stock à partir de cette date (AAAA-MM-JJ).",
+    )
+    parser.add_argument("--backup-dir", type=Path, default=None, help="Répertoire cible (défaut: BACKUP_DIR).")
+    args = parser.parse_args()
+
+    if args.mode == "directory":
+        result = create_directory_backup(
+            args.label, jobs=args.jobs, backup_dir=args.backup_dir, progress=_progress
+        )
+    elif args.mode == "tables":
+        result = create_table_backup(
+            args.label,
+            tables=tuple(args.table or HIGH_CHURN_TABLES),
+            since=args.since,
+            backup_dir=args.backup_dir,
+        )
+    else:
+        result = create_streaming_backup(args.label, backup_dir=args.backup_dir)
+    print(json.dumps(asdict(result), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
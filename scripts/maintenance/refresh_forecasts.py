@@ -0,0 +1,38 @@
+"""Réajuste les prévisions de consommation par produit (job planifié)."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.services.forecasting import refresh_all_forecasts, refresh_forecasts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rafraîchir product_consumption_forecasts (incrémental par défaut).")
+    parser.add_argument("--tenant-id", type=int, default=None, help="Limiter à un tenant (défaut: tous).")
+    parser.add_argument("--full", action="store_true", help="Réajuster tous les produits même sans nouveau mouvement.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("FORECAST_WORKERS", "0")),
+        help="Processus d'ajustement des gros tenants (défaut: FORECAST_WORKERS, 0 = sans pool).",
+    )
+    args = parser.parse_args()
+    workers = max(0, args.workers)
+
+    if args.tenant_id is not None:
+        results = [refresh_forecasts(args.tenant_id, full=args.full, workers=workers)]
+    else:
+        results = refresh_all_forecasts(full=args.full, workers=workers)
+    print(json.dumps([asdict(result) for result in results], indent=2))
+
+
+if __name__ == "__main__":
+    main()
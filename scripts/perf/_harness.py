@@ -0,0 +1,127 @@
+"""Outils communs aux benchmarks : transactions annulées, comptage SQL, percentiles, mesures."""
+
+from __future__ import annotations
+
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy import event
+
+
+class RollbackEngine:
+    """Enveloppe d'engine dont ``begin()`` annule systématiquement la transaction."""
+
+    def __init__(self, engine) -> None:
+        self._engine = engine
+
+    @contextmanager
+    def begin(self):
+        with self._engine.connect() as conn:
+            trans = conn.begin()
+            try:
+                yield conn
+            finally:
+                trans.rollback()
+
+
+class StatementCounter:
+    """Compte les requêtes envoyées au serveur (allers-retours) sur un engine."""
+
+    def __init__(self, engine) -> None:
+        self._engine = engine
+        self.count = 0
+
+    def _on_execute(self, *_args, **_kwargs) -> None:
+        self.count += 1
+
+    def reset(self) -> None:
+        self.count = 0
+
+    def __enter__(self) -> "StatementCounter":
+        event.listen(self._engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        event.remove(self._engine, "before_cursor_execute", self._on_execute)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def patched(target: Any, name: str, value: Any):
+    """Remplace ``target.name`` le temps du bloc."""
+
+    original = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+
+def measure(fn: Callable[[], Any], *, iterations: int, warmup: int = 1) -> dict[str, float | int]:
+    """Latences (ms) de ``fn`` : p50/p95/p99, moyenne et extrêmes sur ``iterations`` appels."""
+
+    for _ in range(max(0, warmup)):
+        fn()
+    samples: list[float] = []
+    for _ in range(max(1, iterations)):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "iterations": len(samples),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def git_revision(root: Path) -> dict[str, object]:
+    """Commit courant et état de l'arbre, pour comparer les résultats entre commits."""
+
+    def _git(*args: str) -> str | None:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=root, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": _git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def compare_results(
+    current: list[dict[str, Any]], baseline: list[dict[str, Any]], *, threshold: float
+) -> list[dict[str, Any]]:
+    """Écart de p50 par benchmark ; ``regression`` si la hausse dépasse ``threshold`` (0.2 = +20 %)."""
+
+    previous = {entry["name"]: entry for entry in baseline}
+    comparison: list[dict[str, Any]] = []
+    for entry in current:
+        before = previous.get(entry["name"])
+        if not before or "p50_ms" not in entry or not before.get("p50_ms"):
+            continue
+        change = entry["p50_ms"] / before["p50_ms"] - 1
+        comparison.append(
+            {
+                "name": entry["name"],
+                "baseline_p50_ms": before["p50_ms"],
+                "p50_ms": entry["p50_ms"],
+                "change_pct": round(change * 100, 1),
+                "regression": change > threshold,
+            }
+        )
+    return comparison
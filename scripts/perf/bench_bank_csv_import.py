@@ -0,0 +1,97 @@
+"""Benchmark de l'import CSV de relevés : débit (lignes/s) ligne à ligne vs COPY.
+
+Les imports sont exécutés dans des transactions annulées : la base n'est pas modifiée.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path as _PathHelper
+import sys
+
+sys.path.append(str(_PathHelper(__file__).resolve().parents[2]))
+sys.path.append(str(_PathHelper(__file__).resolve().parent))
+
+from _harness import RollbackEngine, StatementCounter
+
+from backend.services.importers import bank_statement_csv
+from core.data_repository import get_engine
+
+_LABELS = ("CB CARREFOUR", "PRLV URSSAF", "VIR SEPA METRO", "CB TOTAL ENERGIES", "REMISE CB SUMUP")
+
+
+def generate_csv(rows: int, *, seed: int = 42) -> str:
+    """Génère un CSV synthétique (date, libelle, montant, ref) de ``rows`` lignes."""
+
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["date", "libelle", "montant", "ref"])
+    for index in range(rows):
+        writer.writerow(
+            [
+                (start + timedelta(days=index % 1800)).isoformat(),
+                f"{rng.choice(_LABELS)} {index}",
+                f"{rng.uniform(-900, 1500):.2f}",
+                f"BENCH{index:08d}",
+            ]
+        )
+    return buffer.getvalue()
+
+
+def run(account_id: int, sizes: list[int], modes: list[str]) -> list[dict[str, object]]:
+    engine = get_engine()
+    bank_statement_csv.get_engine = lambda: RollbackEngine(engine)
+    results: list[dict[str, object]] = []
+    with StatementCounter(engine) as counter:
+        for size in sizes:
+            content = generate_csv(size)
+            for mode in modes:
+                counter.reset()
+                started = time.perf_counter()
+                summary = bank_statement_csv.import_csv(
+                    content,
+                    account_id,
+                    source=f"bench-{size}",
+                    bulk=mode == "bulk",
+                )
+                elapsed = time.perf_counter() - started
+                results.append(
+                    {
+                        "rows": size,
+                        "mode": mode,
+                        "inserted": summary["inserted"],
+                        "duplicates": summary["duplicates"],
+                        "round_trips": counter.count,
+                        "seconds": round(elapsed, 3),
+                        "rows_per_second": round(size / elapsed, 1) if elapsed else None,
+                    }
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark import CSV relevés bancaires.")
+    parser.add_argument("--account-id", type=int, required=True, help="Compte finance_accounts cible.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Nombre de lignes (séparées par des virgules).")
+    parser.add_argument(
+        "--modes",
+        default="rowwise,bulk",
+        help="Modes à mesurer: rowwise, bulk (séparés par des virgules).",
+    )
+    args = parser.parse_args()
+
+    sizes = [int(part) for part in args.sizes.split(",") if part.strip()]
+    modes = [part.strip() for part in args.modes.split(",") if part.strip()]
+    print(json.dumps(run(args.account_id, sizes, modes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
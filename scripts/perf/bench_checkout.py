@@ -0,0 +1,98 @@
+"""Benchmark du checkout POS : allers-retours SQL et latence p99 selon la taille du panier.
+
+Chaque vente est exécutée dans une transaction annulée (ROLLBACK) : la base n'est pas modifiée.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path as _PathHelper
+import sys
+
+sys.path.append(str(_PathHelper(__file__).resolve().parents[2]))
+sys.path.append(str(_PathHelper(__file__).resolve().parent))
+
+from sqlalchemy import text
+
+from _harness import RollbackEngine, StatementCounter, percentile
+
+from core import inventory_service
+from core.data_repository import get_engine
+
+
+def _pick_products(engine, tenant_id: int, limit: int) -> list[dict[str, object]]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                """
+                SELECT id, nom, prix_vente, tva
+                FROM produits
+                WHERE tenant_id = :tenant_id AND COALESCE(stock_actuel, 0) >= 1
+                ORDER BY id
+                LIMIT :limit
+                """
+            ),
+            {"tenant_id": tenant_id, "limit": limit},
+        ).fetchall()
+    return [
+        {"id": int(row.id), "qty": 1, "nom": row.nom, "prix_vente": row.prix_vente, "tva": row.tva}
+        for row in rows
+    ]
+
+
+def run(tenant_id: int, sizes: list[int], iterations: int, with_receipt: bool) -> list[dict[str, object]]:
+    engine = get_engine()
+    products = _pick_products(engine, tenant_id, max(sizes))
+    if not products:
+        raise SystemExit("Aucun produit en stock pour ce tenant.")
+
+    inventory_service.get_engine = lambda: RollbackEngine(engine)
+    if not with_receipt:
+        inventory_service._build_sale_receipt = lambda *_args, **_kwargs: {}
+
+    results: list[dict[str, object]] = []
+    with StatementCounter(engine) as counter:
+        for size in sizes:
+            cart = products[:size]
+            for batched in (False, True):
+                latencies: list[float] = []
+                round_trips = 0
+                for _ in range(iterations):
+                    counter.reset()
+                    started = time.perf_counter()
+                    success, message, _receipt = inventory_service.process_sale_transaction(
+                        cart, "bench", tenant_id=tenant_id, batched=batched
+                    )
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    round_trips = counter.count
+                    if not success:
+                        raise SystemExit(f"Vente en échec ({size} lignes): {message}")
+                results.append(
+                    {
+                        "cart_size": len(cart),
+                        "mode": "batched" if batched else "per_line",
+                        "round_trips": round_trips,
+                        "p50_ms": round(statistics.median(latencies), 3),
+                        "p99_ms": round(percentile(latencies, 99), 3),
+                    }
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du checkout POS (par ligne vs ensembliste).")
+    parser.add_argument("--tenant-id", type=int, default=1, help="Tenant ciblé.")
+    parser.add_argument("--sizes", default="1,10,30,60", help="Tailles de panier (séparées par des virgules).")
+    parser.add_argument("--iterations", type=int, default=50, help="Ventes par taille et par mode.")
+    parser.add_argument("--with-receipt", action="store_true", help="Inclut la génération du ticket PDF.")
+    args = parser.parse_args()
+
+    sizes = [int(part) for part in args.sizes.split(",") if part.strip()]
+    print(json.dumps(run(args.tenant_id, sizes, args.iterations, args.with_receipt), indent=2))
+
+
+if __name__ == "__main__":
+    main()
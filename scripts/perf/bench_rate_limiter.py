@@ -0,0 +1,121 @@
+"""Benchmark du rate limiter : surcoût par requête selon le backend de stockage.
+
+Mesure ``RateLimiter.check`` (clé client incluse) pour les backends ``memory`` et
+``shm`` et, si ``--redis-url`` est fourni, ``redis``. ``--workers`` lance en plus
+plusieurs processus sur la même table partagée pour mesurer la contention du verrou.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path as _PathHelper
+import sys
+
+sys.path.append(str(_PathHelper(__file__).resolve().parents[2]))
+sys.path.append(str(_PathHelper(__file__).resolve().parent))
+
+from starlette.requests import Request
+
+from _harness import percentile
+
+from backend.middleware.rate_limit_backends import build_bucket_store
+from backend.middleware.rate_limiter import RateLimitConfig, RateLimiter
+
+
+def _requests(clients: int) -> list[Request]:
+    return [
+        Request(
+            {
+                "type": "http",
+                "method": "GET",
+                "path": "/api/products",
+                "headers": [(b"x-forwarded-for", f"10.0.{i // 256}.{i % 256}".encode())],
+                "query_string": b"",
+                "server": ("bench", 80),
+                "client": ("127.0.0.1", 0),
+                "scheme": "http",
+            }
+        )
+        for i in range(clients)
+    ]
+
+
+async def _measure(limiter: RateLimiter, requests: list[Request], iterations: int) -> list[float]:
+    latencies: list[float] = []
+    for i in range(iterations):
+        request = requests[i % len(requests)]
+        started = time.perf_counter()
+        await limiter.check(request)
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+    return latencies
+
+
+def _run_backend(backend: str, clients: int, iterations: int) -> dict[str, object]:
+    limiter = RateLimiter(RateLimitConfig(requests=1_000_000, window=60), store=build_bucket_store(backend))
+    requests = _requests(clients)
+    asyncio.run(_measure(limiter, requests, min(iterations, 1000)))  # échauffement
+    started = time.perf_counter()
+    latencies = asyncio.run(_measure(limiter, requests, iterations))
+    elapsed = time.perf_counter() - started
+    return {
+        "backend": backend,
+        "clients": clients,
+        "iterations": iterations,
+        "p50_us": round(statistics.median(latencies), 2),
+        "p99_us": round(percentile(latencies, 99), 2),
+        "checks_per_s": round(iterations / elapsed),
+    }
+
+
+def _worker(args: tuple[int, int]) -> float:
+    clients, iterations = args
+    limiter = RateLimiter(RateLimitConfig(requests=1_000_000, window=60), store=build_bucket_store("shm"))
+    requests = _requests(clients)
+    started = time.perf_counter()
+    asyncio.run(_measure(limiter, requests, iterations))
+    return time.perf_counter() - started
+
+
+def _run_shm_workers(workers: int, clients: int, iterations: int) -> dict[str, object]:
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        pool.map(_worker, [(clients, iterations)] * workers)
+    elapsed = time.perf_counter() - started
+    return {
+        "backend": "shm",
+        "workers": workers,
+        "clients": clients,
+        "iterations": iterations * workers,
+        "checks_per_s": round(iterations * workers / elapsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du rate limiter par backend.")
+    parser.add_argument("--clients", type=int, default=10_000, help="Nombre de clés clients distinctes.")
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=0, help="Processus concurrents sur la table shm.")
+    parser.add_argument("--redis-url", default=None, help="Mesurer aussi le backend Redis.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("RATE_LIMIT_SHM_PATH", str(_PathHelper(tempfile.gettempdir()) / "bench-rate-limit.bin"))
+    backends = ["memory", "shm"]
+    if args.redis_url:
+        os.environ["RATE_LIMIT_REDIS_URL"] = args.redis_url
+        backends.append("redis")
+
+    results = [_run_backend(backend, args.clients, args.iterations) for backend in backends]
+    if args.workers > 1:
+        results.append(_run_shm_workers(args.workers, args.clients, args.iterations // args.workers))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
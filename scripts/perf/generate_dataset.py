@@ -0,0 +1,512 @@
+"""Jeu de données synthétique pour les benchmarks (tenants ``bench-NN``).
+
+Volumes par défaut : 2 tenants, 50 000 produits, 10 M mouvements de stock, 1 M
+transactions finance et 5 000 lignes de relevés (finance et restaurant) par tenant.
+Tout est généré côté serveur (``generate_series``) avec des graines fixes : deux
+exécutions produisent les mêmes données, aux dates près (relatives au jour du
+lancement, pour que les fenêtres « 30 derniers jours » portent sur l'historique).
+À lancer sur une base locale dédiée : rien n'est annulé et un tenant déjà peuplé
+est ignoré. Le script refuse d'écrire dans une base dont le nom ne contient ni
+``bench`` ni ``perf``, sauf avec ``--yes``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import text
+
+from core.data_repository import get_engine
+
+_CATEGORIES = (
+    "Epicerie",
+    "Boissons",
+    "Frais",
+    "Surgelés",
+    "Hygiène",
+    "Entretien",
+    "Fruits et légumes",
+    "Boucherie",
+)
+_SUPPLIERS = ("METRO", "PROMOCASH", "EUROCIEL", "TRANSGOURMET")
+_FINANCE_CATEGORIES = (
+    ("bench-ventes", "Ventes", "RECETTE"),
+    ("bench-achats", "Achats marchandises", "DEPENSE"),
+    ("bench-loyer", "Loyer", "DEPENSE"),
+    ("bench-energie", "Energie", "DEPENSE"),
+    ("bench-salaires", "Salaires", "DEPENSE"),
+    ("bench-banque", "Frais bancaires", "DEPENSE"),
+)
+_LABELS = ("CB CARREFOUR", "PRLV URSSAF", "VIR SEPA METRO", "CB TOTAL ENERGIES", "REMISE CB SUMUP", "LOYER")
+
+_PRODUCTS_SQL = """
+    INSERT INTO produits (nom, tenant_id, categorie, prix_achat, prix_vente, tva, seuil_alerte, actif)
+    SELECT
+        format('BENCH %s %s', :code, lpad(s.g::text, 6, '0')),
+        :tenant_id,
+        (CAST(:categories AS TEXT[]))[1 + s.g % cardinality(CAST(:categories AS TEXT[]))],
+        s.prix_achat,
+        round(s.prix_achat * (1.2 + (s.g % 7) / 10.0), 2),
+        (ARRAY[5.5, 10, 20])[1 + s.g % 3],
+        s.g % 10,
+        TRUE
+    FROM (
+        SELECT g, round((0.5 + random() * 25)::numeric, 2) AS prix_achat
+        FROM generate_series(1, :count) AS g
+    ) s
+"""
+
+_BARCODES_SQL = """
+    INSERT INTO produits_barcodes (produit_id, tenant_id, code, symbologie, is_principal)
+    SELECT p.id, p.tenant_id, '2' || lpad(p.id::text, 12, '0'), 'EAN-13', TRUE
+    FROM produits p
+    WHERE p.tenant_id = :tenant_id
+"""
+
+# 15 % d'entrées fournisseurs (gros volumes), 85 % de ventes POS ; dates croissantes
+# avec g, comme un historique réel (corrélation id/date exploitée par les index BRIN).
+_MOVEMENTS_SQL = """
+    INSERT INTO mouvements_stock (produit_id, tenant_id, type, quantite, source, date_mvt)
+    SELECT
+        (CAST(:ids AS INT[]))[1 + floor(s.r2 * cardinality(CAST(:ids AS INT[])))::int],
+        :tenant_id,
+        CASE WHEN s.r < 0.15 THEN 'ENTREE'::type_mouvement ELSE 'SORTIE'::type_mouvement END,
+        CASE WHEN s.r < 0.15 THEN 12 + s.g % 36 ELSE 1 + s.g % 3 END,
+        CASE WHEN s.r < 0.15 THEN (CAST(:suppliers AS TEXT[]))[1 + s.g % 4] ELSE 'POS' END,
+        CAST(:start AS TIMESTAMP) + (s.g::double precision / :total) * :span_seconds * INTERVAL '1 second'
+    FROM (
+        SELECT g, random() AS r, random() AS r2
+        FROM generate_series(:lo, :hi) AS g
+    ) s
+"""
+
+_STOCK_REFRESH_SQL = """
+    UPDATE produits p
+    SET stock_actuel = GREATEST(m.stock, 0)
+    FROM (
+        SELECT produit_id, SUM(CASE WHEN type = 'SORTIE' THEN -quantite ELSE quantite END) AS stock
+        FROM mouvements_stock
+        WHERE tenant_id = :tenant_id
+        GROUP BY produit_id
+    ) m
+    WHERE p.id = m.produit_id AND p.tenant_id = :tenant_id
+"""
+
+_TRANSACTIONS_SQL = """
+    WITH src AS (
+        SELECT g, random() AS r, random() AS r2
+        FROM generate_series(:lo, :hi) AS g
+    ),
+    tx AS (
+        INSERT INTO finance_transactions (
+            entity_id, account_id, direction, source, date_operation, date_value,
+            amount, currency, ref_externe, note, status
+        )
+        SELECT
+            :entity_id,
+            :account_id,
+            CASE WHEN src.r < 0.35 THEN 'IN' ELSE 'OUT' END::finance_tx_direction,
+            'BENCH',
+            CAST(:start AS DATE) + (src.g % :days),
+            CAST(:start AS DATE) + (src.g % :days),
+            round((5 + src.r2 * 1500)::numeric, 2),
+            'EUR',
+            format('BENCH-%s-%s', :code, src.g),
+            format('%s %s', (CAST(:labels AS TEXT[]))[1 + src.g % 6], src.g),
+            'CONFIRMED'
+        FROM src
+        RETURNING id, direction, amount, note
+    )
+    INSERT INTO finance_transaction_lines (transaction_id, category_id, montant_ttc, description, position)
+    SELECT
+        tx.id,
+        CASE
+            WHEN tx.direction = 'IN' THEN (CAST(:categories AS BIGINT[]))[1]
+            ELSE (CAST(:categories AS BIGINT[]))[2 + tx.id % (cardinality(CAST(:categories AS BIGINT[])) - 1)]
+        END,
+        tx.amount,
+        tx.note,
+        1
+    FROM tx
+"""
+
+_FINANCE_STATEMENT_LINES_SQL = """
+    INSERT INTO finance_bank_statement_lines (statement_id, date_operation, date_valeur, libelle_banque, montant, ref_banque, checksum)
+    SELECT
+        :statement_id,
+        CAST(:start AS DATE) + (g % :days),
+        CAST(:start AS DATE) + (g % :days),
+        format('%s %s', (CAST(:labels AS TEXT[]))[1 + g % 6], g),
+        round((random() * 2400 - 900)::numeric, 2),
+        format('BENCH-%s-%s', :code, g),
+        md5(format('bench-%s-%s', :code, g))
+    FROM generate_series(1, :count) AS g
+"""
+
+_RESTAURANT_STATEMENTS_SQL = """
+    INSERT INTO restaurant_bank_statements (tenant_id, account, date, libelle, categorie, montant, type, mois, source)
+    SELECT
+        :tenant_id,
+        'BENCH',
+        s.jour,
+        format('%s %s', (CAST(:labels AS TEXT[]))[1 + s.g % 6], s.g),
+        (CAST(:categories AS TEXT[]))[1 + s.g % cardinality(CAST(:categories AS TEXT[]))],
+        round((5 + random() * 1500)::numeric, 2),
+        CASE WHEN s.g % 3 = 0 THEN 'Entrée' ELSE 'Sortie' END,
+        to_char(s.jour, 'YYYY-MM'),
+        'bench'
+    FROM (
+        SELECT g, CAST(:start AS DATE) + (g % :days) AS jour
+        FROM generate_series(1, :count) AS g
+    ) s
+"""
+
+
+def _split(total: int, parts: int) -> list[int]:
+    base, extra = divmod(max(total, 0), parts)
+    return [base + (1 if index < extra else 0) for index in range(parts)]
+
+
+def _seed(conn, *parts: object) -> None:
+    """Graine déterministe de ``random()`` pour la session (dépend de ``parts``)."""
+
+    value = random.Random("-".join(str(part) for part in parts)).uniform(-1, 1)
+    conn.execute(text("SELECT setseed(:value)"), {"value": value})
+
+
+def _exists(conn, regclass: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": regclass}).scalar()
+
+
+def _function_exists(conn, name: str) -> bool:
+    return bool(conn.execute(text("SELECT 1 FROM pg_proc WHERE proname = :name"), {"name": name}).scalar())
+
+
+def _ensure_tenant(conn, index: int) -> tuple[int, str]:
+    code = f"bench-{index:02d}"
+    # init.sql insère les tenants avec des id explicites : la séquence peut être en retard.
+    conn.execute(text("SELECT setval(pg_get_serial_sequence('tenants', 'id'), (SELECT MAX(id) FROM tenants))"))
+    tenant_id = conn.execute(
+        text(
+            """
+            INSERT INTO tenants (name, code) VALUES (:name, :code)
+            ON CONFLICT (code) DO UPDATE SET name = EXCLUDED.name
+            RETURNING id
+            """
+        ),
+        {"name": f"Benchmark {index:02d}", "code": code},
+    ).scalar_one()
+    return int(tenant_id), code
+
+
+def _generate_catalog(engine, *, tenant_id: int, code: str, products: int, seed: int) -> list[int]:
+    with engine.begin() as conn:
+        _seed(conn, seed, code, "produits")
+        conn.execute(
+            text(_PRODUCTS_SQL),
+            {"code": code, "tenant_id": tenant_id, "count": products, "categories": list(_CATEGORIES)},
+        )
+        conn.execute(text(_BARCODES_SQL), {"tenant_id": tenant_id})
+        ids = conn.execute(
+            text("SELECT id FROM produits WHERE tenant_id = :tenant_id ORDER BY id"), {"tenant_id": tenant_id}
+        ).scalars().all()
+    return [int(value) for value in ids]
+
+
+def _generate_movements(
+    engine,
+    *,
+    tenant_id: int,
+    code: str,
+    product_ids: list[int],
+    total: int,
+    start: date,
+    days: int,
+    chunk_size: int,
+    seed: int,
+) -> bool:
+    """Insère ``total`` mouvements par lots ; retourne ``True`` si les triggers ont été court-circuités."""
+
+    with engine.connect() as conn:
+        superuser = bool(conn.execute(text("SELECT rolsuper FROM pg_roles WHERE rolname = current_user")).scalar())
+    params = {
+        "tenant_id": tenant_id,
+        "ids": product_ids,
+        "suppliers": list(_SUPPLIERS),
+        "start": start,
+        "total": total,
+        "span_seconds": days * 86400,
+    }
+    for lo in range(1, total + 1, chunk_size):
+        hi = min(total, lo + chunk_size - 1)
+        with engine.begin() as conn:
+            if superuser:
+                # Sans trg_update_stock_actuel ligne à ligne : stock_actuel est recalculé après coup.
+                conn.execute(text("SET LOCAL session_replication_role = replica"))
+            _seed(conn, seed, code, "mouvements", lo)
+            conn.execute(text(_MOVEMENTS_SQL), {**params, "lo": lo, "hi": hi})
+    if superuser:
+        with engine.begin() as conn:
+            conn.execute(text(_STOCK_REFRESH_SQL), {"tenant_id": tenant_id})
+    return superuser
+
+
+def _ensure_finance_dimensions(conn, *, tenant_id: int, code: str) -> tuple[int, int, list[int]]:
+    entity_code = code.upper()
+    entity_id = conn.execute(
+        text(
+            """
+            INSERT INTO finance_entities (code, name, currency, is_active)
+            VALUES (:code, :name, 'EUR', TRUE)
+            ON CONFLICT (code) DO UPDATE SET name = EXCLUDED.name
+            RETURNING id
+            """
+        ),
+        {"code": entity_code, "name": f"Benchmark {code}"},
+    ).scalar_one()
+    conn.execute(
+        text(
+            """
+            INSERT INTO finance_entity_members (entity_id, tenant_id)
+            SELECT :entity_id, :tenant_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM finance_entity_members WHERE entity_id = :entity_id AND tenant_id = :tenant_id
+            )
+            """
+        ),
+        {"entity_id": entity_id, "tenant_id": tenant_id},
+    )
+    label = f"BENCH - {entity_code}"
+    account_id = conn.execute(
+        text("SELECT id FROM finance_accounts WHERE entity_id = :entity_id AND label = :label"),
+        {"entity_id": entity_id, "label": label},
+    ).scalar()
+    if account_id is None:
+        account_id = conn.execute(
+            text(
+                """
+                INSERT INTO finance_accounts (entity_id, type, label, currency, is_active)
+                VALUES (:entity_id, 'BANQUE', :label, 'EUR', TRUE)
+                RETURNING id
+                """
+            ),
+            {"entity_id": entity_id, "label": label},
+        ).scalar_one()
+    category_ids = []
+    for cat_code, name, cat_type in _FINANCE_CATEGORIES:
+        category_ids.append(
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO finance_categories (entity_id, code, name, type)
+                    VALUES (:entity_id, :code, :name, :type)
+                    ON CONFLICT (entity_id, code) DO UPDATE SET name = EXCLUDED.name
+                    RETURNING id
+                    """
+                ),
+                {"entity_id": entity_id, "code": cat_code, "name": name, "type": cat_type},
+            ).scalar_one()
+        )
+    return int(entity_id), int(account_id), [int(value) for value in category_ids]
+
+
+def _generate_finance(
+    engine,
+    *,
+    tenant_id: int,
+    code: str,
+    transactions: int,
+    statement_lines: int,
+    start: date,
+    days: int,
+    chunk_size: int,
+    seed: int,
+) -> None:
+    with engine.begin() as conn:
+        entity_id, account_id, category_ids = _ensure_finance_dimensions(conn, tenant_id=tenant_id, code=code)
+    params = {
+        "entity_id": entity_id,
+        "account_id": account_id,
+        "categories": category_ids,
+        "labels": list(_LABELS),
+        "code": code,
+        "start": start,
+        "days": days,
+    }
+    for lo in range(1, transactions + 1, chunk_size):
+        hi = min(transactions, lo + chunk_size - 1)
+        with engine.begin() as conn:
+            _seed(conn, seed, code, "transactions", lo)
+            conn.execute(text(_TRANSACTIONS_SQL), {**params, "lo": lo, "hi": hi})
+
+    if statement_lines <= 0:
+        return
+    with engine.begin() as conn:
+        _seed(conn, seed, code, "releves")
+        statement_id = conn.execute(
+            text(
+                """
+                INSERT INTO finance_bank_statements (account_id, period_start, period_end, source, file_name, hash)
+                VALUES (:account_id, :start, CAST(:start AS DATE) + :days, 'BENCH', 'bench.csv', :hash)
+                ON CONFLICT (account_id, hash) DO UPDATE SET source = EXCLUDED.source
+                RETURNING id
+                """
+            ),
+            {"account_id": account_id, "start": start, "days": days, "hash": f"bench-{code}"},
+        ).scalar_one()
+        conn.execute(
+            text(_FINANCE_STATEMENT_LINES_SQL),
+            {**params, "statement_id": statement_id, "count": statement_lines},
+        )
+        if _exists(conn, "restaurant_bank_statements"):
+            conn.execute(
+                text(_RESTAURANT_STATEMENTS_SQL),
+                {
+                    "tenant_id": tenant_id,
+                    "labels": list(_LABELS),
+                    "categories": [name for _code, name, _type in _FINANCE_CATEGORIES],
+                    "start": start,
+                    "days": days,
+                    "count": statement_lines,
+                },
+            )
+
+
+def generate(
+    *,
+    tenants: int,
+    products: int,
+    movements: int,
+    transactions: int,
+    statement_lines: int,
+    history_days: int,
+    chunk_size: int,
+    seed: int,
+) -> dict[str, object]:
+    engine = get_engine()
+    start = date.today() - timedelta(days=history_days)
+    report: list[dict[str, object]] = []
+    for index, (n_products, n_movements, n_transactions) in enumerate(
+        zip(_split(products, tenants), _split(movements, tenants), _split(transactions, tenants)), start=1
+    ):
+        with engine.begin() as conn:
+            tenant_id, code = _ensure_tenant(conn, index)
+            existing = conn.execute(
+                text("SELECT COUNT(*) FROM produits WHERE tenant_id = :tenant_id"), {"tenant_id": tenant_id}
+            ).scalar()
+            if _function_exists(conn, "mouvements_stock_ensure_partitions"):
+                conn.execute(text("SELECT mouvements_stock_ensure_partitions(3, :start)"), {"start": start})
+        entry: dict[str, object] = {"tenant_id": tenant_id, "code": code}
+        if existing:
+            entry["skipped"] = f"{existing} produits déjà présents"
+            report.append(entry)
+            continue
+
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+        product_ids = _generate_catalog(engine, tenant_id=tenant_id, code=code, products=n_products, seed=seed)
+        timings["produits"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        triggers_bypassed = False
+        if n_movements and product_ids:
+            triggers_bypassed = _generate_movements(
+                engine,
+                tenant_id=tenant_id,
+                code=code,
+                product_ids=product_ids,
+                total=n_movements,
+                start=start,
+                days=history_days,
+                chunk_size=chunk_size,
+                seed=seed,
+            )
+        timings["mouvements"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _generate_finance(
+            engine,
+            tenant_id=tenant_id,
+            code=code,
+            transactions=n_transactions,
+            statement_lines=statement_lines,
+            start=start,
+            days=history_days,
+            chunk_size=chunk_size,
+            seed=seed,
+        )
+        timings["finance"] = time.perf_counter() - started
+
+        entry.update(
+            {
+                "produits": len(product_ids),
+                "mouvements": n_movements,
+                "transactions": n_transactions,
+                "lignes_releves": statement_lines,
+                "triggers_bypassed": triggers_bypassed,
+                "seconds": {name: round(value, 1) for name, value in timings.items()},
+            }
+        )
+        report.append(entry)
+
+    with engine.begin() as conn:
+        if _function_exists(conn, "stock_ledger_compact"):
+            conn.execute(text("SELECT * FROM stock_ledger_compact()"))
+        conn.execute(text("ANALYZE"))
+    return {"seed": seed, "history_start": start, "tenants": report}
+
+
+_DEDICATED_MARKERS = ("bench", "perf")
+
+
+def _check_target(engine, *, confirmed: bool) -> str:
+    """Refuse une base qui ne semble pas dédiée aux benchmarks, sauf confirmation."""
+
+    with engine.connect() as conn:
+        name = conn.execute(text("SELECT current_database()")).scalar() or ""
+    if not confirmed and not any(marker in name.lower() for marker in _DEDICATED_MARKERS):
+        raise SystemExit(
+            f"Base « {name} » : le nom ne contient ni 'bench' ni 'perf'. "
+            "Relancer avec --yes pour y écrire le jeu de données."
+        )
+    return name
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Générer un jeu de données de benchmark (base locale dédiée).")
+    parser.add_argument("--tenants", type=int, default=2, help="Nombre de tenants bench-NN (défaut: 2).")
+    parser.add_argument("--products", type=int, default=50_000, help="Produits au total (défaut: 50 000).")
+    parser.add_argument("--movements", type=int, default=10_000_000, help="Mouvements de stock au total (défaut: 10 M).")
+    parser.add_argument("--transactions", type=int, default=1_000_000, help="Transactions finance au total (défaut: 1 M).")
+    parser.add_argument("--statement-lines", type=int, default=5000, help="Lignes de relevés par tenant (défaut: 5 000).")
+    parser.add_argument("--history-days", type=int, default=730, help="Profondeur d'historique en jours (défaut: 730).")
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="Lignes par transaction d'insertion.")
+    parser.add_argument("--seed", type=int, default=42, help="Graine des générateurs (défaut: 42).")
+    parser.add_argument("--yes", action="store_true", help="Écrire même si la base n'est pas nommée bench/perf.")
+    args = parser.parse_args()
+
+    _check_target(get_engine(), confirmed=args.yes)
+
+    report = generate(
+        tenants=max(1, args.tenants),
+        products=args.products,
+        movements=args.movements,
+        transactions=args.transactions,
+        statement_lines=args.statement_lines,
+        history_days=max(1, args.history_days),
+        chunk_size=max(1000, args.chunk_size),
+        seed=args.seed,
+    )
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Suite de benchmarks des chemins critiques, résultats JSON comparables entre commits.
+
+À lancer sur le jeu de données de ``generate_dataset.py`` (tenant ``bench-01`` par
+défaut). Les écritures (checkout, import CSV) sont exécutées dans des transactions
+annulées. ``--compare`` confronte le p50 de chaque benchmark à un fichier de
+résultats précédent et sort en erreur au-delà de ``--threshold``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(_ROOT))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from sqlalchemy import text
+
+from _harness import RollbackEngine, StatementCounter, compare_results, git_revision, measure, patched
+
+from core.data_repository import get_engine
+
+
+@dataclass
+class Context:
+    engine: Any
+    tenant_id: int
+    entity_id: int | None
+    account_id: int | None
+    iterations: int
+    warmup: int
+    pdfs: list[Path] = field(default_factory=list)
+
+
+def _resolve_context(engine, tenant_code: str, *, iterations: int, warmup: int, pdfs: list[Path]) -> Context:
+    with engine.connect() as conn:
+        tenant_id = conn.execute(text("SELECT id FROM tenants WHERE code = :code"), {"code": tenant_code}).scalar()
+        if tenant_id is None:
+            raise SystemExit(f"Tenant {tenant_code!r} introuvable : lancer generate_dataset.py d'abord.")
+        entity_id = conn.execute(
+            text("SELECT entity_id FROM finance_entity_members WHERE tenant_id = :tenant_id ORDER BY entity_id LIMIT 1"),
+            {"tenant_id": tenant_id},
+        ).scalar()
+        account_id = conn.execute(
+            text("SELECT id FROM finance_accounts WHERE entity_id = :entity_id ORDER BY id LIMIT 1"),
+            {"entity_id": entity_id},
+        ).scalar()
+    return Context(
+        engine=engine,
+        tenant_id=int(tenant_id),
+        entity_id=int(entity_id) if entity_id is not None else None,
+        account_id=int(account_id) if account_id is not None else None,
+        iterations=iterations,
+        warmup=warmup,
+        pdfs=pdfs,
+    )
+
+
+def _dataset_counts(ctx: Context) -> dict[str, int]:
+    queries = {
+        "produits": ("SELECT COUNT(*) FROM produits WHERE tenant_id = :tenant_id", {"tenant_id": ctx.tenant_id}),
+        "mouvements": ("SELECT COUNT(*) FROM mouvements_stock WHERE tenant_id = :tenant_id", {"tenant_id": ctx.tenant_id}),
+        "transactions": (
+            "SELECT COUNT(*) FROM finance_transactions WHERE entity_id = :entity_id",
+            {"entity_id": ctx.entity_id},
+        ),
+    }
+    with ctx.engine.connect() as conn:
+        return {name: int(conn.execute(text(sql), params).scalar() or 0) for name, (sql, params) in queries.items()}
+
+
+def bench_checkout(ctx: Context) -> list[dict[str, Any]]:
+    from core import inventory_service
+
+    with ctx.engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                """
+                SELECT id FROM produits
+                WHERE tenant_id = :tenant_id AND COALESCE(stock_actuel, 0) >= 1
+                ORDER BY id
+                LIMIT 10
+                """
+            ),
+            {"tenant_id": ctx.tenant_id},
+        ).fetchall()
+    cart = [{"id": int(row.id), "qty": 1} for row in rows]
+    if not cart:
+        return [{"name": "pos_checkout", "skipped": "aucun produit en stock"}]
+
+    def _sale() -> None:
+        success, message, _receipt = inventory_service.process_sale_transaction(
+            cart, "bench", tenant_id=ctx.tenant_id, batched=True, defer_receipt=True
+        )
+        if not success:
+            raise RuntimeError(message)
+
+    with patched(inventory_service, "get_engine", lambda: RollbackEngine(ctx.engine)):
+        with StatementCounter(ctx.engine) as counter:
+            stats = measure(_sale, iterations=ctx.iterations, warmup=ctx.warmup)
+            round_trips = counter.count // max(1, stats["iterations"] + ctx.warmup)
+    return [{"name": "pos_checkout", "cart_size": len(cart), "round_trips": round_trips, **stats}]
+
+
+def bench_search_transactions(ctx: Context) -> list[dict[str, Any]]:
+    from backend.services.finance.transactions import search_transactions
+
+    cases = {
+        "search_transactions": {"entity_id": ctx.entity_id, "page": 1, "size": 50},
+        "search_transactions_text": {"entity_id": ctx.entity_id, "q": "URSSAF", "page": 1, "size": 50},
+        "search_transactions_deep_page": {"entity_id": ctx.entity_id, "page": 200, "size": 50},
+    }
+    results: list[dict[str, Any]] = []
+    for name, kwargs in cases.items():
+        stats = measure(lambda kwargs=kwargs: search_transactions(**kwargs), iterations=ctx.iterations, warmup=ctx.warmup)
+        results.append({"name": name, **stats})
+    return results
+
+
+def bench_dashboard(ctx: Context) -> list[dict[str, Any]]:
+    from backend.services.dashboard import fetch_dashboard_metrics
+
+    return [
+        {
+            "name": "fetch_dashboard_metrics",
+            **measure(
+                lambda: fetch_dashboard_metrics(tenant_id=ctx.tenant_id, use_cache=False),
+                iterations=ctx.iterations,
+                warmup=ctx.warmup,
+            ),
+        }
+    ]
+
+
+def bench_supply_plan(ctx: Context) -> list[dict[str, Any]]:
+    from backend.services.supply import compute_supply_plan
+
+    return [
+        {
+            "name": "compute_supply_plan_cold",
+            **measure(
+                lambda: compute_supply_plan(tenant_id=ctx.tenant_id, use_cache=False),
+                iterations=ctx.iterations,
+                warmup=ctx.warmup,
+            ),
+        },
+        {
+            "name": "compute_supply_plan_cached",
+            **measure(
+                lambda: compute_supply_plan(tenant_id=ctx.tenant_id, limit=100),
+                iterations=ctx.iterations,
+                warmup=max(1, ctx.warmup),
+            ),
+        },
+    ]
+
+
+def bench_import_csv(ctx: Context) -> list[dict[str, Any]]:
+    from backend.services.importers import bank_statement_csv
+    from bench_bank_csv_import import generate_csv
+
+    if ctx.account_id is None:
+        return [{"name": "import_csv", "skipped": "aucun compte finance"}]
+    content = generate_csv(5000)
+    with patched(bank_statement_csv, "get_engine", lambda: RollbackEngine(ctx.engine)):
+        stats = measure(
+            lambda: bank_statement_csv.import_csv(content, ctx.account_id, source="bench-suite"),
+            iterations=max(1, ctx.iterations // 4),
+            warmup=ctx.warmup,
+        )
+    return [{"name": "import_csv", "rows": 5000, **stats}]
+
+
+def bench_diagnostics(ctx: Context) -> list[dict[str, Any]]:
+    from backend.services.audit import list_diagnostics
+
+    return [
+        {
+            "name": "list_diagnostics",
+            **measure(lambda: list_diagnostics(tenant_id=ctx.tenant_id), iterations=ctx.iterations, warmup=ctx.warmup),
+        }
+    ]
+
+
+def bench_pdf_parsers(ctx: Context) -> list[dict[str, Any]]:
+    from backend.services.parsers.bank_statement_parsers import parse_statement
+    from backend.services.restaurant.pdf_parser import parse_bank_statement_pdf
+
+    iterations = max(1, min(ctx.iterations, 5))
+    results: list[dict[str, Any]] = []
+    for path in ctx.pdfs:
+        content = path.read_bytes()
+        results.append(
+            {
+                "name": f"parse_statement[{path.name}]",
+                **measure(lambda path=path: parse_statement(path), iterations=iterations, warmup=0),
+            }
+        )
+        results.append(
+            {
+                "name": f"parse_bank_statement_pdf[{path.name}]",
+                **measure(lambda content=content: parse_bank_statement_pdf(content), iterations=iterations, warmup=0),
+            }
+        )
+    return results
+
+
+BENCHMARKS: dict[str, Callable[[Context], list[dict[str, Any]]]] = {
+    "checkout": bench_checkout,
+    "search_transactions": bench_search_transactions,
+    "dashboard": bench_dashboard,
+    "supply_plan": bench_supply_plan,
+    "import_csv": bench_import_csv,
+    "diagnostics": bench_diagnostics,
+    "pdf_parsers": bench_pdf_parsers,
+}
+
+
+def run(ctx: Context, selected: list[str]) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    for name in selected:
+        try:
+            results.extend(BENCHMARKS[name](ctx))
+        except Exception as exc:  # un benchmark en échec ne bloque pas la suite
+            results.append({"name": name, "error": f"{type(exc).__name__}: {exc}"})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Suite de benchmarks (sortie JSON).")
+    parser.add_argument("--tenant-code", default="bench-01", help="Tenant du jeu de données (défaut: bench-01).")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Benchmark à exécuter (répétable).")
+    parser.add_argument("--iterations", type=int, default=20, help="Mesures par benchmark (défaut: 20).")
+    parser.add_argument("--warmup", type=int, default=2, help="Appels de chauffe non mesurés (défaut: 2).")
+    parser.add_argument(
+        "--pdf",
+        action="append",
+        type=Path,
+        default=None,
+        help="Relevé PDF à parser (répétable ; défaut: les 3 premiers de releve/).",
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Fichier JSON de sortie (défaut: stdout).")
+    parser.add_argument("--compare", type=Path, default=None, help="Résultats de référence à comparer.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Hausse de p50 tolérée (défaut: 0.2 = +20 %%).")
+    args = parser.parse_args()
+
+    pdfs = args.pdf if args.pdf is not None else sorted((_ROOT / "releve").glob("*.pdf"))[:3]
+    engine = get_engine()
+    ctx = _resolve_context(
+        engine, args.tenant_code, iterations=max(1, args.iterations), warmup=max(0, args.warmup), pdfs=pdfs
+    )
+    with engine.connect() as conn:
+        server_version = conn.execute(text("SHOW server_version")).scalar()
+
+    report: dict[str, Any] = {
+        "meta": {
+            **git_revision(_ROOT),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "postgres": server_version,
+            "tenant": args.tenant_code,
+            "dataset": _dataset_counts(ctx),
+            "iterations": ctx.iterations,
+        },
+        "results": run(ctx, args.only or list(BENCHMARKS)),
+    }
+    regressions = False
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        report["comparison"] = compare_results(report["results"], baseline.get("results", []), threshold=args.threshold)
+        report["baseline"] = baseline.get("meta", {}).get("commit")
+        regressions = any(entry["regression"] for entry in report["comparison"])
+
+    payload = json.dumps(report, indent=2, default=str)
+    if args.output is not None:
+        args.output.write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,199 @@
 from __future__ import annotations
 
 import sys
+from collections import deque, namedtuple
 from pathlib import Path
+from typing import Any, Callable
+
+import pytest
 
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+_NO_SCALAR = object()
+
+# Description de colonne DB-API (psycopg2 expose les deux accès : index et attribut).
+_Column = namedtuple("Column", "name type_code")
+
+
+class FakeResult:
+    """Résultat SQLAlchemy minimal : lignes, scalaire, rowcount et colonnes."""
+
+    def __init__(self, rows=(), *, scalar=_NO_SCALAR, rowcount=None, columns=None):
+        self.rows = list(rows)
+        self._scalar = scalar
+        self.rowcount = len(self.rows) if rowcount is None else rowcount
+        self.columns = [_Column(*column) for column in columns or []]
+        self.cursor = type("Cursor", (), {"description": self.columns})()
+        self.closed = False
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+    def fetchall(self):
+        return self.rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    fetchone = first
+
+    def one(self):
+        if len(self.rows) != 1:
+            raise AssertionError(f"une ligne attendue, {len(self.rows)} reçue(s)")
+        return self.rows[0]
+
+    def scalar(self):
+        if self._scalar is not _NO_SCALAR:
+            return self._scalar
+        row = self.first()
+        if row is None:
+            return None
+        if isinstance(row, dict):
+            return next(iter(row.values()))
+        return row[0]
+
+    scalar_one = scalar
+
+    def keys(self):
+        return [column[0] for column in self.columns]
+
+    def partitions(self, size):
+        for start in range(0, len(self.rows), size):
+            yield self.rows[start : start + size]
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeCursor:
+    def __init__(self, engine):
+        self._engine = engine
+
+    def copy_expert(self, sql, stream):
+        self._engine.copied.append(stream.read())
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, engine):
+        self._engine = engine
+        self.connection = type("DBAPIConnection", (), {"cursor": lambda _self: _FakeCursor(engine)})()
+
+    def execution_options(self, **options):
+        self._engine.options.update(options)
+        return self
+
+    def execute(self, statement, params=None):
+        return self._engine.execute(statement, params)
+
+    def begin(self):
+        return _FakeTransaction(self._engine, self)
+
+    begin_nested = begin
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _FakeTransaction:
+    def __init__(self, engine, conn=None):
+        self._engine = engine
+        self._conn = conn
+
+    def __enter__(self):
+        self._engine.open_transactions += 1
+        return self._conn or _FakeConnection(self._engine)
+
+    def __exit__(self, *exc):
+        self._engine.open_transactions -= 1
+        return False
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakeEngine:
+    """Moteur factice : enregistre les appels et renvoie les résultats programmés.
+
+    ``returns`` empile des résultats consommés dans l'ordre des ``execute`` (une liste
+    devient des lignes, toute autre valeur un scalaire) ; ``respond`` installe une
+    fonction ``(sql, params) -> valeur`` utilisée une fois la file vide.
+    """
+
+    Result = FakeResult
+
+    def __init__(self):
+        self.calls: list[tuple[str, Any]] = []
+        self.copied: list[str] = []
+        self.options: dict[str, Any] = {}
+        self.open_transactions = 0
+        self.results: list[FakeResult] = []
+        self._queue: deque[FakeResult] = deque()
+        self._responder: Callable[[str, Any], Any] | None = None
+
+    def returns(self, *values) -> "FakeEngine":
+        self._queue.extend(_as_result(value) for value in values)
+        return self
+
+    def respond(self, responder: Callable[[str, Any], Any]) -> "FakeEngine":
+        self._responder = responder
+        return self
+
+    @property
+    def params(self) -> list[Any]:
+        return [params for _, params in self.calls]
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.calls.append((sql, params))
+        if self._queue:
+            result = self._queue.popleft()
+        elif self._responder is not None:
+            result = _as_result(self._responder(sql, params))
+        else:
+            result = FakeResult()
+        self.results.append(result)
+        return result
+
+    def connect(self):
+        return _FakeTransaction(self)
+
+    begin = connect
+
+
+def _as_result(value) -> FakeResult:
+    if isinstance(value, FakeResult):
+        return value
+    if isinstance(value, list):
+        return FakeResult(value)
+    if value is None:
+        return FakeResult()
+    return FakeResult(scalar=value)
+
+
+@pytest.fixture
+def make_fake_engine() -> Callable[[], FakeEngine]:
+    """Fabrique de moteurs factices, pour les tests qui en comparent plusieurs."""
+
+    return FakeEngine
+
+
+@pytest.fixture
+def fake_engine(make_fake_engine) -> FakeEngine:
+    """Moteur SQL factice partagé par les tests de services."""
+
+    return make_fake_engine()
@@ -51,3 +51,47 @@ def test_list_diagnostics_handles_empty(monkeypatch):
 
     assert result["summary"]["anomalies"] == 0
     assert result["items"] == []
+
+
+class _PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+def _programming_error(pgcode):
+    from sqlalchemy.exc import ProgrammingError
+
+    return ProgrammingError("SELECT ...", {}, _PgError(pgcode))
+
+
+def test_stock_diagnostics_read_ledger_checkpoint_with_full_scan_fallback(monkeypatch):
+    calls = []
+
+    def fake_query_df(sql, params=None):
+        calls.append(str(sql))
+        if len(calls) == 1:
+            raise _programming_error("42P01")  # relation "stock_ledger_checkpoint" does not exist
+        return sample_data.make_audit_diag_df()
+
+    monkeypatch.setattr(audit_service, "query_df", fake_query_df)
+
+    df = audit_service._fetch_stock_diagnostics_df(1)
+
+    assert not df.empty
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("error", [_programming_error("42703"), RuntimeError("connexion perdue")])
+def test_stock_diagnostics_do_not_hide_other_errors(monkeypatch, error):
+    calls = []
+
+    def fake_query_df(sql, params=None):
+        calls.append(sql)
+        raise error
+
+    monkeypatch.setattr(audit_service, "query_df", fake_query_df)
+
+    with pytest.raises(type(error)):
+        audit_service._fetch_stock_diagnostics_df(1)
+    assert len(calls) == 1
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.dependencies import security, tenant as tenant_dep
+from backend.dependencies.revocation import RevocationList
+
+
+def _token(**claims):
+    base = {"sub": "1", "username": "u", "role": "admin", "tenant_id": 1}
+    base.update(claims)
+    return security.create_access_token(base)
+
+
+def test_decode_token_verifies_once_then_hits_cache(monkeypatch):
+    token = _token()
+    calls = []
+    real_decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(kwargs.get("options"))
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+
+    first = security._decode_token(token)
+    second = security._decode_token(token)
+
+    assert first is second and len(calls) == 1
+    assert security.jwt.get_unverified_header(token)["kid"] in security._SECRETS_BY_KID
+
+
+def test_revoked_token_rejected_even_when_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(security, "_REVOCATIONS", RevocationList(tmp_path / "revoked.log"))
+    token = _token()
+    security._decode_token(token)
+
+    security.revoke_token(token)
+
+    with pytest.raises(HTTPException) as exc:
+        security._decode_token(token)
+    assert exc.value.detail == "Token révoqué"
+
+
+def test_revocation_list_shared_and_expired_by_heap(tmp_path):
+    journal = tmp_path / "revoked.log"
+    worker_a, worker_b = RevocationList(journal), RevocationList(journal)
+
+    worker_a.revoke("j1", 110.0, now=100.0)
+    worker_a.revoke("j2", 200.0, now=100.0)
+
+    assert worker_b.is_revoked("j1", now=105.0)
+    assert worker_b.is_revoked("j2", now=150.0)
+    assert not worker_b.is_revoked("j1", now=150.0)
+    assert len(worker_b) == 1
+
+
+def test_revocation_journal_is_private_and_per_deployment(tmp_path, monkeypatch):
+    from backend.dependencies import revocation
+
+    monkeypatch.delenv("JWT_REVOCATION_FILE", raising=False)
+    monkeypatch.setattr(revocation, "_SHM_DIR", tmp_path)
+    monkeypatch.setenv("DATABASE_URL", "postgresql://a/db1")
+    first = revocation.default_journal_path()
+    monkeypatch.setenv("DATABASE_URL", "postgresql://a/db2")
+    second = revocation.default_journal_path()
+
+    assert first.parent == second.parent and first != second
+    assert first.parent.stat().st_mode & 0o777 == 0o700
+
+    RevocationList(first).revoke("j1", 110.0, now=100.0)
+    assert first.stat().st_mode & 0o777 == 0o600
+
+
+def test_revocation_journal_ignores_a_file_readable_by_others(tmp_path):
+    journal = tmp_path / "revoked.log"
+    journal.write_text("200.000 injecte\n")
+    journal.chmod(0o644)
+    worker = RevocationList(journal)
+
+    worker.revoke("j1", 110.0, now=100.0)
+
+    assert worker.is_revoked("j1", now=105.0)  # révocation locale conservée
+    assert not worker.is_revoked("injecte", now=105.0)
+
+
+def test_current_tenant_cache_avoids_io(monkeypatch):
+    queries = []
+
+    def fake_query(identifier):
+        queries.append(identifier)
+        return tenant_dep.Tenant(id=7, code="t7", name="T7")
+
+    monkeypatch.setattr(tenant_dep, "_query_tenant", fake_query)
+    monkeypatch.setattr(tenant_dep, "_TENANT_CACHE", {})
+    user = security.AuthenticatedUser(id=1, username="u", role="admin", tenant_id=7)
+
+    first = asyncio.run(tenant_dep.get_current_tenant(user))
+    second = asyncio.run(tenant_dep.get_current_tenant(user))
+
+    assert first == second == tenant_dep.Tenant(id=7, code="t7", name="T7")
+    assert queries == ["7"]
@@ -80,17 +80,22 @@ def test_products_listing(api_client, monkeypatch):
 def test_checkout_success(api_client, monkeypatch):
     client = api_client
 
-    def fake_checkout(cart, username, tenant_id):
+    def fake_checkout(cart, username, tenant_id, **kwargs):
         assert cart == [{'id': 1, 'nom': 'Test', 'prix_vente': 2.5, 'tva': 5.5, 'qty': 1}]
         assert username == 'api_user'
         assert tenant_id == 1
+        assert kwargs['defer_receipt'] is False
         return True, None, {'filename': 'ticket.pdf', 'content': b'binary'}
 
     monkeypatch.setattr('backend.main.process_sale_transaction', fake_checkout)
 
     response = client.post(
         '/pos/checkout',
-        json={'cart': [{'id': 1, 'nom': 'Test', 'prix_vente': 2.5, 'tva': 5.5, 'qty': 1}], 'username': None},
+        json={
+            'cart': [{'id': 1, 'nom': 'Test', 'prix_vente': 2.5, 'tva': 5.5, 'qty': 1}],
+            'username': None,
+            'inline_receipt': True,
+        },
     )
     assert response.status_code == 200
     body = response.json()
@@ -99,6 +104,40 @@ def test_checkout_success(api_client, monkeypatch):
     assert body['receipt_base64'] is not None
 
 
+def test_checkout_defers_receipt_rendering(api_client, monkeypatch):
+    client = api_client
+
+    def fake_checkout(cart, username, tenant_id, **kwargs):
+        assert kwargs['defer_receipt'] is True
+        return True, None, {
+            'filename': 'ticket.pdf',
+            'render': lambda: {'filename': 'ticket.pdf', 'content': b'%PDF-binary'},
+        }
+
+    monkeypatch.setattr('backend.main.process_sale_transaction', fake_checkout)
+
+    response = client.post(
+        '/pos/checkout',
+        json={'cart': [{'id': 1, 'nom': 'Test', 'prix_vente': 2.5, 'tva': 5.5, 'qty': 1}]},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body['receipt_base64'] is None
+    assert body['receipt_id']
+
+    receipt = client.get(f"/pos/receipts/{body['receipt_id']}")
+    assert receipt.status_code == 200
+    assert receipt.headers['content-type'] == 'application/pdf'
+    assert receipt.content == b'%PDF-binary'
+
+    cached = client.get(
+        f"/pos/receipts/{body['receipt_id']}",
+        headers={'If-None-Match': receipt.headers['etag']},
+    )
+    assert cached.status_code == 304
+    assert client.get('/pos/receipts/unknown').status_code == 404
+
+
 def test_product_update(api_client, monkeypatch):
     client = api_client
     called = {}
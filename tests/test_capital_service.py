@@ -17,15 +17,13 @@ def patch_db(monkeypatch):
     def fake_fetch_tenants():
         return pd.DataFrame([{"id": 1, "code": "epicerie", "name": "Épicerie HQ"}])
 
-    def fake_price_history(*, tenant_id):
-        return Decimal("10.5")
-
-    def fake_bank_balance(*, tenant_id):
-        return Decimal("5")
+    def fake_tenant_balances():
+        return pd.DataFrame(
+            [{"id": 1, "code": "epicerie", "name": "Épicerie HQ", "stock_value": 10.5, "bank_balance": 5}]
+        )
 
     monkeypatch.setattr(capital_service, "_fetch_tenants", fake_fetch_tenants)
-    monkeypatch.setattr(capital_service, "_latest_price_total", fake_price_history)
-    monkeypatch.setattr(capital_service, "_bank_balance", fake_bank_balance)
+    monkeypatch.setattr(capital_service, "_fetch_tenant_balances", fake_tenant_balances)
     monkeypatch.setattr(capital_service, "_cash_balance", lambda *args, **kwargs: Decimal("2"))
     yield
 
@@ -53,3 +51,41 @@ def test_build_capital_overview(monkeypatch):
     overview = capital_service.build_capital_overview(limit_latest_prices=5)
     assert overview["global"]["stock_value"] >= 0
     assert overview["entities"][0]["code"] == "epicerie"
+    assert overview["global"]["total_assets"] == pytest.approx(17.5)
+
+
+def test_persist_daily_snapshot_writes_all_tenants_in_one_batch(monkeypatch):
+    executed = []
+
+    class _Conn:
+        def execute(self, statement, params):
+            executed.append(params)
+
+    class _Begin:
+        def __enter__(self):
+            return _Conn()
+
+        def __exit__(self, *exc):
+            return False
+
+    class _Engine:
+        def begin(self):
+            return _Begin()
+
+    monkeypatch.setattr(capital_service, "get_engine", lambda: _Engine())
+    when = datetime(2024, 12, 1)
+
+    capital_service.persist_daily_snapshot(when)
+
+    assert executed == [
+        [
+            {
+                "tenant_id": 1,
+                "snapshot_date": when,
+                "stock_value": 10.5,
+                "bank_balance": 5.0,
+                "cash_balance": 2.0,
+                "total_assets": 17.5,
+            }
+        ]
+    ]
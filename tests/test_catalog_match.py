@@ -0,0 +1,99 @@
+import pandas as pd
+
+from backend.services import catalog_match
+from backend.services import invoices as invoices_service
+
+
+def _catalog_frame():
+    return pd.DataFrame(
+        [
+            {"produit_id": 1, "produit_nom": "Coca-Cola 33cl", "categorie": "Boissons",
+             "prix_achat_catalogue": 0.4, "prix_vente_catalogue": 1.0, "tva_catalogue": 5.5, "code": "5449000000996"},
+            {"produit_id": 1, "produit_nom": "Coca-Cola 33cl", "categorie": "Boissons",
+             "prix_achat_catalogue": 0.4, "prix_vente_catalogue": 1.0, "tva_catalogue": 5.5, "code": "5449000131805"},
+            {"produit_id": 2, "produit_nom": "Riz basmati 1kg", "categorie": "Epicerie",
+             "prix_achat_catalogue": 1.5, "prix_vente_catalogue": 2.9, "tva_catalogue": 5.5, "code": None},
+            {"produit_id": 3, "produit_nom": "Pâtes complètes 500g", "categorie": "Epicerie",
+             "prix_achat_catalogue": 0.9, "prix_vente_catalogue": 1.8, "tva_catalogue": 5.5, "code": "3000000000017"},
+        ]
+    )
+
+
+def test_index_matches_codes_names_and_label_variants():
+    index = catalog_match.CatalogMatchIndex.from_frame(_catalog_frame(), version=1)
+
+    assert index.match_code(" 5449000131805 ").produit_id == 1
+    assert index.match_code("5449000000996").barcode == "5449000000996"
+    assert index.match_name("riz basmati 1KG ").produit_id == 2
+    assert index.match_fuzzy("COCA COLA 33 CL").produit_id == 1
+    assert index.match_fuzzy("PATES COMPLETES 500G X12").produit_id == 3
+    assert index.match_fuzzy("Lessive liquide") is None
+
+
+def test_fuzzy_match_requires_the_same_size():
+    frame = pd.concat(
+        [
+            _catalog_frame(),
+            pd.DataFrame(
+                [{"produit_id": 4, "produit_nom": "Riz basmati 5kg", "categorie": "Epicerie",
+                  "prix_achat_catalogue": 6.0, "prix_vente_catalogue": 11.0, "tva_catalogue": 5.5, "code": None}]
+            ),
+        ]
+    )
+    index = catalog_match.CatalogMatchIndex.from_frame(frame, version=1)
+
+    assert index.match_fuzzy("COCA COLA 50CL") is None
+    assert index.match_fuzzy("RIZ BASMATI 1 KG").produit_id == 2
+    assert index.match_fuzzy("RIZ BASMATI 5000G").produit_id == 4
+    assert index.match_fuzzy("RIZ BASMATI") is None
+    assert catalog_match.size_tokens("Eau 1,5L x6") == {"1500ml"}
+
+
+def test_index_reloaded_only_when_catalog_version_changes(monkeypatch):
+    loads = []
+    version = {"value": 4}
+
+    def fake_load(tenant_id, current):
+        loads.append(current)
+        return catalog_match.CatalogMatchIndex.from_frame(_catalog_frame(), version=current)
+
+    monkeypatch.setattr(catalog_match, "_catalog_version", lambda tenant_id: version["value"])
+    monkeypatch.setattr(catalog_match, "_load_index", fake_load)
+    catalog_match.invalidate_catalog_match_index()
+
+    first = catalog_match.get_catalog_match_index(9)
+    assert catalog_match.get_catalog_match_index(9) is first
+    version["value"] = 5
+    assert catalog_match.get_catalog_match_index(9) is not first
+    assert loads == [4, 5]
+    catalog_match.invalidate_catalog_match_index()
+
+
+def test_enrich_lines_only_suggests_fuzzy_matches(monkeypatch):
+    index = catalog_match.CatalogMatchIndex.from_frame(_catalog_frame(), version=1)
+    monkeypatch.setattr(catalog_match, "get_catalog_match_index", lambda tenant_id: index)
+    monkeypatch.setattr(invoices_service, "get_catalog_match_index", lambda tenant_id: index)
+
+    lines = pd.DataFrame(
+        [
+            {"nom": "Coca", "codes": "5449000131805", "prix_achat": 0.45, "qte_init": 24},
+            {"nom": "Riz basmati 1kg", "codes": "", "prix_achat": 1.4, "qte_init": 10},
+            {"nom": "PATES COMPLETES 500G", "codes": "", "prix_achat": 0.8, "qte_init": 12},
+            {"nom": "COCA COLA ZERO 33CL", "codes": "", "prix_achat": 0.5, "qte_init": 24},
+            {"nom": "Produit inconnu", "codes": "", "prix_achat": 2.0, "qte_init": 1},
+        ]
+    )
+
+    enriched = invoices_service.enrich_lines_with_catalog(lines, tenant_id=3)
+
+    # Code-barres et nom exact : correspondances appliquées.
+    assert enriched["produit_id"].tolist()[:2] == [1, 2]
+    assert enriched["catalogue_nom"].iloc[0] == "Coca-Cola 33cl"
+    assert enriched["prix_vente_catalogue"].iloc[0] == 1.0
+    # Libellés approchants : suggestion seulement, ni produit_id ni code.
+    assert enriched["produit_id"].iloc[2:].isna().all()
+    assert enriched["codes"].iloc[2:].isna().all()
+    assert enriched["suggestion_id"].tolist()[2:4] == [3, 1]
+    assert enriched["suggestion_nom"].iloc[3] == "Coca-Cola 33cl"
+    assert pd.isna(enriched["suggestion_id"].iloc[4])
+    assert enriched["suggestion_id"].iloc[:2].isna().all()
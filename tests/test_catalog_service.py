@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from collections import deque
 from dataclasses import dataclass
+from types import SimpleNamespace
 from typing import Any
 
 import pytest
@@ -123,3 +124,96 @@ def test_list_products_page_status_default(monkeypatch):
 
     assert total == 1
     assert items[0]['status'] == 'ok'
+
+
+class RecordingConnection(DummyConnection):
+    def __init__(self, responses):
+        super().__init__(responses)
+        self.calls = []
+
+    def execute(self, statement, params=None):
+        self.calls.append((str(statement), params or {}))
+        return super().execute(statement, params)
+
+
+@pytest.fixture
+def clear_count_cache():
+    catalog_service.invalidate_catalog_count_cache()
+    yield
+    catalog_service.invalidate_catalog_count_cache()
+
+
+def _product_row(product_id, nom, codes):
+    return DummyRow(
+        _mapping={
+            'id': product_id,
+            'nom': nom,
+            'tenant_id': 1,
+            'prix_achat': 1,
+            'prix_vente': 2,
+            'tva': 5.5,
+            'categorie': None,
+            'seuil_alerte': 0,
+            'stock_actuel': 3,
+            'actif': True,
+            'codes': codes,
+        }
+    )
+
+
+def test_list_products_page_aggregates_barcodes_and_caches_total(monkeypatch, clear_count_cache):
+    rows = [_product_row(1, 'Abricot', ['111', '222']), _product_row(2, 'Banane', [])]
+    conn = RecordingConnection(
+        [DummyCursor(fetchone=(2,)), DummyCursor(fetchall=rows), DummyCursor(fetchall=rows)]
+    )
+    monkeypatch.setattr(
+        catalog_service, '_fetch_barcodes', lambda *_a, **_k: pytest.fail('barcodes fetched per row')
+    )
+    _patch_engine(monkeypatch, conn)
+
+    items, total = catalog_service.list_products_page(tenant_id=1, search='50%', per_page=2)
+    again, cached_total = catalog_service.list_products_page(tenant_id=1, search='50%', per_page=2)
+
+    assert total == cached_total == 2
+    assert [item['codes'] for item in items] == [['111', '222'], []]
+    assert len(conn.calls) == 3  # COUNT, page, page (total servi par le cache)
+    assert 'array_agg' in conn.calls[1][0]
+    assert conn.calls[0][1]['search'] == '%50\\%%'
+    assert catalog_service.next_cursor(items, 2) == catalog_service.encode_cursor(items[-1])
+    assert catalog_service.next_cursor(items, 3) is None
+
+
+def test_list_products_page_keyset_cursor(monkeypatch, clear_count_cache):
+    conn = RecordingConnection([DummyCursor(fetchone=(5,)), DummyCursor(fetchall=[_product_row(9, 'Cerise', ['9'])])])
+    _patch_engine(monkeypatch, conn)
+    cursor = catalog_service.encode_cursor({'nom': 'Banane', 'id': 2})
+
+    items, _total = catalog_service.list_products_page(tenant_id=1, cursor=cursor, page=40, per_page=2)
+
+    sql, params = conn.calls[1]
+    assert '(p.nom, p.id) > (:after_nom, :after_id)' in sql
+    assert 'OFFSET' not in sql
+    assert (params['after_nom'], params['after_id']) == ('Banane', 2)
+    assert items[0]['nom'] == 'Cerise'
+
+
+def test_catalog_write_invalidates_cached_total(monkeypatch, clear_count_cache):
+    conn = RecordingConnection(
+        [
+            DummyCursor(fetchone=(1,)),
+            DummyCursor(fetchall=[]),
+            SimpleNamespace(rowcount=1),
+            DummyCursor(fetchone=(0,)),
+            DummyCursor(fetchall=[]),
+        ]
+    )
+    _patch_engine(monkeypatch, conn)
+
+    assert catalog_service.list_products_page(tenant_id=1)[1] == 1
+    catalog_service.delete_product(1, tenant_id=1)
+    assert catalog_service.list_products_page(tenant_id=1)[1] == 0
+
+
+def test_list_products_page_rejects_invalid_cursor(monkeypatch, clear_count_cache):
+    with pytest.raises(ValueError):
+        catalog_service.list_products_page(tenant_id=1, cursor='pas-un-curseur')
@@ -57,16 +57,51 @@ def test_fetch_top_stock_and_sales(monkeypatch):
     assert status[0]['statut_stock'] == 'Épuisé'
 
 
-def test_fetch_dashboard_metrics_combines_sections(monkeypatch):
-    monkeypatch.setattr(dashboard, 'fetch_kpis', lambda tenant_id: {'total_produits': 1})
-    monkeypatch.setattr(dashboard, 'fetch_top_stock_value', lambda tenant_id: [{'nom': 'X', 'valeur_stock': 10}])
-    monkeypatch.setattr(dashboard, 'fetch_top_sales', lambda tenant_id: [{'nom': 'X', 'quantite_vendue': 2}])
-    monkeypatch.setattr(dashboard, 'fetch_status_distribution', lambda tenant_id: [{'statut_stock': 'OK', 'nombre': 1}])
-    monkeypatch.setattr(dashboard, 'fetch_supplier_breakdown', lambda tenant_id: [])
-    monkeypatch.setattr(dashboard, 'fetch_weekly_variation', lambda tenant_id: [])
-    monkeypatch.setattr(dashboard, 'fetch_margin_alerts', lambda tenant_id: [])
-
-    result = dashboard.fetch_dashboard_metrics(tenant_id=1)
-
-    assert result['kpis']['total_produits'] == 1
+def test_fetch_dashboard_bundle_single_round_trip(monkeypatch, fake_engine):
+    fake_engine.returns(
+        {
+            'kpis': {'total_produits': 3, 'valeur_stock_ht': '12.5', 'quantite_stock_total': None},
+            'top_stock_value': [{'nom': 'X', 'valeur_stock': 10}],
+            'top_sales': None,
+        }
+    )
+    monkeypatch.setattr(dashboard, 'get_engine', lambda: fake_engine)
+
+    result = dashboard.fetch_dashboard_bundle(tenant_id=4)
+
+    assert len(fake_engine.calls) == 1
+    assert fake_engine.params[0]['tenant_id'] == 4
+    assert result['kpis'] == {
+        'total_produits': 3,
+        'valeur_stock_ht': 12.5,
+        'quantite_stock_total': 0.0,
+        'alerte_stock_bas': 0,
+        'stock_epuise': 0,
+    }
     assert result['top_stock_value'][0]['nom'] == 'X'
+    assert result['top_sales'] == [] and result['margin_alerts'] == []
+
+
+def test_fetch_dashboard_metrics_caches_per_tenant(monkeypatch):
+    calls = []
+
+    def fake_bundle(*, tenant_id):
+        calls.append(tenant_id)
+        return {'kpis': {'total_produits': len(calls)}}
+
+    monkeypatch.setattr(dashboard, 'fetch_dashboard_bundle', fake_bundle)
+    monkeypatch.setattr(dashboard, '_CACHE', dashboard._TenantCache())
+
+    assert dashboard.fetch_dashboard_metrics(tenant_id=1)['kpis']['total_produits'] == 1
+    assert dashboard.fetch_dashboard_metrics(tenant_id=1)['kpis']['total_produits'] == 1
+    dashboard.fetch_dashboard_metrics(tenant_id=2)
+    assert calls == [1, 2]
+
+    dashboard.invalidate_dashboard_cache(1)
+    assert dashboard.fetch_dashboard_metrics(tenant_id=1)['kpis']['total_produits'] == 3
+    dashboard.fetch_dashboard_metrics(tenant_id=2)
+    assert calls == [1, 2, 1]
+
+    monkeypatch.setenv('DASHBOARD_CACHE_TTL_SECONDS', '0')
+    dashboard.fetch_dashboard_metrics(tenant_id=2)
+    assert calls == [1, 2, 1, 2]
@@ -0,0 +1,148 @@
+from backend.services.mappers import restaurant_to_finance as backfill
+
+
+def test_map_params_keep_only_the_tenant_mappings():
+    params = backfill._map_params(
+        2,
+        {(2, 10): 100, (3, 10): 300},
+        {(2, 5): 50},
+        {(2, "LCL - NOUTAM"): 7, (3, "SUMUP"): 9},
+    )
+
+    assert params == {
+        "cat_src": [10],
+        "cat_dst": [100],
+        "cc_src": [5],
+        "cc_dst": [50],
+        "acc_label": ["LCL - NOUTAM"],
+        "acc_dst": [7],
+    }
+
+
+def test_bulk_backfill_runs_tenants_in_parallel_and_isolates_failures(monkeypatch):
+    calls = []
+
+    def fake_tenant(engine, tenant_id, entity_id, map_params, *, chunk_size, dry_run, reset):
+        calls.append((tenant_id, entity_id, chunk_size, dry_run))
+        if tenant_id == 3:
+            raise RuntimeError("connexion perdue")
+        return {"entity_id": entity_id, "inserted": 4}
+
+    monkeypatch.setattr(backfill, "_backfill_tenant_bulk", fake_tenant)
+
+    report = backfill.backfill_transactions_bulk(
+        object(),
+        {1: 11, 2: 12, 3: 13},
+        {},
+        {},
+        {},
+        tenants=[2, 3],
+        chunk_size=500,
+        dry_run=True,
+    )
+
+    assert sorted(calls) == [(2, 12, 500, True), (3, 13, 500, True)]
+    assert report[2] == {"entity_id": 12, "inserted": 4}
+    assert report[3] == {"entity_id": 13, "error": "connexion perdue"}
+
+
+def test_unmapped_expenses_are_categorised_from_their_label(monkeypatch, fake_engine):
+    from types import SimpleNamespace
+
+    from backend.services import finance_categorization as fc
+
+    monkeypatch.setattr(backfill, "rules_matcher", lambda entity_id: fc.base_category_matcher())
+    fake_engine.returns(
+        [
+            SimpleNamespace(id=21, code="charges_sociales", name="Charges sociales"),
+            SimpleNamespace(id=22, code="frais_generaux", name="Frais generaux"),
+        ]
+    )
+    expenses = [
+        (1, 2, 10, "PRLV URSSAF IDF"),  # catégorie restaurant déjà mappée
+        (2, 2, None, "PRLV URSSAF IDF"),
+        (3, 2, 99, "LIBELLE SANS REGLE"),
+        (4, 5, None, "PRLV URSSAF IDF"),  # tenant sans entité finance
+    ]
+
+    with fake_engine.begin() as conn:
+        resolved = backfill._auto_categories(conn, expenses, {2: 12}, {(2, 10): 100})
+
+    assert resolved == {2: 21, 3: 22}
+    assert fake_engine.params == [{"entity_id": 12}]
+
+
+def test_bulk_chunk_links_statement_lines_before_its_checkpoint(fake_engine):
+    from types import SimpleNamespace
+
+    events = []
+
+    def respond(sql, params):
+        if params and "transaction_ids" in params:
+            events.append(("link", params["transaction_ids"], fake_engine.open_transactions))
+        elif params and "inserted" in params:
+            events.append(("checkpoint", params["last_id"], fake_engine.open_transactions))
+        return None
+
+    chunk = SimpleNamespace(
+        scanned=2, last_id=8, missing_category=0, waiting_ids=None, eligible=2, inserted=2, transaction_ids=[70, 71]
+    )
+    fake_engine.returns(None, [SimpleNamespace(id=3)], [], [chunk]).respond(respond)
+
+    stats = backfill._backfill_tenant_bulk(
+        fake_engine, 2, 12, backfill._map_params(2, {}, {}, {}), chunk_size=5, dry_run=False, reset=False
+    )
+
+    assert stats["inserted"] == 2 and stats["last_id"] == 8
+    assert events == [("link", [70, 71], 2), ("checkpoint", 8, 2)]
+
+
+def _expenses_table(progress, mapped):
+    """Simule un lot ensembliste sur les dépenses 1..6 : seules celles de ``mapped`` sont éligibles."""
+    from types import SimpleNamespace
+
+    def respond(sql, params):
+        if "FROM finance_backfill_progress" in sql:
+            return [SimpleNamespace(**progress)] if progress else []
+        if "INSERT INTO finance_backfill_progress" in sql:
+            progress.update(last_id=params["last_id"], pending_ids=params["pending_ids"])
+            return None
+        if "finance_accounts" in sql or "transaction_ids" in params:
+            return None
+        if "AS scanned" not in sql:
+            return []
+        ids = [i for i in range(1, 7) if i > params["after_id"] or i in params["retry_ids"]]
+        ids = ids[: params["chunk_size"]]
+        ready = [i for i in ids if i in mapped]
+        return [
+            SimpleNamespace(
+                scanned=len(ids),
+                last_id=max(ids, default=None),
+                missing_category=len(ids) - len(ready),
+                waiting_ids=[i for i in ids if i not in mapped] or None,
+                eligible=len(ready),
+                inserted=len(ready),
+                transaction_ids=ready,
+            )
+        ]
+
+    return respond
+
+
+def test_bulk_rerun_retries_expenses_skipped_for_a_missing_mapping(fake_engine):
+    progress = {}
+    mapped = {1, 2, 4, 6}
+    fake_engine.respond(_expenses_table(progress, mapped))
+
+    first = backfill._backfill_tenant_bulk(fake_engine, 2, 12, {}, chunk_size=4, dry_run=False, reset=False)
+
+    assert first["inserted"] == 4 and first["last_id"] == 6
+    assert first["waiting"] == 2
+    assert progress == {"last_id": 6, "pending_ids": [3, 5]}
+
+    mapped.update({3, 5})
+    again = backfill._backfill_tenant_bulk(fake_engine, 2, 12, {}, chunk_size=4, dry_run=False, reset=False)
+
+    assert again["retried"] == 2 and again["inserted"] == 2
+    assert again["waiting"] == 0
+    assert progress == {"last_id": 6, "pending_ids": []}
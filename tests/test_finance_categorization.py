@@ -0,0 +1,127 @@
+import pytest
+
+from backend.services import finance_categorization as fc
+
+
+def _reference_match(direction, label, rules=fc.BASE_CATEGORY_RULES):
+    upper = label.upper()
+    normalized = fc._normalize_for_matching(label)
+    entry_type = "Entree" if direction == "IN" else "Sortie"
+    for keywords, category_name, allowed_types in rules:
+        if allowed_types and entry_type not in allowed_types:
+            continue
+        if any(k.upper() in upper or fc._normalize_for_matching(k) in normalized for k in keywords):
+            return category_name
+    return None
+
+
+@pytest.mark.parametrize(
+    "direction,label",
+    [
+        ("IN", "REMISE CB NO 123 12/03"),
+        ("OUT", "REMISE CB NO 123 12/03"),
+        ("OUT", "PRLV SEPA URSSAF IDF"),
+        ("OUT", "CB TOTAL-ENERGIES 75018"),
+        ("OUT", "CB UBER EATS PARIS"),
+        ("IN", "VIR INST. M. DUPONT"),
+        ("OUT", "E.D.F. PRLV"),
+        ("OUT", "LIBELLE SANS REGLE"),
+        ("IN", ""),
+    ],
+)
+def test_compiled_matcher_keeps_first_rule_wins(direction, label):
+    assert fc.match_category_rules(direction, label) == _reference_match(direction, label)
+
+
+def test_compiled_matcher_filters_by_direction():
+    rules = (
+        (("ACME",), "Sortie seulement", ("Sortie",)),
+        (("ACME",), "Deux sens", None),
+    )
+
+    assert fc.match_category_rules("OUT", "cb acme", rules) == "Sortie seulement"
+    assert fc.match_category_rules("IN", "cb acme", rules) == "Deux sens"
+
+
+def test_compiled_matcher_matches_normalized_keywords():
+    rules = ((("E.D.F.",), "Energie", None),)
+
+    assert fc.match_category_rules("OUT", "PRLV EDF CLIENT", rules) == "Energie"
+
+
+def test_base_rules_compile_once_and_custom_rules_are_not_cached():
+    custom = ((("ACME",), "Fournisseur", None),)
+
+    assert fc.compile_category_rules(fc.BASE_CATEGORY_RULES) is fc.base_category_matcher()
+    assert fc.compile_category_rules(custom) is not fc.compile_category_rules(custom)
+
+
+def test_rules_matcher_recompiles_only_when_rules_version_changes(monkeypatch):
+    from backend.services.finance import rules
+
+    version = [(1, 10, "2024-12-01")]
+    loaded = []
+    monkeypatch.setattr(rules, "_MATCHERS", {})
+    monkeypatch.setattr(rules, "_rules_version", lambda entity_id: version[0])
+    monkeypatch.setattr(
+        rules,
+        "matching_rules",
+        lambda entity_id: loaded.append(entity_id) or (((f"ACME{len(loaded)}",), "Fournisseur", None),),
+    )
+
+    first = rules.rules_matcher(4)
+    assert rules.rules_matcher(4) is first
+    assert loaded == [4]
+
+    version[0] = (2, 11, "2024-12-02")
+    second = rules.rules_matcher(4)
+    assert second is not first
+    assert second.match("Sortie", "CB ACME2") == "Fournisseur"
+    assert loaded == [4, 4]
+
+
+def test_auto_categorize_many_accepts_compiled_matcher():
+    matcher = fc.compile_category_rules(((("ACME",), "Fournisseur", ("Sortie",)),))
+
+    assert fc.auto_categorize_many(["OUT", "IN"], ["cb acme", "cb acme"], matcher) == [
+        ("Fournisseur", "achats_fournisseurs"),
+        (None, "encaissements"),
+    ]
+
+
+def test_batch_categorize_rule_updates_in_one_statement(monkeypatch, fake_engine):
+    from backend.schemas.finance import FinanceBatchCategorizeRequest
+    from backend.services.finance import transactions
+
+    fake_engine.returns(fake_engine.Result(rowcount=3))
+    monkeypatch.setattr(transactions, "get_engine", lambda: fake_engine)
+    payload = FinanceBatchCategorizeRequest(
+        category_id=9, rule={"keywords": ["e.d.f", "100%_bio", "%"], "apply_to_autre_only": False}
+    )
+
+    assert transactions.batch_categorize(payload) == {"updated": 3, "category_id": 9}
+    assert len(fake_engine.calls) == 1
+    params = fake_engine.params[0]
+    assert params["raw_patterns"] == ["%E.D.F%", "%100\\_BIO%"]
+    assert params["normalized_patterns"] == ["%EDF%", "%100BIO%"]
+
+
+def test_auto_categorize_many_matches_scalar_api():
+    directions = ["OUT", "IN", "OUT", "IN"]
+    labels = ["PRLV URSSAF", "VIREMENT RECU", "INCONNU", "REMISE CB 123"]
+
+    results = fc.auto_categorize_many(directions, labels)
+
+    assert results == [fc.auto_categorize(d, label) for d, label in zip(directions, labels)]
+    assert results[2] == (None, "frais_generaux")
+
+
+def test_auto_categorize_many_accepts_list_rules():
+    rules = [[["ACME"], "Fournisseur", ["Sortie"]]]
+
+    assert fc.auto_categorize_many(["OUT"], ["cb acme"], rules) == [("Fournisseur", "achats_fournisseurs")]
+
+
+def test_auto_categorize_many_rejects_mismatched_lengths():
+    with pytest.raises(ValueError):
+        fc.auto_categorize_many(["OUT"], [])
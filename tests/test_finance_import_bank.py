@@ -1,3 +1,5 @@
+import csv
+import io
 from datetime import date
 
 from backend.services.importers import bank_statement_csv
@@ -16,3 +18,84 @@ def test_parse_csv_basic():
     assert rows[1]["date_operation"] == date(2024, 12, 1)
     assert abs(rows[1]["montant"] - 100.0) < 1e-6
     assert rows[1]["ref_banque"] == "DEF"
+
+
+def test_content_hash_uses_full_text_content():
+    first = "date,libelle,montant\n2024-12-01,A,1\n"
+    second = "date,libelle,montant\n2024-12-02,B,1\n"
+    assert len(first) == len(second)
+    assert bank_statement_csv._content_hash(first) != bank_statement_csv._content_hash(second)
+    assert bank_statement_csv._content_hash(first) == bank_statement_csv._content_hash(first.encode("utf-8"))
+
+
+def test_copy_chunks_serialise_rows_for_copy(monkeypatch):
+    monkeypatch.setattr(bank_statement_csv, "_COPY_CHUNK_SIZE", 2)
+    entries = bank_statement_csv.parse_csv(
+        "date,libelle,montant,ref\n"
+        "2024-12-01,\"Paiement, CB\",-12.34,ABC\n"
+        "2024-12-02,Virement,100,\n"
+        "2024-12-03,Prélèvement,-5,XYZ\n"
+    )
+
+    chunks = [chunk.getvalue() for chunk in bank_statement_csv._iter_copy_chunks(entries, 7)]
+
+    assert len(chunks) == 2
+    first_rows = chunks[0].splitlines()
+    assert first_rows[0].startswith('0,2024-12-01,"Paiement, CB",-12.34,ABC,')
+    assert first_rows[0].endswith(bank_statement_csv._checksum(7, entries[0]))
+    # ref_banque absente → champ vide non quoté, interprété comme NULL par COPY.
+    assert first_rows[1].split(",")[4] == ""
+    assert chunks[1].startswith("2,2024-12-03,Prélèvement,-5.0,XYZ,")
+
+
+
+_DUPLICATES_CSV = (
+    "date,libelle,montant,ref\n"
+    "2024-12-01,Paiement CB,-12.34,A1\n"
+    "2024-12-01,Paiement CB,-12.34,B2\n"  # même checksum que la 1re ligne
+    "2024-12-02,Virement,100,B2\n"  # ref B2 libre : la ligne précédente est écartée
+    "2024-12-03,Prélèvement,-5,A1\n"  # ref déjà prise par la 1re ligne
+    "2024-12-04,Frais,-1,\n"
+    "2024-12-04,Frais,-1,\n"
+)
+
+
+def _import_rowwise(engine, entries):
+    with engine.begin() as conn:
+        inserted = bank_statement_csv._insert_lines_rowwise(conn, entries, account_id=7, statement_id=1)
+    rows = [
+        (params["date_operation"], params["libelle_banque"], params["ref_banque"])
+        for params in engine.params
+        if params and "statement_id" in params
+    ]
+    return inserted, rows
+
+
+def _import_bulk(engine, entries):
+    # Compte vide : le serveur insère toutes les lignes transmises par COPY.
+    engine.respond(lambda sql, params: engine.Result(rowcount=sum(len(c.splitlines()) for c in engine.copied)))
+    with engine.begin() as conn:
+        inserted = bank_statement_csv._insert_lines_bulk(conn, entries, account_id=7, statement_id=1)
+    rows = [
+        (date.fromisoformat(fields[1]), fields[2], fields[4] or None)
+        for chunk in engine.copied
+        for fields in csv.reader(io.StringIO(chunk))
+    ]
+    return inserted, rows
+
+
+def test_bulk_and_rowwise_imports_keep_the_same_lines(make_fake_engine):
+    entries = bank_statement_csv.parse_csv(_DUPLICATES_CSV)
+
+    rowwise = _import_rowwise(make_fake_engine(), entries)
+    bulk = _import_bulk(make_fake_engine(), entries)
+
+    assert rowwise == bulk
+    assert rowwise == (
+        3,
+        [
+            (date(2024, 12, 1), "Paiement CB", "A1"),
+            (date(2024, 12, 2), "Virement", "B2"),
+            (date(2024, 12, 4), "Frais", None),
+        ],
+    )
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from backend.services.finance import stats
+
+
+def test_timeline_reads_rollup_table(monkeypatch):
+    seen = []
+
+    def fake_query_df(sql, params=None):
+        seen.append((str(sql), params))
+        return pd.DataFrame(
+            [
+                {"period": "2024-11", "inflow": 100.0, "outflow": 40.0, "tx_count": 3},
+                {"period": "2024-12", "inflow": 10.0, "outflow": 30.0, "tx_count": 2},
+            ]
+        )
+
+    monkeypatch.setattr(stats, "query_df", fake_query_df)
+
+    rows = stats.timeline_stats(entity_id=2, months=6)
+
+    assert len(seen) == 1
+    sql, params = seen[0]
+    assert "FROM finance_rollup_daily r" in sql and "finance_transaction_lines" not in sql
+    assert params == {"entity_id": 2, "months": 6}
+    assert [r["cumulative_balance"] for r in rows] == [60.0, 40.0]
+
+
+def test_category_breakdown_falls_back_to_lines(monkeypatch):
+    seen = []
+
+    def fake_query_df(sql, params=None):
+        sql = str(sql)
+        seen.append(sql)
+        if "finance_rollup_daily" in sql:
+            raise RuntimeError('relation "finance_rollup_daily" does not exist')
+        return pd.DataFrame(
+            [
+                {"category_id": 1, "category_name": "A", "category_code": "a", "amount": 75.0, "tx_count": 3},
+                {"category_id": 2, "category_name": "B", "category_code": "b", "amount": 25.0, "tx_count": 1},
+            ]
+        )
+
+    monkeypatch.setattr(stats, "query_df", fake_query_df)
+
+    rows = stats.category_breakdown(direction="out")
+
+    assert len(seen) == 2 and "finance_transaction_lines" in seen[1]
+    assert [r["percentage"] for r in rows] == [75.0, 25.0]
@@ -0,0 +1,110 @@
+from datetime import date
+
+import pytest
+
+from backend.schemas.finance import FinanceTransactionCreate
+from backend.services.finance import transactions as tx
+
+# (date_operation, transaction_id, line_id) : la transaction 7 a deux lignes, ce qui place
+# deux lignes d'une même transaction de part et d'autre d'une limite de page.
+_LINES = [
+    (date(2024, 12, 10), 9, 90),
+    (date(2024, 12, 9), 8, 80),
+    (date(2024, 12, 9), 7, 71),
+    (date(2024, 12, 9), 7, 70),
+    (date(2024, 12, 8), 6, 60),
+]
+
+
+def _keyset_database(engine, lines, plan_rows=0):
+    """Simule la base : filtre curseur, tri et LIMIT de la requête keyset."""
+
+    def respond(sql, params):
+        if sql.lstrip().startswith("EXPLAIN"):
+            return engine.Result(scalar=[{"Plan": {"Plan Rows": plan_rows}}])
+        if "COUNT(*)" in sql:
+            return len(lines)
+        rows = sorted(lines, reverse="DESC" in sql)
+        if "cursor_date" in params:
+            cursor = (params["cursor_date"], params["cursor_tx"], params["cursor_line"])
+            descending = "DESC" in sql
+            rows = [row for row in rows if (row < cursor if descending else row > cursor)]
+        return [
+            {"date_operation": day, "transaction_id": tx_id, "line_id": line_id}
+            for day, tx_id, line_id in rows[: params["limit"]]
+        ]
+
+    return respond
+
+
+def _walk(sort, size):
+    pages, cursor = [], None
+    while True:
+        page = tx.search_transactions_keyset(cursor=cursor, size=size, sort=sort)
+        pages.append([(item["date_operation"], item["transaction_id"], item["line_id"]) for item in page.items])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_search_cursor_roundtrip():
+    cursor = tx.encode_search_cursor(date(2024, 12, 3), 7, 42)
+    assert tx.decode_search_cursor(cursor) == (date(2024, 12, 3), 7, 42)
+    with pytest.raises(ValueError):
+        tx.decode_search_cursor("pas-un-curseur")
+
+
+@pytest.mark.parametrize("sort", ["-date_operation", "date_operation"])
+def test_keyset_pages_cover_every_line_once_in_order(monkeypatch, fake_engine, sort):
+    fake_engine.respond(_keyset_database(fake_engine, _LINES))
+    monkeypatch.setattr(tx, "get_engine", lambda: fake_engine)
+
+    pages = _walk(sort, size=2)
+
+    expected = sorted(_LINES, reverse=sort.startswith("-"))
+    assert [line for page in pages for line in page] == expected
+    assert pages[1] == expected[2:4]  # les deux lignes de la transaction 7 ne sont ni perdues ni dupliquées
+
+
+def test_keyset_search_counts_only_on_request(monkeypatch, fake_engine):
+    fake_engine.respond(_keyset_database(fake_engine, _LINES, plan_rows=1234))
+    monkeypatch.setattr(tx, "get_engine", lambda: fake_engine)
+
+    assert tx.search_transactions_keyset(size=2).total is None
+    estimated = tx.search_transactions_keyset(size=2, count="estimate")
+    assert estimated.total == 1234 and estimated.total_is_estimate
+    cursor = estimated.next_cursor
+    exact = tx.search_transactions_keyset(cursor=cursor, size=2, count="exact")
+    assert exact.total == len(_LINES) and not exact.total_is_estimate
+
+
+def test_keyset_search_rejects_unsupported_sort(monkeypatch, fake_engine):
+    monkeypatch.setattr(tx, "get_engine", lambda: fake_engine)
+
+    with pytest.raises(ValueError):
+        tx.search_transactions_keyset(sort="amount")
+    assert fake_engine.calls == []
+
+
+def test_create_transaction_links_its_statement_line_in_the_same_transaction(monkeypatch, fake_engine):
+    linked = []
+
+    def respond(sql, params):
+        if params and "transaction_ids" in params:
+            linked.append((params["transaction_ids"], fake_engine.open_transactions))
+        return None
+
+    fake_engine.returns([(55,)]).respond(respond)
+    monkeypatch.setattr(tx, "get_engine", lambda: fake_engine)
+    payload = FinanceTransactionCreate(
+        entity_id=1,
+        account_id=3,
+        direction="OUT",
+        source="MANUEL",
+        date_operation=date(2024, 12, 9),
+        amount=12.5,
+        lines=[{"category_id": 4, "montant_ttc": 12.5}],
+    )
+
+    assert tx.create_transaction(payload)["id"] == 55
+    assert linked == [([55], 1)]
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.exc import ProgrammingError
+
+from backend.services import forecasting
+
+
+def test_fit_recovers_level_and_trend_per_product():
+    days = 28
+    matrix = np.vstack(
+        [
+            np.full(days, 4.0),  # stable
+            np.arange(days, dtype=float),  # croissance d'une unité par jour
+            np.zeros(days),  # aucune vente
+            np.r_[np.zeros(days - 7), np.full(7, 10.0)],  # lancé il y a une semaine
+        ]
+    )
+
+    level, trend = forecasting.fit_consumption_models(matrix, alpha=0.1)
+
+    assert level[0] == pytest.approx(4.0)
+    assert trend[0] == pytest.approx(0.0)
+    assert level[1] == pytest.approx(days - 1)
+    assert trend[1] == pytest.approx(1.0)
+    assert (level[2], trend[2]) == (0.0, 0.0)
+    assert level[3] == pytest.approx(10.0)
+
+
+def test_horizon_mean_damps_trend_and_never_goes_negative():
+    level = np.array([10.0, 1.0])
+    trend = np.array([1.0, -5.0])
+
+    flat = forecasting.horizon_mean(level, trend, 7, damping=0.0)
+    damped = forecasting.horizon_mean(level, trend, 7, damping=0.9)
+
+    assert flat.tolist() == [10.0, 1.0]
+    assert 10.0 < damped[0] < 10.0 + 4.0
+    assert damped[1] == 0.0
+
+
+def test_sales_matrix_places_quantities_by_product_and_day(monkeypatch):
+    rows = pd.DataFrame(
+        [
+            {"produit_id": 12, "jour": date(2024, 3, 9), "quantite": 2},
+            {"produit_id": 5, "jour": date(2024, 3, 3), "quantite": 1},
+            {"produit_id": 12, "jour": date(2024, 3, 3), "quantite": 4},
+        ]
+    )
+    monkeypatch.setattr(forecasting, "query_df", lambda sql, params=None: rows)
+
+    ids, matrix = forecasting._sales_matrix(1, date(2024, 3, 10), 7)
+
+    assert ids.tolist() == [5, 12]
+    assert matrix[0].tolist() == [1, 0, 0, 0, 0, 0, 0]
+    assert matrix[1].tolist() == [4, 0, 0, 0, 0, 0, 2]
+
+
+def _forecast_tables(engine, tables):
+    """Simule product_consumption_forecasts et product_forecast_runs pour un tenant."""
+
+    def respond(sql, params):
+        assert engine.open_transactions == 1
+        if "DELETE FROM product_consumption_forecasts" in sql:
+            tables["forecasts"].clear()
+        elif "INSERT INTO product_consumption_forecasts" in sql:
+            tables["forecasts"].update(zip(params["ids"], params["levels"]))
+        elif "INSERT INTO product_forecast_runs" in sql:
+            tables["run"] = {"fit_date": params["fit_date"], "last_movement_id": params["last_movement_id"]}
+        return None
+
+    return respond
+
+
+@pytest.fixture
+def fake_store(monkeypatch, fake_engine):
+    state = {"watermark": 50, "run": None, "forecasts": {}, "matrix_products": [], "touched": [2, 7]}
+
+    def fake_sales_matrix(tenant_id, until, days, product_ids=None):
+        state["matrix_products"].append(product_ids)
+        ids = np.array(sorted(product_ids) if product_ids is not None else [1, 2], dtype=np.int64)
+        return ids, np.ones((len(ids), days))
+
+    def fake_query_df(sql, params=None):
+        return pd.DataFrame([{"produit_id": pid} for pid in state["touched"]])
+
+    fake_engine.respond(_forecast_tables(fake_engine, state))
+    monkeypatch.setattr(forecasting, "_movement_watermark", lambda tenant_id: state["watermark"])
+    monkeypatch.setattr(forecasting, "_last_run", lambda tenant_id: state["run"])
+    monkeypatch.setattr(forecasting, "_sales_matrix", fake_sales_matrix)
+    monkeypatch.setattr(forecasting, "query_df", fake_query_df)
+    monkeypatch.setattr(forecasting, "get_engine", lambda: fake_engine)
+    return state
+
+
+def test_refresh_is_full_on_first_run_then_incremental(fake_store):
+    today = date(2024, 3, 10)
+
+    first = forecasting.refresh_forecasts(1, today=today)
+    assert (first.mode, first.products) == ("full", 2)
+    assert set(fake_store["forecasts"]) == {1, 2}
+    assert fake_store["run"] == {"fit_date": today, "last_movement_id": 50}
+
+    assert forecasting.refresh_forecasts(1, today=today).mode == "unchanged"
+
+    fake_store["watermark"] = 60
+    second = forecasting.refresh_forecasts(1, today=today)
+    assert (second.mode, second.products) == ("incremental", 2)
+    assert fake_store["matrix_products"][-1] == [2, 7]
+    assert set(fake_store["forecasts"]) == {1, 2, 7}  # produit 1 non touché : conservé
+
+    fake_store["touched"] = []
+    fake_store["watermark"] = 70
+    third = forecasting.refresh_forecasts(1, today=date(2024, 3, 11))
+    assert third.mode == "full"
+    assert set(fake_store["forecasts"]) == {1, 2}  # la fenêtre a glissé : tout est refait
+
+
+def test_refresh_uses_a_process_pool_only_when_asked(monkeypatch, fake_store):
+    pools = []
+    monkeypatch.setattr(forecasting, "_pool_min_products", lambda: 0)
+    monkeypatch.setattr(forecasting, "ProcessPoolExecutor", lambda **kwargs: pools.append(kwargs) or pytest.fail("pool"))
+
+    forecasting.refresh_forecasts(1, today=date(2024, 3, 10))
+
+    assert pools == []
+
+
+def test_pool_context_never_forks():
+    assert forecasting._pool_context().get_start_method() in {"forkserver", "spawn"}
+
+
+def _stored_forecasts():
+    return pd.DataFrame(
+        [
+            {"produit_id": 3, "level": 2.0, "trend": 0.0, "generated_at": pd.Timestamp("2024-03-10T04:00Z")},
+            {"produit_id": 4, "level": 0.5, "trend": 0.0, "generated_at": pd.Timestamp("2024-03-10T04:00Z")},
+        ]
+    )
+
+
+def test_forecast_lookup_reads_stored_models(monkeypatch):
+    monkeypatch.setattr(forecasting, "query_df", lambda sql, params=None: _stored_forecasts())
+    monkeypatch.setattr(forecasting, "refresh_forecasts", lambda *a, **k: pytest.fail("refit on lookup"))
+
+    snapshot = forecasting.load_forecast_snapshot(1)
+
+    assert forecasting.forecast_daily_consumption(tenant_id=1, horizon=14) == {3: 2.0, 4: 0.5}
+    assert snapshot.generated_at.year == 2024
+
+
+def test_forecast_lookup_before_first_job_run_is_empty(monkeypatch):
+    monkeypatch.setattr(forecasting, "query_df", lambda sql, params=None: pd.DataFrame())
+    monkeypatch.setattr(forecasting, "refresh_forecasts", lambda *a, **k: pytest.fail("refit on lookup"))
+
+    snapshot = forecasting.load_forecast_snapshot(1)
+
+    assert snapshot.ids.tolist() == [] and snapshot.generated_at is None
+    assert forecasting.forecast_daily_consumption(tenant_id=1) == {}
+
+
+class _PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+def _raise(pgcode):
+    def query_df(sql, params=None):
+        raise ProgrammingError("SELECT ...", {}, _PgError(pgcode))
+
+    return query_df
+
+
+def test_forecast_lookup_tolerates_only_a_missing_table(monkeypatch):
+    monkeypatch.setattr(forecasting, "query_df", _raise("42P01"))
+    assert forecasting.forecast_daily_consumption(tenant_id=1) == {}
+
+    monkeypatch.setattr(forecasting, "query_df", _raise("42703"))
+    with pytest.raises(ProgrammingError):
+        forecasting.load_forecast_snapshot(1)
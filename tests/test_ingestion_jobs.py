@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from backend.services import ingestion_jobs
+from backend.services.importers import bank_statement_csv
+
+
+def test_job_runs_cpu_step_in_process_pool_and_reports_progress():
+    manager = ingestion_jobs.IngestionJobManager(max_pending=2, workers=1, cpu_workers=1)
+    content = b"date,libelle,montant\n2024-01-02,Loyer,-500\n2024-01-03,Vente,120.5\n"
+
+    def run(ctx):
+        entries = ctx.run_cpu(bank_statement_csv.parse_csv, content)
+        ctx.progress(len(entries), len(entries))
+        return {"total": len(entries)}
+
+    try:
+        job = manager.submit("bank_statement_import", run, tenant_id=3)
+        assert job.future.result(timeout=30) == {"total": 2}
+        snapshot = manager.get(job.id, tenant_id=3).snapshot()
+        assert snapshot["status"] == ingestion_jobs.JOB_DONE
+        assert (snapshot["done"], snapshot["total"]) == (2, 2)
+        with pytest.raises(ingestion_jobs.JobNotFoundError):
+            manager.get(job.id, tenant_id=4)
+    finally:
+        manager.shutdown()
+
+
+def test_queue_is_bounded_and_errors_are_recorded():
+    manager = ingestion_jobs.IngestionJobManager(max_pending=1, workers=1, cpu_workers=0)
+    release = threading.Event()
+
+    def blocked(_ctx):
+        release.wait(5)
+        raise ValueError("CSV invalide")
+
+    try:
+        job = manager.submit("bank_statement_import", blocked, tenant_id=1)
+        with pytest.raises(ingestion_jobs.JobQueueFullError):
+            manager.submit("bank_statement_import", lambda _ctx: None, tenant_id=1)
+        release.set()
+        with pytest.raises(ValueError):
+            job.future.result(timeout=5)
+        assert job.status == ingestion_jobs.JOB_ERROR and job.error == "CSV invalide"
+        # Le créneau est libéré : un nouveau job est accepté.
+        assert manager.submit("bank_statement_import", lambda _ctx: 1, tenant_id=1).future.result(timeout=5) == 1
+        assert [j.status for j in manager.list(tenant_id=1)] == [ingestion_jobs.JOB_DONE, ingestion_jobs.JOB_ERROR]
+    finally:
+        manager.shutdown()
+
+
+def test_rejected_submission_leaves_no_job_and_frees_its_slot():
+    manager = ingestion_jobs.IngestionJobManager(max_pending=1, workers=1, cpu_workers=0)
+    manager.shutdown()
+
+    with pytest.raises(RuntimeError):
+        manager.submit("bank_statement_import", lambda _ctx: None, tenant_id=1)
+
+    assert manager.list(tenant_id=1) == []
+    assert manager._slots.acquire(blocking=False)
+
+
+def test_cpu_pool_does_not_fork_the_server_process():
+    manager = ingestion_jobs.IngestionJobManager(max_pending=1, workers=1, cpu_workers=1)
+    try:
+        assert manager._cpu()._mp_context.get_start_method() in {"forkserver", "spawn"}
+    finally:
+        manager.shutdown()
@@ -182,3 +182,145 @@ def test_process_sale_transaction_handles_legacy_cart_keys(monkeypatch):
     )
     assert insert_params_list
     assert insert_params_list[0]["qty"] == Decimal("3")
+
+
+class DummyRowsResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_process_sale_transaction_batched_uses_set_based_statements(monkeypatch):
+    execution_log = []
+
+    def handler(statement, params):
+        execution_log.append((statement, params))
+        if "FOR UPDATE" in statement:
+            return DummyRowsResult([(2, 10), (5, 10)])
+        return DummyFetchResult(None)
+
+    consumed = []
+    connection = DummyConnection(handler)
+    engine = DummyEngine(connection)
+    monkeypatch.setattr(inventory_service, "get_engine", lambda: engine)
+    monkeypatch.setattr(inventory_service, "text", lambda sql: sql)
+    monkeypatch.setattr(
+        inventory_service.inventory_costing,
+        "consume_layers_bulk",
+        lambda conn, *, tenant_id, quantities: consumed.append(quantities),
+        raising=False,
+    )
+
+    success, message, receipt = inventory_service.process_sale_transaction(
+        [{"id": 5, "qty": 1}, {"id": 2, "qty": 3}, {"id": 5, "qty": 2}],
+        "admin",
+        batched=True,
+    )
+
+    assert success is True
+    assert message is None
+    assert receipt is not None
+    statements = [stmt for stmt, _ in execution_log]
+    assert len(statements) == 3
+    lock_params = execution_log[0][1]
+    assert lock_params["ids"] == [2, 5]
+    assert "UPDATE produits AS p" in statements[2]
+    assert "FROM (VALUES" in statements[2]
+    assert consumed == [{2: Decimal("3"), 5: Decimal("3")}]
+
+
+def test_process_sale_transaction_batched_reports_missing_products(monkeypatch):
+    execution_log = []
+
+    def handler(statement, params):
+        execution_log.append(statement)
+        if "FOR UPDATE" in statement:
+            return DummyRowsResult([(1, 10)])
+        pytest.fail(f"Unexpected statement executed: {statement}")
+
+    connection = DummyConnection(handler)
+    engine = DummyEngine(connection)
+    monkeypatch.setattr(inventory_service, "get_engine", lambda: engine)
+    monkeypatch.setattr(inventory_service, "text", lambda sql: sql)
+
+    success, message, receipt = inventory_service.process_sale_transaction(
+        [{"id": 1, "qty": 1}, {"id": 9, "qty": 1}],
+        "admin",
+        batched=True,
+    )
+
+    assert success is False
+    assert message == "Produits introuvables: 9."
+    assert receipt is None
+    assert len(execution_log) == 1
+
+
+def test_process_sale_transaction_can_defer_receipt_rendering(monkeypatch):
+    def handler(statement, params):
+        if "FOR UPDATE" in statement:
+            return DummyRowsResult([(4, 10)])
+        return DummyFetchResult(None)
+
+    rendered = []
+    connection = DummyConnection(handler)
+    engine = DummyEngine(connection)
+    monkeypatch.setattr(inventory_service, "get_engine", lambda: engine)
+    monkeypatch.setattr(inventory_service, "text", lambda sql: sql)
+    monkeypatch.setattr(
+        inventory_service,
+        "render_receipt_pdf",
+        lambda lines: rendered.append(lines) or b"%PDF",
+    )
+
+    success, message, receipt = inventory_service.process_sale_transaction(
+        [{"id": 4, "qty": 2, "nom": "Café"}],
+        "admin",
+        batched=True,
+        defer_receipt=True,
+    )
+
+    assert success is True
+    assert rendered == []
+    assert receipt["filename"].endswith(".pdf")
+    built = receipt["render"]()
+    assert built == {"filename": receipt["filename"], "content": b"%PDF"}
+
+
+def test_process_sale_transaction_batched_renders_receipt_after_commit(monkeypatch):
+    def handler(statement, params):
+        if "FOR UPDATE" in statement:
+            return DummyRowsResult([(4, 10)])
+        return DummyFetchResult(None)
+
+    class TrackingContext(DummyContext):
+        open = False
+
+        def __enter__(self):
+            TrackingContext.open = True
+            return super().__enter__()
+
+        def __exit__(self, exc_type, exc, tb):
+            TrackingContext.open = False
+            return super().__exit__(exc_type, exc, tb)
+
+    connection = DummyConnection(handler)
+    engine = DummyEngine(connection)
+    engine.begin = lambda: TrackingContext(connection)
+    rendered_in_transaction = []
+    monkeypatch.setattr(inventory_service, "get_engine", lambda: engine)
+    monkeypatch.setattr(inventory_service, "text", lambda sql: sql)
+    monkeypatch.setattr(
+        inventory_service,
+        "render_receipt_pdf",
+        lambda lines: rendered_in_transaction.append(TrackingContext.open) or b"%PDF",
+    )
+
+    success, _message, receipt = inventory_service.process_sale_transaction(
+        [{"id": 4, "qty": 1, "nom": "Café"}], "admin", batched=True
+    )
+
+    assert success is True
+    assert receipt is not None
+    assert rendered_in_transaction == [False]
@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+from backend.services.parsers.bank_statement_parsers import ParsedStatement, Transaction
+from backend.services.parsers.keyword_analyzer import KeywordAnalyzer
+
+
+def _tx(libelle: str, debit: str | None = None, credit: str | None = None) -> Transaction:
+    return Transaction(
+        date="01/12",
+        libelle=libelle,
+        debit=Decimal(debit) if debit else None,
+        credit=Decimal(credit) if credit else None,
+    )
+
+
+def test_analyze_transaction_counts_overlapping_keywords():
+    analyzer = KeywordAnalyzer(
+        {
+            "a": {"name": "A", "keywords": ["METRO", "METRO CASH", "CASH"]},
+            "b": {"name": "B", "keywords": ["CASH CARRY", "metro"]},
+        }
+    )
+
+    category, keywords = analyzer.analyze_transaction(_tx("cb metro cash carry"))
+
+    assert category == "a"
+    assert keywords == ["METRO", "METRO CASH", "CASH"]
+
+
+def test_analyze_transaction_ties_go_to_first_category():
+    analyzer = KeywordAnalyzer(
+        {
+            "first": {"name": "First", "keywords": ["URSSAF"]},
+            "second": {"name": "Second", "keywords": ["PRLV"]},
+        }
+    )
+
+    assert analyzer.analyze_transaction(_tx("PRLV URSSAF")) == ("first", ["URSSAF"])
+    assert analyzer.analyze_transaction(_tx("SANS MOT CLE")) == (None, [])
+
+
+def test_analyze_multiple_statements_parallel_matches_sequential():
+    analyzer = KeywordAnalyzer()
+    statements = [
+        ParsedStatement(
+            bank_type="LCL",
+            source_file=f"releve_{index}.pdf",
+            transactions=[
+                _tx("PRLV SEPA URSSAF D ILE", debit="120.50"),
+                _tx("REMISE CB 12/03", credit="300"),
+                _tx("LIBELLE INCONNU XYZ", debit="5"),
+            ],
+        )
+        for index in range(3)
+    ]
+
+    sequential = analyzer.analyze_multiple_statements(statements, workers=1)
+    parallel = analyzer.analyze_multiple_statements(statements, workers=2)
+
+    assert parallel == sequential
+    assert sequential.total_transactions == 9
+    assert sequential.uncategorized_transactions == 3
+    assert sequential.categories["charges_sociales"].total_debit == 361.5
+    assert sequential.uncategorized_keywords["INCONNU"] == 3
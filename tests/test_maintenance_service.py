@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+
+from backend.services import forecasting, maintenance
+from core.repositories import stock_movements
+
+# (partition, borne haute, mouvements) telles que les verrait la fonction d'archivage.
+_PARTITIONS = [
+    ("mouvements_stock_p202201", date(2022, 2, 1), 1200),
+    ("mouvements_stock_p202202", date(2022, 3, 1), 800),
+    ("mouvements_stock_p202203", date(2022, 4, 1), 950),
+]
+
+
+def _archive_database(engine, archived):
+    """Simule mouvements_stock_archive_partitions : partitions closes avant ``before``."""
+
+    def respond(sql, params):
+        assert engine.open_transactions == 1
+        rows = [
+            {
+                "partition_name": name,
+                "range_end": upper,
+                "movements": movements,
+                "action": "drop" if params["drop"] else "detach",
+            }
+            for name, upper, movements in _PARTITIONS
+            if upper <= params["before"]
+        ]
+        if not params["dry_run"]:
+            archived.extend((row["partition_name"], params["schema"]) for row in rows)
+        return rows
+
+    return respond
+
+
+@pytest.fixture
+def archive_engine(monkeypatch, fake_engine):
+    archived = []
+    fake_engine.respond(_archive_database(fake_engine, archived))
+    monkeypatch.setattr(stock_movements, "get_engine", lambda: fake_engine)
+    return archived
+
+
+def test_archive_dry_run_reports_old_partitions_without_detaching(archive_engine):
+    report = maintenance.archive_movement_partitions(date(2022, 3, 1), dry_run=True)
+
+    assert report == [
+        {"partition": "mouvements_stock_p202201", "range_end": date(2022, 2, 1), "movements": 1200, "action": "detach"},
+        {"partition": "mouvements_stock_p202202", "range_end": date(2022, 3, 1), "movements": 800, "action": "detach"},
+    ]
+    assert archive_engine == []
+
+
+def test_archive_moves_partitions_to_the_requested_schema_or_drops_them(archive_engine):
+    detached = maintenance.archive_movement_partitions(date(2022, 2, 1), schema="cold")
+    dropped = maintenance.archive_movement_partitions(date(2022, 4, 1), drop=True)
+
+    assert [row["action"] for row in detached] == ["detach"]
+    assert {row["action"] for row in dropped} == {"drop"}
+    assert archive_engine[0] == ("mouvements_stock_p202201", "cold")
+
+
+def test_ensure_movement_partitions_returns_created_count(monkeypatch, fake_engine):
+    fake_engine.respond(lambda sql, params: params["months_ahead"] - 1)
+    monkeypatch.setattr(stock_movements, "get_engine", lambda: fake_engine)
+
+    assert maintenance.ensure_movement_partitions(months_ahead=4) == 3
+    assert fake_engine.open_transactions == 0
+
+
+def test_forecast_refresh_is_scoped_to_one_tenant(monkeypatch):
+    refreshed = []
+
+    def fake_refresh(tenant_id, *, full=False, **kwargs):
+        refreshed.append((tenant_id, full, kwargs))
+        return forecasting.ForecastRefresh(tenant_id, "full", 3, 99, 12)
+
+    monkeypatch.setattr(maintenance, "refresh_forecasts", fake_refresh)
+
+    entry = maintenance.refresh_consumption_forecasts(5, full=True)
+
+    assert refreshed == [(5, True, {})]
+    assert entry == {"tenant_id": 5, "mode": "full", "products": 3, "last_movement_id": 99, "duration_ms": 12}
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import threading
+
+import pytest
+from starlette.requests import Request
+
+from backend.middleware import rate_limit_backends as backends
+from backend.middleware.rate_limiter import RateLimitConfig, RateLimiter
+
+POLICY = backends.BucketPolicy(capacity=2.0, refill_rate=1.0)
+
+
+def _request(ip: str = "10.0.0.1") -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/products",
+            "headers": [(b"x-forwarded-for", ip.encode())],
+            "query_string": b"",
+        }
+    )
+
+
+def test_memory_store_timing_wheel_expires_idle_buckets():
+    store = backends.MemoryBucketStore(tick=1.0, slots=8)
+
+    assert store.take_sync("a", 100.0, POLICY) == (True, 1.0)
+    assert store.take_sync("a", 100.0, POLICY) == (True, 0.0)
+    assert store.take_sync("a", 100.5, POLICY) == (False, 0.5)
+    store.take_sync("b", 101.0, POLICY)
+    assert len(store) == 2
+
+    # "a" idle since 100.5 (ttl 2s), "b" touched again: only "a" is dropped.
+    store.take_sync("b", 102.9, POLICY)
+    store.take_sync("b", 104.0, POLICY)
+    assert len(store) == 1
+    # Bucket forgotten == full bucket.
+    assert store.take_sync("a", 104.0, POLICY) == (True, 1.0)
+
+
+def test_rate_limiter_headers_and_store_injection():
+    limiter = RateLimiter(RateLimitConfig(requests=1, window=60, burst=0), store=backends.MemoryBucketStore())
+
+    allowed, headers = asyncio.run(limiter.check(_request()))
+    denied, denied_headers = asyncio.run(limiter.check(_request()))
+    other, _ = asyncio.run(limiter.check(_request("10.0.0.2")))
+
+    assert allowed and other and not denied
+    assert headers["X-RateLimit-Remaining"] == "0"
+    assert int(denied_headers["Retry-After"]) >= 59
+
+
+def test_shared_memory_store_is_shared_between_instances(tmp_path):
+    path = tmp_path / "buckets.bin"
+    first = backends.SharedMemoryBucketStore(path, slots=64, probe=4)
+    second = backends.SharedMemoryBucketStore(path, slots=64, probe=4)
+    try:
+        assert first.take_sync("client", 10.0, POLICY) == (True, 1.0)
+        assert second.take_sync("client", 10.0, POLICY) == (True, 0.0)
+        assert first.take_sync("client", 10.0, POLICY)[0] is False
+        # Expired slots are reused in place: the table never needs a cleanup pass.
+        for i in range(500):
+            assert second.take_sync(f"k{i}", 100.0 + i, POLICY)[0]
+        assert first.take_sync("client", 1000.0, POLICY) == (True, 1.0)
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_memory_store_fails_closed_instead_of_evicting_live_buckets(tmp_path, caplog):
+    # One-slot table: a second client has no room while the first bucket is live.
+    store = backends.SharedMemoryBucketStore(tmp_path / "buckets.bin", slots=1, probe=1)
+    try:
+        assert store.take_sync("owner", 10.0, POLICY) == (True, 1.0)
+        with caplog.at_level("WARNING", logger=backends.__name__):
+            assert store.take_sync("intruder", 10.5, POLICY) == (False, 0.0)
+        assert "denying request" in caplog.text
+        # The live bucket was not reset to a full allowance...
+        assert store.take_sync("owner", 10.5, POLICY) == (True, 0.5)
+        # ...and its slot is reused once it has expired.
+        assert store.take_sync("intruder", 20.0, POLICY) == (True, 1.0)
+    finally:
+        store.close()
+
+
+class _FakeRedis:
+    """Local Redis protocol stand-in: SCRIPT LOAD / EVALSHA for the token bucket script."""
+
+    def __init__(self):
+        self.sha = hashlib.sha1(backends.TOKEN_BUCKET_LUA.encode()).hexdigest()
+        self.data: dict[bytes, tuple[float, float]] = {}
+        self.commands: list[bytes] = []
+        self.sessions: list[list[bytes]] = []
+        self.delays: dict[bytes, float] = {}
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def _handle(self, reader, writer):
+        session: list[bytes] = []
+        self.sessions.append(session)
+        while True:
+            header = await reader.readline()
+            if not header:
+                break
+            args = []
+            for _ in range(int(header[1:])):
+                length = int((await reader.readline())[1:])
+                args.append((await reader.readexactly(length + 2))[:-2])
+            session.append(args[0].upper())
+            if len(args) > 3 and args[3] in self.delays:
+                await asyncio.sleep(self.delays[args[3]])
+            writer.write(self._dispatch(args))
+            await writer.drain()
+        writer.close()
+
+    def _dispatch(self, args):
+        command = args[0].upper()
+        self.commands.append(command)
+        if command in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"SCRIPT":
+            return b"$%d\r\n%s\r\n" % (len(self.sha), self.sha.encode())
+        if command == b"EVALSHA" and args[1].decode() == self.sha:
+            key = args[3]
+            capacity, rate, now = (float(v) for v in args[4:7])
+            tokens, ts = self.data.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            allowed = 1 if tokens >= 1 else 0
+            tokens -= allowed
+            self.data[key] = (tokens, now)
+            raw = repr(tokens).encode()
+            return b"*2\r\n:%d\r\n$%d\r\n%s\r\n" % (allowed, len(raw), raw)
+        return b"-NOSCRIPT No matching script\r\n"
+
+    async def _shutdown(self):
+        self.server.close()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=2)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+
+
+@pytest.fixture
+def fake_redis():
+    server = _FakeRedis()
+    yield server
+    server.close()
+
+
+def test_redis_store_runs_script_over_resp(fake_redis):
+    store = backends.RedisBucketStore(f"redis://127.0.0.1:{fake_redis.port}/0", key_prefix="t:")
+
+    async def scenario():
+        return [await store.take("client", 50.0, POLICY) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [(True, 1.0), (True, 0.0), (False, 0.0)]
+    assert fake_redis.commands.count(b"SCRIPT") == 1
+    assert b"t:client" in fake_redis.data
+
+
+def test_redis_timeout_never_hands_a_stale_reply_to_the_next_caller(fake_redis):
+    store = backends.RedisBucketStore(f"redis://127.0.0.1:{fake_redis.port}/0", key_prefix="t:", timeout=0.2)
+    fake_redis.delays[b"t:slow"] = 0.5
+    drained = backends.BucketPolicy(capacity=1.0, refill_rate=0.0)
+
+    async def scenario():
+        await store.take("fast", 50.0, drained)  # loads the script, drains "fast"
+        slow = asyncio.ensure_future(store.take("slow", 50.0, drained))
+        await asyncio.sleep(0.05)  # "slow" holds the lock, its reply is late
+        fast = await store.take("fast", 50.0, drained)
+        return await slow, fast
+
+    slow, fast = asyncio.run(scenario())
+
+    assert slow == (True, 1.0)  # timed out: fail open
+    assert fast == (False, 0.0)  # its own reply, not the one meant for "slow"
+    assert len(fake_redis.sessions) == 2  # the desynchronised connection was replaced
+
+
+def test_redis_auth_and_select_precede_every_command_on_a_connection(fake_redis):
+    store = backends.RedisBucketStore(f"redis://:secret@127.0.0.1:{fake_redis.port}/3", key_prefix="t:")
+
+    async def scenario():
+        return await asyncio.gather(*(store.take(f"client-{i}", 50.0, POLICY) for i in range(5)))
+
+    assert asyncio.run(scenario()) == [(True, 1.0)] * 5
+    assert [session[:2] for session in fake_redis.sessions] == [[b"AUTH", b"SELECT"]]
+
+
+def test_redis_store_fails_open_when_unreachable():
+    store = backends.RedisBucketStore("redis://127.0.0.1:1/0", timeout=0.05)
+
+    assert asyncio.run(store.take("client", 1.0, POLICY)) == (True, POLICY.capacity)
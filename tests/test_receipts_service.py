@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from backend.services.receipts import ReceiptNotFoundError, ReceiptPendingError, ReceiptStore
+
+
+def _render(content: bytes):
+    return lambda: {'filename': 'ticket.pdf', 'content': content}
+
+
+def test_receipt_store_renders_in_background():
+    store = ReceiptStore(max_entries=4, ttl_seconds=60)
+    receipt_id = store.submit(_render(b'%PDF'), filename='ticket.pdf', tenant_id=1)
+
+    filename, content = store.get(receipt_id, tenant_id=1)
+
+    assert filename == 'ticket.pdf'
+    assert content == b'%PDF'
+    store.shutdown()
+
+
+def test_receipt_store_is_scoped_by_tenant():
+    store = ReceiptStore()
+    receipt_id = store.submit(_render(b'%PDF'), filename='ticket.pdf', tenant_id=1)
+
+    with pytest.raises(ReceiptNotFoundError):
+        store.get(receipt_id, tenant_id=2)
+    store.shutdown()
+
+
+def test_receipt_store_evicts_least_recently_used():
+    store = ReceiptStore(max_entries=2, ttl_seconds=60)
+    first = store.submit(_render(b'1'), filename='a.pdf', tenant_id=1)
+    second = store.submit(_render(b'2'), filename='b.pdf', tenant_id=1)
+    store.get(first, tenant_id=1)
+    store.submit(_render(b'3'), filename='c.pdf', tenant_id=1)
+
+    assert len(store) == 2
+    assert store.get(first, tenant_id=1)[1] == b'1'
+    with pytest.raises(ReceiptNotFoundError):
+        store.get(second, tenant_id=1)
+    store.shutdown()
+
+
+def test_receipt_store_expires_entries():
+    store = ReceiptStore(ttl_seconds=0)
+    receipt_id = store.submit(_render(b'%PDF'), filename='ticket.pdf', tenant_id=1)
+
+    with pytest.raises(ReceiptNotFoundError):
+        store.get(receipt_id, tenant_id=1)
+    store.shutdown()
+
+
+def test_receipt_store_purges_expired_entries_behind_recent_ones(monkeypatch):
+    from backend.services import receipts
+
+    clock = [100.0]
+    monkeypatch.setattr(receipts.time, 'monotonic', lambda: clock[0])
+    store = ReceiptStore(max_entries=10, ttl_seconds=10)
+    first = store.submit(_render(b'1'), filename='a.pdf', tenant_id=1)
+    clock[0] = 105.0
+    store.submit(_render(b'2'), filename='b.pdf', tenant_id=1)
+    store.get(first, tenant_id=1)
+    clock[0] = 112.0
+    store.submit(_render(b'3'), filename='c.pdf', tenant_id=1)
+
+    assert len(store) == 2
+    store.shutdown()
+
+
+def test_receipt_store_reports_pending_render():
+    release = threading.Event()
+    store = ReceiptStore(workers=1)
+
+    def slow_render():
+        release.wait(5)
+        return {'content': b'%PDF'}
+
+    receipt_id = store.submit(slow_render, filename='ticket.pdf', tenant_id=1)
+    with pytest.raises(ReceiptPendingError):
+        store.get(receipt_id, tenant_id=1, timeout=0.01)
+    release.set()
+    assert store.get(receipt_id, tenant_id=1)[1] == b'%PDF'
+    store.shutdown()
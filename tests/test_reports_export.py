@@ -0,0 +1,51 @@
+import io
+from decimal import Decimal
+
+import pytest
+
+from backend.services import reports
+
+_COLUMNS = [("id", 23), ("nom", 25), ("stock", 1700)]
+
+
+def _stock_rows(engine, rows):
+    return engine.returns(engine.Result(rows, columns=_COLUMNS))
+
+
+def test_stream_dataset_csv_is_lazy_and_batched(monkeypatch, fake_engine):
+    _stock_rows(fake_engine, [(1, "Café", Decimal("2.50")), (2, "Thé", None), (3, "Eau", Decimal("0"))])
+    monkeypatch.setattr(reports, "get_engine", lambda: fake_engine)
+
+    export = reports.stream_dataset("stock", tenant_id=7, limit=None, batch_rows=2)
+
+    assert export.filename == "rapport_stock.csv" and export.media_type == "text/csv"
+    assert fake_engine.calls == []
+    chunks = list(export.chunks)
+
+    assert len(chunks) == 2
+    assert b"".join(chunks).decode("utf-8").splitlines() == ["id,nom,stock", "1,Café,2.50", "2,Thé,", "3,Eau,0"]
+    assert fake_engine.params == [{"limit": None, "tenant_id": 7}]
+    assert fake_engine.options["stream_results"] is True
+    assert fake_engine.results[0].closed and fake_engine.open_transactions == 0
+
+
+def test_stream_dataset_rejects_unknown_dataset_or_format():
+    with pytest.raises(ValueError):
+        reports.stream_dataset("inconnu", tenant_id=1)
+    with pytest.raises(ValueError):
+        reports.stream_dataset("stock", tenant_id=1, fmt="xlsx")
+
+
+def test_stream_dataset_parquet(monkeypatch, fake_engine):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _stock_rows(fake_engine, [(1, "Café", Decimal("2.50")), (2, None, None)])
+    monkeypatch.setattr(reports, "get_engine", lambda: fake_engine)
+
+    export = reports.stream_dataset("stock", tenant_id=1, fmt="parquet", batch_rows=1)
+    table = pq.read_table(io.BytesIO(b"".join(export.chunks)))
+
+    assert export.filename == "rapport_stock.parquet"
+    assert table.to_pylist() == [
+        {"id": 1, "nom": "Café", "stock": 2.5},
+        {"id": 2, "nom": None, "stock": None},
+    ]
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.restaurant import bank_statements
+
+
+def _entry(day: int, libelle: str, montant: float) -> dict:
+    return {
+        "date": date(2024, 3, day),
+        "libelle": libelle,
+        "categorie": None,
+        "montant": montant,
+        "type": "Sortie",
+        "mois": "2024-03",
+        "source": "sumup_pdf",
+    }
+
+
+def _statements_table(engine, stored):
+    """Simule l'insertion groupée : une ligne par clé naturelle, les doublons écartés."""
+
+    def respond(sql, params):
+        assert engine.open_transactions == 1
+        inserted = []
+        for day, libelle, montant, source in zip(
+            params["dates"], params["libelles"], params["montants"], params["sources"]
+        ):
+            key = (params["tenant"], params["account"], day, libelle, montant)
+            if key not in stored:
+                stored[key] = source
+                inserted.append((len(stored),))
+        return inserted
+
+    return respond
+
+
+@pytest.fixture
+def statements(monkeypatch, fake_engine):
+    stored = {}
+    fake_engine.respond(_statements_table(fake_engine, stored))
+    monkeypatch.setattr(bank_statements, "get_engine", lambda: fake_engine)
+    return stored
+
+
+def test_pdf_import_is_idempotent(monkeypatch, statements):
+    entries = [_entry(1, "METRO", 120.5), _entry(2, "EDF", 80.0), _entry(2, "EDF", 80.0)]
+    parsed = []
+    monkeypatch.setattr(
+        bank_statements,
+        "get_job_manager",
+        lambda: SimpleNamespace(run_cpu=lambda func, payload: parsed.append((func, payload)) or entries),
+    )
+
+    first = bank_statements.import_bank_statements_from_pdf(3, "lcl", b"%PDF")
+    again = bank_statements.import_bank_statements_from_pdf(3, "lcl", b"%PDF")
+
+    assert first == {"inserted": 2, "total": 3, "duplicates": 1}
+    assert again == {"inserted": 0, "total": 3, "duplicates": 3}
+    assert parsed[0] == (bank_statements.parse_bank_statement_pdf, b"%PDF")
+    assert set(statements) == {
+        (3, "lcl", date(2024, 3, 1), "METRO", 120.5),
+        (3, "lcl", date(2024, 3, 2), "EDF", 80.0),
+    }
+    assert set(statements.values()) == {"sumup_pdf"}
+
+
+def test_bulk_insert_chunks_large_statements(monkeypatch, fake_engine, statements):
+    monkeypatch.setattr(bank_statements, "_BULK_IMPORT_CHUNK", 2)
+    entries = [_entry(day, f"op {day}", day) for day in (1, 2, 3, 1, 5)]
+
+    summary = bank_statements.insert_bank_statements_bulk(1, "sumup", entries)
+
+    assert [len(params["dates"]) for params in fake_engine.params] == [2, 2, 1]
+    assert summary == {"inserted": 4, "total": 5, "duplicates": 1}
+    assert len(statements) == 4
+
+
+def test_empty_pdf_reports_zero_counts(monkeypatch, fake_engine, statements):
+    monkeypatch.setattr(bank_statements, "get_job_manager", lambda: SimpleNamespace(run_cpu=lambda func, payload: []))
+
+    assert bank_statements.import_bank_statements_from_pdf(1, "lcl", b"") == {"inserted": 0, "total": 0, "duplicates": 0}
+    assert fake_engine.calls == []
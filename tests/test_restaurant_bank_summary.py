@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from backend.services.restaurant import bank_statements
+from backend.services.restaurant.utils import _get_grouping_preset, _resolve_group_name
+
+
+def _bucket(bucket, *, jour=None, semaine=None, week_start=None, mois=None, categorie=None, entrees=0, sorties=0):
+    return {
+        "bucket": bucket,
+        "jour": jour,
+        "semaine": semaine,
+        "week_start": week_start,
+        "mois": mois,
+        "categorie": categorie,
+        "entrees": entrees,
+        "sorties": sorties,
+        "nb_entrees": 1 if entrees else 0,
+        "nb_sorties": 1 if sorties else 0,
+    }
+
+
+BUCKETS = pd.DataFrame(
+    [
+        _bucket("month", mois="2024-02", entrees=100, sorties=40),
+        _bucket("month", mois="2024-01", entrees=50, sorties=10),
+        _bucket("day", jour=date(2024, 2, 1), entrees=100, sorties=40),
+        _bucket("day", jour=date(2024, 1, 31), entrees=50, sorties=10),
+        _bucket("week", semaine="2024-W05", week_start=date(2024, 1, 29), entrees=150, sorties=50),
+        _bucket("category", categorie="Ventes", entrees=150),
+        _bucket("category", categorie=None, sorties=50),
+    ]
+)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    calls = {"buckets": 0, "version": (1, 1)}
+
+    def fake_query_df(sql, params=None):
+        if "GROUPING SETS" in str(sql):
+            calls["buckets"] += 1
+            assert params["entity_id"] == 7
+            return BUCKETS
+        last_tx, last_line = calls["version"]
+        return pd.DataFrame([{"last_tx": last_tx, "last_line": last_line}])
+
+    monkeypatch.setattr(bank_statements, "query_df", fake_query_df)
+    monkeypatch.setattr(bank_statements, "_get_restaurant_entity_id", lambda: 7)
+    bank_statements.invalidate_bank_statement_summary_cache()
+    yield calls
+    bank_statements.invalidate_bank_statement_summary_cache()
+
+
+def test_summary_builds_sorted_buckets_from_sql_aggregates(fake_db):
+    summary = bank_statements.get_bank_statement_summary(1, months=3)
+
+    assert [m["mois"] for m in summary["monthly"]] == ["2024-01", "2024-02"]
+    assert summary["monthly"][1] == {"mois": "2024-02", "entrees": 100.0, "sorties": 40.0, "net": 60.0}
+    assert [d["jour"] for d in summary["daily"]] == [date(2024, 1, 31), date(2024, 2, 1)]
+    assert summary["weekly"][0]["end_date"] == date(2024, 2, 4)
+    assert summary["forecast_next_month"] == pytest.approx(50.0)
+
+    _name, preset = _get_grouping_preset(None)
+    groups = {g["group"]: g for g in summary["groups"]}
+    assert groups[_resolve_group_name("Ventes", "Entree", preset)]["entrees"] == 150.0
+    assert groups[_resolve_group_name(None, "Sortie", preset)]["sorties"] == 50.0
+
+
+def test_summary_is_cached_until_new_finance_rows(fake_db):
+    first = bank_statements.get_bank_statement_summary(1, months=3)
+    assert bank_statements.get_bank_statement_summary(1, months=3) is first
+    assert fake_db["buckets"] == 1
+
+    bank_statements.get_bank_statement_summary(1, months=12)
+    assert fake_db["buckets"] == 2
+
+    fake_db["version"] = (2, 3)
+    assert bank_statements.get_bank_statement_summary(1, months=3) is not first
+    assert fake_db["buckets"] == 3
@@ -0,0 +1,88 @@
+from backend.services.parsers import bank_statement_parsers, statement_pipeline
+from backend.services.parsers.statement_pipeline import StatementCache, parse_statements
+
+_SUMUP_PAGE = "\n".join(
+    [
+        "Relevé de compte SumUp",
+        "IBAN: FR7612345678901234567890123",
+        "Date de la transaction Code de la transaction Type de transaction",
+        "01/12/2024 10:00 ABC123 Paiement carte REF1 Approuvé 0.00 12.50 0.20 112.30",
+    ]
+)
+
+
+def _fake_extract(calls):
+    def _extract(source):
+        calls.append(source.read())
+        return [_SUMUP_PAGE]
+
+    return _extract
+
+
+def test_parse_statement_pages_detects_bank_from_extracted_text():
+    statement = bank_statement_parsers.parse_statement_pages([_SUMUP_PAGE], "releve.pdf")
+
+    assert statement.bank_type == "SUMUP"
+    assert statement.iban == "FR7612345678901234567890123"
+    assert len(statement.transactions) == 1
+    assert statement.transactions[0].source_file == "releve.pdf"
+
+
+def test_parse_statements_uses_content_hash_cache(tmp_path, monkeypatch):
+    calls: list[bytes] = []
+    monkeypatch.setattr(statement_pipeline, "extract_pages", _fake_extract(calls))
+    first = tmp_path / "a.pdf"
+    first.write_bytes(b"%PDF-sumup")
+    cache = StatementCache(tmp_path / "cache")
+
+    cold = parse_statements([first], workers=1, cache=cache)
+    assert cold[0].error is None and not cold[0].cached
+    assert calls == [b"%PDF-sumup"]
+
+    # Même contenu sous un autre nom : servi par le cache, sans ré-extraction.
+    renamed = tmp_path / "b.pdf"
+    renamed.write_bytes(b"%PDF-sumup")
+    warm = parse_statements([first, renamed], workers=1, cache=cache)
+
+    assert [r.cached for r in warm] == [True, True]
+    assert len(calls) == 1
+    assert warm[1].statement.source_file == str(renamed)
+    assert warm[1].statement.transactions[0].source_file == str(renamed)
+
+
+def test_parse_statements_reports_errors_without_stopping(tmp_path, monkeypatch):
+    monkeypatch.setattr(statement_pipeline, "extract_pages", lambda source: ["texte inconnu"])
+    unknown = tmp_path / "inconnu.pdf"
+    unknown.write_bytes(b"%PDF-unknown")
+    missing = tmp_path / "absent.pdf"
+
+    results = parse_statements([unknown, missing], workers=1, cache=False)
+
+    assert [r.path for r in results] == [unknown, missing]
+    assert "non reconnu" in results[0].error
+    assert results[1].statement is None and results[1].error
+
+
+def test_statement_cache_round_trips_as_json(tmp_path):
+    statement = bank_statement_parsers.parse_statement_pages([_SUMUP_PAGE], "releve.pdf")
+    cache = StatementCache(tmp_path / "cache")
+
+    cache.put("ab" * 32, statement)
+
+    entry = next((tmp_path / "cache").rglob("*.json"))
+    assert entry.read_text(encoding="utf-8").startswith("{")
+    assert cache.get("ab" * 32) == statement
+    assert (tmp_path / "cache").stat().st_mode & 0o077 == 0
+
+
+def test_statement_cache_ignores_directory_shared_with_other_users(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    statement = bank_statement_parsers.parse_statement_pages([_SUMUP_PAGE], "releve.pdf")
+    cache = StatementCache(shared)
+
+    cache.put("cd" * 32, statement)
+
+    assert cache.get("cd" * 32) is None
+    assert list(shared.iterdir()) == []
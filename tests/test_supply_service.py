@@ -11,6 +11,15 @@ pytestmark = pytest.mark.skipif(
 )
 
 
+@pytest.fixture(autouse=True)
+def _isolated_supply_cache(monkeypatch):
+    monkeypatch.setattr(supply, "forecast_daily_consumption", lambda tenant_id, horizon: {})
+    monkeypatch.setattr(supply, "_movement_watermark", lambda tenant_id: 0)
+    supply.invalidate_supply_cache()
+    yield
+    supply.invalidate_supply_cache()
+
+
 def test_compute_supply_plan_with_recommendations(monkeypatch):
     monkeypatch.setattr(supply, "fetch_customer_catalog", lambda tenant_id: sample_data.make_catalog_df())
     monkeypatch.setattr(supply, "fetch_recent_suppliers", lambda tenant_id: sample_data.make_suppliers_df())
@@ -48,3 +57,41 @@ def test_supply_plan_filters_and_search(monkeypatch):
     assert result["summary"]["analyzed"] == 1
     assert result["items"][0]["nom"] == "Jus mangue"
     assert result["items"][0]["fournisseur"] == "Metro"
+
+
+def test_supply_plan_reuses_base_until_new_movement(monkeypatch):
+    loads = []
+    watermark = {"value": 10}
+
+    def fake_catalog(tenant_id):
+        loads.append(tenant_id)
+        return sample_data.make_catalog_df()
+
+    monkeypatch.setattr(supply, "fetch_customer_catalog", fake_catalog)
+    monkeypatch.setattr(supply, "fetch_recent_suppliers", lambda tenant_id: sample_data.make_suppliers_df())
+    monkeypatch.setattr(supply, "_movement_watermark", lambda tenant_id: watermark["value"])
+
+    first = supply.compute_supply_plan(target_coverage=10, alert_threshold=5)
+    wider = supply.compute_supply_plan(target_coverage=30, alert_threshold=5, search="eau")
+    assert loads == [1]
+    assert wider["summary"]["units_to_order"] > 0
+    assert first["summary"]["analyzed"] == 4
+
+    watermark["value"] = 11
+    supply.compute_supply_plan(target_coverage=10, alert_threshold=5)
+    assert loads == [1, 1]
+
+
+def test_supply_plan_pages_items_but_summarises_everything(monkeypatch):
+    monkeypatch.setattr(supply, "fetch_customer_catalog", lambda tenant_id: sample_data.make_catalog_df())
+    monkeypatch.setattr(supply, "fetch_recent_suppliers", lambda tenant_id: sample_data.make_suppliers_df())
+
+    full = supply.compute_supply_plan(target_coverage=10, alert_threshold=5)
+    page = supply.compute_supply_plan(target_coverage=10, alert_threshold=5, limit=1, offset=1)
+    urgent = supply.compute_supply_plan(target_coverage=10, alert_threshold=5, priorities=["Critique"])
+
+    assert page["summary"] == full["summary"]
+    assert page["items_total"] == full["items_total"] == 4
+    assert page["items"] == full["items"][1:2]
+    assert urgent["items"] and all(item["niveau_priorite"] == "Critique" for item in urgent["items"])
+    assert urgent["items_total"] == len(urgent["items"])